@@ -1,15 +1,75 @@
-from fastapi import FastAPI, HTTPException, Request
+# Configuration is loaded once, before anything else is imported
+from startup.config import get_settings, configure_logging
+from startup.import_profiler import start_import_profiler
+configure_logging()
+import_profiler = start_import_profiler(get_settings().import_profile)
+
+from fastapi import FastAPI, HTTPException, Request, Response, BackgroundTasks
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Dict, Optional, Any
 from fastapi.middleware.cors import CORSMiddleware
-from fitness_optimization import optimize_gpt, workout_gpt
-from nutri_optimization import nutrition_gpt
-from checkIn_optimization import checkIn_gpt
-from checkIn_fixPlans import adjust_plan_gpt
-from firstPlanNote import RPAnalysisSystem
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+from startup.clients import registry
+from startup.admission import (
+    BATCH, CHECK_IN, FIRST_PLAN, PRIORITIES, PRIORITY_HEADER, AdmissionController, AdmissionRejected
+)
+from startup.lazy import LazyObject, lazy_import
+from first_time_plans.circuit_breaker import CircuitOpen, breaker_stats
+from first_time_plans.model_routing import routing_stats
+from first_time_plans.batch_llm import batch_stats
+from first_time_plans.deadline import (
+    DEADLINE_HEADER, DeadlineExceeded, RequestCancelled, budget_from_header, current_deadline, detached, optional_step, request_deadline
+)
+
+# Pipeline modules are imported lazily: each name below is only imported when its endpoint
+# first calls it. Request models, exception classes and the user store stay eager.
+optimize_gpt = lazy_import("fitness_optimization", "optimize_gpt")
+workout_gpt = lazy_import("fitness_optimization", "workout_gpt")
+nutrition_gpt = lazy_import("nutri_optimization", "nutrition_gpt")
+checkIn_gpt = lazy_import("checkIn_optimization", "checkIn_gpt")
+adjust_plan_gpt = lazy_import("checkIn_fixPlans", "adjust_plan_gpt")
+adjust_plan_patch_gpt = lazy_import("checkIn_fixPlans", "adjust_plan_patch_gpt")
+RPAnalysisSystem = lazy_import("firstPlanNote", "RPAnalysisSystem")
+CheckInDataIngestionModule = lazy_import("check_time_plans.data_ingestion.check_in_ingestion", "CheckInDataIngestionModule")
+from check_time_plans.decisions.plan_patch import PlanPatchError
+from check_time_plans.data_ingestion.check_in_ingestion import WorkoutPlan, MealPlan
+CheckInMemoryStore = lazy_import("check_time_plans.data_ingestion.memory_store", "CheckInMemoryStore")
+build_metrics_row = lazy_import("check_time_plans.data_ingestion.memory_store", "build_metrics_row")
+pre_screen_metrics_row = lazy_import("check_time_plans.data_ingestion.memory_store", "pre_screen_metrics_row")
+ChunkCache = lazy_import("check_time_plans.data_ingestion.chunking", "ChunkCache")
+from check_time_plans.data_ingestion.user_store import UserInfoStore
+from check_time_plans.data_ingestion.idempotency_store import (
+    IDEMPOTENCY_HEADER, IdempotencyKeyReused, IdempotencyStore, request_hash
+)
+
+logger = logging.getLogger(__name__)
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # On by default in production: prime the LLM connection pool before taking traffic
+    if get_settings().warmup:
+        await run_in_threadpool(registry.warm_up)
+    removed = idempotency_store.purge()
+    if removed:
+        logger.info(f"Purged {removed} expired idempotency record(s)")
+    removed = ChunkCache().purge()
+    if removed:
+        logger.info(f"Purged {removed} unused chunk result(s)")
+    # Bulk jobs run on daemon threads, so a stopped worker leaves its jobs "running"
+    interrupted = batch_job_store.interrupt_abandoned()
+    if interrupted:
+        logger.warning(f"Marked {interrupted} batch job(s) of a stopped worker as interrupted")
+    yield
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -19,13 +79,211 @@ app.add_middleware(
 )
 
 
+# Default time budget (seconds) per endpoint when the client sends no X-Request-Timeout header
+REQUEST_BUDGETS = {
+    "/first_time/": 240.0,
+    "/check_in_optimization/": 120.0,
+}
+DEFAULT_REQUEST_BUDGET = 60.0
+
+
+class RequestDeadlineMiddleware:
+    """
+    Makes the request's deadline current for the endpoint and every LLM call it makes.
+
+    Plain ASGI rather than @app.middleware("http"), which would hide the client's
+    disconnect from the endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        default = REQUEST_BUDGETS.get(scope["path"], DEFAULT_REQUEST_BUDGET)
+        header = Headers(scope=scope).get(DEADLINE_HEADER)
+        with request_deadline(budget_from_header(header, default)):
+            await self.app(scope, receive, send)
+
+
+app.add_middleware(RequestDeadlineMiddleware)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.exception_handler(RequestCancelled)
+async def request_cancelled_handler(request: Request, exc: RequestCancelled):
+    # Nobody is listening any more; 499 only shows up in the access log
+    return JSONResponse(status_code=499, content={"detail": str(exc)})
+
+
+@app.exception_handler(CircuitOpen)
+async def circuit_open_handler(request: Request, exc: CircuitOpen):
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.get("/llm/circuits")
+async def llm_circuits():
+    """State and recent latency of this worker's per-model LLM circuit breakers."""
+    return breaker_stats()
+
+@app.get("/llm/routes")
+async def llm_routes():
+    """Model tiers, the model each node is currently routed to and observed latency per node and model."""
+    return routing_stats()
+
+
+@app.get("/llm/batches")
+async def llm_batches():
+    """Active bulk runs, pending and running batched requests of this worker."""
+    return batch_stats()
+
+
+# Seconds between checks for a disconnected client while a pipeline runs
+DISCONNECT_POLL_INTERVAL = 0.5
+
+
+async def run_cancellable(request: Request, pipeline, *args):
+    """
+    Run a blocking pipeline in the threadpool while watching the client connection.
+
+    If the client disconnects, the request's deadline is cancelled: the LLM call in flight
+    closes its stream at the next chunk and no further node starts, freeing the worker thread
+    and the connection. With COMPLETE_ON_DISCONNECT=1 the pipeline runs to the end instead, so
+    its LLM results still land in the caches; the same holds for requests carrying an
+    Idempotency-Key, whose retry picks up the stored response.
+    """
+    task = asyncio.ensure_future(run_in_threadpool(pipeline, *args))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            break
+
+    # A client that sent an Idempotency-Key retries with it and attaches to this run
+    if get_settings().complete_on_disconnect or IDEMPOTENCY_HEADER in request.headers:
+        logger.info(f"Client left {request.url.path}; completing the run in the background")
+    else:
+        logger.info(f"Client left {request.url.path}; cancelling the run")
+        current_deadline().cancel()
+    return await task
+
+
+# Per-worker bound on concurrently running pipelines (MAX_CONCURRENT_PIPELINES)
+admission = AdmissionController(get_settings().max_concurrent_pipelines)
+# Priority class per pipeline route; a caller can only lower it, with X-Request-Priority
+ADMISSION_CLASSES = {
+    "/first_time/": FIRST_PLAN,
+    "/check_in_optimization/": CHECK_IN,
+    "/checkIn_optimization/": CHECK_IN,
+    "/checkIn_adjustPlan/": CHECK_IN,
+    "/checkIn_adjustPlan_patch/": CHECK_IN,
+    "/check_in/{user_id}/close_week/": CHECK_IN,
+}
+
+
+async def admit(request: Request, run):
+    """
+    Run a pipeline once the admission controller grants it a slot.
+
+    Requests that cannot start within their deadline get 429 with Retry-After right away
+    rather than queueing until they time out.
+    """
+    route = request.scope.get("route")
+    priority_class = ADMISSION_CLASSES.get(getattr(route, "path", request.url.path), BATCH)
+    requested = request.headers.get(PRIORITY_HEADER)
+    if requested in PRIORITIES and PRIORITIES[requested] > PRIORITIES[priority_class]:
+        priority_class = requested
+    try:
+        async with admission.slot(priority_class, current_deadline().remaining()):
+            return await run()
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Queue depth, running pipelines and queue wait percentiles of this worker."""
+    return admission.stats()
+
+
+# Responses stored under Idempotency-Key, shared by all workers
+idempotency_store = LazyObject(IdempotencyStore)
+# Keyed runs in progress in this worker; a retry waits on the event instead of polling the store
+_idempotent_runs: Dict[str, asyncio.Event] = {}
+# Seconds between store checks while another worker runs the keyed request
+IDEMPOTENCY_POLL_INTERVAL = 0.5
+
+
+async def run_idempotent(request: Request, response: Response, run):
+    """
+    Run a POST at most once per Idempotency-Key.
+
+    Without the header the request simply runs. With it, the first request claims the key and
+    runs; a repeat with the same key and body waits for that run and gets its stored response
+    (marked Idempotent-Replayed: true), and after a successful run the response is replayed
+    immediately for IDEMPOTENCY_TTL seconds. A failed run releases the key, so a retry runs
+    again. Reusing a key with a different body is rejected with 422. Only runs go through
+    admission control; replays are answered straight away.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return await admit(request, run)
+
+    scope = request.url.path
+    fingerprint = request_hash(scope, await request.body())
+    run_key = f"{scope}\n{key}"
+    while True:
+        try:
+            claimed, record = await run_in_threadpool(idempotency_store.begin, scope, key, fingerprint)
+        except IdempotencyKeyReused as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if claimed:
+            break
+        if record.done:
+            response.headers["Idempotent-Replayed"] = "true"
+            return record.response
+        running = _idempotent_runs.get(run_key)
+        if running is not None:
+            await running.wait()
+        else:
+            # Running in another worker: wait until it is stored, or released and ours to run
+            await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+            current_deadline().check()
+
+    finished = _idempotent_runs[run_key] = asyncio.Event()
+    try:
+        result = jsonable_encoder(await admit(request, run))
+    except BaseException:
+        await run_in_threadpool(idempotency_store.release, scope, key)
+        raise
+    else:
+        if isinstance(result, dict) and result.get("degraded"):
+            # Rule-based stand-ins are not the answer to keep; a retry should get the real plan
+            await run_in_threadpool(idempotency_store.release, scope, key)
+        else:
+            await run_in_threadpool(idempotency_store.complete, scope, key, result)
+        return result
+    finally:
+        _idempotent_runs.pop(run_key, None)
+        finished.set()
 
 
 
 
 
 
-user_infos: Dict[str, dict] = {}
+
+
+# Persisted on disk so that every worker process sees the same users
+user_infos = UserInfoStore()
 
 
 class UserInfo(BaseModel):
@@ -148,7 +406,7 @@ async def get_user_info(user_id: str):
 @app.get("/get-all-users/", response_model=Dict[str, UserInfo])
 async def get_all_users():
     if user_infos:
-        return user_infos
+        return dict(user_infos)
     raise HTTPException(status_code=404, detail="No users found")
     
 
@@ -167,17 +425,35 @@ class CheckInData(BaseModel):
     userWorkoutDetailsLastWeek: str
 
 
+# Per-user rolling digest (condensed initial report, key metrics table, capped narrative)
+# used in check-in prompts instead of the full initial report and raw history
+memory_store = LazyObject(CheckInMemoryStore)
+
+
 # return just the chekcIn report with update fo the workout
 @app.post("/checkIn_optimization/")
-async def receive_check_in(data: CheckInData):
+async def receive_check_in(data: CheckInData, background_tasks: BackgroundTasks, request: Request):
     
     data_info =  data.dict()
-    checkIn_response =  await checkIn_gpt(data_info)
+
+    async def run():
+        # Condensing the initial report is a blocking LLM call: it runs in the threadpool,
+        # inside the admitted slot and under the request's deadline
+        data_info["memoryDigest"] = await run_in_threadpool(memory_store.digest, data.userId, data.analysisReportStart)
+        return await checkIn_gpt(data_info)
+
+    checkIn_response =  await admit(request, run)
+    # Fold the report into the digest after responding, free of the request's deadline
+    background_tasks.add_task(detached(memory_store.update), data.userId, checkIn_response)
     return {"message": "Check-in data received successfully!", "response": checkIn_response}
 
 
 @app.post("/checkIn_adjustPlan/")
-async def adjudst_plan_check_in(data: CheckInData):
+async def adjudst_plan_check_in(data: CheckInData, request: Request, response: Response):
+    return await run_idempotent(request, response, lambda: adjust_plan_check_in(data))
+
+
+async def adjust_plan_check_in(data: CheckInData):
     data_info = data.dict()
     
     # Call the AI function to analyze and optimize the check-in plan
@@ -194,6 +470,40 @@ async def adjudst_plan_check_in(data: CheckInData):
 
 
 
+class PlanPatchRequest(CheckInData):
+    checkInResponse: str = ""
+    # Validated into the check-in plan models with their usual defaults
+    workoutPlan: WorkoutPlan
+    mealPlan: MealPlan
+
+
+@app.post("/checkIn_adjustPlan_patch/")
+async def adjust_plan_patch_check_in(data: PlanPatchRequest, request: Request, response: Response):
+    """
+    Structured plan adjustment: the LLM returns patch operations against the stored
+    workout and meal plans, which are applied and validated here. Returns the patched
+    plans together with the diff.
+    """
+    return await run_idempotent(request, response, lambda: run_in_threadpool(adjust_plan_patch, data))
+
+
+def adjust_plan_patch(data: PlanPatchRequest):
+    try:
+        adjustment = adjust_plan_patch_gpt(data.dict(), data.checkInResponse, data.workoutPlan, data.mealPlan)
+    except PlanPatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return {
+        "message": "Check-in data received successfully!",
+        "response": adjustment
+    }
+
+
+
+
+
+
+
 @app.post("/checkIn_optimization_entire/")
 async def receive_check_in(data: CheckInData):
     data_info = data.dict()
@@ -218,23 +528,27 @@ from pydantic import BaseModel
 from fastapi import HTTPException
 
 # Module imports remain the same as before...
-from check_time_plans.data_ingestion.check_in_ingestion import CheckInDataIngestionModule
+CheckInDataIngestionModule = lazy_import("check_time_plans.data_ingestion.check_in_ingestion", "CheckInDataIngestionModule")
 
 
-from check_time_plans.data_ingestion.meal_adherence import MealAdherenceExtractor
-from check_time_plans.data_ingestion.training_logs import TrainingLogsExtractor
-from check_time_plans.data_ingestion.body_metrics import BodyMetricsExtractor
-from check_time_plans.data_ingestion.report_metrics import ReportMetricExtractor
+MealAdherenceExtractor = lazy_import("check_time_plans.data_ingestion.meal_adherence", "MealAdherenceExtractor")
+TrainingLogsExtractor = lazy_import("check_time_plans.data_ingestion.training_logs", "TrainingLogsExtractor")
+BodyMetricsExtractor = lazy_import("check_time_plans.data_ingestion.body_metrics", "BodyMetricsExtractor")
+personal_metrics = lazy_import("check_time_plans.analytics.anthropometrics", "personal_metrics")
+ReportMetricExtractor = lazy_import("check_time_plans.data_ingestion.report_metrics", "ReportMetricExtractor")
+TimeSeriesStore = lazy_import("check_time_plans.data_ingestion.timeseries_store", "TimeSeriesStore")
 
 
-from check_time_plans.analysis.nutrition_adherence import NutritionAdherenceModule
-from check_time_plans.analysis.training_performance import TrainingPerformanceModule
-from check_time_plans.analysis.body_metrics import BodyMetricsModule
+NutritionAdherenceModule = lazy_import("check_time_plans.analysis.nutrition_adherence", "NutritionAdherenceModule")
+TrainingPerformanceModule = lazy_import("check_time_plans.analysis.training_performance", "TrainingPerformanceModule")
+BodyMetricsModule = lazy_import("check_time_plans.analysis.body_metrics", "BodyMetricsModule")
 
-from check_time_plans.decisions.goal_alignment import GoalAlignmentNode
+GoalAlignmentNode = lazy_import("check_time_plans.decisions.goal_alignment", "GoalAlignmentNode")
 
-from check_time_plans.decisions.nutrition_adjustment import NutritionAdjustmentNode
-from check_time_plans.decisions.training_adjustment import TrainingAdjustmentNode
+NutritionAdjustmentNode = lazy_import("check_time_plans.decisions.nutrition_adjustment", "NutritionAdjustmentNode")
+TrainingAdjustmentNode = lazy_import("check_time_plans.decisions.training_adjustment", "TrainingAdjustmentNode")
+NoChangePreScreenNode = lazy_import("check_time_plans.decisions.no_change_screen", "NoChangePreScreenNode")
+session_dates = lazy_import("check_time_plans.analytics.meal_analytics", "session_dates")
 
 
 """
@@ -250,6 +564,9 @@ from check_time_plans.plans.meal_plan_generator import MealPlanGenerator
 
 
 
+timeseries_store = LazyObject(TimeSeriesStore)
+
+
 # Define our input model that matches the structure we're receiving
 class CheckInData(BaseModel):
     analysisReport: Optional[Dict[str, Any]] = None
@@ -261,35 +578,106 @@ class CheckInData(BaseModel):
     weekReport: Optional[Dict[str, Any]] = None
 
 @app.post("/check_in_optimization/")
-async def process_check_in(data: Dict[str, Any]):
+async def process_check_in(request: Request, response: Response):
+    body = await request.body()
+    # The pipeline blocks on its LLM calls, so it runs in the threadpool (see run_cancellable)
+    return await run_idempotent(request, response, lambda: run_cancellable(request, run_check_in, body))
+
+
+def append_measurement_history(check_in) -> None:
+    """Append the check-in's current body measurements to the columnar history."""
+    timeseries_store.append_measurements(
+        check_in.userId,
+        check_in.bodyMeasurements.dates.get("current", ""),
+        {name: m.current for name, m in check_in.bodyMeasurements.measurements.items()}
+    )
+
+
+def run_check_in(body: bytes):
     try:
 
         # 1. Data Ingestion Phase
+        # The raw body is validated once, straight into the typed models; extractors read
+        # those models through views instead of .dict() copies
         ingestion_module = CheckInDataIngestionModule()
-        standardized_data = ingestion_module.process_check_in_data(data)
+        standardized_data = ingestion_module.process_check_in_json(body)
+        # Keep the columnar history up to date on every path, fast path included, so
+        # extractors can report long-term trends
+        timeseries_store.append_daily_reports(standardized_data.userId, standardized_data.dailyReports)
+        append_measurement_history(standardized_data)
         
 
+        # 1b. No-change fast path: when every weekly metric is within tolerance keep the plan
+        # and skip extraction, analysis and decision LLM calls
+        pre_screen_node = NoChangePreScreenNode()
+        pre_screen = pre_screen_node.evaluate(standardized_data)
+        # Key numbers go into the long-term memory table used by later check-in prompts on
+        # every path; the extractors' row below refines it when they run
+        memory_store.record_metrics(standardized_data.userId, pre_screen_metrics_row(
+            standardized_data.weekReport.date,
+            standardized_data.weekReport.averageWeight,
+            pre_screen
+        ))
+        if pre_screen.keep_plan:
+            no_change = pre_screen_node.build_no_change_response(standardized_data, pre_screen)
+            return {
+                "status": "success",
+                "userId": standardized_data.userId,
+                "dataIngestionComplete": True,
+                "fastPath": True,
+                "goals": {
+                    "weekly": standardized_data.goals.weeklyGoal,
+                    "monthly": standardized_data.goals.monthlyGoal,
+                    "quarterly": standardized_data.goals.quarterlyGoal
+                },
+                "preScreen": pre_screen.dict(),
+                "decisionPhase": {
+                    "nutrition_adjustments": no_change["nutrition_adjustments"],
+                    "training_adjustments": no_change["training_adjustments"]
+                },
+                "summary_report": {
+                    "report": no_change["summary"]
+                }
+            }
+
+
         # 2. Extract 
         meal_data = MealAdherenceExtractor().extract_meal_adherence(
-            standardized_data.mealPlan.dict(),  
-            [report.dict() for report in standardized_data.dailyReports]  
+            standardized_data.mealPlan,
+            standardized_data.dailyReports,
+            training_dates=session_dates(standardized_data.exerciseLogs)
         )
         training_data = TrainingLogsExtractor().extract_training_logs(
-            [log.dict() for log in standardized_data.exerciseLogs],
-            standardized_data.workoutPlan.dict()
+            standardized_data.exerciseLogs,
+            standardized_data.workoutPlan
         )
-        body_data = BodyMetricsExtractor().extract_body_measurements(
-            standardized_data.bodyMeasurements.dict()  
+        # Sex and height from saved user info feed the body-fat and BMI estimates
+        sex, height_cm, _ = personal_metrics(user_infos.get(standardized_data.userId, {}))
+        body_data = BodyMetricsExtractor(timeseries_store=timeseries_store).extract_body_measurements(
+            standardized_data.bodyMeasurements,
+            user_id=standardized_data.userId,
+            sex=sex,
+            height_cm=height_cm
         )
 
-        report_daily_week = ReportMetricExtractor().extract_report_metrics(
-            standardized_data.weekReport.dict(), 
-            [daily.dict() for daily in standardized_data.dailyReports]
+        report_daily_week = ReportMetricExtractor(timeseries_store=timeseries_store).extract_report_metrics(
+            standardized_data.weekReport,
+            standardized_data.dailyReports
         )
 
 
 
 
+        # The extractors' metrics fill in and replace the pre-screen's numbers
+        memory_store.record_metrics(standardized_data.userId, build_metrics_row(
+            standardized_data.weekReport.date,
+            standardized_data.weekReport.averageWeight,
+            meal_metrics=meal_data.get("computed_metrics"),
+            training_metrics=training_data.get("computed_metrics"),
+            report_metrics=report_daily_week.get("computed_metrics")
+        ))
+
+
         # 3. Analysis Phase 
         nutrition_analysis = NutritionAdherenceModule().analyze_meal_compliance(meal_data)  
         training_analysis = TrainingPerformanceModule().analyze_workout_execution(training_data)
@@ -320,6 +708,7 @@ async def process_check_in(data: Dict[str, Any]):
             "status": "success",
             "userId": standardized_data.userId,
             "dataIngestionComplete": True,
+            "fastPath": False,
             "goals": {
                 "weekly": standardized_data.goals.weeklyGoal,
                 "monthly": standardized_data.goals.monthlyGoal,
@@ -336,6 +725,7 @@ async def process_check_in(data: Dict[str, Any]):
                 "metrics_analysis" : metrics_analysis,
                 "report_daily_week" : report_daily_week, 
                 "goal_alignment" : goal_alignment,
+                "pre_screen" : pre_screen.dict(),
             }, 
             "decisionPhase": { 
                 "nutrition_adjustments" :  nutrition_adjustments, 
@@ -343,9 +733,12 @@ async def process_check_in(data: Dict[str, Any]):
             }, 
             "summary_report" :  {
                 "report" : "summary_report"
-            }
+            },
+            "skippedNodes": list(current_deadline().skipped)
 
         }
+    except (DeadlineExceeded, CircuitOpen):
+        raise
     except Exception as e:
         # Proper error handling
         raise HTTPException(status_code=500, detail=f"Error processing check-in data: {str(e)}")
@@ -420,32 +813,255 @@ async def process_check_in(data: Dict[str, Any]):
 
 
 
+# Bulk check-ins: many runs share Batch API batches (see first_time_plans.batch_llm), at
+# batch prices and outside the interactive rate limits; results are collected per job
+from first_time_plans.batch_llm import batch_mode, get_collector
+from check_time_plans.data_ingestion.batch_job_store import BatchJobStore
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import threading
+import json
+
+batch_job_store = LazyObject(BatchJobStore)
+
+# Budget of one bulk run: pipelines expect a deadline, but each of a run's stages is a batch
+# that may take up to the Batch API's 24h completion window
+BATCH_RUN_BUDGET = 3 * 86400.0
+
+
+@app.post("/batch/check_in_optimization/", status_code=202)
+async def submit_check_in_batch(check_ins: List[Dict[str, Any]]):
+    """Queue one check-in run per body; poll GET /batch/jobs/{job_id} for the results."""
+    if not check_ins:
+        raise HTTPException(status_code=422, detail="No check-ins to run")
+    job = batch_job_store.create("check_in_optimization", len(check_ins))
+    bodies = [json.dumps(body).encode("utf-8") for body in check_ins]
+    # A thread of its own: runs take as long as their batches, and start without the request's deadline
+    threading.Thread(target=run_batch_job, args=(job.job_id, run_check_in, bodies), daemon=True).start()
+    return job.summary()
+
+
+@app.get("/batch/jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    job = batch_job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return {**job.summary(), "items": job.items}
+
+
+def run_batch_job(job_id: str, pipeline, inputs: List[Any]):
+    """Run the pipeline once per input in batch mode, up to BATCH_MAX_RUNS at a time."""
+    collector = get_collector()
+
+    def run(index: int, data: Any):
+        try:
+            with request_deadline(BATCH_RUN_BUDGET), batch_mode(collector):
+                result = pipeline(data)
+        except HTTPException as e:
+            batch_job_store.record(job_id, index, error=str(e.detail))
+        except Exception as e:
+            batch_job_store.record(job_id, index, error=str(e))
+        else:
+            batch_job_store.record(job_id, index, result=jsonable_encoder(result))
+
+    if not inputs:
+        return
+    # Held until every run is recorded; without it the job is closed as interrupted on the next startup
+    with batch_job_store.running(job_id):
+        with ThreadPoolExecutor(max_workers=max(1, min(get_settings().batch_max_runs, len(inputs)))) as pool:
+            for index, data in enumerate(inputs):
+                pool.submit(contextvars.copy_context().run, run, index, data)
+    logger.info(f"Batch job {job_id} finished ({len(inputs)} run(s))")
+
+
+# Daily incremental check-in ingestion: reports and exercise entries are appended as they
+# arrive, so the weekly check-in only needs the decision LLM calls
+from check_time_plans.data_ingestion.check_in_ingestion import DailyReport, ExerciseLog
+DailyCheckInStore = lazy_import("check_time_plans.data_ingestion.daily_ingestion", "DailyCheckInStore")
+
+daily_store = LazyObject(DailyCheckInStore)
+
+# The store endpoints below are plain functions: FastAPI runs them in its threadpool, so
+# their file locks and disk IO never block the event loop
+
+
+@app.post("/check_in/{user_id}/daily_report/")
+def append_daily_report(user_id: str, report: DailyReport):
+    aggregates = daily_store.append_daily_report(user_id, report)
+    timeseries_store.append_daily_reports(user_id, [report])
+    return {"status": "success", "userId": user_id, "aggregates": aggregates}
+
+
+@app.post("/check_in/{user_id}/exercise_log/")
+def append_exercise_log(user_id: str, log: ExerciseLog):
+    aggregates = daily_store.append_exercise_log(user_id, log)
+    return {"status": "success", "userId": user_id, "aggregates": aggregates}
+
+
+@app.get("/check_in/{user_id}/aggregates/")
+def get_check_in_aggregates(user_id: str):
+    state = daily_store.get_state(user_id)
+    return {"userId": user_id, "aggregates": state.aggregates}
+
+
+@app.post("/check_in/{user_id}/close_week/")
+async def close_check_in_week(user_id: str, data: Dict[str, Any], request: Request):
+    return await admit(request, lambda: run_in_threadpool(close_week, user_id, data))
+
+
+def close_week(user_id: str, data: Dict[str, Any]):
+    """
+    Weekly check-in built from the stored daily data. The request carries only the
+    weekly context (analysisReport, bodyMeasurements, mealPlan, userWorkoutDetails,
+    weekReport); daily reports and exercise logs come from the store. Once the check-in
+    has been processed successfully, the reports and entries it used are removed from
+    the store; anything appended meanwhile is kept for the next week.
+    """
+    state = daily_store.get_state(user_id).model_copy(deep=True)
+    try:
+        payload = dict(data)
+        # Stored models are passed as they are; validation does not copy model instances
+        payload["dailyReports"] = state.dailyReports
+        payload["exercisesLog"] = state.exerciseLogs
+        payload.setdefault("weekReport", {}).setdefault("userId", user_id)
+
+        standardized_data = CheckInDataIngestionModule().process_check_in_data(payload)
+        aggregates = state.aggregates
+        # Daily reports reached the columnar history as they arrived; the week adds its measurements
+        append_measurement_history(standardized_data)
+
+        pre_screen_node = NoChangePreScreenNode()
+        pre_screen = pre_screen_node.evaluate(standardized_data)
+        memory_store.record_metrics(user_id, pre_screen_metrics_row(
+            standardized_data.weekReport.date,
+            standardized_data.weekReport.averageWeight or aggregates.weight_ewma,
+            pre_screen
+        ))
+        if pre_screen.keep_plan:
+            no_change = pre_screen_node.build_no_change_response(standardized_data, pre_screen)
+            daily_store.close_week(user_id, state)
+            return {
+                "status": "success",
+                "userId": user_id,
+                "fastPath": True,
+                "aggregates": aggregates,
+                "preScreen": pre_screen.dict(),
+                "decisionPhase": {
+                    "nutrition_adjustments": no_change["nutrition_adjustments"],
+                    "training_adjustments": no_change["training_adjustments"]
+                },
+                "summary_report": {"report": no_change["summary"]}
+            }
+
+        nutrition_analysis = aggregates.nutrition_summary(standardized_data.mealPlan.totalDailyNutrition.model_dump())
+        planned_sessions = sum(
+            1 for day in standardized_data.workoutPlan.schedule if day.type != "Rest Day" and day.exercises
+        )
+        training_summary = aggregates.training_summary(planned_sessions)
+        waist_change = next(
+            (m.change for name, m in standardized_data.bodyMeasurements.measurements.items() if "waist" in name.lower()),
+            None
+        )
+        weight_change = (
+            round(aggregates.weight_last - aggregates.weight_first, 2)
+            if aggregates.weight_first is not None else None
+        )
+
+        goal_alignment = GoalAlignmentNode().evaluate_goal_progress(
+            {"body_metrics_analysis": {
+                "composition_metrics": {
+                    "weight_change": weight_change,
+                    "waist_measurement_change": waist_change
+                },
+                "specific_measurement_changes": []
+            }},
+            {"training_performance_analysis": {
+                "program_adherence_score": training_summary["session_completion_percentage"],
+                "progression_assessment": (
+                    f"Progressing: {', '.join(training_summary['progressing_lifts']) or 'none'}; "
+                    f"stalled: {', '.join(training_summary['stalled_lifts']) or 'none'}"
+                )
+            }}
+        )
+
+        nutrition_adjustments = NutritionAdjustmentNode().determine_nutrition_changes(
+            nutrition_analysis=nutrition_analysis,
+            goal_alignment=goal_alignment,
+            current_meal_plan=standardized_data.mealPlan.dict()
+        )
+        training_adjustments = TrainingAdjustmentNode().determine_training_changes(
+            training_analysis=training_summary,
+            goal_alignment=goal_alignment,
+            current_workout_plan=standardized_data.workoutPlan.dict()
+        )
+
+        daily_store.close_week(user_id, state)
+        return {
+            "status": "success",
+            "userId": user_id,
+            "fastPath": False,
+            "aggregates": aggregates,
+            "preScreen": pre_screen.dict(),
+            "analysisData": {
+                "nutrition_analysis": nutrition_analysis,
+                "training_analysis": training_summary,
+                "goal_alignment": goal_alignment
+            },
+            "decisionPhase": {
+                "nutrition_adjustments": nutrition_adjustments,
+                "training_adjustments": training_adjustments
+            }
+        }
+    except (DeadlineExceeded, CircuitOpen):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing check-in data: {str(e)}")
+
+
+
+
+
+
+
+
+
+
 # Import modules for data processing and analysis
-from first_time_plans.Module_A_B.dataIngestionModule import DataIngestionModule
+DataIngestionModule = lazy_import("first_time_plans.Module_A_B.dataIngestionModule", "DataIngestionModule")
+ProfileCanonicalizer = lazy_import("first_time_plans.Module_A_B.profileCanonicalization", "ProfileCanonicalizer")
 
-from first_time_plans.Module_A_B.goalClarificationModule import GoalClarificationModule
-from first_time_plans.Module_A_B.bodyCompositionModule import BodyCompositionModule
-from first_time_plans.Module_A_B.trainingHistory import TrainingHistoryModule
-from first_time_plans.Module_A_B.recoveryAndLifestyleModule import RecoveryAndLifestyleModule
+GoalClarificationModule = lazy_import("first_time_plans.Module_A_B.goalClarificationModule", "GoalClarificationModule")
+BodyCompositionModule = lazy_import("first_time_plans.Module_A_B.bodyCompositionModule", "BodyCompositionModule")
+TrainingHistoryModule = lazy_import("first_time_plans.Module_A_B.trainingHistory", "TrainingHistoryModule")
+RecoveryAndLifestyleModule = lazy_import("first_time_plans.Module_A_B.recoveryAndLifestyleModule", "RecoveryAndLifestyleModule")
 
 # Import decision nodes for workout planning
-from first_time_plans.Module_C.TrainingSplitDecisionNode import TrainingSplitDecisionNode
-from first_time_plans.Module_C.VolumeDecisionNode import VolumeAndIntensityDecisionNode
-from first_time_plans.Module_C.ExerciseSelectionNode import ExerciseSelectionDecisionNode
+TrainingSplitDecisionNode = lazy_import("first_time_plans.Module_C.TrainingSplitDecisionNode", "TrainingSplitDecisionNode")
+VolumeAndIntensityDecisionNode = lazy_import("first_time_plans.Module_C.VolumeDecisionNode", "VolumeAndIntensityDecisionNode")
+ExerciseSelectionDecisionNode = lazy_import("first_time_plans.Module_C.ExerciseSelectionNode", "ExerciseSelectionDecisionNode")
 
 # Import decision nodes for nutrition planning
-from first_time_plans.Module_D.CalorieNeedsDecisionNode import CaloricNeedsDecisionNode
-from first_time_plans.Module_D.MacrosDistrubutionNodes import MacroDistributionDecisionNode
-from first_time_plans.Module_D.MealTimingDecion import MealTimingDecisionNode
+CaloricNeedsDecisionNode = lazy_import("first_time_plans.Module_D.CalorieNeedsDecisionNode", "CaloricNeedsDecisionNode")
+MacroDistributionDecisionNode = lazy_import("first_time_plans.Module_D.MacrosDistrubutionNodes", "MacroDistributionDecisionNode")
+MealTimingDecisionNode = lazy_import("first_time_plans.Module_D.MealTimingDecion", "MealTimingDecisionNode")
 
 
-from first_time_plans.Module_E.WorkoutDecisionClass import WorkoutDecisionClass
-from first_time_plans.Module_E.NutritionDecisionClass import NutritionDecisionClass
-from first_time_plans.Module_E.ReportDecision  import ReportDecision
+WorkoutDecisionClass = lazy_import("first_time_plans.Module_E.WorkoutDecisionClass", "WorkoutDecisionClass")
+NutritionDecisionClass = lazy_import("first_time_plans.Module_E.NutritionDecisionClass", "NutritionDecisionClass")
+ReportDecision = lazy_import("first_time_plans.Module_E.ReportDecision", "ReportDecision")
 
 
 # Import utility for LLM interactions
-from first_time_plans.call_llm_class import BaseLLM
+BaseLLM = lazy_import("first_time_plans.call_llm_class", "BaseLLM")
+build_shared_prefix = lazy_import("first_time_plans.prompt_prefix", "build_shared_prefix")
+from first_time_plans.partial_output import FieldEvents, early_input
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+
+# Budget (seconds) an optional node needs to be started: the recovery analysis must leave room
+# for the nine required nodes after it, the closing report only for itself
+RECOVERY_MIN_REMAINING = 150.0
+REPORT_MIN_REMAINING = 30.0
 
 # Request model for incoming client data
 class BaseModelForRequest(BaseModel):
@@ -455,64 +1071,92 @@ class BaseModelForRequest(BaseModel):
 
 
 @app.post("/first_time/")
+async def create_first_plan(base_model: BaseModelForRequest, request: Request, response: Response):
+    # The nodes block on their LLM calls, so the pipeline runs in the threadpool while the
+    # connection is watched; a client that goes away cancels the remaining nodes
+    return await run_idempotent(
+        request, response, lambda: run_cancellable(request, build_first_plan, base_model)
+    )
+
 
-async def create_first_plan(base_model: BaseModelForRequest):
+def build_first_plan(base_model: BaseModelForRequest):
     try:
         # --- STEP 1: Data Ingestion ---
         client_data = base_model.dict()
         ingestion_module = DataIngestionModule()
-        standardized_profile = ingestion_module.process_data(client_data)
+        canonicalizer = ProfileCanonicalizer()
+        standardized_profile = canonicalizer.canonicalize(ingestion_module.process_data(client_data))
+        profile_hash = canonicalizer.profile_hash(standardized_profile)
+
+        # One client for every node: the persona and profile form a shared prompt prefix
+        llm = BaseLLM(shared_prefix=build_shared_prefix(standardized_profile))
             
         # --- STEP 2: Goal Clarification --- 
-        goal_module = GoalClarificationModule()
+        goal_module = GoalClarificationModule(llm_client=llm)
         goal_analysis = goal_module.process(standardized_profile)
 
 
         #--- STEP 3:Client Body Composition Analysis ---
-        body_module = BodyCompositionModule()
+        body_module = BodyCompositionModule(llm_client=llm)
         body_analysis = body_module.process(standardized_profile)
 
 
         # --- STEP 6: Training History Analysis ---
-        training_history_module = TrainingHistoryModule()
+        training_history_module = TrainingHistoryModule(llm_client=llm)
         history_analysis = training_history_module.process(standardized_profile)
 
 
         # --- STEP 7: Recovery and Lifestyle Analysis ---
-        recovery_module = RecoveryAndLifestyleModule()
-        recovery_analysis = recovery_module.process(standardized_profile)
-
-
-        #--- STEP 8: Decision Nodes for Workout Planning ---
-        training_split_node = TrainingSplitDecisionNode()
-        split_recommendation = training_split_node.process(
-           standardized_profile, goal_analysis, body_analysis, history_analysis,recovery_analysis
+        # Optional: skipped when the remaining budget is needed for the plans themselves
+        recovery_module = RecoveryAndLifestyleModule(llm_client=llm)
+        recovery_analysis = optional_step(
+            "RecoveryAndLifestyleModule",
+            RECOVERY_MIN_REMAINING,
+            lambda: recovery_module.process(standardized_profile),
+            {}
         )
 
 
-        volume_node = VolumeAndIntensityDecisionNode()
-        volume_guidelines = volume_node.process(
-            standardized_profile, history_analysis, body_analysis, goal_analysis
-        )
-        
-        exercise_node = ExerciseSelectionDecisionNode()
-        exercise_selection = exercise_node.process(
-            standardized_profile, history_analysis, split_recommendation, volume_guidelines
-        )
+        #--- STEP 8: Decision Nodes for Workout Planning ---
+        # Split and volume are independent and stream side by side; exercise selection starts
+        # as soon as the few fields it reads from them are final, while both are still generating
+        training_split_node = TrainingSplitDecisionNode(llm_client=llm)
+        volume_node = VolumeAndIntensityDecisionNode(llm_client=llm)
+        exercise_node = ExerciseSelectionDecisionNode(llm_client=llm)
+        split_fields = FieldEvents()
+        volume_fields = FieldEvents()
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            # Each node runs in a copy of this context so the request deadline reaches it
+            split_future = pool.submit(
+                contextvars.copy_context().run, training_split_node.process,
+                standardized_profile, goal_analysis, body_analysis, history_analysis, recovery_analysis, split_fields
+            )
+            volume_future = pool.submit(
+                contextvars.copy_context().run, volume_node.process,
+                standardized_profile, history_analysis, body_analysis, goal_analysis, volume_fields
+            )
+            exercise_selection = exercise_node.process(
+                standardized_profile,
+                history_analysis,
+                early_input(split_fields, split_future, "training_split_recommendation", *exercise_node.SPLIT_FIELDS),
+                early_input(volume_fields, volume_future, "volume_intensity_recommendation", *exercise_node.VOLUME_FIELDS)
+            )
+            split_recommendation = split_future.result()
+            volume_guidelines = volume_future.result()
 
 
-        caloric_node = CaloricNeedsDecisionNode()
+        caloric_node = CaloricNeedsDecisionNode(llm_client=llm)
         caloric_targets = caloric_node.process(standardized_profile, body_analysis, goal_analysis)
 
 
-        macro_node = MacroDistributionDecisionNode()
+        macro_node = MacroDistributionDecisionNode(llm_client=llm)
         macro_plan = macro_node.process(
             caloric_targets, client_data, body_analysis, goal_analysis, history_analysis
         )
         
   
         
-        meal_timing_node = MealTimingDecisionNode()
+        meal_timing_node = MealTimingDecisionNode(llm_client=llm)
         timing_recommendations = meal_timing_node.process(
             macro_plan, split_recommendation, standardized_profile, goal_analysis, recovery_analysis
         )
@@ -521,7 +1165,7 @@ async def create_first_plan(base_model: BaseModelForRequest):
         # --- STEP 9: Decision Nodes for Nutrition Planning ---
 
 
-        nutrition_decision = NutritionDecisionClass()
+        nutrition_decision = NutritionDecisionClass(llm_client=llm)
         nutrition_plan = nutrition_decision.process(
             standardized_profile,
             caloric_targets,
@@ -532,7 +1176,7 @@ async def create_first_plan(base_model: BaseModelForRequest):
             split_recommendation
         )
 
-        workout_decision = WorkoutDecisionClass()
+        workout_decision = WorkoutDecisionClass(llm_client=llm)
         workout_plan = workout_decision.process(
             standardized_profile, 
             split_recommendation, 
@@ -544,26 +1188,50 @@ async def create_first_plan(base_model: BaseModelForRequest):
         )
 
         # comunque cio la scelta dell metro questo e un altro modo provato si vedra 
-        report_analysis = ReportDecision()
-        final_report = report_analysis.process(
-            standardized_profile,
-            goal_analysis,
-            body_analysis,
-            history_analysis,
-            caloric_targets,
-            macro_plan,
-            workout_plan,
-            nutrition_plan
+        report_analysis = ReportDecision(llm_client=llm)
+        final_report = optional_step(
+            "ReportDecision",
+            REPORT_MIN_REMAINING,
+            lambda: report_analysis.process(
+                standardized_profile,
+                goal_analysis,
+                body_analysis,
+                history_analysis,
+                caloric_targets,
+                macro_plan,
+                workout_plan,
+                nutrition_plan
+            ),
+            None
         )
 
+        # Nodes that fell back to their rule-based counterpart while the LLM circuit was open
+        degraded_nodes = [
+            name for name, result in (
+                ("TrainingSplitDecisionNode", split_recommendation),
+                ("ExerciseSelectionDecisionNode", exercise_selection),
+                ("CaloricNeedsDecisionNode", caloric_targets),
+                ("MacroDistributionDecisionNode", macro_plan),
+            ) if result.get("degraded")
+        ]
         
         return {
             "status": "success",
             "nutrition_plan" : nutrition_plan,
             "workout_plan" : workout_plan, 
             "final_report" :  final_report,  
+            "profile_hash": profile_hash,
+            "llm_usage": llm.usage_summary(),
+            "skipped_nodes": list(current_deadline().skipped),
+            "degraded": bool(degraded_nodes),
+            "degraded_nodes": degraded_nodes,
         }
   
+    except CircuitOpen as e:
+        # A node without a rule-based counterpart hit the open circuit
+        return degraded_first_plan(standardized_profile, profile_hash, llm, e)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -589,4 +1257,41 @@ async def create_first_plan(base_model: BaseModelForRequest):
         # )
         
 
-        """
\ No newline at end of file
+        """
+
+
+if import_profiler:
+    import_profiler.report()
+
+
+def degraded_first_plan(standardized_profile: Dict[str, Any], profile_hash: str, llm, error: CircuitOpen):
+    """
+    First plan from the rule-based nodes only, served at once while the LLM circuit is open:
+    calorie and macro targets, a template split and catalog exercises. The full plans and the
+    report need the LLM and are left out; the client retries after retry_after seconds.
+    """
+    split_recommendation = TrainingSplitDecisionNode(llm_client=llm).fallback(standardized_profile, {}, {}, {})
+    exercise_selection = ExerciseSelectionDecisionNode(llm_client=llm).fallback(
+        standardized_profile, {}, split_recommendation, {}
+    )
+    caloric_targets = CaloricNeedsDecisionNode(llm_client=llm).fallback(standardized_profile, {}, {})
+    macro_plan = MacroDistributionDecisionNode(llm_client=llm).fallback(caloric_targets, standardized_profile, {}, {}, {})
+    return {
+        "status": "degraded",
+        "nutrition_plan": None,
+        "workout_plan": None,
+        "final_report": None,
+        "caloric_targets": caloric_targets,
+        "macro_plan": macro_plan,
+        "training_split": split_recommendation,
+        "exercise_selection": exercise_selection,
+        "profile_hash": profile_hash,
+        "llm_usage": llm.usage_summary(),
+        "skipped_nodes": list(current_deadline().skipped),
+        "degraded": True,
+        "degraded_nodes": [
+            "TrainingSplitDecisionNode", "ExerciseSelectionDecisionNode",
+            "CaloricNeedsDecisionNode", "MacroDistributionDecisionNode"
+        ],
+        "retry_after": error.retry_after,
+    }
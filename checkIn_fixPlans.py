@@ -1,13 +1,18 @@
 import os
 import sys
-from dotenv import load_dotenv
-from openai import OpenAI
-
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-
-OPENAI_MODEL = "gpt-4o-mini"
+import json
+from startup.clients import lazy_client
+from first_time_plans.deadline import llm_timeout
+from first_time_plans.model_routing import routed
+from checkIn_optimization import client_history
+from first_time_plans.call_llm_class import BaseLLM
+from check_time_plans.data_ingestion.check_in_ingestion import WorkoutPlan, MealPlan
+from check_time_plans.decisions.plan_patch import PlanPatch, PlanPatchError, apply_plan_adjustment
+
+# Shared client from the registry; built on first use
+client = lazy_client()
+# Structured calls go through BaseLLM: circuit breaker, cancellable streaming and output repair
+llm = BaseLLM(llm_client=client)
 
 # System Message for Check-In Report
 system_message_checkIn_plan_report = """You are Dr. Mike Israetel (Renaissance Periodization - RP Strength), 
@@ -52,8 +57,8 @@ def user_prompt_for_checkIn_plan_report(checkIn_info):
     **5️⃣ Exercise Log & Training Effort:**
     {checkIn_info['exercisesLogLastWeek']}
 
-    **6️⃣ Previous Goals & Progress Assessment:**
-    {checkIn_info['analysisReportStart']}
+    **6️⃣ Previous Goals & Progress Assessment (client history):**
+    {client_history(checkIn_info)}
 
     ---
     🔍 **Analysis Requirement:**  
@@ -100,7 +105,7 @@ def user_prompt_for_checkIn_plan_report(checkIn_info):
     {checkIn_info['exercisesLogLastWeek']}
 
     - Report made Last Week with the Gaol set for the 12 weeks: 
-    {checkIn_info['analysisReportStart']}
+    {client_history(checkIn_info)}
 
     any import point is also add the end of the report separet by line "--" I want to re the goal and from th ebalayis the can cganeg mus tbe chaneg th egoal oen for th enew weke bt the forut and twke week slight chnage it 
     based on hwo the information and reprot write to set new goal 
@@ -116,13 +121,16 @@ def user_prompt_for_checkIn_plan_report(checkIn_info):
     """
 
 async def checkIn_gpt(checkIn_info: dict):
-    reply = client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=[
-            {"role": "system", "content": system_message_checkIn_plan_report},
-            {"role": "user", "content": user_prompt_for_checkIn_plan_report(checkIn_info)}
-        ]
-    )
+    with routed("checkIn_gpt") as route:
+        reply = client.chat.completions.create(
+            model=route.model,
+            timeout=llm_timeout(),
+            messages=[
+                {"role": "system", "content": system_message_checkIn_plan_report},
+                {"role": "user", "content": user_prompt_for_checkIn_plan_report(checkIn_info)}
+            ],
+            **route.options()
+        )
     return reply.choices[0].message.content
 
 
@@ -299,11 +307,73 @@ def user_prompt_for_plan_adjustment(checkIn_info, checkIn_response):
     """
 
 async def adjust_plan_gpt(checkIn_info: dict, checkIn_response: str):
-    reply = client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=[
-            {"role": "system", "content": system_message_plan_adjustment},
-            {"role": "user", "content": user_prompt_for_plan_adjustment(checkIn_info, checkIn_response)}
-        ]
-    )
+    with routed("adjust_plan_gpt") as route:
+        reply = client.chat.completions.create(
+            model=route.model,
+            timeout=llm_timeout(),
+            messages=[
+                {"role": "system", "content": system_message_plan_adjustment},
+                {"role": "user", "content": user_prompt_for_plan_adjustment(checkIn_info, checkIn_response)}
+            ],
+            **route.options()
+        )
     return reply.choices[0].message.content
+
+
+
+
+
+
+
+
+
+
+# Patch output mode: the model returns typed patch operations against the stored plans
+# instead of re-emitting them in full, so output length scales with the size of the change
+system_message_plan_patch = """You are Dr. Mike Israetel (Renaissance Periodization - RP Strength), 
+an expert in evidence-based training and nutrition. Your task is to analyze the user's latest check-in data 
+and decide whether the current workout plan or meal plan needs adjustments.
+
+**Your response must:**
+1. Never re-write a plan. Express every change as a patch operation against the JSON plan you are given.
+2. Use JSON-pointer paths with zero-based list indexes (e.g. "/schedule/0/exercises/1/sets", "/totalDailyNutrition/calories").
+3. Use "replace" to change a value, "add" to insert (use "-" as the last path token to append), and "remove" to delete.
+4. Encode every value as JSON (numbers as 4, strings as "90 sec", objects as {"name": "Dips", "sets": 3, "reps": 10}).
+5. Return empty operation lists when no change is needed.
+6. Keep totals consistent: if meal macros change, patch totalDailyNutrition as well.
+"""
+
+def user_prompt_for_plan_patch(checkIn_info, checkIn_response, workout_plan, meal_plan):
+    return f"""
+    Previous Check-In Report:
+    {checkIn_response}
+
+    User Check-In Data:
+    - Body Measurements Last Week: {checkIn_info.get('bodyMeasurementsLastWeek', '')}
+    - Daily Reports Last Week: {checkIn_info.get('dailyReportsLastWeek', '')}
+    - Exercise Log Last Week: {checkIn_info.get('exercisesLogLastWeek', '')}
+
+    Current Workout Plan (JSON):
+    {json.dumps(workout_plan.model_dump(exclude_none=True), separators=(',', ':'))}
+
+    Current Meal Plan (JSON):
+    {json.dumps(meal_plan.model_dump(exclude_none=True), separators=(',', ':'))}
+
+    Analysis Task:
+    Decide whether the workout plan, the meal plan, or both require changes based on performance, progress and adherence.
+    Return only the minimal patch operations needed, the rationale, and the new four week goal if it changed.
+    """
+
+def adjust_plan_patch_gpt(checkIn_info: dict, checkIn_response: str, workout_plan: WorkoutPlan, meal_plan: MealPlan):
+    try:
+        patch = llm.call_llm(
+            user_prompt_for_plan_patch(checkIn_info, checkIn_response, workout_plan, meal_plan),
+            system_message_plan_patch,
+            schema=PlanPatch,
+            as_model=True,
+            node="adjust_plan_patch_gpt"
+        )
+    except ValueError as e:
+        # A refusal, or an output that could not be repaired into a PlanPatch
+        raise PlanPatchError(f"No usable plan patch from the model: {e}") from e
+    return apply_plan_adjustment(patch, workout_plan, meal_plan)
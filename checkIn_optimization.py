@@ -1,16 +1,15 @@
 import os
 import io
 import sys
-from dotenv import load_dotenv
-from  openai import OpenAI
+from startup.clients import lazy_client
+from first_time_plans.deadline import llm_timeout
+from first_time_plans.model_routing import routed
 
 
 
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Shared client from the registry; built on first use
+client = lazy_client()
 
-OPENAI_MODEL = "gpt-4o-mini"
 
 
 system_message_checkIn_plan = """You are Dr. Mike Israetel (Renaissance Periodization - RP Strength), a leading expert in evidence-based nutrition for strength training and muscle hypertrophy. Your approach focuses on macronutrient precision, caloric periodization, and strategic meal timing to optimize muscle growth, fat loss, and performance.
@@ -44,6 +43,10 @@ Using the provided check-in data, analyze the following:
 Based on this analysis, generate a concise, actionable feedback report, including key takeaways, necessary adjustments, and next steps to ensure continued progress.
 """
 
+def client_history(checkIn_info):
+    """The memory digest, or the initial report for callers that do not attach one."""
+    return checkIn_info.get('memoryDigest') or checkIn_info.get('analysisReportStart', '')
+
 def user_prompt_for_checkIn_plan(checkIn_info):
     user_prompt = f"""
     Check-In Summary
@@ -51,8 +54,8 @@ def user_prompt_for_checkIn_plan(checkIn_info):
     Meal Plan Last Week:
     {checkIn_info['mealPlanLastWeek']}  # Corrected this line
 
-    Analysis Report Start:
-    {checkIn_info['analysisReportStart']}
+    Client History (rolling summary of the initial report and past check-ins):
+    {client_history(checkIn_info)}
 
     Body Measurements Last Week:
     {checkIn_info['bodyMeasurementsLastWeek']}
@@ -92,7 +95,8 @@ def message_checkIn_plan(checkIn_info):
     
 async def checkIn_gpt(checkIn_info: str):
 
-    reply =  client.chat.completions.create(model= OPENAI_MODEL, messages = message_checkIn_plan(checkIn_info))
+    with routed("checkIn_gpt") as route:
+        reply =  client.chat.completions.create(model= route.model, messages = message_checkIn_plan(checkIn_info), timeout=llm_timeout(), **route.options())
     reply_text = reply.choices[0].message.content
     return reply_text
 
@@ -51,8 +51,7 @@ class BodyMetricsModule:
         """
         self.llm_client = llm_client or BaseLLM()
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
-
+        
     def analyze_body_changes(self, body_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Analyze body measurement data to assess composition changes and health markers.
@@ -129,7 +128,7 @@ class BodyMetricsModule:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=BodyMetricsAnalysis)
+        result = self.llm_client.call_llm(prompt, system_message, schema=BodyMetricsAnalysis, node=type(self).__name__)
         return result
 
     def _format_list(self, data: List[Any]) -> str:
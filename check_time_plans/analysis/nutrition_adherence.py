@@ -3,9 +3,7 @@ from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class NutritionInsight(BaseModel):
     """Insight about a specific nutrition pattern or issue."""
@@ -152,7 +150,7 @@ class NutritionAdherenceModule:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=NutritionAdherenceAnalysis)
+        result = self.llm_client.call_llm(prompt, system_message, schema=NutritionAdherenceAnalysis, node=type(self).__name__)
         return result
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
@@ -3,9 +3,7 @@ from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class ExerciseInsight(BaseModel):
     """Detailed insight about a specific exercise."""
@@ -163,7 +161,7 @@ class TrainingPerformanceModule:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=TrainingPerformanceAnalysis)
+        result = self.llm_client.call_llm(prompt, system_message, schema=TrainingPerformanceAnalysis, node=type(self).__name__)
         return result
     
     def _format_list(self, data: List[Any]) -> str:
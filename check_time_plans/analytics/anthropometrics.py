@@ -0,0 +1,343 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections.abc import Mapping
+from pydantic import BaseModel, Field
+from models import MeasurementsData
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fixed measurement index: the MeasurementsData fields first, then girths the scanner
+# exports that the model does not list yet (needed for symmetry and body-fat estimates)
+EXTRA_MEASUREMENTS = (
+    "height", "neckGirth", "waistGirth", "chestGirth",
+    "calfGirthL", "forearmGirthL", "upperArmGirthR", "upperArmGirthL", "thighGirthR", "thighGirthL",
+)
+MEASUREMENT_INDEX: Tuple[str, ...] = tuple(MeasurementsData.model_fields) + tuple(
+    name for name in EXTRA_MEASUREMENTS if name not in MeasurementsData.model_fields
+)
+INDEX = {name: position for position, name in enumerate(MEASUREMENT_INDEX)}
+
+# (ratio name, numerator, denominator)
+RATIO_DEFINITIONS = (
+    ("waist_to_hip", "bellyWaistGirth", "hipGirth"),
+    ("shoulder_to_waist_width", "acrossBackShoulderWidth", "bellyWaistWidth"),
+    ("chest_to_waist", "bustGirth", "bellyWaistGirth"),
+    ("chest_to_hip", "bustGirth", "hipGirth"),
+    ("waist_to_height", "bellyWaistGirth", "height"),
+    ("waist_depth_to_width", "bellyWaistDepth", "bellyWaistWidth"),
+)
+_RATIO_NUMERATORS = np.array([INDEX[numerator] for _, numerator, _ in RATIO_DEFINITIONS])
+_RATIO_DENOMINATORS = np.array([INDEX[denominator] for _, _, denominator in RATIO_DEFINITIONS])
+
+# Right/left pairs for symmetry checks
+SYMMETRY_PAIRS = tuple(
+    (name[:-1], INDEX[name], INDEX[name[:-1] + "L"])
+    for name in MEASUREMENT_INDEX
+    if name.endswith("R") and name[:-1] + "L" in INDEX
+)
+
+UNIT_TO_CM = {"cm": 1.0, "mm": 0.1, "m": 100.0, "in": 2.54, "inch": 2.54, "inches": 2.54, '"': 2.54}
+
+class AnthropometricSnapshot(BaseModel):
+    """Deterministic anthropometrics for one measurement date."""
+    ratios: Dict[str, float] = Field(default_factory=dict, description="Standard girth and width ratios")
+    symmetry: Dict[str, float] = Field(default_factory=dict, description="Right-minus-left difference as % of the mean")
+    body_fat_percentage: Optional[float] = Field(None, description="US Navy circumference estimate")
+    lean_mass: Optional[float] = Field(None, description="Weight times (1 - body fat)")
+    bmi: Optional[float] = None
+
+class AnthropometricAnalysis(BaseModel):
+    """Current and previous snapshots plus per-measurement deltas (all lengths in cm)."""
+    current: AnthropometricSnapshot
+    previous: Optional[AnthropometricSnapshot] = None
+    measurements: Dict[str, float] = Field(default_factory=dict, description="Current measurements in cm")
+    changes: Dict[str, float] = Field(default_factory=dict, description="Current minus previous (cm)")
+    change_percentages: Dict[str, float] = Field(default_factory=dict)
+    weight_current: Optional[float] = None
+    weight_previous: Optional[float] = None
+
+def parse_number(value: Any) -> Optional[float]:
+    """Parse numbers given as numbers or strings such as '180 cm'."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).strip().split()[0].rstrip("cmkgCMKG"))
+    except (ValueError, IndexError):
+        return None
+
+def personal_metrics(personal_info: Dict[str, Any]) -> Tuple[Optional[str], Optional[float], Optional[float]]:
+    """
+    Read sex, height (cm) and weight (kg) from a profile's personal section.
+
+    Args:
+        personal_info: Either the section itself or a ProfileSection-style {"title", "data"} wrapper
+
+    Returns:
+        Tuple of (sex, height_cm, weight_kg), None where unavailable
+    """
+    data = (personal_info or {}).get("data", personal_info or {})
+    height = parse_number(data.get("height"))
+    if height is not None and height < 3:
+        # Height given in metres
+        height *= 100
+    return data.get("gender") or data.get("sex"), height, parse_number(data.get("weight"))
+
+def _to_cm(value: Optional[float], unit: Optional[str]) -> float:
+    """Convert a length to cm (NaN when missing)."""
+    if value is None:
+        return np.nan
+    return value * UNIT_TO_CM.get((unit or "cm").strip().lower(), 1.0)
+
+def _round(value: float, digits: int = 2) -> Optional[float]:
+    """Round, mapping NaN to None."""
+    return None if value is None or np.isnan(value) else round(float(value), digits) + 0.0
+
+class AnthropometricsEngine:
+    """
+    Computes girth ratios, left/right symmetry, US Navy body fat and measurement deltas.
+
+    Measurements are laid out on the fixed MEASUREMENT_INDEX so that current and previous
+    values form a 2 x N matrix and every ratio, symmetry score and delta is computed in one
+    vectorized pass. Missing measurements are NaN and drop out of the results.
+    """
+
+    def __init__(self, stable_change_percent: float = 1.0):
+        """
+        Initialize the AnthropometricsEngine.
+
+        Args:
+            stable_change_percent: Absolute % change below which a measurement counts as stable
+        """
+        self.stable_change_percent = stable_change_percent
+
+    def to_vectors(self, measurements: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Map a measurements dictionary onto the fixed index.
+
+        Accepts check-in entries ({"current", "previous", "unit"}), first-time entries
+        ({"value", "unit"}) and bare numbers.
+
+        Args:
+            measurements: Measurement name to entry
+
+        Returns:
+            Tuple of (current, previous) vectors in cm, NaN where missing
+        """
+        current = np.full(len(MEASUREMENT_INDEX), np.nan)
+        previous = np.full(len(MEASUREMENT_INDEX), np.nan)
+        for name, entry in (measurements or {}).items():
+            position = INDEX.get(name)
+            if position is None:
+                continue
+            if isinstance(entry, Mapping):
+                unit = entry.get("unit")
+                current[position] = _to_cm(parse_number(entry.get("current", entry.get("value"))), unit)
+                previous[position] = _to_cm(parse_number(entry.get("previous")), unit)
+            else:
+                current[position] = _to_cm(parse_number(entry), "cm")
+        return current, previous
+
+    def analyze(
+        self,
+        measurements: Dict[str, Any],
+        sex: Optional[str] = None,
+        height_cm: Optional[float] = None,
+        weight_current: Optional[float] = None,
+        weight_previous: Optional[float] = None
+    ) -> AnthropometricAnalysis:
+        """
+        Compute every anthropometric metric for the current and previous measurements.
+
+        Args:
+            measurements: Measurement name to entry
+            sex: 'male' or 'female'; selects the US Navy equation
+            height_cm: Standing height, used when the measurements do not include it
+            weight_current: Body weight (kg) at the current measurement date
+            weight_previous: Body weight (kg) at the previous measurement date
+
+        Returns:
+            AnthropometricAnalysis with snapshots and deltas
+        """
+        current, previous = self.to_vectors(measurements)
+        matrix = np.vstack([current, previous])
+        if height_cm:
+            height = matrix[:, INDEX["height"]]
+            matrix[:, INDEX["height"]] = np.where(np.isnan(height), height_cm, height)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = matrix[:, _RATIO_NUMERATORS] / matrix[:, _RATIO_DENOMINATORS]
+            if SYMMETRY_PAIRS:
+                right = matrix[:, [r for _, r, _ in SYMMETRY_PAIRS]]
+                left = matrix[:, [l for _, _, l in SYMMETRY_PAIRS]]
+                symmetry = (right - left) / ((right + left) / 2) * 100
+            else:
+                symmetry = np.empty((2, 0))
+            # Deltas use the measured values only, not the injected height
+            changes = current - previous
+            change_percentages = changes / previous * 100
+
+        body_fat = self._navy_body_fat(matrix, sex)
+        weights = np.array([
+            np.nan if weight_current is None else weight_current,
+            np.nan if weight_previous is None else weight_previous
+        ])
+        lean_mass = weights * (1 - body_fat / 100)
+        bmi = weights / (matrix[:, INDEX["height"]] / 100) ** 2
+
+        snapshots = [
+            AnthropometricSnapshot(
+                ratios=self._present(dict(zip((name for name, _, _ in RATIO_DEFINITIONS), ratios[row])), 3),
+                symmetry=self._present(dict(zip((name for name, _, _ in SYMMETRY_PAIRS), symmetry[row])), 1),
+                body_fat_percentage=_round(body_fat[row], 1),
+                lean_mass=_round(lean_mass[row], 1),
+                bmi=_round(bmi[row], 1)
+            )
+            for row in range(2)
+        ]
+        has_previous = bool(np.any(~np.isnan(previous))) or weight_previous is not None
+
+        return AnthropometricAnalysis(
+            current=snapshots[0],
+            previous=snapshots[1] if has_previous else None,
+            measurements=self._present(dict(zip(MEASUREMENT_INDEX, current))),
+            changes=self._present(dict(zip(MEASUREMENT_INDEX, changes))),
+            change_percentages=self._present(dict(zip(MEASUREMENT_INDEX, change_percentages))),
+            weight_current=weight_current,
+            weight_previous=weight_previous
+        )
+
+    def composition_metrics(self, analysis: AnthropometricAnalysis) -> Dict[str, Any]:
+        """
+        Map the analysis onto the BodyCompositionMetrics fields.
+
+        Args:
+            analysis: Output of analyze()
+
+        Returns:
+            Dictionary matching the BodyCompositionMetrics schema
+        """
+        current, previous = analysis.current, analysis.previous or AnthropometricSnapshot()
+
+        def delta(now: Optional[float], before: Optional[float]) -> Optional[float]:
+            return None if now is None or before is None else round(now - before, 2)
+
+        weight_change = delta(analysis.weight_current, analysis.weight_previous)
+        lean_mass_change = delta(current.lean_mass, previous.lean_mass)
+        return {
+            "weight_change": weight_change or 0.0,
+            "weight_change_percentage": (
+                round(weight_change / analysis.weight_previous * 100, 2) if weight_change else 0.0
+            ),
+            "body_fat_change": delta(current.body_fat_percentage, previous.body_fat_percentage),
+            "lean_mass_change": lean_mass_change,
+            "lean_mass_change_percentage": (
+                round(lean_mass_change / previous.lean_mass * 100, 2)
+                if lean_mass_change is not None and previous.lean_mass else None
+            ),
+            "bmi_change": delta(current.bmi, previous.bmi),
+            "waist_measurement_change": analysis.changes.get("bellyWaistGirth", analysis.changes.get("waistGirth"))
+        }
+
+    def measurement_ratios(self, analysis: AnthropometricAnalysis) -> List[Dict[str, Any]]:
+        """Current ratios as MeasurementRatio dictionaries."""
+        return [{"name": name, "value": value} for name, value in analysis.current.ratios.items()]
+
+    def measurement_changes(self, analysis: AnthropometricAnalysis) -> List[Dict[str, Any]]:
+        """Per-measurement deltas as MeasurementChange dictionaries."""
+        return [
+            {
+                "name": name,
+                "change": change,
+                "description": (
+                    f"{analysis.change_percentages[name]:+.1f}% since previous measurement"
+                    if name in analysis.change_percentages else None
+                ),
+                "unit": "cm"
+            }
+            for name, change in analysis.changes.items()
+        ]
+
+    def classify_changes(self, analysis: AnthropometricAnalysis, top: int = 3) -> Dict[str, List[str]]:
+        """
+        Split measurements into trending and stable and pick the largest movers.
+
+        Args:
+            analysis: Output of analyze()
+            top: Number of primary change areas to return
+
+        Returns:
+            Dictionary with trending_measurements, stable_measurements and primary_change_areas
+        """
+        percentages = analysis.change_percentages
+        names = np.array(list(percentages), dtype=object)
+        values = np.abs(np.array(list(percentages.values()), dtype=float))
+        trending = values >= self.stable_change_percent
+        order = np.argsort(-values)
+        return {
+            "trending_measurements": names[trending].tolist(),
+            "stable_measurements": names[~trending].tolist(),
+            "primary_change_areas": [names[i] for i in order[:top] if trending[i]]
+        }
+
+    def format_summary(self, analysis: AnthropometricAnalysis) -> str:
+        """
+        Compact, prompt-ready summary of the computed anthropometrics.
+
+        Args:
+            analysis: Output of analyze()
+
+        Returns:
+            Formatted multi-line string
+        """
+        lines = []
+        if analysis.measurements:
+            lines.append("- Measurements (cm): " + ", ".join(
+                f"{name}={value}" for name, value in analysis.measurements.items()
+            ))
+        for label, snapshot in (("Current", analysis.current), ("Previous", analysis.previous)):
+            if snapshot is None:
+                continue
+            values = snapshot.model_dump(exclude_none=True)
+            ratios = values.pop("ratios", {})
+            symmetry = values.pop("symmetry", {})
+            if not ratios and not values and not symmetry:
+                continue
+            lines.append(
+                f"- {label}: " + ", ".join(f"{key}={value}" for key, value in {**ratios, **values}.items())
+            )
+            if symmetry:
+                lines.append(
+                    f"  {label} right-left difference (%): " +
+                    ", ".join(f"{key}={value}" for key, value in symmetry.items())
+                )
+        if analysis.changes:
+            lines.append("- Changes (cm): " + ", ".join(
+                f"{name} {change:+.1f} ({analysis.change_percentages.get(name, 0.0):+.1f}%)"
+                for name, change in analysis.changes.items()
+            ))
+        return "\n".join(lines) or "No measurements available."
+
+    def _navy_body_fat(self, matrix: np.ndarray, sex: Optional[str]) -> np.ndarray:
+        """US Navy circumference body-fat equations (metric form), NaN when inputs are missing."""
+        waist = matrix[:, INDEX["bellyWaistGirth"]]
+        waist = np.where(np.isnan(waist), matrix[:, INDEX["waistGirth"]], waist)
+        neck = matrix[:, INDEX["neckGirth"]]
+        hip = matrix[:, INDEX["hipGirth"]]
+        height = matrix[:, INDEX["height"]]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if (sex or "").strip().lower() in ("female", "f", "woman"):
+                density = 1.29579 - 0.35004 * np.log10(waist + hip - neck) + 0.22100 * np.log10(height)
+            elif (sex or "").strip().lower() in ("male", "m", "man"):
+                density = 1.0324 - 0.19077 * np.log10(waist - neck) + 0.15456 * np.log10(height)
+            else:
+                return np.full(2, np.nan)
+            body_fat = 495 / density - 450
+        return np.where((body_fat > 2) & (body_fat < 70), body_fat, np.nan)
+
+    def _present(self, values: Dict[str, float], digits: int = 2) -> Dict[str, float]:
+        """Drop NaN entries and round the rest."""
+        return {name: _round(value, digits) for name, value in values.items() if not np.isnan(value)}
@@ -0,0 +1,283 @@
+from typing import Dict, Any, List, Optional, Iterable, Set
+from pydantic import BaseModel, Field
+from check_time_plans.data_ingestion.timeseries_store import to_epoch_day
+import numpy as np
+import logging
+import warnings
+
+logger = logging.getLogger(__name__)
+
+MACROS = ("protein", "carbs", "fat")
+# Report macro keys in MACROS order
+REPORT_MACRO_KEYS = ("proteins", "carbs", "fats")
+# Plan nutrition keys in MACROS order
+PLAN_MACRO_KEYS = ("protein", "carbohydrates", "fat")
+CALORIES_PER_GRAM = np.array([4.0, 4.0, 9.0])
+# Share of the training-day calories below which the rest-day meals are taken to list only
+# some of the day's meals rather than a rest-day total
+COMPLETE_DAY_FRACTION = 0.6
+
+class DayTypeAdherence(BaseModel):
+    """Adherence over one day type (training or rest)."""
+    days: int
+    target_calories: Optional[float] = None
+    average_calories: Optional[float] = None
+    macro_adherence: Dict[str, float] = Field(default_factory=dict, description="Mean % of target per macro")
+    calorie_adherence: Optional[float] = None
+    overall_adherence: Optional[float] = None
+
+class MealAdherenceAnalytics(BaseModel):
+    """Deterministic macro and calorie adherence for a period of daily reports."""
+    days_reported: int
+    macro_adherence: Dict[str, float] = Field(default_factory=dict, description="Mean % of target per macro")
+    calorie_adherence: float = Field(0.0, description="Mean % of calorie target (4/4/9 kcal per gram)")
+    overall_adherence: float = Field(0.0, description="Mean daily score: 100 minus the mean absolute deviation from target")
+    consistent_days: int = 0
+    inconsistent_days: int = 0
+    day_scores: List[float] = Field(default_factory=list)
+    adherence_trend_per_week: Optional[float] = Field(None, description="Slope of the daily score in points per week")
+    training_days: Optional[DayTypeAdherence] = None
+    rest_days: Optional[DayTypeAdherence] = None
+
+def session_dates(exercise_logs: Iterable[Any]) -> Set[str]:
+    """ISO dates with at least one logged exercise entry: the training days of compute()."""
+    return {entry.date[:10] for log in exercise_logs for entry in log.entries if entry.date}
+
+def _round(value: float, digits: int = 1) -> Optional[float]:
+    """Round, mapping NaN to None."""
+    return None if value is None or np.isnan(value) else round(float(value), digits) + 0.0
+
+class MealAdherenceEngine:
+    """
+    Scores reported macros against the planned training-day and rest-day targets.
+
+    The week is laid out as an (days x 3) intake matrix and a matching target matrix picked
+    per day from the training or rest targets, so per-macro adherence, 4/4/9 calorie
+    adherence, day classification and the training vs rest split come out of one
+    vectorized pass. A day is consistent when every macro and calories fall within
+    ``tolerance_percent`` of target.
+    """
+
+    def __init__(self, tolerance_percent: float = 10.0):
+        """
+        Initialize the MealAdherenceEngine.
+
+        Args:
+            tolerance_percent: Allowed deviation from target for a day to count as consistent
+        """
+        self.tolerance_percent = tolerance_percent
+
+    def day_targets(self, meal_plan: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        Planned daily targets for training and rest days.
+
+        totalDailyNutrition is the training-day target (the training-day meal totals when it
+        is missing). The rest-day target is the plan's own rest-day total, the summed
+        nonTrainingDayMeals, as long as those meals describe a whole day (at least
+        COMPLETE_DAY_FRACTION of the training-day calories); otherwise rest days share the
+        training-day target.
+
+        Args:
+            meal_plan: MealPlan dictionary
+
+        Returns:
+            Dictionary with 'training' and 'rest' arrays of [protein, carbs, fat, calories]
+        """
+        total = meal_plan.get("totalDailyNutrition", {}) or {}
+        training = self._target_vector(total, total.get("calories"))
+        training_meals = self._meal_totals(meal_plan.get("trainingDayMeals", []) or [])
+        rest_meals = self._meal_totals(meal_plan.get("nonTrainingDayMeals", []) or [])
+
+        if training[:3].sum() <= 0:
+            training = training_meals if training_meals[:3].sum() > 0 else rest_meals
+        if rest_meals[:3].sum() > 0 and rest_meals[3] >= COMPLETE_DAY_FRACTION * training[3]:
+            return {"training": training, "rest": rest_meals}
+        return {"training": training, "rest": training}
+
+    def compute(
+        self,
+        meal_plan: Dict[str, Any],
+        daily_reports: List[Dict[str, Any]],
+        training_dates: Optional[Iterable[str]] = None
+    ) -> MealAdherenceAnalytics:
+        """
+        Compute adherence metrics for a period of daily reports.
+
+        Args:
+            meal_plan: MealPlan dictionary
+            daily_reports: Daily report dictionaries (DailyReport shape)
+            training_dates: ISO dates with a logged session; when None every day uses the
+                training-day targets and no split is reported
+
+        Returns:
+            MealAdherenceAnalytics with every computed metric
+        """
+        reports = sorted(daily_reports or [], key=lambda r: (r.get("date", ""), r.get("day", 0)))
+        if not reports:
+            return MealAdherenceAnalytics(days_reported=0)
+
+        intake = np.array([
+            [(report.get("macros") or {}).get(key) or 0 for key in REPORT_MACRO_KEYS]
+            for report in reports
+        ], dtype=float)
+        intake = np.column_stack([intake, intake @ CALORIES_PER_GRAM])
+
+        targets = self.day_targets(meal_plan)
+        training_set = {date[:10] for date in training_dates} if training_dates is not None else None
+        is_training = np.array([
+            training_set is None or (report.get("date") or "")[:10] in training_set
+            for report in reports
+        ])
+        target = np.where(is_training[:, None], targets["training"], targets["rest"])
+
+        # Targets of 0 are not scored (NaN); all-NaN means are silenced and dropped later
+        with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            percent = np.where(target > 0, intake / target * 100, np.nan)
+            deviation = np.abs(percent - 100)
+            # Daily score: 100 minus the mean absolute deviation over macros and calories
+            day_scores = np.nan_to_num(np.clip(100 - np.nanmean(deviation, axis=1), 0, 100))
+            macro_adherence = np.nanmean(percent[:, :3], axis=0)
+            calorie_adherence = np.nanmean(percent[:, 3])
+        consistent = np.all(np.nan_to_num(deviation, nan=0.0) <= self.tolerance_percent, axis=1)
+
+        days = np.array([to_epoch_day(report.get("date", "")) for report in reports])
+        if np.isnan(days).any():
+            # Positions in the sorted period, never a mix of day numbers and positions
+            days = np.arange(len(reports), dtype=float)
+        trend = None
+        if len(reports) >= 2 and np.ptp(days) > 0:
+            trend = _round(np.polyfit(days, day_scores, 1)[0] * 7)
+
+        analytics = MealAdherenceAnalytics(
+            days_reported=len(reports),
+            macro_adherence=self._macro_dict(macro_adherence),
+            calorie_adherence=_round(calorie_adherence) or 0.0,
+            overall_adherence=_round(day_scores.mean()),
+            consistent_days=int(consistent.sum()),
+            inconsistent_days=int((~consistent).sum()),
+            day_scores=[_round(score) for score in day_scores],
+            adherence_trend_per_week=trend
+        )
+        if training_set is not None:
+            analytics.training_days = self._day_type(intake, percent, day_scores, is_training, targets["training"])
+            analytics.rest_days = self._day_type(intake, percent, day_scores, ~is_training, targets["rest"])
+        return analytics
+
+    def to_compliance_metrics(self, analytics: MealAdherenceAnalytics, meal_timing_adherence: float = 0.0) -> Dict[str, Any]:
+        """
+        Map computed analytics onto the MealComplianceMetrics fields.
+
+        Daily reports carry no meal times, so timing adherence has to come from elsewhere
+        (the narrative estimate) and defaults to 0.
+
+        Args:
+            analytics: Output of compute()
+            meal_timing_adherence: Timing adherence estimate
+
+        Returns:
+            Dictionary matching the MealComplianceMetrics schema
+        """
+        return {
+            "overall_adherence_percentage": analytics.overall_adherence,
+            "protein_target_adherence": analytics.macro_adherence.get("protein", 0.0),
+            "carbs_target_adherence": analytics.macro_adherence.get("carbs", 0.0),
+            "fat_target_adherence": analytics.macro_adherence.get("fat", 0.0),
+            "calorie_target_adherence": analytics.calorie_adherence,
+            "meal_timing_adherence": meal_timing_adherence,
+            "consistent_days": analytics.consistent_days,
+            "inconsistent_days": analytics.inconsistent_days
+        }
+
+    def describe_split(self, analytics: MealAdherenceAnalytics) -> str:
+        """
+        One-line comparison of training-day and rest-day adherence.
+
+        Args:
+            analytics: Output of compute()
+
+        Returns:
+            Comparison text
+        """
+        if analytics.training_days is None or analytics.rest_days is None:
+            return "Training and rest days were not distinguished (no session dates)."
+        parts = []
+        for label, split in (("Training days", analytics.training_days), ("Rest days", analytics.rest_days)):
+            if not split.days:
+                parts.append(f"{label}: none reported")
+                continue
+            macros = ", ".join(f"{macro} {value}%" for macro, value in split.macro_adherence.items())
+            parts.append(
+                f"{label} ({split.days}): {split.average_calories} of {split.target_calories} kcal "
+                f"({split.calorie_adherence}%), {macros}, score {split.overall_adherence}"
+            )
+        return "; ".join(parts)
+
+    def describe_trend(self, analytics: MealAdherenceAnalytics) -> str:
+        """One-line description of the daily score trend."""
+        if analytics.adherence_trend_per_week is None:
+            return "Not enough days to assess a trend."
+        slope = analytics.adherence_trend_per_week
+        direction = "improving" if slope > 2 else ("declining" if slope < -2 else "stable")
+        return f"Adherence {direction} ({slope:+.1f} points/week; daily scores {analytics.day_scores})"
+
+    def format_summary(self, analytics: MealAdherenceAnalytics) -> str:
+        """
+        Compact, prompt-ready summary of the computed metrics.
+
+        Args:
+            analytics: Output of compute()
+
+        Returns:
+            Formatted multi-line string
+        """
+        return (
+            f"  Days reported: {analytics.days_reported}\n"
+            f"  Macro adherence (% of target): "
+            + ", ".join(f"{macro} {value}" for macro, value in analytics.macro_adherence.items()) + "\n"
+            f"  Calorie adherence: {analytics.calorie_adherence}%\n"
+            f"  Overall score: {analytics.overall_adherence}\n"
+            f"  Consistent days (within {self.tolerance_percent:g}%): {analytics.consistent_days}, "
+            f"inconsistent: {analytics.inconsistent_days}\n"
+            f"  Trend: {self.describe_trend(analytics)}\n"
+            f"  Split: {self.describe_split(analytics)}\n"
+        )
+
+    def _target_vector(self, nutrition: Dict[str, Any], calories: Optional[float]) -> np.ndarray:
+        """[protein, carbs, fat, calories] target, deriving calories with 4/4/9 when missing."""
+        macros = np.array([nutrition.get(key) or 0 for key in PLAN_MACRO_KEYS], dtype=float)
+        return np.append(macros, calories or macros @ CALORIES_PER_GRAM)
+
+    def _meal_totals(self, meals: List[Dict[str, Any]]) -> np.ndarray:
+        """Summed [protein, carbs, fat, calories] of a day's prescribed meals."""
+        totals = {key: sum((meal.get("nutrition") or {}).get(key) or 0 for meal in meals) for key in PLAN_MACRO_KEYS}
+        calories = sum((meal.get("nutrition") or {}).get("calories") or 0 for meal in meals)
+        return self._target_vector(totals, calories)
+
+    def _macro_dict(self, values: np.ndarray) -> Dict[str, float]:
+        """Name the per-macro values, dropping NaN."""
+        return {macro: _round(value) for macro, value in zip(MACROS, values) if not np.isnan(value)}
+
+    def _day_type(
+        self,
+        intake: np.ndarray,
+        percent: np.ndarray,
+        day_scores: np.ndarray,
+        mask: np.ndarray,
+        target: np.ndarray
+    ) -> DayTypeAdherence:
+        """Adherence restricted to one day type."""
+        if not mask.any():
+            return DayTypeAdherence(days=0, target_calories=_round(target[3], 0))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            macro_percent = np.nanmean(percent[mask, :3], axis=0)
+            calorie_percent = np.nanmean(percent[mask, 3])
+        return DayTypeAdherence(
+            days=int(mask.sum()),
+            target_calories=_round(target[3], 0),
+            average_calories=_round(intake[mask, 3].mean(), 0),
+            macro_adherence=self._macro_dict(macro_percent),
+            calorie_adherence=_round(calorie_percent),
+            overall_adherence=_round(day_scores[mask].mean())
+        )
@@ -0,0 +1,310 @@
+from typing import Dict, Any, List, Optional
+from pydantic import BaseModel, Field
+from check_time_plans.data_ingestion.timeseries_store import to_epoch_day
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+HIGH_PERFORMANCE_TERMS = ("high", "good", "great", "excellent", "strong", "pr")
+
+class WeightTrend(BaseModel):
+    """Weight trend computed from daily weigh-ins."""
+    weigh_ins: int
+    start_weight: Optional[float] = None
+    latest_weight: Optional[float] = None
+    ewma_weight: Optional[float] = Field(None, description="Exponentially weighted moving average at the last weigh-in")
+    regression_change: Optional[float] = Field(None, description="Change over the period on the fitted regression line (kg)")
+    weekly_rate_kg: Optional[float] = Field(None, description="Regression slope in kg per week")
+    weekly_rate_percent: Optional[float] = Field(None, description="Regression slope as % bodyweight per week")
+
+class SleepSummary(BaseModel):
+    """Sleep length and efficiency means and trends."""
+    nights: int
+    mean_length: Optional[float] = None
+    mean_efficiency: Optional[float] = None
+    length_trend_per_week: Optional[float] = Field(None, description="Hours per week change in sleep length")
+    efficiency_trend_per_week: Optional[float] = Field(None, description="Points per week change in sleep efficiency")
+
+class ReadinessSummary(BaseModel):
+    """Resting heart rate deviation from baseline."""
+    rhr_baseline: Optional[float] = None
+    rhr_recent: Optional[float] = Field(None, description="Mean RHR over the last three reports")
+    rhr_deviation: Optional[float] = Field(None, description="Recent RHR minus baseline (bpm)")
+    readiness_score: Optional[float] = Field(None, description="0-100; 100 means RHR at or below baseline")
+
+class ActivitySummary(BaseModel):
+    """Step and cardio totals."""
+    steps_total: int = 0
+    steps_mean: Optional[float] = None
+    cardio_total: int = 0
+    cardio_days: int = 0
+
+class ReportAnalytics(BaseModel):
+    """Deterministic metrics computed from a period of daily reports."""
+    days_reported: int
+    weight: WeightTrend
+    sleep: SleepSummary
+    readiness: ReadinessSummary
+    activity: ActivitySummary
+    performance_consistency: float = Field(..., description="Percentage of days reporting high performance")
+    stress_days: int = Field(..., description="Days with reported stressors")
+
+def ewma(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Exponentially weighted moving average (NaNs are forward filled), in one linear pass.
+
+    Args:
+        values: Observations in time order
+        alpha: Smoothing factor in (0, 1]
+
+    Returns:
+        EWMA series of the same length
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    if not present.any():
+        return np.full(len(values), np.nan)
+    # Forward fill gaps; a leading gap takes the first observation
+    index = np.where(present, np.arange(len(values)), np.argmax(present))
+    np.maximum.accumulate(index, out=index)
+    filled = values[index]
+
+    # ewma_0 = x_0, ewma_t = a x_t + (1-a) ewma_{t-1}
+    smoothed = np.empty(len(filled))
+    level = filled[0]
+    for t, value in enumerate(filled.tolist()):
+        level = alpha * value + (1 - alpha) * level
+        smoothed[t] = level
+    return smoothed
+
+def _slope_per_week(days: np.ndarray, values: np.ndarray) -> Optional[float]:
+    """Least-squares slope per week over the present observations."""
+    present = ~np.isnan(values) & ~np.isnan(days)
+    if present.sum() < 2 or np.ptp(days[present]) == 0:
+        return None
+    return float(np.polyfit(days[present], values[present], 1)[0] * 7)
+
+def _mean(values: np.ndarray) -> Optional[float]:
+    """NaN-aware mean, None when empty."""
+    if not np.any(~np.isnan(values)):
+        return None
+    return float(np.nanmean(values))
+
+def _round(value: Optional[float], digits: int = 2) -> Optional[float]:
+    """Round optional floats (normalizing -0.0)."""
+    return None if value is None else round(value, digits) + 0.0
+
+class ReportAnalyticsEngine:
+    """
+    Computes weight-trend, sleep, readiness and activity metrics from daily reports.
+
+    Everything is derived with NumPy over column arrays built once from the reports, so
+    the numbers are reproducible between runs and cost no tokens. The results populate
+    ``ProgressMetrics`` directly; the LLM only writes the narrative fields.
+    """
+
+    def __init__(self, ewma_alpha: float = 0.3, stable_rate_percent: float = 0.1):
+        """
+        Initialize the ReportAnalyticsEngine.
+
+        Args:
+            ewma_alpha: Smoothing factor for the weight EWMA
+            stable_rate_percent: Weekly rate (% bodyweight) below which weight counts as stable
+        """
+        self.ewma_alpha = ewma_alpha
+        self.stable_rate_percent = stable_rate_percent
+
+    def compute(self, daily_reports: List[Dict[str, Any]], rhr_baseline: Optional[float] = None) -> ReportAnalytics:
+        """
+        Compute all deterministic metrics for a period of daily reports.
+
+        Args:
+            daily_reports: Daily report dictionaries (DailyReport shape)
+            rhr_baseline: Long-term resting heart rate baseline; defaults to the period median
+
+        Returns:
+            ReportAnalytics with every computed metric
+        """
+        reports = sorted(daily_reports, key=lambda r: (r.get("date", ""), r.get("day", 0)))
+        columns = self._to_columns(reports)
+
+        return ReportAnalytics(
+            days_reported=len(reports),
+            weight=self._weight_trend(columns["days"], columns["weight"]),
+            sleep=self._sleep_summary(columns["days"], columns["sleep_length"], columns["sleep_efficiency"]),
+            readiness=self._readiness(columns["rhr"], rhr_baseline),
+            activity=ActivitySummary(
+                steps_total=int(np.nansum(columns["steps"])),
+                steps_mean=_round(_mean(columns["steps"]), 0),
+                cardio_total=int(np.nansum(columns["cardio"])),
+                cardio_days=int(np.sum(np.nan_to_num(columns["cardio"]) > 0))
+            ),
+            performance_consistency=round(float(columns["high_performance"].mean() * 100), 1) if reports else 0.0,
+            stress_days=int(columns["stressed"].sum())
+        )
+
+    def to_progress_metrics(self, analytics: ReportAnalytics) -> Dict[str, Any]:
+        """
+        Map computed analytics onto the ProgressMetrics fields.
+
+        Args:
+            analytics: Output of compute()
+
+        Returns:
+            Dictionary matching the ProgressMetrics schema
+        """
+        weight = analytics.weight
+        if weight.weekly_rate_percent is None:
+            weight_trend = "insufficient weigh-ins"
+        elif abs(weight.weekly_rate_percent) < self.stable_rate_percent:
+            weight_trend = f"stable ({weight.weekly_rate_kg:+.2f} kg/week)"
+        else:
+            direction = "gaining" if weight.weekly_rate_kg > 0 else "losing"
+            weight_trend = (
+                f"{direction} {abs(weight.weekly_rate_kg):.2f} kg/week "
+                f"({weight.weekly_rate_percent:+.2f}% bodyweight/week)"
+            )
+
+        readiness = analytics.readiness.readiness_score
+        sleep = analytics.sleep
+        if readiness is None and sleep.mean_length is None:
+            recovery_quality = "unknown (no RHR or sleep data)"
+        else:
+            sleep_ok = sleep.mean_length is None or sleep.mean_length >= 7
+            if readiness is not None and readiness >= 80 and sleep_ok:
+                band = "good"
+            elif readiness is not None and readiness < 50:
+                band = "poor"
+            else:
+                band = "moderate"
+            recovery_quality = (
+                f"{band} (readiness {readiness if readiness is not None else 'n/a'}, "
+                f"sleep {sleep.mean_length if sleep.mean_length is not None else 'n/a'} h)"
+            )
+
+        if sleep.length_trend_per_week is None:
+            sleep_quality_trend = "insufficient sleep data"
+        else:
+            direction = "improving" if sleep.length_trend_per_week > 0.1 else (
+                "declining" if sleep.length_trend_per_week < -0.1 else "stable"
+            )
+            sleep_quality_trend = (
+                f"{direction}: mean {sleep.mean_length} h, efficiency {sleep.mean_efficiency}%, "
+                f"{sleep.length_trend_per_week:+.2f} h/week"
+            )
+
+        # 0-10: half from stress-free days, half from readiness
+        stress_free = 1 - analytics.stress_days / analytics.days_reported if analytics.days_reported else 0.0
+        readiness_share = (readiness if readiness is not None else 50.0) / 100
+        stress_management_score = round(10 * (0.5 * stress_free + 0.5 * readiness_share), 1)
+
+        return {
+            "weight_trend": weight_trend,
+            "weight_change": weight.regression_change if weight.regression_change is not None else 0.0,
+            "performance_consistency": analytics.performance_consistency,
+            "recovery_quality": recovery_quality,
+            "stress_management_score": stress_management_score,
+            "sleep_quality_trend": sleep_quality_trend
+        }
+
+    def format_summary(self, analytics: ReportAnalytics) -> str:
+        """
+        Compact, prompt-ready summary of the computed metrics.
+
+        Args:
+            analytics: Output of compute()
+
+        Returns:
+            Formatted multi-line string
+        """
+        sections = {
+            "weight": analytics.weight.model_dump(exclude_none=True),
+            "sleep": analytics.sleep.model_dump(exclude_none=True),
+            "readiness": analytics.readiness.model_dump(exclude_none=True),
+            "activity": analytics.activity.model_dump(exclude_none=True),
+        }
+        formatted = f"  Days reported: {analytics.days_reported}\n"
+        for name, values in sections.items():
+            formatted += f"  {name.title()}: " + ", ".join(f"{key}={value}" for key, value in values.items()) + "\n"
+        formatted += f"  High-performance days: {analytics.performance_consistency}%\n"
+        formatted += f"  Days with stressors: {analytics.stress_days}\n"
+        return formatted
+
+    def _to_columns(self, reports: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Lay the reports out as one float array per field."""
+        def column(getter) -> np.ndarray:
+            values = []
+            for report in reports:
+                value = getter(report)
+                values.append(np.nan if value is None else float(value))
+            return np.asarray(values, dtype=float)
+
+        days = column(lambda r: to_epoch_day(r.get("date", "")))
+        if np.isnan(days).any():
+            # Fall back to the reported day number when dates are missing
+            days = column(lambda r: r.get("day"))
+
+        return {
+            "days": days,
+            "weight": np.where(column(lambda r: r.get("weight")) > 0, column(lambda r: r.get("weight")), np.nan),
+            "sleep_length": column(lambda r: (r.get("sleep") or {}).get("length") or None),
+            "sleep_efficiency": column(lambda r: (r.get("sleep") or {}).get("efficiency")),
+            "rhr": column(lambda r: r.get("rhr") or None),
+            "steps": column(lambda r: r.get("steps")),
+            "cardio": column(lambda r: r.get("cardio")),
+            "high_performance": np.asarray([
+                any(term in (r.get("performance") or "").lower().split() for term in HIGH_PERFORMANCE_TERMS)
+                for r in reports
+            ], dtype=bool),
+            "stressed": np.asarray([bool((r.get("stressors") or "").strip()) for r in reports], dtype=bool),
+        }
+
+    def _weight_trend(self, days: np.ndarray, weights: np.ndarray) -> WeightTrend:
+        """EWMA and least-squares weight trend."""
+        present = ~np.isnan(weights)
+        if not present.any():
+            return WeightTrend(weigh_ins=0)
+
+        smoothed = ewma(weights[present], self.ewma_alpha)
+        trend = WeightTrend(
+            weigh_ins=int(present.sum()),
+            start_weight=float(weights[present][0]),
+            latest_weight=float(weights[present][-1]),
+            ewma_weight=_round(float(smoothed[-1]))
+        )
+        weekly_rate = _slope_per_week(days, weights)
+        if weekly_rate is not None:
+            span_weeks = np.ptp(days[present]) / 7
+            trend.weekly_rate_kg = round(weekly_rate, 3)
+            trend.weekly_rate_percent = round(weekly_rate / float(np.nanmean(weights)) * 100, 3)
+            trend.regression_change = round(weekly_rate * span_weeks, 2)
+        return trend
+
+    def _sleep_summary(self, days: np.ndarray, length: np.ndarray, efficiency: np.ndarray) -> SleepSummary:
+        """Sleep means and weekly trends."""
+        return SleepSummary(
+            nights=int(np.sum(~np.isnan(length))),
+            mean_length=_round(_mean(length)),
+            mean_efficiency=_round(_mean(efficiency), 1),
+            length_trend_per_week=_round(_slope_per_week(days, length)),
+            efficiency_trend_per_week=_round(_slope_per_week(days, efficiency))
+        )
+
+    def _readiness(self, rhr: np.ndarray, baseline: Optional[float]) -> ReadinessSummary:
+        """Recent RHR deviation from baseline mapped to a 0-100 readiness score."""
+        present = rhr[~np.isnan(rhr)]
+        if len(present) == 0:
+            return ReadinessSummary()
+
+        baseline = float(np.median(present)) if baseline is None else float(baseline)
+        recent = float(present[-3:].mean())
+        deviation = recent - baseline
+        # Each bpm above baseline costs 10 readiness points
+        score = float(np.clip(100 - 10 * max(deviation, 0.0), 0, 100))
+        return ReadinessSummary(
+            rhr_baseline=round(baseline, 1),
+            rhr_recent=round(recent, 1),
+            rhr_deviation=round(deviation, 1),
+            readiness_score=round(score, 1)
+        )
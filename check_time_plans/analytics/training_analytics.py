@@ -0,0 +1,436 @@
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from functools import lru_cache
+from datetime import date as Date
+import difflib
+import math
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Abbreviations expanded before matching
+NAME_ALIASES = {
+    "bb": "barbell", "db": "dumbbell", "kb": "kettlebell", "ohp": "overhead press",
+    "rdl": "romanian deadlift", "bw": "bodyweight", "pulldown": "pull down", "pullup": "pull up",
+    "chinup": "chin up", "pushup": "push up", "situp": "sit up",
+    "pullups": "pull up", "chinups": "chin up", "pushups": "push up", "situps": "sit up", "ups": "up",
+}
+
+# (keyword, muscle group) in matching order; the first keyword whose tokens all appear as
+# whole tokens of the exercise id decides the primary muscle group. Multi-word movements
+# come before the generic single tokens they contain ('leg curl' before 'curl', 'upright
+# row' before 'row', 'incline press' before 'press'-free 'incline')
+MUSCLE_KEYWORDS = (
+    ("leg curl", "hamstrings"), ("romanian deadlift", "hamstrings"), ("stiff leg deadlift", "hamstrings"),
+    ("good morning", "hamstrings"),
+    ("leg extension", "quads"), ("leg press", "quads"), ("split squat", "quads"), ("step up", "quads"),
+    ("hip thrust", "glutes"), ("glute bridge", "glutes"),
+    ("leg raise", "core"), ("sit up", "core"), ("russian twist", "core"),
+    ("back extension", "back"),
+    ("lateral raise", "shoulders"), ("side raise", "shoulders"), ("front raise", "shoulders"),
+    ("rear delt", "shoulders"), ("reverse fly", "shoulders"), ("face pull", "shoulders"), ("upright row", "shoulders"),
+    ("overhead press", "shoulders"), ("shoulder press", "shoulders"), ("military press", "shoulders"),
+    ("arnold press", "shoulders"), ("push press", "shoulders"),
+    ("close grip bench", "triceps"), ("tricep dip", "triceps"), ("tricep kickback", "triceps"),
+    ("bench press", "chest"), ("chest press", "chest"), ("incline press", "chest"), ("decline press", "chest"),
+    ("floor press", "chest"), ("dumbbell press", "chest"), ("machine press", "chest"), ("push up", "chest"),
+    ("pull down", "back"), ("pull up", "back"), ("chin up", "back"),
+    ("squat", "quads"), ("lunge", "quads"), ("hack", "quads"),
+    ("hamstring", "hamstrings"), ("nordic", "hamstrings"),
+    ("glute", "glutes"), ("bridge", "glutes"), ("kickback", "glutes"),
+    ("calf", "calves"), ("calve", "calves"),
+    ("curl", "biceps"), ("bicep", "biceps"),
+    ("row", "back"), ("lat", "back"), ("deadlift", "back"), ("shrug", "back"), ("pullover", "back"),
+    ("bench", "chest"), ("chest", "chest"), ("fly", "chest"), ("flye", "chest"), ("dip", "chest"),
+    ("pec", "chest"), ("incline", "chest"), ("decline", "chest"),
+    ("shoulder", "shoulders"), ("military", "shoulders"), ("arnold", "shoulders"), ("delt", "shoulders"),
+    ("tricep", "triceps"), ("pushdown", "triceps"), ("skull", "triceps"), ("extension", "triceps"),
+    ("plank", "core"), ("crunch", "core"), ("ab", "core"), ("abs", "core"), ("pallof", "core"),
+)
+_MUSCLE_KEYWORD_TOKENS = tuple((frozenset(keyword.split()), group) for keyword, group in MUSCLE_KEYWORDS)
+
+DEFAULT_PLANNED_SETS = 3
+
+class SessionCompletion(BaseModel):
+    """One logged session joined against its plan day."""
+    date: str
+    plan_day: Optional[int] = Field(None, description="Matched WorkoutPlan.schedule day")
+    planned_sets: int = 0
+    completed_sets: int = 0
+    completion_percentage: Optional[float] = None
+    missing_exercises: List[str] = Field(default_factory=list)
+    unplanned_exercises: List[str] = Field(default_factory=list)
+
+class MuscleVolume(BaseModel):
+    """Weekly set volume for one muscle group."""
+    planned_weekly_sets: float = 0.0
+    logged_weekly_sets: float = 0.0
+    completion_percentage: Optional[float] = None
+    exercises: List[str] = Field(default_factory=list)
+
+class ExerciseSummary(BaseModel):
+    """Per-exercise load progression and tonnage."""
+    name: str
+    canonical_id: str
+    muscle_group: str
+    sessions: int
+    planned_sessions: int = Field(0, description="Plan days containing the exercise over the period")
+    starting_weight: float
+    current_weight: float
+    best_weight: float
+    weight_change: float
+    weight_change_percentage: float
+    progression_per_week: float
+    tonnage: float
+
+class TrainingAnalytics(BaseModel):
+    """Deterministic plan-vs-log training metrics."""
+    weeks: int
+    planned_sessions_per_week: int
+    sessions_logged: int
+    training_consistency: float = Field(..., description="Logged sessions vs planned sessions (%)")
+    volume_completion_rate: float = Field(..., description="Completed vs prescribed sets (%)")
+    intensity_adherence: Optional[float] = Field(None, description="Logged sets within the prescribed rep range (%)")
+    sessions: List[SessionCompletion] = Field(default_factory=list)
+    muscle_volume: Dict[str, MuscleVolume] = Field(default_factory=dict)
+    exercises: List[ExerciseSummary] = Field(default_factory=list)
+    weekly_tonnage: float = 0.0
+    total_tonnage: float = 0.0
+
+@lru_cache(maxsize=4096)
+def normalize_exercise_name(name: str) -> str:
+    """Lower-case, strip punctuation, expand aliases and singularize tokens."""
+    tokens = re.sub(r"[^a-z0-9]+", " ", (name or "").lower()).split()
+    expanded = " ".join(NAME_ALIASES.get(token, token) for token in tokens).split()
+    return " ".join(token[:-1] if len(token) > 3 and token.endswith("s") and not token.endswith("ss") else token
+                    for token in expanded)
+
+@lru_cache(maxsize=4096)
+def resolve_exercise(name: str, candidates: Tuple[str, ...], cutoff: float = 0.8) -> str:
+    """
+    Map a logged exercise name to a canonical id among the plan's exercises.
+
+    Tries an exact normalized match, then a unique token-subset match ('Squat' -> 'back squat'),
+    then the closest difflib match above ``cutoff``. Unmatched names keep their own
+    normalized id. Results are cached per (name, plan exercises).
+
+    Args:
+        name: Logged exercise name
+        candidates: Canonical ids of the planned exercises
+        cutoff: Minimum difflib similarity for a fuzzy match
+
+    Returns:
+        Canonical exercise id
+    """
+    normalized = normalize_exercise_name(name)
+    if normalized in candidates:
+        return normalized
+    tokens = set(normalized.split())
+    subset = [c for c in candidates if tokens and (tokens <= set(c.split()) or set(c.split()) <= tokens)]
+    if len(subset) == 1:
+        return subset[0]
+    close = difflib.get_close_matches(normalized, subset or candidates, n=1, cutoff=cutoff)
+    return close[0] if close else normalized
+
+@lru_cache(maxsize=4096)
+def muscle_group_for(canonical_id: str) -> str:
+    """Primary muscle group of an exercise by keyword (see MUSCLE_KEYWORDS)."""
+    tokens = set(canonical_id.split())
+    for keyword, group in _MUSCLE_KEYWORD_TOKENS:
+        if keyword <= tokens:
+            return group
+    return "other"
+
+class TrainingJoinEngine:
+    """
+    Joins the prescribed WorkoutPlan.schedule against logged ExerciseLog entries.
+
+    Logged names are resolved to canonical plan exercises, each session date is mapped to
+    the plan day whose exercises it overlaps most, and per-session completion, weekly
+    set volume per muscle group and tonnage are accumulated in a single pass over the
+    entries.
+    """
+
+    def __init__(self, rep_tolerance: int = 2, name_cutoff: float = 0.8):
+        """
+        Initialize the TrainingJoinEngine.
+
+        Args:
+            rep_tolerance: Reps either side of the prescription still counted as on target
+            name_cutoff: Minimum similarity for fuzzy exercise-name matches
+        """
+        self.rep_tolerance = rep_tolerance
+        self.name_cutoff = name_cutoff
+
+    def compute(self, training_logs: List[Dict[str, Any]], workout_plan: Optional[Dict[str, Any]] = None) -> TrainingAnalytics:
+        """
+        Compute plan-vs-log training metrics.
+
+        Args:
+            training_logs: ExerciseLog dictionaries
+            workout_plan: WorkoutPlan dictionary
+
+        Returns:
+            TrainingAnalytics with every computed metric
+        """
+        plan_days = self._plan_days(workout_plan or {})
+        candidates = tuple(sorted({exercise_id for day in plan_days.values() for exercise_id in day}))
+        # Plan names win over logged spellings when reporting
+        display_names: Dict[str, str] = {
+            normalize_exercise_name(exercise.get("name", "")): exercise.get("name", "")
+            for day in (workout_plan or {}).get("schedule", []) or []
+            for exercise in day.get("exercises") or []
+        }
+
+        # date -> canonical id -> list of (weight, reps, sets)
+        sessions: Dict[str, Dict[str, List[Tuple[float, Optional[int], int]]]] = {}
+        for log in training_logs or []:
+            canonical_id = resolve_exercise(log.get("name", ""), candidates, self.name_cutoff)
+            display_names.setdefault(canonical_id, log.get("name", canonical_id))
+            for entry in log.get("entries", []) or []:
+                date = (entry.get("date") or "")[:10]
+                if not date:
+                    continue
+                sets = entry.get("sets") or 1
+                sessions.setdefault(date, {}).setdefault(canonical_id, []).append(
+                    (float(entry.get("weight") or 0), entry.get("reps"), sets)
+                )
+
+        dates = sorted(sessions)
+        weeks = self._weeks(dates)
+        planned_per_week = len(plan_days)
+        assignment = self._assign_plan_days(sessions, plan_days)
+
+        session_results = []
+        completed_total = 0
+        on_target = 0
+        rep_checked = 0
+        logged_sets_by_exercise: Dict[str, int] = {}
+        tonnage_by_exercise: Dict[str, float] = {}
+        for date in dates:
+            plan_day = assignment.get(date)
+            planned = plan_days.get(plan_day, {})
+            completed = 0
+            for exercise_id, sets_logged in sessions[date].items():
+                prescription = planned.get(exercise_id)
+                set_count = sum(sets for _, _, sets in sets_logged)
+                logged_sets_by_exercise[exercise_id] = logged_sets_by_exercise.get(exercise_id, 0) + set_count
+                for weight, reps, sets in sets_logged:
+                    planned_reps = prescription[1] if prescription else None
+                    tonnage_by_exercise[exercise_id] = (
+                        tonnage_by_exercise.get(exercise_id, 0.0) + weight * (reps or planned_reps or 1) * sets
+                    )
+                    if reps and planned_reps:
+                        rep_checked += sets
+                        if abs(reps - planned_reps) <= self.rep_tolerance:
+                            on_target += sets
+                if prescription:
+                    completed += min(set_count, prescription[0])
+            planned_sets = sum(sets for sets, _ in planned.values())
+            completed_total += completed
+            session_results.append(SessionCompletion(
+                date=date,
+                plan_day=plan_day,
+                planned_sets=planned_sets,
+                completed_sets=completed,
+                completion_percentage=round(completed / planned_sets * 100, 1) if planned_sets else None,
+                missing_exercises=[display_names.get(e, e) for e in planned if e not in sessions[date]],
+                unplanned_exercises=[display_names.get(e, e) for e in sessions[date] if e not in planned]
+            ))
+
+        weekly_planned_sets = sum(sets for day in plan_days.values() for sets, _ in day.values())
+        expected_sets = weekly_planned_sets * weeks
+        total_tonnage = sum(tonnage_by_exercise.values())
+
+        return TrainingAnalytics(
+            weeks=weeks,
+            planned_sessions_per_week=planned_per_week,
+            sessions_logged=len(dates),
+            training_consistency=(
+                round(min(len(dates) / (planned_per_week * weeks), 1.0) * 100, 1) if planned_per_week else 0.0
+            ),
+            volume_completion_rate=round(min(completed_total / expected_sets, 1.0) * 100, 1) if expected_sets else 0.0,
+            intensity_adherence=round(on_target / rep_checked * 100, 1) if rep_checked else None,
+            sessions=session_results,
+            muscle_volume=self._muscle_volume(plan_days, logged_sets_by_exercise, weeks, display_names),
+            exercises=self._exercise_summaries(training_logs, candidates, tonnage_by_exercise, plan_days, weeks),
+            weekly_tonnage=round(total_tonnage / weeks, 1),
+            total_tonnage=round(total_tonnage, 1)
+        )
+
+    def format_summary(self, analytics: TrainingAnalytics, max_sessions: Optional[int] = None) -> str:
+        """
+        Compact, prompt-ready summary of the computed metrics.
+
+        Args:
+            analytics: Output of compute()
+            max_sessions: Only list the most recent sessions (all when None)
+
+        Returns:
+            Formatted multi-line string
+        """
+        lines = [
+            f"  Sessions: {analytics.sessions_logged} logged vs {analytics.planned_sessions_per_week}/week planned "
+            f"over {analytics.weeks} week(s) ({analytics.training_consistency}%)",
+            f"  Volume completion: {analytics.volume_completion_rate}% of prescribed sets",
+            f"  Intensity adherence (reps within {self.rep_tolerance} of prescription): "
+            + (f"{analytics.intensity_adherence}%" if analytics.intensity_adherence is not None else "n/a (no reps logged)"),
+            f"  Tonnage: {analytics.weekly_tonnage} per week",
+        ]
+        sessions = analytics.sessions
+        if max_sessions is not None and len(sessions) > max_sessions:
+            lines.append(f"  ({len(sessions) - max_sessions} earlier sessions omitted)")
+            sessions = sessions[-max_sessions:] if max_sessions else []
+        for session in sessions:
+            line = f"  {session.date} -> plan day {session.plan_day}: {session.completed_sets}/{session.planned_sets} sets"
+            if session.missing_exercises:
+                line += f", missed {', '.join(session.missing_exercises)}"
+            if session.unplanned_exercises:
+                line += f", extra {', '.join(session.unplanned_exercises)}"
+            lines.append(line)
+        for group, volume in analytics.muscle_volume.items():
+            lines.append(
+                f"  {group}: {volume.logged_weekly_sets} of {volume.planned_weekly_sets} weekly sets "
+                f"({volume.completion_percentage if volume.completion_percentage is not None else 'n/a'}%)"
+            )
+        for exercise in analytics.exercises:
+            lines.append(
+                f"  {exercise.name}: {exercise.starting_weight} -> {exercise.current_weight} "
+                f"({exercise.weight_change_percentage:+.1f}%, {exercise.progression_per_week:+.2f}/week), "
+                f"{exercise.sessions} sessions"
+            )
+        return "\n".join(lines) + "\n"
+
+    def _plan_days(self, workout_plan: Dict[str, Any]) -> Dict[int, Dict[str, Tuple[int, Optional[int]]]]:
+        """Training days of the plan as day -> canonical id -> (sets, reps)."""
+        plan_days = {}
+        for day in workout_plan.get("schedule", []) or []:
+            exercises = day.get("exercises") or []
+            if day.get("type") == "Rest Day" or not exercises:
+                continue
+            prescriptions: Dict[str, Tuple[int, Optional[int]]] = {}
+            for exercise in exercises:
+                exercise_id = normalize_exercise_name(exercise.get("name", ""))
+                sets, reps = prescriptions.get(exercise_id, (0, None))
+                prescriptions[exercise_id] = (sets + (exercise.get("sets") or DEFAULT_PLANNED_SETS), exercise.get("reps") or reps)
+            plan_days[day.get("day")] = prescriptions
+        return plan_days
+
+    def _assign_plan_days(
+        self,
+        sessions: Dict[str, Dict[str, Any]],
+        plan_days: Dict[int, Dict[str, Any]]
+    ) -> Dict[str, Optional[int]]:
+        """
+        Map each session date to the plan day it overlaps most.
+
+        Within a calendar week each plan day is used once while unused days remain; ties
+        go to the next plan day in schedule order.
+        """
+        order = sorted(plan_days)
+        assignment: Dict[str, Optional[int]] = {}
+        used_by_week: Dict[int, set] = {}
+        position = 0
+        dates = sorted(sessions)
+        for date in dates:
+            if not order:
+                assignment[date] = None
+                continue
+            week = self._week_index(date, dates[0])
+            used = used_by_week.setdefault(week, set())
+            available = [day for day in order if day not in used] or order
+            logged = set(sessions[date])
+            # Next plan day in schedule order after the previous session's day
+            expected = next(day for day in order[position:] + order[:position] if day in available)
+
+            def overlap(day: int) -> Tuple[float, bool]:
+                planned = set(plan_days[day])
+                union = planned | logged
+                return (len(planned & logged) / len(union) if union else 0.0, day == expected)
+
+            best = max(available, key=overlap)
+            assignment[date] = best
+            used.add(best)
+            position = (order.index(best) + 1) % len(order)
+        return assignment
+
+    def _muscle_volume(
+        self,
+        plan_days: Dict[int, Dict[str, Tuple[int, Optional[int]]]],
+        logged_sets: Dict[str, int],
+        weeks: int,
+        display_names: Dict[str, str]
+    ) -> Dict[str, MuscleVolume]:
+        """Planned vs logged weekly sets per muscle group."""
+        volume: Dict[str, MuscleVolume] = {}
+        for day in plan_days.values():
+            for exercise_id, (sets, _) in day.items():
+                group = volume.setdefault(muscle_group_for(exercise_id), MuscleVolume())
+                group.planned_weekly_sets += sets
+                if exercise_id not in group.exercises:
+                    group.exercises.append(exercise_id)
+        for exercise_id, sets in logged_sets.items():
+            group = volume.setdefault(muscle_group_for(exercise_id), MuscleVolume())
+            group.logged_weekly_sets += sets / weeks
+            if exercise_id not in group.exercises:
+                group.exercises.append(exercise_id)
+        for group in volume.values():
+            group.logged_weekly_sets = round(group.logged_weekly_sets, 1)
+            group.exercises = [display_names.get(e, e) for e in group.exercises]
+            if group.planned_weekly_sets:
+                group.completion_percentage = round(group.logged_weekly_sets / group.planned_weekly_sets * 100, 1)
+        return volume
+
+    def _exercise_summaries(
+        self,
+        training_logs: List[Dict[str, Any]],
+        candidates: Tuple[str, ...],
+        tonnage: Dict[str, float],
+        plan_days: Dict[int, Dict[str, Tuple[int, Optional[int]]]],
+        weeks: int
+    ) -> List[ExerciseSummary]:
+        """Per-exercise load progression."""
+        summaries = []
+        for log in training_logs or []:
+            entries = sorted(
+                (entry for entry in log.get("entries", []) or [] if entry.get("date")),
+                key=lambda entry: entry["date"]
+            )
+            if not entries:
+                continue
+            canonical_id = resolve_exercise(log.get("name", ""), candidates, self.name_cutoff)
+            start, current = float(entries[0].get("weight") or 0), float(entries[-1].get("weight") or 0)
+            span_days = self._days_between(entries[0]["date"][:10], entries[-1]["date"][:10])
+            summaries.append(ExerciseSummary(
+                name=log.get("name", canonical_id),
+                canonical_id=canonical_id,
+                muscle_group=muscle_group_for(canonical_id),
+                sessions=len({entry["date"][:10] for entry in entries}),
+                planned_sessions=sum(1 for day in plan_days.values() if canonical_id in day) * weeks,
+                starting_weight=start,
+                current_weight=current,
+                best_weight=max(float(entry.get("weight") or 0) for entry in entries),
+                weight_change=round(current - start, 2),
+                weight_change_percentage=round((current - start) / start * 100, 1) if start else 0.0,
+                progression_per_week=round((current - start) / span_days * 7, 2) if span_days else 0.0,
+                tonnage=round(tonnage.get(canonical_id, 0.0), 1)
+            ))
+        return summaries
+
+    def _weeks(self, dates: List[str]) -> int:
+        """Number of weeks covered by the session dates (at least one)."""
+        if not dates:
+            return 1
+        return max(1, math.ceil((self._days_between(dates[0], dates[-1]) + 1) / 7))
+
+    def _week_index(self, date: str, first_date: str) -> int:
+        """Week number of a date counted from the first session."""
+        return self._days_between(first_date, date) // 7
+
+    def _days_between(self, start: str, end: str) -> int:
+        """Whole days between two ISO dates (0 when unparseable)."""
+        try:
+            return (Date.fromisoformat(end[:10]) - Date.fromisoformat(start[:10])).days
+        except ValueError:
+            return 0
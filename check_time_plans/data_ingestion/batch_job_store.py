@@ -0,0 +1,139 @@
+from typing import Any, ContextManager, List, Optional
+from pydantic import BaseModel
+import os
+import time
+import uuid
+import logging
+import threading
+from check_time_plans.data_ingestion.shared_state import state_dir, write_json_atomic, process_lock, owner_lock, has_owner
+
+logger = logging.getLogger(__name__)
+
+# Error of the runs a stopped worker left unfinished
+INTERRUPTED = "Interrupted: the worker running this job stopped before the run finished"
+
+BATCH_JOB_STATE_DIR = state_dir("BATCH_JOB_STATE_DIR", "batch_jobs")
+
+class BatchJobItem(BaseModel):
+    """Outcome of one run of a bulk job."""
+    status: str = "pending"
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+class BatchJob(BaseModel):
+    """A bulk job: one pipeline run per input, executed in batch mode; "running", "done" or "interrupted"."""
+    job_id: str
+    pipeline: str
+    status: str = "running"
+    created_at: float
+    finished_at: Optional[float] = None
+    items: List[BatchJobItem]
+
+    @property
+    def done(self) -> bool:
+        return all(item.status != "pending" for item in self.items)
+
+    def summary(self) -> dict:
+        """The job without its results."""
+        counts = {"pending": 0, "success": 0, "error": 0}
+        for item in self.items:
+            counts[item.status] += 1
+        return {
+            "job_id": self.job_id,
+            "pipeline": self.pipeline,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "total": len(self.items),
+            **counts
+        }
+
+class BatchJobStore:
+    """
+    Bulk jobs and their per-run results, one JSON file per job under BATCH_JOB_STATE_DIR, so
+    that any worker process can report on a job run by another.
+
+    The worker running a job holds its owner lock (see running()); a job still "running"
+    with nobody holding it was lost with a stopped worker, and interrupt_abandoned() closes it.
+    """
+
+    def __init__(self, state_dir: str = BATCH_JOB_STATE_DIR):
+        self.state_dir = state_dir
+        self._lock = threading.Lock()
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def create(self, pipeline: str, size: int) -> BatchJob:
+        """Start a job of `size` runs of a pipeline; a job of no runs is done at once."""
+        job = BatchJob(
+            job_id=uuid.uuid4().hex,
+            pipeline=pipeline,
+            created_at=time.time(),
+            items=[BatchJobItem() for _ in range(size)]
+        )
+        if job.done:
+            job.status = "done"
+            job.finished_at = job.created_at
+        self._save(self._path(job.job_id), job)
+        return job
+
+    def running(self, job_id: str) -> ContextManager[None]:
+        """Hold the job's owner lock while this worker runs it."""
+        return owner_lock(self._path(job_id))
+
+    def interrupt_abandoned(self) -> int:
+        """
+        Close the running jobs no live worker holds: their pending runs fail as interrupted.
+
+        Returns:
+            Number of jobs closed
+        """
+        interrupted = 0
+        for name in os.listdir(self.state_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.state_dir, name)
+            with self._lock, process_lock(path):
+                job = self._load(path)
+                if job is None or job.status != "running" or has_owner(path):
+                    continue
+                for index, item in enumerate(job.items):
+                    if item.status == "pending":
+                        job.items[index] = BatchJobItem(status="error", error=INTERRUPTED)
+                job.status = "interrupted"
+                job.finished_at = time.time()
+                self._save(path, job)
+                interrupted += 1
+        return interrupted
+
+    def record(self, job_id: str, index: int, result: Any = None, error: Optional[str] = None) -> None:
+        """Store the outcome of one run; the job is finished with its last run."""
+        path = self._path(job_id)
+        with self._lock, process_lock(path):
+            job = self._load(path)
+            if job is None:
+                return
+            job.items[index] = BatchJobItem(status="error" if error is not None else "success", result=result, error=error)
+            if job.done:
+                job.status = "done"
+                job.finished_at = time.time()
+            self._save(path, job)
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self._load(self._path(job_id))
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.state_dir, f"{''.join(c for c in job_id if c.isalnum())}.json")
+
+    def _load(self, path: str) -> Optional[BatchJob]:
+        """Read a job, treating a missing or unreadable file as no job."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return BatchJob.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable batch job {path}: {str(e)}")
+            return None
+
+    def _save(self, path: str, job: BatchJob) -> None:
+        write_json_atomic(path, job.model_dump_json())
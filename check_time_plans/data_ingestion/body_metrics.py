@@ -1,12 +1,15 @@
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Tuple, Union
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from check_time_plans.data_ingestion.timeseries_store import TimeSeriesStore
+from check_time_plans.analytics.anthropometrics import AnthropometricsEngine, AnthropometricAnalysis
+from check_time_plans.data_ingestion.views import as_view
+from collections.abc import Mapping
+import numpy as np
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class MeasurementRatio(BaseModel):
     """Represents a measurement ratio with name and value."""
@@ -51,41 +54,91 @@ class BodyMetricsAnalysis(BaseModel):
     body_recomposition_indicators: str 
     health_marker_implications: str 
 
+class BodyMetricsNarrative(BaseModel):
+    """Qualitative part of the body metrics analysis; ratios, deltas and composition are computed locally."""
+    upper_lower_balance: str = Field(..., description="Assessment of upper vs. lower body development")
+    left_right_symmetry: str = Field(..., description="Assessment of left-right symmetry")
+    anterior_posterior_balance: str = Field(..., description="Assessment of front vs. back muscle development")
+    proportion_observations: str = Field(..., description="Notable observations about body proportions")
+    change_rate_assessment: str
+    visual_impact_assessment: str
+    body_recomposition_indicators: str
+    health_marker_implications: str
+
 
 
 class BodyMetricsExtractor:
     """
     Extracts and analyzes client body measurement data with advanced processing capabilities.
+    
+    Ratios, symmetry, body-fat estimates and measurement deltas are computed by
+    AnthropometricsEngine; the LLM only interprets them.
     """
 
-    def __init__(self, llm_client: Optional[Any] = None):
+    def __init__(
+        self,
+        llm_client: Optional[Any] = None,
+        timeseries_store: Optional[TimeSeriesStore] = None,
+        engine: Optional[AnthropometricsEngine] = None
+    ):
         """
         Initialize the BodyMetricsExtractor with an optional custom LLM client.
         
         Args:
             llm_client: Custom LLM client implementation. If None, uses the default BaseLLM.
+            timeseries_store: Columnar history store. If provided, long-term measurement trends are added to the prompt
+                and the weigh-ins at the measurement dates feed the composition metrics.
+            engine: Anthropometric engine. If None, uses the default AnthropometricsEngine.
         """
         self.llm_client = llm_client or BaseLLM()
+        self.timeseries_store = timeseries_store
+        self.engine = engine or AnthropometricsEngine()
     
-    def extract_body_measurements(self, body_measurements: Dict[str, Any]) -> Dict[str, Any]:
+    def extract_body_measurements(
+        self,
+        body_measurements: Union[Dict[str, Any], BaseModel],
+        user_id: Optional[str] = None,
+        sex: Optional[str] = None,
+        height_cm: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         Process body measurement data to analyze changes and patterns.
         
         Args:
-            body_measurements: The client's body measurement data over time
+            body_measurements: The client's body measurement data over time (dict or validated model)
+            user_id: The client's id, used to look up measurement history
+            sex: Client's sex, needed for the body-fat estimate
+            height_cm: Client's height, needed for body fat, BMI and waist-to-height
             
         Returns:
             A dictionary containing structured body metrics analysis
         """
         try:
+            # Validated models are read through a view instead of a .dict() copy
+            body_measurements = as_view(body_measurements)
+            
             # Validate input data structure
             self._validate_input_data(body_measurements)
             
-            # Process using the schema-based approach
-            schema_result = self._analyze_body_metrics_schema(body_measurements)
+            # Compute ratios, deltas and composition locally
+            measurements = body_measurements.get("measurements", {})
+            weight_current, weight_previous = self._weights_at_dates(
+                user_id, body_measurements.get("dates", {}), measurements
+            )
+            analysis = self.engine.analyze(
+                measurements,
+                sex=sex,
+                height_cm=height_cm,
+                weight_current=weight_current,
+                weight_previous=weight_previous
+            )
+            
+            # Ask the LLM to interpret the computed metrics
+            narrative = self._analyze_body_metrics_schema(body_measurements, analysis, user_id)
             
             return {
-                "body_metrics_analysis": schema_result
+                "body_metrics_analysis": self._merge_analysis(analysis, narrative),
+                "anthropometrics": analysis.model_dump()
             }
             
         except Exception as e:
@@ -137,15 +190,22 @@ class BodyMetricsExtractor:
             "implications for program adjustment."
         )
     
-    def _analyze_body_metrics_schema(self, body_measurements: Dict[str, Any]) -> BodyMetricsAnalysis:
+    def _analyze_body_metrics_schema(
+        self,
+        body_measurements: Dict[str, Any],
+        analysis: AnthropometricAnalysis,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
-        Analyze body metrics using Pydantic schema validation and LLM analysis.
+        Interpret the computed body metrics using Pydantic schema validation and LLM analysis.
         
         Args:
             body_measurements: The client's body measurement data
+            analysis: Metrics computed by the anthropometric engine
+            user_id: The client's id, used to look up measurement history
             
         Returns:
-            Structured body metrics analysis
+            Narrative fields of the body metrics analysis
         """
         # Extract measurement context
         dates = body_measurements.get("dates", {})
@@ -156,7 +216,8 @@ class BodyMetricsExtractor:
         measurements = body_measurements.get("measurements", {})
         
         # Prepare detailed prompt
-        prompt = self._construct_detailed_prompt(current_date, previous_date, measurements)
+        prompt = self._construct_detailed_prompt(current_date, previous_date, analysis)
+        prompt += self._format_measurement_history(user_id, list(measurements.keys()))
         
         # Prepare system message
         system_message = self.get_system_message()
@@ -165,81 +226,127 @@ class BodyMetricsExtractor:
         result = self.llm_client.call_llm(
             prompt, 
             system_message, 
-            schema=BodyMetricsAnalysis
+            schema=BodyMetricsNarrative,
+            node=type(self).__name__
         )
         
         return result
     
-    def _construct_detailed_prompt(self, current_date: str, previous_date: str, measurements: Dict) -> str:
+    def _merge_analysis(self, analysis: AnthropometricAnalysis, narrative: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine the computed metrics and the LLM narrative into the BodyMetricsAnalysis shape.
+        
+        Args:
+            analysis: Metrics computed by the anthropometric engine
+            narrative: Narrative fields from the LLM
+        
+        Returns:
+            Dictionary matching the BodyMetricsAnalysis schema
+        """
+        proportion_fields = (
+            "upper_lower_balance", "left_right_symmetry", "anterior_posterior_balance", "proportion_observations"
+        )
+        return {
+            "composition_metrics": BodyCompositionMetrics(**self.engine.composition_metrics(analysis)).model_dump(),
+            "proportion_assessment": BodyProportionAssessment(
+                **{field: narrative.get(field, "") for field in proportion_fields},
+                measurement_ratios=[MeasurementRatio(**ratio) for ratio in self.engine.measurement_ratios(analysis)]
+            ).model_dump(),
+            "specific_measurement_changes": [
+                MeasurementChange(**change).model_dump() for change in self.engine.measurement_changes(analysis)
+            ],
+            **self.engine.classify_changes(analysis),
+            **{key: value for key, value in narrative.items() if key not in proportion_fields}
+        }
+    
+    def _weights_at_dates(
+        self,
+        user_id: Optional[str],
+        dates: Dict[str, str],
+        measurements: Dict[str, Any]
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """
+        Body weight at the current and previous measurement dates.
+        
+        Uses a 'weight' measurement when present, otherwise the latest weigh-in on or
+        before each date from the columnar store.
+        
+        Args:
+            user_id: The client's id
+            dates: Measurement dates ('current' and 'previous')
+            measurements: Measurement name to entry
+        
+        Returns:
+            Tuple of (current weight, previous weight), None where unknown
+        """
+        weight = measurements.get("weight")
+        if isinstance(weight, Mapping):
+            return weight.get("current"), weight.get("previous")
+        if not self.timeseries_store or not user_id:
+            return None, None
+        
+        weights = []
+        for key in ("current", "previous"):
+            date = (dates.get(key) or "")[:10]
+            if not date:
+                weights.append(None)
+                continue
+            history = self.timeseries_store.daily_range(user_id, end=date, fields=["weight"])["weight"]
+            history = history[~np.isnan(history) & (history > 0)]
+            weights.append(float(history[-1]) if len(history) else None)
+        return weights[0], weights[1]
+    
+    def _construct_detailed_prompt(self, current_date: str, previous_date: str, analysis: AnthropometricAnalysis) -> str:
         """
         Construct a detailed prompt for LLM analysis.
         
         Args:
             current_date: Current measurement date
             previous_date: Previous measurement date
-            measurements: Detailed measurements dictionary
+            analysis: Metrics computed by the anthropometric engine
         
         Returns:
             Formatted prompt string
         """
-        # Format measurement details
-        measurement_summary = self._format_measurements(measurements)
-        
         return (
-            "Perform a comprehensive analysis of body measurement data:\n\n"
+            "Interpret the following body measurement analysis:\n\n"
             f"MEASUREMENT CONTEXT:\n"
             f"- Current Date: {current_date}\n"
             f"- Previous Date: {previous_date}\n\n"
             
-            f"MEASUREMENT DETAILS:\n{measurement_summary}\n\n"
+            f"COMPUTED METRICS (ratios, right-left symmetry, US Navy body fat, changes):\n"
+            f"{self.engine.format_summary(analysis)}\n\n"
             
-            "Analysis Requirements:\n"
-            "1. Calculate key body composition metrics\n"
-            "2. Assess body proportions and symmetry\n"
-            "3. Identify significant measurement changes\n"
-            "4. Evaluate change rate and potential implications\n"
-            "5. Provide insights for program optimization\n\n"
+            "These metrics are exact; do not recalculate them. Analysis Requirements:\n"
+            "1. Assess body proportions and symmetry\n"
+            "2. Evaluate change rate and potential implications\n"
+            "3. Identify signs of body recomposition\n"
+            "4. Provide insights for program optimization\n\n"
             
             "Deliver a detailed, actionable body metrics analysis."
         )
     
-    def _format_measurements(self, measurements: Dict[str, Any]) -> str:
+    def _format_measurement_history(self, user_id: Optional[str], names: List[str]) -> str:
         """
-        Format measurement data as a readable string for LLM analysis.
+        Format long-term measurement trends from the columnar store, if available.
         
         Args:
-            measurements: Dictionary of body measurements
+            user_id: The client's id
+            names: Measurement names in the current check-in
         
         Returns:
-            Formatted string representation of measurements
+            Formatted prompt section, or an empty string when there is no history
         """
-        if not measurements:
-            return "No measurement data available."
+        if not self.timeseries_store or not user_id:
+            return ""
         
-        formatted_measurements = []
-        for name, data in measurements.items():
-            current = data.get("current", "N/A")
-            previous = data.get("previous", "N/A")
-            unit = data.get("unit", "")
-            change = data.get("change", "N/A")
-            
-            measurement_str = (
-                f"{name.title()}:\n"
-                f"  - Current: {current} {unit}\n"
-                f"  - Previous: {previous} {unit}\n"
-                f"  - Change: {change} {unit}"
-            )
-            
-            # Calculate percentage change if possible
-            try:
-                current_val = float(current)
-                previous_val = float(previous)
-                if previous_val != 0:
-                    pct_change = (current_val - previous_val) / previous_val * 100
-                    measurement_str += f"\n  - Percentage Change: {pct_change:.2f}%"
-            except (ValueError, TypeError):
-                pass
-            
-            formatted_measurements.append(measurement_str)
+        history = self.timeseries_store.summarize_measurement_trends(user_id, names)
+        if not history:
+            return ""
         
-        return "\n\n".join(formatted_measurements)
\ No newline at end of file
+        lines = [
+            f"- {name}: {trend['first']} -> {trend['latest']} since {trend['since']} "
+            f"({trend['check_ins']} check-ins, {trend['change_per_4_weeks']} per 4 weeks)"
+            for name, trend in history.items()
+        ]
+        return "\n\nLONG-TERM MEASUREMENT HISTORY:\n" + "\n".join(lines)
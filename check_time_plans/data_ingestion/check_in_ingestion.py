@@ -1,38 +1,74 @@
 import json
-from typing import Dict, Any, Optional, List
-from pydantic import BaseModel, Field
+from typing import Dict, Any, Optional, List, Literal, Union
+from pydantic import BaseModel, Field, AliasChoices, ValidationError, field_validator, model_validator
 from datetime import datetime
+from first_time_plans.validation import validate_json, validate_python
+
+# Defaults and validators reproduce the lenient field-by-field ingestion, so a raw payload
+# is validated in a single pass (from JSON bytes or a dict) straight into these models.
+# Daily reports and exercise logs come in two flavours: the Lenient* models fill in whatever
+# a weekly payload leaves out, while DailyReport/ExerciseEntry/ExerciseLog, their strict
+# subclasses, validate data posted on its own and keep their required fields required.
+# A strict instance is also a lenient one, so stored daily data feeds a weekly check-in as is.
+
+def _list_or_empty(value: Any) -> Any:
+    """Treat anything that is not a list as an empty list."""
+    return value if isinstance(value, list) else []
+
+# Spellings of the structured goal direction accepted from the analysis report
+GOAL_DIRECTIONS = {
+    "gain": "gain", "bulk": "gain", "muscle_gain": "gain",
+    "lose": "lose", "loss": "lose", "cut": "lose", "fat_loss": "lose", "weight_loss": "lose",
+    "maintain": "maintain", "maintenance": "maintain", "recomp": "maintain", "recomposition": "maintain",
+}
 
 class Goals(BaseModel):
-    weeklyGoal: str
-    monthlyGoal: str
-    quarterlyGoal: str
+    weeklyGoal: str = "Not specified"
+    monthlyGoal: str = "Not specified"
+    quarterlyGoal: str = "Not specified"
+    # Structured direction of the weight goal; unknown values are dropped (the free text is used instead)
+    goalDirection: Optional[Literal["gain", "lose", "maintain"]] = None
+
+    @field_validator("goalDirection", mode="before")
+    @classmethod
+    def _known_direction(cls, value: Any) -> Any:
+        if not isinstance(value, str):
+            return None
+        return GOAL_DIRECTIONS.get(value.strip().lower().replace(" ", "_").replace("-", "_"))
 
 class StandardizedMeasurement(BaseModel):
-    current: float
-    previous: float
-    unit: str
-    change: float
+    current: float = 0.0
+    previous: float = 0.0
+    unit: str = "cm"
+    change: float = 0.0
 
 class StandardizedBodyMeasurements(BaseModel):
-    dates: Dict[str, str]
-    measurements: Dict[str, StandardizedMeasurement]
+    dates: Dict[str, str] = Field(default_factory=lambda: {"current": "", "previous": ""})
+    measurements: Dict[str, StandardizedMeasurement] = Field(default_factory=dict)
+
+    @field_validator("measurements", mode="before")
+    @classmethod
+    def _drop_scalar_measurements(cls, value: Any) -> Any:
+        if not isinstance(value, dict):
+            return {}
+        return {key: entry for key, entry in value.items() if isinstance(entry, (dict, BaseModel))}
 
 class MacroNutrients(BaseModel):
-    carbs: int
-    fats: int
-    proteins: int
+    carbs: int = 0
+    fats: int = 0
+    proteins: int = 0
 
 class SleepMetrics(BaseModel):
-    length: float
+    length: float = 0.0
     efficiency: Optional[int] = None
 
-class DailyReport(BaseModel):
-    day: int
-    date: str
+class LenientDailyReport(BaseModel):
+    """A daily report inside a weekly check-in payload; missing fields fall back to defaults."""
+    day: int = 0
+    date: str = ""
     timeOfWeighIn: Optional[str] = None
-    weight: float
-    macros: MacroNutrients
+    weight: float = 0.0
+    macros: MacroNutrients = Field(default_factory=MacroNutrients)
     performance: Optional[str] = None
     steps: Optional[int] = None
     cardio: Optional[int] = None
@@ -42,45 +78,76 @@ class DailyReport(BaseModel):
     stressors: Optional[str] = None
     additionalNotes: Optional[str] = None
 
-class ExerciseEntry(BaseModel):
-    date: str
-    weight: float
+    @field_validator("sleep", mode="before")
+    @classmethod
+    def _sleep_object_only(cls, value: Any) -> Any:
+        return value if isinstance(value, (dict, SleepMetrics)) else None
+
+class DailyReport(LenientDailyReport):
+    """A daily report posted on its own: the date and the weigh-in are required."""
+    date: str = Field(..., min_length=1)
+    weight: float = Field(..., ge=0)
+
+class LenientExerciseEntry(BaseModel):
+    """An exercise entry inside a weekly check-in payload; missing fields fall back to defaults."""
+    date: str = ""
+    weight: float = 0.0
+    reps: Optional[int] = None
+    sets: Optional[int] = None
+    notes: Optional[str] = None
+
+class ExerciseEntry(LenientExerciseEntry):
+    """An exercise entry posted on its own: the date and the load are required."""
+    date: str = Field(..., min_length=1)
+    weight: float = Field(..., ge=0)
+
+class LenientExerciseLog(BaseModel):
+    """An exercise log inside a weekly check-in payload; missing fields fall back to defaults."""
+    name: str = "Undefined"
+    entries: List[LenientExerciseEntry] = Field(default_factory=list)
+
+    _entries_list = field_validator("entries", mode="before")(_list_or_empty)
 
-class ExerciseLog(BaseModel):
-    name: str
-    entries: List[ExerciseEntry]
+class ExerciseLog(LenientExerciseLog):
+    """New entries for one exercise posted on their own: the name and at least one entry are required."""
+    name: str = Field(..., min_length=1)
+    entries: List[ExerciseEntry] = Field(..., min_length=1)
 
 class MealItem(BaseModel):
-    name: str
-    quantity: str
+    name: str = ""
+    quantity: str = "1 serving"
 
 class MealNutrition(BaseModel):
-    protein: int
-    carbohydrates: int
-    fat: int
-    calories: int
+    protein: int = 0
+    carbohydrates: int = 0
+    fat: int = 0
+    calories: int = 0
 
 class Meal(BaseModel):
-    name: str
-    time: str
-    items: List[MealItem]
-    nutrition: MealNutrition
+    name: str = "Unnamed Meal"
+    time: str = ""
+    items: List[MealItem] = Field(default_factory=list)
+    nutrition: MealNutrition = Field(default_factory=MealNutrition)
+
+    _items_list = field_validator("items", mode="before")(_list_or_empty)
 
 class TotalNutrition(BaseModel):
-    protein: int
-    carbohydrates: int
-    fat: int
-    calories: int
+    protein: int = 0
+    carbohydrates: int = 0
+    fat: int = 0
+    calories: int = 0
 
 class MealPlan(BaseModel):
-    name: str
-    description: str
-    totalDailyNutrition: TotalNutrition
-    trainingDayMeals: List[Meal]
-    nonTrainingDayMeals: List[Meal]
+    name: str = "Default Meal Plan"
+    description: str = ""
+    totalDailyNutrition: TotalNutrition = Field(default_factory=TotalNutrition)
+    trainingDayMeals: List[Meal] = Field(default_factory=list)
+    nonTrainingDayMeals: List[Meal] = Field(default_factory=list)
+
+    _meal_lists = field_validator("trainingDayMeals", "nonTrainingDayMeals", mode="before")(_list_or_empty)
 
 class Exercise(BaseModel):
-    name: str
+    name: str = ""
     sets: Optional[int] = None
     reps: Optional[int] = None
     rest: Optional[str] = None
@@ -89,17 +156,28 @@ class Exercise(BaseModel):
     notes: Optional[str] = None
 
 class WorkoutDay(BaseModel):
-    day: int
+    day: int = 0
     type: Optional[str] = None
     exercises: Optional[List[Exercise]] = None
 
+    @model_validator(mode="before")
+    @classmethod
+    def _rest_days_have_no_exercises(cls, data: Any) -> Any:
+        if not isinstance(data, dict):
+            return data
+        if data.get("type") == "Rest Day":
+            return {"day": data.get("day", 0), "type": "Rest Day"}
+        return {**data, "exercises": _list_or_empty(data.get("exercises"))}
+
 class WorkoutPlan(BaseModel):
-    name: str
-    description: str
-    schedule: List[WorkoutDay]
+    name: str = "Default Workout Plan"
+    description: str = ""
+    schedule: List[WorkoutDay] = Field(default_factory=list)
+
+    _schedule_list = field_validator("schedule", mode="before")(_list_or_empty)
 
 class WeekReport(BaseModel):
-    date: str
+    date: str = ""
     activityLevels: Optional[str] = None
     appearance: Optional[str] = None
     averageWeight: Optional[float] = None
@@ -114,17 +192,52 @@ class WeekReport(BaseModel):
     stressManagement: Optional[str] = None
     supportWork: Optional[str] = None
     trainingWeek: Optional[str] = None
-    userId: str
+    userId: str = ""
 
 class StandardizedCheckInData(BaseModel):
-    userId: str
-    goals: Goals
-    bodyMeasurements: StandardizedBodyMeasurements
-    dailyReports: List[DailyReport]
-    exerciseLogs: List[ExerciseLog]
-    mealPlan: MealPlan
-    workoutPlan: WorkoutPlan
-    weekReport: WeekReport
+    """
+    A weekly check-in. Accepts either the raw API payload (analysisReport, exercisesLog,
+    userWorkoutDetails) or the standardized field names.
+    """
+    userId: str = ""
+    goals: Goals = Field(default_factory=Goals, validation_alias=AliasChoices("goals", "analysisReport"))
+    bodyMeasurements: StandardizedBodyMeasurements = Field(default_factory=StandardizedBodyMeasurements)
+    dailyReports: List[LenientDailyReport] = Field(default_factory=list)
+    exerciseLogs: List[LenientExerciseLog] = Field(
+        default_factory=list, validation_alias=AliasChoices("exerciseLogs", "exercisesLog")
+    )
+    mealPlan: MealPlan = Field(default_factory=MealPlan)
+    workoutPlan: WorkoutPlan = Field(
+        default_factory=WorkoutPlan, validation_alias=AliasChoices("workoutPlan", "userWorkoutDetails")
+    )
+    weekReport: WeekReport = Field(default_factory=WeekReport)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize_sections(cls, data: Any) -> Any:
+        if not isinstance(data, dict):
+            return data
+        # Missing or null sections fall back to their defaults; the user id comes from the week report
+        data = {key: value for key, value in data.items() if value is not None}
+        week_report = data.get("weekReport")
+        if "userId" not in data and isinstance(week_report, dict):
+            data["userId"] = week_report.get("userId", "")
+        return data
+
+    @field_validator("dailyReports", mode="wrap")
+    @classmethod
+    def _skip_invalid_reports(cls, value: Any, handler: Any) -> List[LenientDailyReport]:
+        try:
+            return handler(value)
+        except ValidationError:
+            # Slow path only when something is wrong: keep the reports that validate
+            reports = []
+            for report in _list_or_empty(value):
+                try:
+                    reports.append(handler([report])[0])
+                except ValidationError as e:
+                    print(f"Error processing daily report: {str(e)}")
+            return reports
 
 class CheckInDataIngestionModule:
     """Module for processing and standardizing check-in data."""
@@ -140,284 +253,33 @@ class CheckInDataIngestionModule:
             StandardizedCheckInData: Processed and standardized data
         """
         try:
-            # Extract data from raw_data directly based on the structure we see
-            analysis_report = raw_data.get('analysisReport', {})
-            body_measurements = raw_data.get('bodyMeasurements', {})
-            daily_reports = raw_data.get('dailyReports', [])
-            exercise_logs = raw_data.get('exercisesLog', [])
-            meal_plan = raw_data.get('mealPlan', {})
-            workout_details = raw_data.get('userWorkoutDetails', {})
-            week_report = raw_data.get('weekReport', {})
-            
-            # Process and standardize each section
-            standardized_goals = self._process_goals(analysis_report)
-            standardized_body = self._process_body_measurements(body_measurements)
-            standardized_daily = self._process_daily_reports(daily_reports)
-            standardized_exercises = self._process_exercise_logs(exercise_logs)
-            standardized_meal = self._process_meal_plan(meal_plan)
-            standardized_workout = self._process_workout_plan(workout_details)
-            standardized_week_report = self._process_week_report(week_report)
-            
-            # Create the standardized data object
-            return StandardizedCheckInData(
-                userId=week_report.get('userId', ''),
-                goals=standardized_goals,
-                bodyMeasurements=standardized_body,
-                dailyReports=standardized_daily,
-                exerciseLogs=standardized_exercises,
-                mealPlan=standardized_meal,
-                workoutPlan=standardized_workout,
-                weekReport=standardized_week_report
-            )
-            
+            return validate_python(StandardizedCheckInData, raw_data)
         except Exception as e:
             # Log the error and raise it for proper handling upstream
             print(f"Error processing check-in data: {str(e)}")
             raise
     
-    def _process_goals(self, analysis_report: Dict[str, Any]) -> Goals:
-        """Process and standardize goals data."""
-        # Extract goals from analysis report
-        weekly_goal = analysis_report.get('weeklyGoal', "Not specified")
-        monthly_goal = analysis_report.get('monthlyGoal', "Not specified")
-        quarterly_goal = analysis_report.get('quarterlyGoal', "Not specified")
-        
-        return Goals(
-            weeklyGoal=weekly_goal,
-            monthlyGoal=monthly_goal,
-            quarterlyGoal=quarterly_goal
-        )
-    
-    def _process_body_measurements(self, body_data: Dict[str, Any]) -> StandardizedBodyMeasurements:
-        """Process and standardize body measurements data."""
-        dates = body_data.get("dates", {"current": "", "previous": ""})
-        measurements = {}
-        
-        raw_measurements = body_data.get("measurements", {})
-        for key, value in raw_measurements.items():
-            if isinstance(value, dict):
-                measurements[key] = StandardizedMeasurement(
-                    current=value.get("current", 0.0),
-                    previous=value.get("previous", 0.0),
-                    unit=value.get("unit", "cm"),
-                    change=value.get("change", 0.0)
-                )
-        
-        return StandardizedBodyMeasurements(
-            dates=dates,
-            measurements=measurements
-        )
-    
-    def _process_daily_reports(self, daily_data: List[Dict[str, Any]]) -> List[DailyReport]:
-        """Process and standardize daily reports data."""
-        daily_reports = []
-        
-        for report in daily_data:
-            try:
-                # Extract and standardize sleep metrics
-                sleep_metrics = None
-                if "sleep" in report and isinstance(report["sleep"], dict):
-                    sleep_metrics = SleepMetrics(
-                        length=report["sleep"].get("length", 0.0),
-                        efficiency=report["sleep"].get("efficiency")
-                    )
-                
-                # Extract and standardize macros
-                macros = MacroNutrients(
-                    carbs=report.get("macros", {}).get("carbs", 0),
-                    fats=report.get("macros", {}).get("fats", 0),
-                    proteins=report.get("macros", {}).get("proteins", 0)
-                )
-                
-                # Create standardized daily report
-                daily_reports.append(
-                    DailyReport(
-                        day=report.get("day", 0),
-                        date=report.get("date", ""),
-                        timeOfWeighIn=report.get("timeOfWeighIn"),
-                        weight=float(report.get("weight", 0.0)),
-                        macros=macros,
-                        performance=report.get("performance"),
-                        steps=report.get("steps"),
-                        cardio=report.get("cardio"),
-                        sleep=sleep_metrics,
-                        rhr=report.get("rhr"),
-                        appetite=report.get("appetite"),
-                        stressors=report.get("stressors"),
-                        additionalNotes=report.get("additionalNotes")
-                    )
-                )
-            except Exception as e:
-                print(f"Error processing daily report: {str(e)}")
-                # Continue processing other reports
-                continue
-        
-        return daily_reports
-    
-    def _process_exercise_logs(self, exercise_data: List[Dict[str, Any]]) -> List[ExerciseLog]:
-        """Process and standardize exercise logs data."""
-        exercise_logs = []
+    def process_check_in_json(self, raw_body: Union[str, bytes]) -> StandardizedCheckInData:
+        """
+        Validate a raw JSON request body straight into StandardizedCheckInData, without
+        building an intermediate dict.
         
-        for exercise in exercise_data:
-            entries = []
-            
-            if "entries" in exercise and isinstance(exercise["entries"], list):
-                for entry in exercise["entries"]:
-                    entries.append(
-                        ExerciseEntry(
-                            date=entry.get("date", ""),
-                            weight=float(entry.get("weight", 0.0))
-                        )
-                    )
+        Args:
+            raw_body: The request body
             
-            exercise_logs.append(
-                ExerciseLog(
-                    name=exercise.get("name", "Undefined"),
-                    entries=entries
-                )
-            )
-        
-        return exercise_logs
+        Returns:
+            StandardizedCheckInData: Processed and standardized data
+        """
+        try:
+            return validate_json(StandardizedCheckInData, raw_body)
+        except Exception as e:
+            print(f"Error processing check-in data: {str(e)}")
+            raise
     
     def _process_meal_plan(self, meal_data: Dict[str, Any]) -> MealPlan:
         """Process and standardize meal plan data."""
-        training_day_meals = []
-        non_training_day_meals = []
-        
-        # Process training day meals
-        if "trainingDayMeals" in meal_data and isinstance(meal_data["trainingDayMeals"], list):
-            for meal in meal_data["trainingDayMeals"]:
-                items = []
-                if "items" in meal and isinstance(meal["items"], list):
-                    for item in meal["items"]:
-                        items.append(
-                            MealItem(
-                                name=item.get("name", ""),
-                                quantity=item.get("quantity", "1 serving")
-                            )
-                        )
-                
-                nutrition = MealNutrition(
-                    protein=meal.get("nutrition", {}).get("protein", 0),
-                    carbohydrates=meal.get("nutrition", {}).get("carbohydrates", 0),
-                    fat=meal.get("nutrition", {}).get("fat", 0),
-                    calories=meal.get("nutrition", {}).get("calories", 0)
-                )
-                
-                training_day_meals.append(
-                    Meal(
-                        name=meal.get("name", "Unnamed Meal"),
-                        time=meal.get("time", ""),
-                        items=items,
-                        nutrition=nutrition
-                    )
-                )
-        
-        # Process non-training day meals
-        if "nonTrainingDayMeals" in meal_data and isinstance(meal_data["nonTrainingDayMeals"], list):
-            for meal in meal_data["nonTrainingDayMeals"]:
-                items = []
-                if "items" in meal and isinstance(meal["items"], list):
-                    for item in meal["items"]:
-                        items.append(
-                            MealItem(
-                                name=item.get("name", ""),
-                                quantity=item.get("quantity", "1 serving")
-                            )
-                        )
-                
-                nutrition = MealNutrition(
-                    protein=meal.get("nutrition", {}).get("protein", 0),
-                    carbohydrates=meal.get("nutrition", {}).get("carbohydrates", 0),
-                    fat=meal.get("nutrition", {}).get("fat", 0),
-                    calories=meal.get("nutrition", {}).get("calories", 0)
-                )
-                
-                non_training_day_meals.append(
-                    Meal(
-                        name=meal.get("name", "Unnamed Meal"),
-                        time=meal.get("time", ""),
-                        items=items,
-                        nutrition=nutrition
-                    )
-                )
-        
-        # Default total nutrition values if not provided
-        total_nutrition = TotalNutrition(
-            protein=meal_data.get("totalDailyNutrition", {}).get("protein", 0),
-            carbohydrates=meal_data.get("totalDailyNutrition", {}).get("carbohydrates", 0),
-            fat=meal_data.get("totalDailyNutrition", {}).get("fat", 0),
-            calories=meal_data.get("totalDailyNutrition", {}).get("calories", 0)
-        )
-        
-        return MealPlan(
-            name=meal_data.get("name", "Default Meal Plan"),
-            description=meal_data.get("description", ""),
-            totalDailyNutrition=total_nutrition,
-            trainingDayMeals=training_day_meals,
-            nonTrainingDayMeals=non_training_day_meals
-        )
+        return validate_python(MealPlan, meal_data or {})
     
     def _process_workout_plan(self, workout_data: Dict[str, Any]) -> WorkoutPlan:
         """Process and standardize workout plan data."""
-        schedule = []
-        
-        if "schedule" in workout_data and isinstance(workout_data["schedule"], list):
-            for day_data in workout_data["schedule"]:
-                # Check if this is a rest day
-                if day_data.get("type") == "Rest Day":
-                    schedule.append(
-                        WorkoutDay(
-                            day=day_data.get("day", 0),
-                            type="Rest Day"
-                        )
-                    )
-                else:
-                    exercises = []
-                    if "exercises" in day_data and isinstance(day_data["exercises"], list):
-                        for exercise_data in day_data["exercises"]:
-                            exercises.append(
-                                Exercise(
-                                    name=exercise_data.get("name", ""),
-                                    sets=exercise_data.get("sets"),
-                                    reps=exercise_data.get("reps"),
-                                    rest=exercise_data.get("rest"),
-                                    duration=exercise_data.get("duration"),
-                                    intensity=exercise_data.get("intensity"),
-                                    notes=exercise_data.get("notes")
-                                )
-                            )
-                    
-                    schedule.append(
-                        WorkoutDay(
-                            day=day_data.get("day", 0),
-                            exercises=exercises
-                        )
-                    )
-        
-        return WorkoutPlan(
-            name=workout_data.get("name", "Default Workout Plan"),
-            description=workout_data.get("description", ""),
-            schedule=schedule
-        )
-    
-    def _process_week_report(self, report_data: Dict[str, Any]) -> WeekReport:
-        """Process and standardize week report data."""
-        return WeekReport(
-            date=report_data.get("date", ""),
-            activityLevels=report_data.get("activityLevels"),
-            appearance=report_data.get("appearance"),
-            averageWeight=report_data.get("averageWeight"),
-            caffeineConsumption=report_data.get("caffeineConsumption"),
-            comments=report_data.get("comments"),
-            digestion=report_data.get("digestion"),
-            highlights=report_data.get("highlights"),
-            nextWeek=report_data.get("nextWeek"),
-            nutrition=report_data.get("nutrition"),
-            questions=report_data.get("questions"),
-            recovery=report_data.get("recovery"),
-            stressManagement=report_data.get("stressManagement"),
-            supportWork=report_data.get("supportWork"),
-            trainingWeek=report_data.get("trainingWeek"),
-            userId=report_data.get("userId", "")
-        )
\ No newline at end of file
+        return validate_python(WorkoutPlan, workout_data or {})
@@ -0,0 +1,246 @@
+from typing import Dict, Any, List, Optional, Callable, Iterable, TypeVar
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from datetime import date as Date, timedelta
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from check_time_plans.data_ingestion.views import to_plain
+from check_time_plans.data_ingestion.shared_state import state_dir, write_json_atomic
+from first_time_plans.deadline import DeadlineExceeded
+from startup.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_CACHE_DIR = state_dir("CHUNK_CACHE_DIR", "chunks")
+
+T = TypeVar("T")
+
+def week_start(date: str) -> Optional[str]:
+    """Monday of the ISO week containing an ISO date or datetime string (None if unparseable)."""
+    try:
+        day = Date.fromisoformat((date or "")[:10])
+    except ValueError:
+        return None
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+def partition_by_week(items: Iterable[T], get_date: Callable[[T], str]) -> Dict[str, List[T]]:
+    """
+    Group items by the Monday of their week, in chronological order.
+
+    Items without a parseable date are left out.
+
+    Args:
+        items: Items to partition
+        get_date: Returns an item's date
+
+    Returns:
+        Week start -> items of that week
+    """
+    weeks: Dict[str, List[T]] = {}
+    for item in items:
+        key = week_start(get_date(item))
+        if key is not None:
+            weeks.setdefault(key, []).append(item)
+    return dict(sorted(weeks.items()))
+
+def chunk_key(namespace: str, payload: Any) -> str:
+    """Content hash of a chunk; identical input always maps to the same cached result."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=to_plain)
+    return hashlib.sha256(f"{namespace}:{encoded}".encode("utf-8")).hexdigest()
+
+class ChunkCache:
+    """
+    Content-addressed cache of chunk results, stored as JSON under ``<root>/<namespace>/<key>.json``.
+
+    Keys are hashes of the chunk input, so a chunk whose data did not change is never sent
+    to the LLM again, while any edit to it produces a new key. Since edited chunks leave their
+    old results behind, the in-memory copy is a bounded LRU of `max_entries` results, and a
+    result on disk expires `ttl` seconds after it was last used (see purge()).
+    """
+
+    def __init__(self, root_dir: str = CHUNK_CACHE_DIR, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Initialize the ChunkCache.
+
+        Args:
+            root_dir: Directory holding one sub-directory per namespace
+            max_entries: Results kept in memory (default: CHUNK_CACHE_MAX_ENTRIES)
+            ttl: Seconds an unused result stays on disk (default: CHUNK_CACHE_TTL)
+        """
+        settings = get_settings()
+        self.root_dir = root_dir
+        self.max_entries = max_entries if max_entries is not None else settings.chunk_cache_max_entries
+        self.ttl = ttl if ttl is not None else settings.chunk_cache_ttl
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result, or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        path = self._path(namespace, key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            # Used again: restart its time to live
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading cached chunk {key}: {str(e)}")
+            return None
+        self._remember(key, value)
+        return value
+
+    def put(self, namespace: str, key: str, value: Dict[str, Any]) -> None:
+        """Atomically store a result."""
+        path = self._path(namespace, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_json_atomic(path, json.dumps(value))
+        self._remember(key, value)
+
+    def purge(self) -> int:
+        """
+        Delete results on disk that were not used for `ttl` seconds.
+
+        Returns:
+            Number of results deleted
+        """
+        removed = 0
+        if not os.path.isdir(self.root_dir):
+            return removed
+        cutoff = time.time() - self.ttl
+        for namespace in os.listdir(self.root_dir):
+            directory = os.path.join(self.root_dir, namespace)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                try:
+                    if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        """Keep a result in memory, dropping the least recently used one beyond max_entries."""
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _path(self, namespace: str, key: str) -> str:
+        """Path of a cached result."""
+        return os.path.join(self.root_dir, namespace, f"{key}.json")
+
+class MapReduceRunner:
+    """
+    Runs per-chunk LLM calls concurrently with bounded parallelism and caches their results.
+
+    BaseLLM calls are blocking, so chunks are mapped on a thread pool of at most
+    ``max_workers`` threads. Cache hits skip the call entirely; failed chunks are logged,
+    left out of the result and not cached.
+    """
+
+    def __init__(self, cache: Optional[ChunkCache] = None, max_workers: int = 4):
+        """
+        Initialize the MapReduceRunner.
+
+        Args:
+            cache: Chunk result cache. If None, uses a ChunkCache under CHUNK_CACHE_DIR.
+            max_workers: Maximum number of concurrent LLM calls
+        """
+        self.cache = cache or ChunkCache()
+        self.max_workers = max_workers
+
+    def map(
+        self,
+        namespace: str,
+        chunks: Dict[str, Any],
+        map_fn: Callable[[str, Any], Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Apply map_fn to every chunk, reusing cached results.
+
+        Args:
+            namespace: Cache namespace (identifies the prompt and schema)
+            chunks: Chunk label -> JSON-serializable chunk input
+            map_fn: Called with (label, chunk) for chunks that are not cached
+
+        Returns:
+            Chunk label -> result, in the order of chunks
+        """
+        keys = {label: chunk_key(namespace, chunk) for label, chunk in chunks.items()}
+        results: Dict[str, Dict[str, Any]] = {}
+        missing = []
+        for label in chunks:
+            cached = self.cache.get(namespace, keys[label])
+            if cached is not None:
+                results[label] = cached
+            else:
+                missing.append(label)
+
+        if missing:
+            logger.info(f"{namespace}: {len(chunks) - len(missing)} cached chunk(s), mapping {len(missing)}")
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(missing)))) as pool:
+                # Each call runs in a copy of the caller's context so the request deadline reaches the pool threads
+                futures = {
+                    label: pool.submit(contextvars.copy_context().run, map_fn, label, chunks[label])
+                    for label in missing
+                }
+                for label, future in futures.items():
+                    try:
+                        result = future.result()
+                    except DeadlineExceeded:
+                        # Cancelled or out of time: chunks that have not started are dropped
+                        for pending in futures.values():
+                            pending.cancel()
+                        raise
+                    except Exception as e:
+                        logger.error(f"{namespace}: chunk {label} failed: {str(e)}")
+                        continue
+                    if result:
+                        self.cache.put(namespace, keys[label], result)
+                        results[label] = result
+
+        return {label: results[label] for label in chunks if label in results}
+
+    def reduce(
+        self,
+        namespace: str,
+        partials: Dict[str, Dict[str, Any]],
+        context: Any,
+        reduce_fn: Callable[[Dict[str, Dict[str, Any]]], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Merge partial results, reusing the cached merge when neither the partials nor the context changed.
+
+        Args:
+            namespace: Cache namespace of the reduce step
+            partials: Chunk label -> partial result
+            context: Any other input of the reduce prompt (part of the cache key)
+            reduce_fn: Called with the partials on a cache miss
+
+        Returns:
+            Merged result
+        """
+        key = chunk_key(namespace, {"partials": partials, "context": context})
+        cached = self.cache.get(namespace, key)
+        if cached is not None:
+            return cached
+        result = reduce_fn(partials)
+        if result:
+            self.cache.put(namespace, key, result)
+        return result
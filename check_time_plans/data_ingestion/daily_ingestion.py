@@ -0,0 +1,324 @@
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from check_time_plans.data_ingestion.check_in_ingestion import (
+    DailyReport, ExerciseLog, LenientDailyReport, LenientExerciseLog, LenientExerciseEntry
+)
+import os
+import json
+import logging
+import threading
+from check_time_plans.data_ingestion.shared_state import state_dir, safe_id, file_version, write_json_atomic, process_lock
+
+logger = logging.getLogger(__name__)
+
+CHECKIN_STATE_DIR = state_dir("CHECKIN_STATE_DIR", "check_ins")
+
+class MacroTotals(BaseModel):
+    """Running macro totals for the week."""
+    proteins: int = 0
+    carbs: int = 0
+    fats: int = 0
+
+class ExerciseBest(BaseModel):
+    """Best estimated one-rep max seen for an exercise this week."""
+    best_e1rm: float
+    best_weight: float
+    date: str
+    first_weight: float
+    last_weight: float
+    entries: int = 0
+
+class RunningAggregates(BaseModel):
+    """Incrementally maintained weekly aggregates over daily reports and exercise entries."""
+    days_reported: int = 0
+    weight_ewma: Optional[float] = None
+    weight_first: Optional[float] = None
+    weight_last: Optional[float] = None
+    macro_totals: MacroTotals = Field(default_factory=MacroTotals)
+    steps_total: int = 0
+    cardio_total: int = 0
+    sleep_length_total: float = 0.0
+    sleep_nights: int = 0
+    session_dates: List[str] = Field(default_factory=list)
+    e1rm_bests: Dict[str, ExerciseBest] = Field(default_factory=dict)
+
+    def nutrition_summary(self, targets: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Summarize average macro intake against the meal plan targets.
+
+        Args:
+            targets: The meal plan's totalDailyNutrition
+
+        Returns:
+            Compact nutrition analysis for the decision nodes
+        """
+        days = max(self.days_reported, 1)
+        averages = {
+            "protein": self.macro_totals.proteins / days,
+            "carbohydrates": self.macro_totals.carbs / days,
+            "fat": self.macro_totals.fats / days,
+        }
+        adherence = {
+            macro: round(average / targets[macro] * 100, 1) if targets.get(macro) else None
+            for macro, average in averages.items()
+        }
+        return {
+            "days_reported": self.days_reported,
+            "average_daily_macros": {macro: round(value, 1) for macro, value in averages.items()},
+            "macro_adherence_percentage": adherence,
+            "average_calories": round(averages["protein"] * 4 + averages["carbohydrates"] * 4 + averages["fat"] * 9),
+            "target_calories": targets.get("calories")
+        }
+
+    def training_summary(self, planned_sessions: int) -> Dict[str, Any]:
+        """
+        Summarize logged sessions and lift progression.
+
+        Args:
+            planned_sessions: Number of non-rest days in the workout plan
+
+        Returns:
+            Compact training analysis for the decision nodes
+        """
+        sessions = len(self.session_dates)
+        progressing = [
+            name for name, best in self.e1rm_bests.items()
+            if best.entries > 1 and best.last_weight > best.first_weight
+        ]
+        stalled = [
+            name for name, best in self.e1rm_bests.items()
+            if best.entries > 1 and best.last_weight <= best.first_weight
+        ]
+        return {
+            "sessions_logged": sessions,
+            "sessions_planned": planned_sessions,
+            "session_completion_percentage": round(min(sessions / planned_sessions * 100, 100.0), 1) if planned_sessions else None,
+            "e1rm_bests": {name: round(best.best_e1rm, 1) for name, best in self.e1rm_bests.items()},
+            "progressing_lifts": progressing,
+            "stalled_lifts": stalled
+        }
+
+class DailyCheckInState(BaseModel):
+    """Everything received for a user since their last weekly check-in."""
+    userId: str
+    # Lenient, so that state saved before the posted models required their fields still loads
+    dailyReports: List[LenientDailyReport] = Field(default_factory=list)
+    exerciseLogs: List[LenientExerciseLog] = Field(default_factory=list)
+    aggregates: RunningAggregates = Field(default_factory=RunningAggregates)
+
+def estimate_e1rm(weight: float, reps: Optional[int]) -> float:
+    """Epley estimated one-rep max; falls back to the load when reps are unknown."""
+    if not reps or reps <= 1:
+        return weight
+    return weight * (1 + reps / 30)
+
+def _entry_key(entry: LenientExerciseEntry) -> Tuple[str, float, Optional[int], Optional[int]]:
+    """What makes an exercise entry a re-send of an earlier one."""
+    return (entry.date, entry.weight, entry.reps, entry.sets)
+
+class DailyCheckInStore:
+    """
+    Stores daily reports and exercise entries as they arrive and keeps weekly aggregates up to date.
+
+    Each append validates with the check-in models, updates the running aggregates in O(1),
+    and persists the user's state as JSON under CHECKIN_STATE_DIR so that the weekly check-in
+    can start from precomputed aggregates instead of a whole-week batch payload.
+    """
+
+    def __init__(self, state_dir: str = CHECKIN_STATE_DIR, weight_alpha: float = 0.3):
+        """
+        Initialize the DailyCheckInStore.
+
+        Args:
+            state_dir: Directory for per-user state files
+            weight_alpha: Smoothing factor of the weight EWMA
+        """
+        self.state_dir = state_dir
+        self.weight_alpha = weight_alpha
+        self._states: Dict[str, Tuple[Any, DailyCheckInState]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def get_state(self, user_id: str) -> DailyCheckInState:
+        """Return the user's current state, loading it from disk if needed."""
+        with self._lock:
+            return self._load(user_id)
+
+    def append_daily_report(self, user_id: str, report: DailyReport) -> RunningAggregates:
+        """
+        Store a daily report and update the running aggregates.
+
+        A report for a date that was already received replaces the earlier one, in which
+        case the aggregates are rebuilt from the stored reports.
+
+        Args:
+            user_id: The client's id
+            report: Validated daily report
+
+        Returns:
+            The updated aggregates
+        """
+        with self._lock, process_lock(self._path(user_id)):
+            state = self._load(user_id)
+            if any(existing.date == report.date for existing in state.dailyReports):
+                state.dailyReports = [existing for existing in state.dailyReports if existing.date != report.date]
+                state.dailyReports.append(report)
+                state.dailyReports.sort(key=lambda r: (r.date, r.day))
+                self._rebuild(state)
+            else:
+                state.dailyReports.append(report)
+                self._add_report(state.aggregates, report)
+            self._save(state)
+            return state.aggregates
+
+    def append_exercise_log(self, user_id: str, log: ExerciseLog) -> RunningAggregates:
+        """
+        Store new entries for an exercise and update session counts and e1RM bests.
+
+        An entry matching one already received (same date, weight, reps and sets, as when
+        a POST is retried) replaces it instead of being counted twice, in which case the
+        aggregates are rebuilt from the stored entries.
+
+        Args:
+            user_id: The client's id
+            log: Validated exercise log holding one or more new entries
+
+        Returns:
+            The updated aggregates
+        """
+        with self._lock, process_lock(self._path(user_id)):
+            state = self._load(user_id)
+            existing = next((item for item in state.exerciseLogs if item.name == log.name), None)
+            resent = {_entry_key(entry) for entry in log.entries}
+            if existing is not None and any(_entry_key(entry) in resent for entry in existing.entries):
+                existing.entries = [entry for entry in existing.entries if _entry_key(entry) not in resent]
+                existing.entries.extend(log.entries)
+                existing.entries.sort(key=lambda entry: entry.date)
+                self._rebuild(state)
+            else:
+                if existing is None:
+                    state.exerciseLogs.append(LenientExerciseLog(name=log.name, entries=list(log.entries)))
+                else:
+                    existing.entries.extend(log.entries)
+                for entry in log.entries:
+                    self._add_entry(state.aggregates, log.name, entry)
+            self._save(state)
+            return state.aggregates
+
+    def close_week(self, user_id: str, snapshot: DailyCheckInState) -> DailyCheckInState:
+        """
+        Remove the reports and entries a weekly check-in was built from.
+
+        Anything appended after the snapshot was taken (including a re-sent report that
+        replaced a snapshotted one) stays in the store for the next week.
+
+        Args:
+            user_id: The client's id
+            snapshot: The state the weekly check-in was processed from
+
+        Returns:
+            The state left for the new week
+        """
+        with self._lock, process_lock(self._path(user_id)):
+            state = self._load(user_id).model_copy(deep=True)
+            # Compared by value: the stored copy may have been reloaded as the lenient models
+            processed_reports = [report.model_dump() for report in snapshot.dailyReports]
+            state.dailyReports = [
+                report for report in state.dailyReports if report.model_dump() not in processed_reports
+            ]
+            processed = {log.name: [entry.model_dump() for entry in log.entries] for log in snapshot.exerciseLogs}
+            logs = []
+            for log in state.exerciseLogs:
+                done = processed.get(log.name, [])
+                entries = []
+                for entry in log.entries:
+                    # Entries are matched as a multiset: identical sets logged twice count twice
+                    if entry.model_dump() in done:
+                        done.remove(entry.model_dump())
+                    else:
+                        entries.append(entry)
+                if entries:
+                    logs.append(LenientExerciseLog(name=log.name, entries=entries))
+            state.exerciseLogs = logs
+            self._rebuild(state)
+            self._save(state)
+            return state
+
+    def _add_report(self, aggregates: RunningAggregates, report: LenientDailyReport) -> None:
+        """Fold one daily report into the aggregates."""
+        aggregates.days_reported += 1
+        if report.weight > 0:
+            if aggregates.weight_ewma is None:
+                aggregates.weight_ewma = report.weight
+                aggregates.weight_first = report.weight
+            else:
+                aggregates.weight_ewma += self.weight_alpha * (report.weight - aggregates.weight_ewma)
+            aggregates.weight_last = report.weight
+        aggregates.macro_totals.proteins += report.macros.proteins
+        aggregates.macro_totals.carbs += report.macros.carbs
+        aggregates.macro_totals.fats += report.macros.fats
+        aggregates.steps_total += report.steps or 0
+        aggregates.cardio_total += report.cardio or 0
+        if report.sleep and report.sleep.length:
+            aggregates.sleep_length_total += report.sleep.length
+            aggregates.sleep_nights += 1
+
+    def _add_entry(self, aggregates: RunningAggregates, name: str, entry: LenientExerciseEntry) -> None:
+        """Fold one exercise entry into the aggregates."""
+        session_date = entry.date[:10]
+        if session_date and session_date not in aggregates.session_dates:
+            aggregates.session_dates.append(session_date)
+
+        e1rm = estimate_e1rm(entry.weight, entry.reps)
+        best = aggregates.e1rm_bests.get(name)
+        if best is None:
+            aggregates.e1rm_bests[name] = ExerciseBest(
+                best_e1rm=e1rm,
+                best_weight=entry.weight,
+                date=entry.date,
+                first_weight=entry.weight,
+                last_weight=entry.weight,
+                entries=1
+            )
+            return
+
+        best.entries += 1
+        best.last_weight = entry.weight
+        best.best_weight = max(best.best_weight, entry.weight)
+        if e1rm > best.best_e1rm:
+            best.best_e1rm = e1rm
+            best.date = entry.date
+
+    def _rebuild(self, state: DailyCheckInState) -> None:
+        """Recompute the aggregates from the stored reports and entries."""
+        state.aggregates = RunningAggregates()
+        for report in state.dailyReports:
+            self._add_report(state.aggregates, report)
+        for log in state.exerciseLogs:
+            for entry in log.entries:
+                self._add_entry(state.aggregates, log.name, entry)
+
+    def _path(self, user_id: str) -> str:
+        """Path of the user's state file."""
+        return os.path.join(self.state_dir, f"{safe_id(user_id)}.json")
+
+    def _load(self, user_id: str) -> DailyCheckInState:
+        """Load the user's state from memory, or from disk if another worker saved a newer version (caller holds the lock)."""
+        path = self._path(user_id)
+        version = file_version(path)
+        cached = self._states.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        if version is not None:
+            with open(path, "r", encoding="utf-8") as f:
+                state = DailyCheckInState(**json.load(f))
+        else:
+            state = DailyCheckInState(userId=user_id)
+        self._states[user_id] = (version, state)
+        return state
+
+    def _save(self, state: DailyCheckInState) -> None:
+        """Atomically persist the user's state (caller holds the locks)."""
+        path = self._path(state.userId)
+        write_json_atomic(path, json.dumps(state.model_dump()))
+        self._states[state.userId] = (file_version(path), state)
@@ -0,0 +1,176 @@
+from typing import Dict, Any, Optional, Tuple
+from pydantic import BaseModel
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from check_time_plans.data_ingestion.shared_state import state_dir, write_json_atomic, process_lock, remove_locked
+from startup.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_STATE_DIR = state_dir("IDEMPOTENCY_STATE_DIR", "idempotency")
+
+# Header a client sets to make retries of a POST safe
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a request with a different body."""
+
+class IdempotencyRecord(BaseModel):
+    """State of one idempotency key: running, or finished with the stored response."""
+    request_hash: str
+    status: str = "in_progress"
+    owner_pid: int
+    started_at: float
+    completed_at: Optional[float] = None
+    response: Optional[Any] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status == "done"
+
+def request_hash(path: str, body: bytes) -> str:
+    """
+    Fingerprint of a request: its path and body, with JSON bodies in canonical form so that
+    a retry that serializes the same payload differently still matches.
+    """
+    try:
+        canonical = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        canonical = body.decode("utf-8", errors="replace")
+    return hashlib.sha256(f"{path}\n{canonical}".encode("utf-8")).hexdigest()
+
+class IdempotencyStore:
+    """
+    Idempotency keys and the responses of the requests that used them, one JSON file per key.
+
+    A key is claimed with an in-progress marker when its first request starts and holds the
+    stored response once that request succeeds; it is released again if the request fails, so
+    a retry runs it anew. Files live under IDEMPOTENCY_STATE_DIR, so every worker process sees
+    the same keys. Responses are kept for `ttl` seconds; an in-progress marker older than the
+    maximum request budget belongs to a run that died and may be taken over.
+    """
+
+    def __init__(self, state_dir: str = IDEMPOTENCY_STATE_DIR, ttl: Optional[float] = None):
+        """
+        Initialize the IdempotencyStore.
+
+        Args:
+            state_dir: Directory for per-key files
+            ttl: Seconds a stored response is replayed (default: IDEMPOTENCY_TTL)
+        """
+        settings = get_settings()
+        self.state_dir = state_dir
+        self.ttl = ttl if ttl is not None else settings.idempotency_ttl
+        # A run cannot legitimately outlive the largest request budget
+        self.stale_after = settings.max_request_timeout + 60
+        self._lock = threading.Lock()
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def begin(self, scope: str, key: str, fingerprint: str) -> Tuple[bool, IdempotencyRecord]:
+        """
+        Claim a key for a request, unless a request with this key is running or has finished.
+
+        Args:
+            scope: Endpoint path (keys are scoped per endpoint)
+            key: Client-supplied idempotency key
+            fingerprint: request_hash() of the request
+
+        Returns:
+            (claimed, record): claimed is True if the caller now owns the key and must run the
+            request, then call complete() or release(); otherwise record is the running or
+            finished request
+
+        Raises:
+            IdempotencyKeyReused: The key belongs to a request with a different body
+        """
+        path = self._path(scope, key)
+        with self._lock, process_lock(path):
+            record = self._load(path)
+            if record is not None and not self._expired(record):
+                if record.request_hash != fingerprint:
+                    raise IdempotencyKeyReused(f"{IDEMPOTENCY_HEADER} was already used with a different request")
+                return False, record
+            if record is not None and not record.done:
+                logger.warning(f"Taking over stale idempotency key for {scope} (owner {record.owner_pid})")
+            record = IdempotencyRecord(request_hash=fingerprint, owner_pid=os.getpid(), started_at=time.time())
+            self._save(path, record)
+            return True, record
+
+    def get(self, scope: str, key: str) -> Optional[IdempotencyRecord]:
+        """The current record of a key, or None if it is unused, released or expired."""
+        record = self._load(self._path(scope, key))
+        if record is None or self._expired(record):
+            return None
+        return record
+
+    def complete(self, scope: str, key: str, response: Any) -> None:
+        """Store the response of a claimed key; later requests with the key get it replayed."""
+        path = self._path(scope, key)
+        with self._lock, process_lock(path):
+            record = self._load(path)
+            if record is None:
+                return
+            record.status = "done"
+            record.completed_at = time.time()
+            record.response = response
+            self._save(path, record)
+
+    def release(self, scope: str, key: str) -> None:
+        """Drop the claim of a failed request, so that a retry runs it again."""
+        path = self._path(scope, key)
+        with self._lock, process_lock(path):
+            record = self._load(path)
+            if record is not None and not record.done:
+                remove_locked(path)
+
+    def purge(self) -> int:
+        """
+        Delete expired records, and lock files whose record is gone.
+
+        Returns:
+            Number of records deleted
+        """
+        removed = 0
+        names = {name[:-len(".lock")] if name.endswith(".json.lock") else name for name in os.listdir(self.state_dir)}
+        for name in sorted(names):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.state_dir, name)
+            with self._lock, process_lock(path):
+                if not os.path.exists(path):
+                    remove_locked(path)
+                    continue
+                record = self._load(path)
+                if record is not None and self._expired(record):
+                    remove_locked(path)
+                    removed += 1
+        return removed
+
+    def _expired(self, record: IdempotencyRecord) -> bool:
+        """Finished records expire after the ttl; running ones once their run must have died."""
+        if record.done:
+            return time.time() - record.completed_at > self.ttl
+        return time.time() - record.started_at > self.stale_after
+
+    def _path(self, scope: str, key: str) -> str:
+        """Path of a key's file; keys are hashed, so any client string is a safe file name."""
+        digest = hashlib.sha256(f"{scope}\n{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self.state_dir, f"{digest}.json")
+
+    def _load(self, path: str) -> Optional[IdempotencyRecord]:
+        """Read a record, treating a missing or unreadable file as no record."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return IdempotencyRecord.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"Ignoring unreadable idempotency record {path}: {str(e)}")
+            return None
+
+    def _save(self, path: str, record: IdempotencyRecord) -> None:
+        write_json_atomic(path, record.model_dump_json())
@@ -1,12 +1,13 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterable, Union, Sequence
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from check_time_plans.analytics.meal_analytics import MealAdherenceEngine, MealAdherenceAnalytics
+from check_time_plans.data_ingestion.chunking import MapReduceRunner, partition_by_week
+from check_time_plans.data_ingestion.views import as_view
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class MealComplianceMetrics(BaseModel):
     """Metrics for measuring meal plan compliance."""
@@ -40,25 +41,59 @@ class MealPlanAdherenceAnalysis(BaseModel):
     practical_challenges: List[str] = Field(..., description="Practical challenges affecting meal plan adherence")
     successful_strategies: List[str] = Field(..., description="Strategies that have improved adherence")
 
+class MealAdherenceNarrative(BaseModel):
+    """Narrative part of the adherence analysis; macro and calorie metrics are computed locally."""
+    meal_timing_adherence: float = Field(..., description="Estimated percentage adherence to scheduled meal times, from the notes")
+    meal_specific_adherence: List[MealAdherenceItem] = Field(..., description="Adherence analysis for each meal")
+    most_challenging_meals: List[str] = Field(..., description="Meals with lowest adherence rates")
+    most_consistent_meals: List[str] = Field(..., description="Meals with highest adherence rates")
+    adherence_trends: str = Field(..., description="Observed trends in meal plan adherence over time")
+    hunger_satiety_observations: str = Field(..., description="Observations about hunger and satiety levels")
+    practical_challenges: List[str] = Field(..., description="Practical challenges affecting meal plan adherence")
+    successful_strategies: List[str] = Field(..., description="Strategies that have improved adherence")
+
 class MealAdherenceExtractor:
     """
     Extracts and analyzes client meal plan adherence data.
     
     This class processes meal plan data alongside daily reports to evaluate how well
     a client has adhered to their prescribed nutrition plan, identifying patterns,
-    challenges, and successful strategies.
+    challenges, and successful strategies. Compliance metrics and the training vs rest
+    split are computed by MealAdherenceEngine; the LLM only adds the narrative.
+    
+    Report histories longer than ``chunk_weeks`` weeks are processed map-reduce style: the
+    reports are partitioned by week, each week gets its own cached narrative call, and a
+    final call merges the partial narratives.
     """
 
-    def __init__(self, llm_client: Optional[Any] = None):
+    def __init__(
+        self,
+        llm_client: Optional[Any] = None,
+        engine: Optional[MealAdherenceEngine] = None,
+        runner: Optional[MapReduceRunner] = None,
+        chunk_weeks: int = 4
+    ):
         """
         Initialize the MealAdherenceExtractor with an optional custom LLM client.
         
         Args:
             llm_client: Custom LLM client implementation. If None, uses the default BaseLLM.
+            engine: Adherence scoring engine. If None, uses the default MealAdherenceEngine.
+            runner: Map-reduce runner for long histories. If None, uses the default MapReduceRunner.
+            chunk_weeks: Report histories spanning more weeks than this are chunked
         """
         self.llm_client = llm_client or BaseLLM()
+        self.engine = engine or MealAdherenceEngine()
+        self.runner = runner or MapReduceRunner()
+        self.chunk_weeks = chunk_weeks
     
-    def extract_meal_adherence(self, meal_plan_data: Dict[str, Any], daily_reports: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    def extract_meal_adherence(
+        self,
+        meal_plan_data: Union[Dict[str, Any], BaseModel],
+        daily_reports: Optional[Sequence[Union[Dict[str, Any], BaseModel]]] = None,
+        training_dates: Optional[Iterable[str]] = None,
+        include_narrative: bool = True
+    ) -> Dict[str, Any]:
         """
         Process meal plan data and daily reports to analyze adherence.
         
@@ -66,18 +101,34 @@ class MealAdherenceExtractor:
         by comparing actual reported intake from daily reports against the prescribed plan.
         
         Args:
-            meal_plan_data: The client's prescribed meal plan
-            daily_reports: Daily nutrition and meal timing reports from the client
+            meal_plan_data: The client's prescribed meal plan (dict or validated MealPlan)
+            daily_reports: Daily nutrition and meal timing reports from the client (dicts or DailyReport models)
+            training_dates: Dates with a logged training session, used for the training vs rest split
+            include_narrative: Whether to ask the LLM for the narrative fields
             
         Returns:
             A dictionary containing structured meal adherence analysis
         """
         try:
-            # Process using the schema-based approach
-            schema_result = self._analyze_meal_adherence_schema(meal_plan_data, daily_reports)
+            # Validated models are read through views instead of .dict() copies
+            meal_plan_data = as_view(meal_plan_data)
+            daily_reports = as_view(daily_reports or [])
+            
+            # Score adherence locally
+            analytics = self.engine.compute(meal_plan_data, daily_reports, training_dates)
+            
+            # Ask the LLM for the narrative only, chunked by week for long histories
+            weeks = partition_by_week(daily_reports, lambda report: report.get("date", ""))
+            if not include_narrative:
+                narrative = {}
+            elif len(weeks) > self.chunk_weeks:
+                narrative = self._map_reduce_narrative(meal_plan_data, weeks, training_dates, analytics)
+            else:
+                narrative = self._analyze_meal_adherence_schema(meal_plan_data, daily_reports, analytics)
             
             return {
-                "meal_adherence_analysis": schema_result
+                "meal_adherence_analysis": self._merge_analysis(analytics, narrative),
+                "computed_metrics": analytics.model_dump()
             }
             
         except Exception as e:
@@ -115,31 +166,30 @@ class MealAdherenceExtractor:
     def _analyze_meal_adherence_schema(
         self,
         meal_plan_data: Dict[str, Any],
-        daily_reports: Optional[List[Dict[str, Any]]] = None
+        daily_reports: List[Dict[str, Any]],
+        analytics: MealAdherenceAnalytics
     ) -> Dict[str, Any]:
         """
-        Analyze meal adherence using Pydantic schema validation.
+        Write the narrative part of the meal adherence analysis using Pydantic schema validation.
         
         Args:
             meal_plan_data: The client's prescribed meal plan
             daily_reports: Daily nutrition and meal timing reports from the client
+            analytics: Adherence metrics computed by the engine
             
         Returns:
-            Structured meal adherence analysis as a Pydantic model
+            Narrative fields of the meal adherence analysis
         """
-        # Extract relevant data for prompt construction
-        daily_reports = daily_reports or []
-        
         # Extract meal plan details
         plan_name = meal_plan_data.get("name", "Unnamed Plan")
         training_day_meals = meal_plan_data.get("trainingDayMeals", [])
         non_training_day_meals = meal_plan_data.get("nonTrainingDayMeals", [])
         total_nutrition = meal_plan_data.get("totalDailyNutrition", {})
         
-        # Construct detailed prompt with comprehensive client data
+        # Numbers are precomputed; only the qualitative daily fields are sent
         prompt = (
-            "Analyze this client's meal plan adherence based on their prescribed meal plan and daily reports. "
-            "Evaluate macro compliance, meal timing, food choices, and identify patterns of adherence.\\n\\n"
+            "Analyze this client's meal plan adherence based on their prescribed meal plan, the computed "
+            "compliance metrics and their daily notes. Evaluate meal timing, food choices, and identify patterns of adherence.\\n\\n"
             
             f"MEAL PLAN SUMMARY:\\n"
             f"- Plan name: {plan_name}\\n"
@@ -151,13 +201,15 @@ class MealAdherenceExtractor:
             f"PRESCRIBED MEALS (TRAINING DAYS):\\n{self._format_meals(training_day_meals)}\\n\\n"
             f"PRESCRIBED MEALS (NON-TRAINING DAYS):\\n{self._format_meals(non_training_day_meals)}\\n\\n"
             
-            f"DAILY REPORTS:\\n{self._format_daily_reports(daily_reports)}\\n\\n"
+            f"COMPUTED COMPLIANCE METRICS:\\n{self.engine.format_summary(analytics)}\\n\\n"
+            
+            f"DAILY NOTES:\\n{self._format_daily_notes(daily_reports)}\\n\\n"
             
-            "Your meal adherence analysis should include:\\n"
-            "1. Overall compliance metrics for macros and timing\\n"
-            "2. Specific adherence analysis for each prescribed meal\\n"
-            "3. Comparison between training and non-training days\\n"
-            "4. Identification of challenging and consistent meals\\n"
+            "The computed metrics are exact; do not recalculate them. Your meal adherence analysis should include:\\n"
+            "1. Specific adherence analysis for each prescribed meal\\n"
+            "2. An estimate of meal timing adherence\\n"
+            "3. Identification of challenging and consistent meals\\n"
+            "4. Adherence trends and hunger/satiety observations\\n"
             "5. Practical challenges affecting adherence\\n"
             "6. Successful strategies that have improved adherence\\n\\n"
             
@@ -165,9 +217,110 @@ class MealAdherenceExtractor:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=MealPlanAdherenceAnalysis)
+        result = self.llm_client.call_llm(prompt, system_message, schema=MealAdherenceNarrative, node=type(self).__name__)
         return result
     
+    def _map_reduce_narrative(
+        self,
+        meal_plan_data: Dict[str, Any],
+        weeks: Dict[str, List[Dict[str, Any]]],
+        training_dates: Optional[Iterable[str]],
+        analytics: MealAdherenceAnalytics
+    ) -> Dict[str, Any]:
+        """
+        Write the narrative for a long report history from per-week narratives.
+        
+        Args:
+            meal_plan_data: The client's prescribed meal plan
+            weeks: Week start -> daily reports of that week
+            training_dates: Dates with a logged training session
+            analytics: Adherence metrics computed over the whole history
+            
+        Returns:
+            Narrative fields of the meal adherence analysis
+        """
+        training_dates = {date[:10] for date in training_dates} if training_dates is not None else None
+        meals = (
+            f"PRESCRIBED MEALS (TRAINING DAYS):\\n{self._format_meals(meal_plan_data.get('trainingDayMeals', []))}\\n\\n"
+            f"PRESCRIBED MEALS (NON-TRAINING DAYS):\\n{self._format_meals(meal_plan_data.get('nonTrainingDayMeals', []))}\\n\\n"
+        )
+        # Each chunk only carries its own week's training dates so older chunks keep their cache key
+        chunks = {
+            week: {
+                "plan": meal_plan_data,
+                "reports": reports,
+                "training_dates": (
+                    sorted({report.get("date", "")[:10] for report in reports} & training_dates)
+                    if training_dates is not None else None
+                )
+            }
+            for week, reports in weeks.items()
+        }
+        
+        def map_chunk(week: str, chunk: Dict[str, Any]) -> Dict[str, Any]:
+            week_analytics = self.engine.compute(chunk["plan"], chunk["reports"], chunk["training_dates"])
+            prompt = (
+                f"Analyze one week (starting {week}) of this client's meal plan adherence. "
+                "Another step merges your analysis with the other weeks, so describe only what this week shows.\\n\\n"
+                
+                f"{meals}"
+                
+                f"COMPUTED COMPLIANCE METRICS FOR THIS WEEK:\\n{self.engine.format_summary(week_analytics)}\\n\\n"
+                
+                f"DAILY NOTES:\\n{self._format_daily_notes(chunk['reports'])}\\n\\n"
+                
+                "The computed metrics are exact; do not recalculate them. Cover each prescribed meal, meal timing, "
+                "hunger and satiety, practical challenges and successful strategies."
+            )
+            return self.llm_client.call_llm(prompt, self.get_system_message(), schema=MealAdherenceNarrative, node=type(self).__name__)
+        
+        partials = self.runner.map("meal_adherence_week", chunks, map_chunk)
+        summary = self.engine.format_summary(analytics)
+        
+        def reduce_partials(partials: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+            prompt = (
+                "Merge these weekly analyses of a client's meal plan adherence into a single analysis. "
+                "Combine each meal's assessments, weight recent weeks more heavily, and list each challenge "
+                "and strategy once. Meal timing adherence is the average across weeks.\\n\\n"
+                
+                f"COMPUTED COMPLIANCE METRICS FOR THE WHOLE HISTORY:\\n{summary}\\n\\n"
+                
+                f"WEEKLY ANALYSES:\\n{self._format_dict(partials)}\\n\\n"
+                
+                "The computed metrics are exact; do not recalculate them."
+            )
+            return self.llm_client.call_llm(prompt, self.get_system_message(), schema=MealAdherenceNarrative, node=type(self).__name__)
+        
+        return self.runner.reduce("meal_adherence_week_reduce", partials, summary, reduce_partials)
+    
+    def _merge_analysis(self, analytics: MealAdherenceAnalytics, narrative: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine computed metrics and the narrative into the MealPlanAdherenceAnalysis shape.
+        
+        Args:
+            analytics: Adherence metrics computed by the engine
+            narrative: Narrative fields from the LLM (empty when skipped)
+            
+        Returns:
+            Dictionary matching the MealPlanAdherenceAnalysis schema
+        """
+        narrative = dict(narrative)
+        compliance_metrics = MealComplianceMetrics(
+            **self.engine.to_compliance_metrics(analytics, narrative.pop("meal_timing_adherence", 0.0))
+        )
+        return {
+            "compliance_metrics": compliance_metrics.model_dump(),
+            "meal_specific_adherence": narrative.pop("meal_specific_adherence", []),
+            "training_vs_non_training_adherence": self.engine.describe_split(analytics),
+            "most_challenging_meals": narrative.pop("most_challenging_meals", []),
+            "most_consistent_meals": narrative.pop("most_consistent_meals", []),
+            "adherence_trends": narrative.pop("adherence_trends", None) or self.engine.describe_trend(analytics),
+            "hunger_satiety_observations": narrative.pop("hunger_satiety_observations", ""),
+            "practical_challenges": narrative.pop("practical_challenges", []),
+            "successful_strategies": narrative.pop("successful_strategies", []),
+            **narrative
+        }
+    
     def _format_meals(self, meals: List[Dict[str, Any]]) -> str:
         """
         Format meal data as a readable string for inclusion in prompts.
@@ -200,9 +353,9 @@ class MealAdherenceExtractor:
         
         return formatted
     
-    def _format_daily_reports(self, reports: List[Dict[str, Any]]) -> str:
+    def _format_daily_notes(self, reports: List[Dict[str, Any]]) -> str:
         """
-        Format daily report data as a readable string for inclusion in prompts.
+        Format the qualitative fields of the daily reports for inclusion in prompts.
         
         Args:
             reports: List of daily report dictionaries
@@ -210,31 +363,19 @@ class MealAdherenceExtractor:
         Returns:
             Formatted string representation
         """
-        if not reports:
-            return "No daily reports available."
-        
         formatted = ""
         for report in reports:
-            date = report.get("date", "Unknown date")
-            day = report.get("day", "")
-            formatted += f"  Day {day} ({date}):\\n"
-            
-            # Macro data
-            macros = report.get("macros", {})
-            formatted += f"    - Protein: {macros.get('proteins', 0)}g\\n"
-            formatted += f"    - Carbs: {macros.get('carbs', 0)}g\\n"
-            formatted += f"    - Fats: {macros.get('fats', 0)}g\\n"
-            
-            # Additional notes
-            notes = report.get("additionalNotes", "")
-            if notes:
-                formatted += f"    - Notes: {notes}\\n"
-            
-            appetite = report.get("appetite", "")
-            if appetite:
-                formatted += f"    - Appetite: {appetite}\\n"
+            fields = {
+                "Appetite": report.get("appetite", ""),
+                "Notes": report.get("additionalNotes", "")
+            }
+            fields = {name: value for name, value in fields.items() if value}
+            if not fields:
+                continue
+            formatted += f"  Day {report.get('day', '')} ({report.get('date', 'Unknown date')}): "
+            formatted += "; ".join(f"{name}: {value}" for name, value in fields.items()) + "\\n"
         
-        return formatted
+        return formatted or "No daily notes available."
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
         """
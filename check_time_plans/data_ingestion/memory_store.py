@@ -0,0 +1,332 @@
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from first_time_plans.call_llm_class import BaseLLM
+import os
+import re
+import json
+import logging
+import threading
+from check_time_plans.data_ingestion.shared_state import state_dir, safe_id, file_version, write_json_atomic, process_lock
+from datetime import date as Date
+
+logger = logging.getLogger(__name__)
+
+MEMORY_STATE_DIR = state_dir("MEMORY_STATE_DIR", "memory")
+
+GOAL_PATTERN = re.compile(r"^\s*(Goal|Goul)(One|Four|Twelve)\s*:\s*(.*)$", re.IGNORECASE | re.MULTILINE)
+
+class CheckInMetricsRow(BaseModel):
+    """Key numbers of one check-in; fields are empty when the check-in did not provide them."""
+    date: str
+    average_weight: Optional[float] = None
+    weekly_rate_percent: Optional[float] = Field(None, description="Weight change as % bodyweight per week")
+    calorie_adherence: Optional[float] = Field(None, description="Mean % of calorie target")
+    training_consistency: Optional[float] = Field(None, description="% of planned sessions completed")
+    volume_completion: Optional[float] = Field(None, description="% of prescribed sets completed")
+
+class CheckInGoals(BaseModel):
+    """Goals set by the latest check-in report."""
+    short_term: Optional[str] = Field(None, description="GoalOne (1 week)")
+    mid_term: Optional[str] = Field(None, description="GoalFour (4 weeks)")
+    long_term: Optional[str] = Field(None, description="GoalTwelve (12 weeks)")
+
+class LongTermMemory(BaseModel):
+    """Rolling per-user digest that replaces the initial report and raw history in check-in prompts."""
+    userId: str
+    baseline: str = Field("", description="Condensed initial analysis report")
+    goals: CheckInGoals = Field(default_factory=CheckInGoals)
+    metrics: List[CheckInMetricsRow] = Field(default_factory=list)
+    narrative: str = Field("", description="Capped running summary of past check-ins")
+    check_ins: int = 0
+
+def cap_words(text: str, max_words: int) -> str:
+    """Truncate text to at most max_words words."""
+    words = (text or "").split()
+    if len(words) <= max_words:
+        return " ".join(words)
+    return " ".join(words[:max_words]) + " ..."
+
+def parse_goals(report: str) -> CheckInGoals:
+    """Read the GoalOne/GoalFour/GoalTwelve block at the end of a check-in report."""
+    found = {}
+    for _, horizon, text in GOAL_PATTERN.findall(report or ""):
+        text = text.strip()
+        if text:
+            found[horizon.lower()] = text
+    return CheckInGoals(
+        short_term=found.get("one"),
+        mid_term=found.get("four"),
+        long_term=found.get("twelve")
+    )
+
+def build_metrics_row(
+    date: str,
+    average_weight: Optional[float] = None,
+    meal_metrics: Optional[Dict[str, Any]] = None,
+    training_metrics: Optional[Dict[str, Any]] = None,
+    report_metrics: Optional[Dict[str, Any]] = None
+) -> CheckInMetricsRow:
+    """
+    Build a metrics row from the extractors' computed metrics.
+
+    Args:
+        date: Check-in date
+        average_weight: Reported weekly average weight
+        meal_metrics: MealAdherenceAnalytics dump
+        training_metrics: TrainingAnalytics dump
+        report_metrics: ReportAnalytics dump
+
+    Returns:
+        Metrics row for the check-in
+    """
+    meal_metrics = meal_metrics or {}
+    training_metrics = training_metrics or {}
+    weight = (report_metrics or {}).get("weight") or {}
+    return CheckInMetricsRow(
+        date=(date or Date.today().isoformat())[:10],
+        average_weight=average_weight or weight.get("ewma_weight"),
+        weekly_rate_percent=weight.get("weekly_rate_percent"),
+        calorie_adherence=meal_metrics.get("calorie_adherence") if meal_metrics.get("days_reported") else None,
+        training_consistency=training_metrics.get("training_consistency"),
+        volume_completion=training_metrics.get("volume_completion_rate")
+    )
+
+def pre_screen_metrics_row(date: str, average_weight: Optional[float], pre_screen: Any) -> CheckInMetricsRow:
+    """
+    Build a metrics row from a no-change pre-screen result, for check-ins that skip the extractors.
+
+    Args:
+        date: Check-in date
+        average_weight: Reported weekly average weight
+        pre_screen: PreScreenResult of the check-in
+
+    Returns:
+        Metrics row for the check-in
+    """
+    return CheckInMetricsRow(
+        date=(date or Date.today().isoformat())[:10],
+        average_weight=average_weight or None,
+        weekly_rate_percent=pre_screen.value("weight_trend"),
+        calorie_adherence=pre_screen.calorie_adherence,
+        training_consistency=pre_screen.value("session_completion")
+    )
+
+class CheckInMemoryStore:
+    """
+    Keeps a compact long-term memory per user for check-in prompts.
+
+    The initial analysis report is condensed once into a capped baseline. After each check-in
+    the key metrics table gains a row (the oldest rows drop out past ``max_rows``), the goals are
+    re-read from the report, and the narrative is rewritten from the previous narrative plus the
+    new report under a word cap, so prompt size stays flat no matter how long the client stays.
+    State is persisted as JSON under MEMORY_STATE_DIR.
+    """
+
+    def __init__(
+        self,
+        state_dir: str = MEMORY_STATE_DIR,
+        llm_client: Optional[Any] = None,
+        max_rows: int = 12,
+        baseline_words: int = 200,
+        narrative_words: int = 250
+    ):
+        """
+        Initialize the CheckInMemoryStore.
+
+        Args:
+            state_dir: Directory for per-user memory files
+            llm_client: Custom LLM client implementation. If None, uses the default BaseLLM.
+            max_rows: Number of check-ins kept in the metrics table
+            baseline_words: Word cap of the condensed initial report
+            narrative_words: Word cap of the running narrative
+        """
+        self.state_dir = state_dir
+        self.llm_client = llm_client or BaseLLM()
+        self.max_rows = max_rows
+        self.baseline_words = baseline_words
+        self.narrative_words = narrative_words
+        self._memories: Dict[str, Tuple[Any, LongTermMemory]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def get_memory(self, user_id: str) -> LongTermMemory:
+        """Return the user's memory, loading it from disk if needed."""
+        with self._lock:
+            return self._load(user_id)
+
+    def digest(self, user_id: str, initial_report: str = "") -> str:
+        """
+        Render the user's memory for a prompt, condensing the initial report on first use.
+
+        Args:
+            user_id: The client's id
+            initial_report: The full initial analysis report (only read until a baseline exists)
+
+        Returns:
+            Compact text digest of the client's history
+        """
+        memory = self.get_memory(user_id)
+        if not memory.baseline and initial_report:
+            baseline = self._condense_baseline(initial_report)
+            with self._lock, process_lock(self._path(user_id)):
+                memory = self._load(user_id)
+                if not memory.baseline:
+                    memory.baseline = baseline
+                    self._save(memory)
+        return self.format_digest(memory)
+
+    def record_metrics(self, user_id: str, row: CheckInMetricsRow) -> LongTermMemory:
+        """
+        Add or replace the metrics row for a check-in date without touching the narrative.
+
+        Args:
+            user_id: The client's id
+            row: Key numbers of the check-in
+
+        Returns:
+            The updated memory
+        """
+        with self._lock, process_lock(self._path(user_id)):
+            memory = self._load(user_id)
+            self._merge_row(memory, row)
+            self._save(memory)
+            return memory
+
+    def update(self, user_id: str, report: str, row: Optional[CheckInMetricsRow] = None) -> LongTermMemory:
+        """
+        Fold a finished check-in into the user's memory.
+
+        Args:
+            user_id: The client's id
+            report: The check-in report returned to the client
+            row: Key numbers of the check-in, if available
+
+        Returns:
+            The updated memory
+        """
+        previous = self.get_memory(user_id).narrative
+        narrative = self._roll_narrative(previous, report)
+        goals = parse_goals(report)
+
+        with self._lock, process_lock(self._path(user_id)):
+            memory = self._load(user_id)
+            memory.narrative = narrative
+            memory.goals = CheckInGoals(
+                short_term=goals.short_term or memory.goals.short_term,
+                mid_term=goals.mid_term or memory.goals.mid_term,
+                long_term=goals.long_term or memory.goals.long_term
+            )
+            memory.check_ins += 1
+            if row is not None:
+                self._merge_row(memory, row)
+            self._save(memory)
+            return memory
+
+    def format_digest(self, memory: LongTermMemory) -> str:
+        """
+        Render a memory as prompt text.
+
+        Args:
+            memory: The user's memory
+
+        Returns:
+            Formatted digest
+        """
+        formatted = f"Check-ins completed: {memory.check_ins}\n"
+        formatted += f"Starting point: {memory.baseline or 'Not available'}\n"
+
+        goals = memory.goals
+        if goals.short_term or goals.mid_term or goals.long_term:
+            formatted += "Current goals:\n"
+            formatted += f"  1 week: {goals.short_term or 'n/a'}\n"
+            formatted += f"  4 weeks: {goals.mid_term or 'n/a'}\n"
+            formatted += f"  12 weeks: {goals.long_term or 'n/a'}\n"
+
+        if memory.metrics:
+            formatted += "Key metrics by check-in (date | avg weight | weight %/week | calorie adherence % | sessions % | sets %):\n"
+            for row in memory.metrics:
+                values = [
+                    row.average_weight, row.weekly_rate_percent, row.calorie_adherence,
+                    row.training_consistency, row.volume_completion
+                ]
+                formatted += "  " + " | ".join([row.date] + ["-" if v is None else f"{v:g}" for v in values]) + "\n"
+
+        formatted += f"History so far: {memory.narrative or 'First check-in.'}"
+        return formatted
+
+    def _condense_baseline(self, initial_report: str) -> str:
+        """Condense the initial analysis report once; falls back to truncation."""
+        prompt = (
+            f"Condense this client's initial analysis report into at most {self.baseline_words} words. "
+            "Keep starting body metrics, training background, constraints and the original goals; drop everything else.\n\n"
+            f"INITIAL REPORT:\n{initial_report}"
+        )
+        try:
+            summary = self.llm_client.call_llm(prompt, self._system_message(), node=type(self).__name__)
+        except Exception as e:
+            logger.error(f"Error condensing initial report: {str(e)}")
+            summary = ""
+        return cap_words(summary if isinstance(summary, str) and summary.strip() else initial_report, self.baseline_words)
+
+    def _roll_narrative(self, previous: str, report: str) -> str:
+        """Rewrite the narrative from the previous one and the new report; falls back to truncation."""
+        prompt = (
+            f"Update the running history of this client's coaching check-ins in at most {self.narrative_words} words. "
+            "Merge the previous history with the new check-in report, keep durable facts (trends, recurring issues, "
+            "plan changes and their effect) and drop week-specific detail that no longer matters.\n\n"
+            f"PREVIOUS HISTORY:\n{previous or 'None (first check-in).'}\n\n"
+            f"NEW CHECK-IN REPORT:\n{report}"
+        )
+        try:
+            narrative = self.llm_client.call_llm(prompt, self._system_message(), node=type(self).__name__)
+        except Exception as e:
+            logger.error(f"Error updating check-in narrative: {str(e)}")
+            narrative = ""
+        if not isinstance(narrative, str) or not narrative.strip():
+            narrative = f"{previous} {report}".strip()
+        return cap_words(narrative, self.narrative_words)
+
+    def _system_message(self) -> str:
+        """System message for the summarization calls."""
+        return (
+            "You maintain concise long-term notes about a fitness coaching client. "
+            "Write plain text only, factual and dense, with numbers where available."
+        )
+
+    def _merge_row(self, memory: LongTermMemory, row: CheckInMetricsRow) -> None:
+        """Insert a row, filling gaps of an existing row for the same date, and apply the cap."""
+        for i, existing in enumerate(memory.metrics):
+            if existing.date == row.date:
+                merged = existing.model_dump()
+                merged.update({k: v for k, v in row.model_dump().items() if v is not None})
+                memory.metrics[i] = CheckInMetricsRow(**merged)
+                break
+        else:
+            memory.metrics.append(row)
+        memory.metrics.sort(key=lambda r: r.date)
+        memory.metrics = memory.metrics[-self.max_rows:]
+
+    def _path(self, user_id: str) -> str:
+        """Path of the user's memory file."""
+        return os.path.join(self.state_dir, f"{safe_id(user_id)}.json")
+
+    def _load(self, user_id: str) -> LongTermMemory:
+        """Load the user's memory from memory, or from disk if another worker saved a newer version (caller holds the lock)."""
+        path = self._path(user_id)
+        version = file_version(path)
+        cached = self._memories.get(user_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        if version is not None:
+            with open(path, "r", encoding="utf-8") as f:
+                memory = LongTermMemory(**json.load(f))
+        else:
+            memory = LongTermMemory(userId=user_id)
+        self._memories[user_id] = (version, memory)
+        return memory
+
+    def _save(self, memory: LongTermMemory) -> None:
+        """Atomically persist the user's memory (caller holds the locks)."""
+        path = self._path(memory.userId)
+        write_json_atomic(path, json.dumps(memory.model_dump()))
+        self._memories[memory.userId] = (file_version(path), memory)
@@ -1,12 +1,17 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union, Sequence
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from check_time_plans.data_ingestion.timeseries_store import TimeSeriesStore
+from check_time_plans.analytics.report_analytics import ReportAnalyticsEngine, ReportAnalytics
+from check_time_plans.data_ingestion.views import as_view
+from first_time_plans.deadline import optional_step
 import logging
 import json
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
+
+# Budget (seconds) the narrative call needs; below it only the computed metrics are returned
+NARRATIVE_MIN_REMAINING = 30.0
 
 class ProgressMetrics(BaseModel):
     """Comprehensive metrics tracking client's progress and performance."""
@@ -27,27 +32,47 @@ class WeeklyProgressAnalysis(BaseModel):
     improvement_areas: List[str] = Field(..., description="Areas requiring focused attention")
     recovery_recommendations: List[str] = Field(..., description="Specific recovery and adjustment recommendations")
 
+class WeeklyProgressNarrative(BaseModel):
+    """Narrative part of the weekly analysis; the progress metrics are computed locally."""
+    activity_level_insights: str = Field(..., description="Detailed insights into activity levels")
+    nutrition_performance: str = Field(..., description="Overview of nutritional performance")
+    training_intensity_observations: str = Field(..., description="Observations about training intensity")
+    key_highlights: List[str] = Field(..., description="Most significant achievements or observations")
+    improvement_areas: List[str] = Field(..., description="Areas requiring focused attention")
+    recovery_recommendations: List[str] = Field(..., description="Specific recovery and adjustment recommendations")
+
 class ReportMetricExtractor:
     """
     Extracts and analyzes client progress metrics from weekly and daily reports.
     
     This class processes weekly summary and daily reports to provide a comprehensive
     view of the client's progress, performance, and areas of potential improvement.
+    Weight trend, sleep, readiness and activity metrics are computed deterministically
+    by ReportAnalyticsEngine; the LLM only writes the narrative fields.
     """
 
-    def __init__(self, llm_client: Optional[Any] = None):
+    def __init__(
+        self,
+        llm_client: Optional[Any] = None,
+        timeseries_store: Optional[TimeSeriesStore] = None,
+        analytics_engine: Optional[ReportAnalyticsEngine] = None
+    ):
         """
         Initialize the ReportMetricExtractor with an optional custom LLM client.
         
         Args:
             llm_client: Custom LLM client implementation. If None, uses the default BaseLLM.
+            timeseries_store: Columnar history store. If provided, long-term trends are added to the prompt.
+            analytics_engine: Deterministic metrics engine. If None, uses the default ReportAnalyticsEngine.
         """
         self.llm_client = llm_client or BaseLLM()
+        self.timeseries_store = timeseries_store
+        self.analytics_engine = analytics_engine or ReportAnalyticsEngine()
     
     def extract_report_metrics(
         self, 
-        week_report: Dict[str, Any], 
-        daily_reports: Optional[List[Dict[str, Any]]] = None
+        week_report: Union[Dict[str, Any], BaseModel], 
+        daily_reports: Optional[Sequence[Union[Dict[str, Any], BaseModel]]] = None
     ) -> Dict[str, Any]:
         """
         Process week report and daily reports to analyze progress metrics.
@@ -60,11 +85,29 @@ class ReportMetricExtractor:
             A dictionary containing structured progress analysis
         """
         try:
-            # Process using the schema-based approach
-            schema_result = self._analyze_report_metrics_schema(week_report, daily_reports)
+            # Validated models are read through views instead of .dict() copies
+            week_report = as_view(week_report)
+            daily_reports = as_view(daily_reports or [])
+            user_id = week_report.get('userId', 'Unknown')
+            
+            # Compute the quantitative metrics locally
+            analytics = self.analytics_engine.compute(daily_reports, rhr_baseline=self._rhr_baseline(user_id))
+            progress_metrics = ProgressMetrics(**self.analytics_engine.to_progress_metrics(analytics))
+            
+            # Ask the LLM for the narrative only; it is dropped when the request budget runs short
+            narrative = optional_step(
+                "report_narrative",
+                NARRATIVE_MIN_REMAINING,
+                lambda: self._analyze_report_metrics_schema(week_report, daily_reports, analytics),
+                {}
+            )
             
             return {
-                "weekly_progress_analysis": schema_result
+                "weekly_progress_analysis": {
+                    "progress_metrics": progress_metrics.model_dump(),
+                    **narrative
+                },
+                "computed_metrics": analytics.model_dump()
             }
             
         except Exception as e:
@@ -98,47 +141,77 @@ class ReportMetricExtractor:
     def _analyze_report_metrics_schema(
         self,
         week_report: Dict[str, Any],
-        daily_reports: Optional[List[Dict[str, Any]]] = None
+        daily_reports: List[Dict[str, Any]],
+        analytics: ReportAnalytics
     ) -> Dict[str, Any]:
         """
-        Analyze progress metrics using Pydantic schema validation.
+        Write the narrative part of the progress analysis using Pydantic schema validation.
         
         Args:
             week_report: The client's weekly summary report
             daily_reports: Daily progress reports from the client
+            analytics: Metrics already computed by the analytics engine
             
         Returns:
-            Structured progress analysis as a Pydantic model
+            Narrative fields of the progress analysis
         """
-        # Ensure daily reports exist
-        daily_reports = daily_reports or []
-        
         # Extract key details from week report
         user_id = week_report.get('userId', 'Unknown')
         
-        # Construct detailed prompt with comprehensive client data
+        # Numbers are precomputed; only the qualitative daily fields are sent
         prompt = (
-            f"Analyze the progress metrics for User {user_id} based on their weekly summary and daily reports.\\n\\n"
+            f"Analyze the progress of User {user_id} based on their weekly summary and daily reports.\\n\\n"
             
             f"WEEKLY SUMMARY:\\n{self._format_week_report(week_report)}\\n\\n"
             
-            f"DAILY REPORTS:\\n{self._format_daily_reports(daily_reports)}\\n\\n"
+            f"COMPUTED METRICS:\\n{self.analytics_engine.format_summary(analytics)}\\n\\n"
             
-            "Provide a comprehensive analysis that includes:\\n"
-            "1. Quantitative progress metrics\\n"
-            "2. Activity level and performance insights\\n"
-            "3. Nutrition and training observations\\n"
-            "4. Key highlights and achievements\\n"
-            "5. Areas requiring improvement\\n"
-            "6. Specific recovery and progress recommendations\\n\\n"
+            f"DAILY NOTES:\\n{self._format_daily_notes(daily_reports)}\\n\\n"
+            
+            f"{self._format_long_term_trends(user_id)}"
+            
+            "The computed metrics are exact; do not recalculate them. Provide:\\n"
+            "1. Activity level and performance insights\\n"
+            "2. Nutrition and training observations\\n"
+            "3. Key highlights and achievements\\n"
+            "4. Areas requiring improvement\\n"
+            "5. Specific recovery and progress recommendations\\n\\n"
             
             "Create a detailed, actionable progress analysis that offers clear insights and guidance."
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=WeeklyProgressAnalysis)
+        result = self.llm_client.call_llm(prompt, system_message, schema=WeeklyProgressNarrative, node=type(self).__name__)
         return result
     
+    def _rhr_baseline(self, user_id: str) -> Optional[float]:
+        """Long-term resting heart rate mean from the columnar store, if available."""
+        if not self.timeseries_store:
+            return None
+        return self.timeseries_store.summarize_daily_trends(user_id).get("rhr_mean")
+    
+    def _format_long_term_trends(self, user_id: str) -> str:
+        """
+        Format long-term daily report trends from the columnar store, if available.
+        
+        Args:
+            user_id: The client's id
+            
+        Returns:
+            Formatted prompt section, or an empty string when there is no history
+        """
+        if not self.timeseries_store:
+            return ""
+        
+        trends = self.timeseries_store.summarize_daily_trends(user_id)
+        if not trends:
+            return ""
+        
+        formatted = "LONG-TERM TRENDS (last 90 days):\\n"
+        for key, value in trends.items():
+            formatted += f"  {key.replace('_', ' ').title()}: {value}\\n"
+        return formatted + "\\n"
+    
     def _format_week_report(self, week_report: Dict[str, Any]) -> str:
         """
         Format week report data as a readable string for inclusion in prompts.
@@ -174,9 +247,9 @@ class ReportMetricExtractor:
         
         return formatted
     
-    def _format_daily_reports(self, reports: List[Dict[str, Any]]) -> str:
+    def _format_daily_notes(self, reports: List[Dict[str, Any]]) -> str:
         """
-        Format daily report data as a readable string for inclusion in prompts.
+        Format the qualitative fields of the daily reports for inclusion in prompts.
         
         Args:
             reports: List of daily report dictionaries
@@ -184,37 +257,20 @@ class ReportMetricExtractor:
         Returns:
             Formatted string representation
         """
-        if not reports:
-            return "No daily reports available."
-        
         formatted = ""
         for report in reports:
-            date = report.get("date", "Unknown date")
-            day = report.get("day", "")
-            formatted += f"  Day {day} ({date}):\\n"
-            
-            # Key performance metrics
-            formatted += f"    - Weight: {report.get('weight', 'N/A')} kg\\n"
-            formatted += f"    - Performance: {report.get('performance', 'N/A')}\\n"
-            
-            # Sleep metrics
-            sleep = report.get("sleep", {})
-            formatted += f"    - Sleep Length: {sleep.get('length', 'N/A')} hours\\n"
-            
-            # Additional relevant data
-            formatted += f"    - Steps: {report.get('steps', 'N/A')}\\n"
-            formatted += f"    - RHR: {report.get('rhr', 'N/A')}\\n"
-            
-            # Notes and stressors
-            notes = report.get("additionalNotes", "")
-            stressors = report.get("stressors", "")
-            
-            if notes:
-                formatted += f"    - Notes: {notes}\\n"
-            if stressors:
-                formatted += f"    - Stressors: {stressors}\\n"
+            fields = {
+                "Performance": report.get("performance", ""),
+                "Notes": report.get("additionalNotes", ""),
+                "Stressors": report.get("stressors", "")
+            }
+            fields = {name: value for name, value in fields.items() if value}
+            if not fields:
+                continue
+            formatted += f"  Day {report.get('day', '')} ({report.get('date', 'Unknown date')}): "
+            formatted += "; ".join(f"{name}: {value}" for name, value in fields.items()) + "\\n"
         
-        return formatted
+        return formatted or "No daily notes available."
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
         """
@@ -0,0 +1,127 @@
+from typing import Iterator, Optional, Tuple
+from contextlib import contextmanager
+import os
+import re
+import hashlib
+import threading
+from startup.config import get_settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+# Root of every on-disk store (absolute, so all worker processes read and write the same files)
+STATE_DIR = get_settings().state_dir
+
+# User ids that are already safe as file names
+SAFE_ID = re.compile(r"[A-Za-z0-9_-]+")
+
+def state_dir(env_var: str, name: str) -> str:
+    """Directory of one store: ``$<env_var>`` if set, else ``<STATE_DIR>/<name>``."""
+    return os.getenv(env_var, os.path.join(STATE_DIR, name))
+
+def safe_id(user_id: str) -> str:
+    """
+    File-name-safe form of a user id, distinct for distinct ids.
+
+    Ids made only of letters, digits, "-" and "_" are used as they are; any other id is
+    replaced by "~" and its SHA-256, so that e.g. "a.b" and "ab" never share a file.
+    """
+    if SAFE_ID.fullmatch(user_id):
+        return user_id
+    return "~" + hashlib.sha256(user_id.encode("utf-8")).hexdigest()
+
+def file_version(path: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Identity of a file's current contents (inode, mtime, size), or None if it does not exist.
+
+    Atomic writes replace the inode, so an in-process cache entry is stale as soon as
+    another worker has saved a newer version of the file.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def write_json_atomic(path: str, text: str) -> None:
+    """Write a file through a process-unique temporary file and an atomic rename."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+@contextmanager
+def process_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive lock shared by all worker processes, held on ``<path>.lock``.
+
+    Guards read-modify-write cycles on a state file; callers still hold their own
+    threading lock for threads within a process. A no-op where fcntl is unavailable.
+    The holder may delete the lock file along with the state file (see remove_locked()).
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    while True:
+        lock_file = open(f"{path}.lock", "a")
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            current = os.stat(f"{path}.lock").st_ino
+        except FileNotFoundError:
+            current = None
+        if current == os.fstat(lock_file.fileno()).st_ino:
+            break
+        # Deleted by the previous holder while we waited: lock the file that replaced it
+        lock_file.close()
+    with lock_file:
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def remove_locked(path: str) -> None:
+    """Delete a state file and its lock file, either of which may be gone; the caller holds process_lock(path)."""
+    for name in (path, f"{path}.lock"):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+@contextmanager
+def owner_lock(path: str) -> Iterator[None]:
+    """
+    Lock on ``<path>.owner`` held for as long as this process works on a resource.
+
+    The OS drops the lock when the process dies, so has_owner() tells a resource another
+    worker is still working on from one abandoned by a process that was stopped.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.owner", "a") as owner_file:
+        fcntl.flock(owner_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            os.remove(f"{path}.owner")
+            fcntl.flock(owner_file.fileno(), fcntl.LOCK_UN)
+
+def has_owner(path: str) -> bool:
+    """Whether a live process holds the owner_lock() of a resource; never, where fcntl is unavailable."""
+    if fcntl is None:
+        return False
+    try:
+        owner_file = open(f"{path}.owner", "r")
+    except FileNotFoundError:
+        return False
+    with owner_file:
+        try:
+            fcntl.flock(owner_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(owner_file.fileno(), fcntl.LOCK_UN)
+        return False
@@ -0,0 +1,391 @@
+from typing import Dict, Any, List, Optional, Sequence
+from check_time_plans.data_ingestion.check_in_ingestion import LenientDailyReport
+import numpy as np
+import os
+import json
+import logging
+import threading
+from check_time_plans.data_ingestion.shared_state import state_dir, safe_id, write_json_atomic, process_lock
+
+logger = logging.getLogger(__name__)
+
+TIMESERIES_DIR = state_dir("TIMESERIES_DIR", "timeseries")
+
+# One float64 column per field; dates are stored as days since the Unix epoch
+DAILY_FIELDS = (
+    "date", "weight", "proteins", "carbs", "fats", "steps", "cardio",
+    "sleep_length", "sleep_efficiency", "rhr"
+)
+MEASUREMENT_FIELDS = ("date", "measurement", "value")
+
+def to_epoch_day(date: str) -> float:
+    """Convert an ISO date or datetime string to days since the epoch (NaN if unparseable)."""
+    try:
+        day = np.datetime64(date[:10], "D")
+    except (ValueError, TypeError):
+        return np.nan
+    # An empty string parses as NaT, whose integer value is a sentinel, not a day
+    return np.nan if np.isnat(day) else float(day.astype(np.int64))
+
+def from_epoch_day(day: float) -> str:
+    """Convert days since the epoch back to an ISO date string."""
+    return str(np.datetime64(int(day), "D"))
+
+def _optional(value: Optional[float]) -> float:
+    """Map missing values to NaN."""
+    return np.nan if value is None else float(value)
+
+def rolling_stat(values: np.ndarray, window: int, stat: str = "mean") -> np.ndarray:
+    """
+    NaN-aware trailing rolling statistic over a dense daily array.
+
+    Args:
+        values: Dense daily values (NaN where nothing was recorded)
+        window: Window length in days
+        stat: "mean", "sum" or "count"
+
+    Returns:
+        Array of the same length; NaN where the window holds no observations
+    """
+    present = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(present)))
+    index = np.arange(1, len(values) + 1)
+    start = np.maximum(index - window, 0)
+    window_sums = sums[index] - sums[start]
+    window_counts = counts[index] - counts[start]
+
+    if stat == "count":
+        return window_counts.astype(float)
+    if stat == "sum":
+        return np.where(window_counts > 0, window_sums, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+class TimeSeriesStore:
+    """
+    Columnar per-user store for daily reports and body measurements.
+
+    Every field is an append-only float64 file under ``<root>/<user>/<table>/<field>.f8``,
+    appended in chunks and memory-mapped on read, so range queries and rolling-window
+    statistics run vectorized over months of history without building Pydantic objects.
+    The date column is written last, so a partially written chunk is never visible.
+    """
+
+    def __init__(self, root_dir: str = TIMESERIES_DIR):
+        """
+        Initialize the TimeSeriesStore.
+
+        Args:
+            root_dir: Directory holding one sub-directory per user
+        """
+        self.root_dir = root_dir
+        self._lock = threading.Lock()
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def append_daily_reports(self, user_id: str, reports: Sequence[LenientDailyReport]) -> int:
+        """
+        Append a chunk of daily reports.
+
+        Re-sent days are stored again; reads keep the latest row for each date.
+
+        Args:
+            user_id: The client's id
+            reports: Validated daily reports
+
+        Returns:
+            Number of rows appended
+        """
+        columns = {
+            "date": [to_epoch_day(report.date) for report in reports],
+            "weight": [report.weight if report.weight > 0 else np.nan for report in reports],
+            "proteins": [report.macros.proteins for report in reports],
+            "carbs": [report.macros.carbs for report in reports],
+            "fats": [report.macros.fats for report in reports],
+            "steps": [_optional(report.steps) for report in reports],
+            "cardio": [_optional(report.cardio) for report in reports],
+            "sleep_length": [_optional(report.sleep.length if report.sleep else None) for report in reports],
+            "sleep_efficiency": [_optional(report.sleep.efficiency if report.sleep else None) for report in reports],
+            "rhr": [_optional(report.rhr) for report in reports],
+        }
+        return self._append(user_id, "daily", DAILY_FIELDS, columns)
+
+    def append_measurements(self, user_id: str, date: str, measurements: Dict[str, float]) -> int:
+        """
+        Append one dated set of body measurements (long format: date, measurement id, value).
+
+        Args:
+            user_id: The client's id
+            date: Measurement date
+            measurements: Measurement name to value
+
+        Returns:
+            Number of rows appended
+        """
+        with self._lock, process_lock(self._names_path(user_id)):
+            names = self._load_measurement_names(user_id)
+            for name in measurements:
+                if name not in names:
+                    names[name] = len(names)
+            self._save_measurement_names(user_id, names)
+
+        day = to_epoch_day(date)
+        columns = {
+            "date": [day] * len(measurements),
+            "measurement": [names[name] for name in measurements],
+            "value": [float(value) for value in measurements.values()],
+        }
+        return self._append(user_id, "measurements", MEASUREMENT_FIELDS, columns)
+
+    def daily_range(
+        self,
+        user_id: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized range query over daily reports, one row per date (latest write wins).
+
+        Args:
+            user_id: The client's id
+            start: Inclusive ISO start date (None for the beginning of history)
+            end: Inclusive ISO end date (None for the latest date)
+            fields: Fields to return (date is always included)
+
+        Returns:
+            Dictionary of field name to array, sorted by date
+        """
+        fields = ["date"] + [field for field in (fields or DAILY_FIELDS) if field != "date"]
+        table = self._read(user_id, "daily", DAILY_FIELDS)
+        dates = table["date"]
+        if len(dates) == 0:
+            return {field: np.empty(0) for field in fields}
+
+        # Keep the last row written for each date
+        reversed_dates = dates[::-1]
+        _, last_index = np.unique(reversed_dates, return_index=True)
+        rows = len(dates) - 1 - last_index
+        rows = rows[~np.isnan(dates[rows])]
+        mask = self._date_mask(dates[rows], start, end)
+        rows = rows[mask]
+        return {field: np.asarray(table[field][rows]) for field in fields}
+
+    def daily_grid(
+        self,
+        user_id: str,
+        field: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Dense calendar-day series for a field, NaN on days without a report.
+
+        Args:
+            user_id: The client's id
+            field: Daily field name
+            start: Inclusive ISO start date
+            end: Inclusive ISO end date
+
+        Returns:
+            Dictionary with "date" (epoch days) and "values" arrays
+        """
+        data = self.daily_range(user_id, start, end, [field])
+        if len(data["date"]) == 0:
+            return {"date": np.empty(0), "values": np.empty(0)}
+        first = to_epoch_day(start) if start else data["date"][0]
+        last = to_epoch_day(end) if end else data["date"][-1]
+        grid = np.arange(first, last + 1)
+        values = np.full(len(grid), np.nan)
+        values[(data["date"] - first).astype(np.int64)] = data[field]
+        return {"date": grid, "values": values}
+
+    def rolling(
+        self,
+        user_id: str,
+        field: str,
+        window: int = 7,
+        stat: str = "mean",
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Trailing rolling-window statistic of a daily field over calendar days.
+
+        Args:
+            user_id: The client's id
+            field: Daily field name
+            window: Window length in days
+            stat: "mean", "sum" or "count"
+            start: Inclusive ISO start date
+            end: Inclusive ISO end date
+
+        Returns:
+            Dictionary with "date" (epoch days) and "values" arrays
+        """
+        grid = self.daily_grid(user_id, field, start, end)
+        return {"date": grid["date"], "values": rolling_stat(grid["values"], window, stat)}
+
+    def measurement_history(
+        self,
+        user_id: str,
+        name: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        History of a single body measurement, one value per date (latest write wins).
+
+        Args:
+            user_id: The client's id
+            name: Measurement name (e.g. "bellyWaistGirth")
+            start: Inclusive ISO start date
+            end: Inclusive ISO end date
+
+        Returns:
+            Dictionary with "date" and "value" arrays sorted by date
+        """
+        names = self._load_measurement_names(user_id)
+        if name not in names:
+            return {"date": np.empty(0), "value": np.empty(0)}
+        table = self._read(user_id, "measurements", MEASUREMENT_FIELDS)
+        rows = np.nonzero(table["measurement"] == names[name])[0]
+        dates = table["date"][rows]
+        _, last_index = np.unique(dates[::-1], return_index=True)
+        rows = rows[len(rows) - 1 - last_index]
+        # Measurements sent without a parseable date cannot be placed in the history
+        rows = rows[~np.isnan(table["date"][rows])]
+        rows = rows[self._date_mask(table["date"][rows], start, end)]
+        return {"date": np.asarray(table["date"][rows]), "value": np.asarray(table["value"][rows])}
+
+    def summarize_daily_trends(self, user_id: str, days: int = 90) -> Dict[str, Any]:
+        """
+        Compact long-term trend summary for prompts.
+
+        Args:
+            user_id: The client's id
+            days: Look-back window in days, ending at the latest report
+
+        Returns:
+            Dictionary of per-field statistics (empty if there is no history)
+        """
+        data = self.daily_range(user_id)
+        if len(data["date"]) == 0:
+            return {}
+        end_day = data["date"][-1]
+        mask = data["date"] > end_day - days
+        summary: Dict[str, Any] = {
+            "period": f"{from_epoch_day(data['date'][mask][0])} to {from_epoch_day(end_day)}",
+            "days_reported": int(mask.sum())
+        }
+
+        weights = data["weight"][mask]
+        present = ~np.isnan(weights)
+        if present.sum() >= 2:
+            slope = np.polyfit(data["date"][mask][present], weights[present], 1)[0]
+            summary["weight_trend_kg_per_week"] = round(float(slope * 7), 3)
+            summary["weight_start"] = round(float(weights[present][0]), 2)
+            summary["weight_latest"] = round(float(weights[present][-1]), 2)
+
+        for field in ("steps", "sleep_length", "sleep_efficiency", "rhr", "proteins", "carbs", "fats"):
+            values = data[field][mask]
+            if np.any(~np.isnan(values)):
+                summary[f"{field}_mean"] = round(float(np.nanmean(values)), 2)
+        return summary
+
+    def summarize_measurement_trends(self, user_id: str, names: Sequence[str]) -> Dict[str, Any]:
+        """
+        Compact long-term history for each named body measurement.
+
+        Args:
+            user_id: The client's id
+            names: Measurement names to summarize
+
+        Returns:
+            Dictionary of measurement name to first/latest values and change per 4 weeks
+        """
+        summary: Dict[str, Any] = {}
+        for name in names:
+            history = self.measurement_history(user_id, name)
+            if len(history["date"]) < 2:
+                continue
+            weeks = (history["date"][-1] - history["date"][0]) / 7
+            total_change = float(history["value"][-1] - history["value"][0])
+            summary[name] = {
+                "since": from_epoch_day(history["date"][0]),
+                "first": round(float(history["value"][0]), 2),
+                "latest": round(float(history["value"][-1]), 2),
+                "check_ins": int(len(history["date"])),
+                "change_per_4_weeks": round(float(total_change / weeks * 4), 2) if weeks > 0 else None
+            }
+        return summary
+
+    def _date_mask(self, dates: np.ndarray, start: Optional[str], end: Optional[str]) -> np.ndarray:
+        """Boolean mask of dates inside the inclusive range."""
+        mask = np.ones(len(dates), dtype=bool)
+        if start:
+            mask &= dates >= to_epoch_day(start)
+        if end:
+            mask &= dates <= to_epoch_day(end)
+        return mask
+
+    def _table_dir(self, user_id: str, table: str) -> str:
+        """Directory holding a user's table."""
+        return os.path.join(self.root_dir, safe_id(user_id), table)
+
+    def _append(self, user_id: str, table: str, fields: Sequence[str], columns: Dict[str, List[float]]) -> int:
+        """
+        Append one chunk to every column file, writing the date column last.
+
+        The date column's length is the committed row count, so columns left longer by an
+        append that died part-way are cut back to it first; otherwise every later row would
+        be read against the wrong date.
+        """
+        rows = len(columns["date"])
+        if rows == 0:
+            return 0
+        table_dir = self._table_dir(user_id, table)
+        with self._lock, process_lock(os.path.join(table_dir, "append")):
+            os.makedirs(table_dir, exist_ok=True)
+            date_path = os.path.join(table_dir, "date.f8")
+            committed = os.path.getsize(date_path) // 8 * 8 if os.path.exists(date_path) else 0
+            for field in fields:
+                path = os.path.join(table_dir, f"{field}.f8")
+                if os.path.exists(path) and os.path.getsize(path) != committed:
+                    os.truncate(path, committed)
+            for field in [field for field in fields if field != "date"] + ["date"]:
+                with open(os.path.join(table_dir, f"{field}.f8"), "ab") as f:
+                    f.write(np.asarray(columns[field], dtype=np.float64).tobytes())
+        return rows
+
+    def _read(self, user_id: str, table: str, fields: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Memory-map every column of a table, truncated to the committed row count."""
+        table_dir = self._table_dir(user_id, table)
+        paths = {field: os.path.join(table_dir, f"{field}.f8") for field in fields}
+        if not os.path.exists(paths["date"]):
+            return {field: np.empty(0) for field in fields}
+        rows = os.path.getsize(paths["date"]) // 8
+        if rows == 0:
+            return {field: np.empty(0) for field in fields}
+        return {
+            field: np.memmap(path, dtype=np.float64, mode="r", shape=(rows,))
+            for field, path in paths.items()
+        }
+
+    def _names_path(self, user_id: str) -> str:
+        """Path of the measurement-name index."""
+        return os.path.join(self._table_dir(user_id, "measurements"), "names.json")
+
+    def _load_measurement_names(self, user_id: str) -> Dict[str, int]:
+        """Load the measurement name to id index."""
+        path = self._names_path(user_id)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_measurement_names(self, user_id: str, names: Dict[str, int]) -> None:
+        """Persist the measurement name to id index (caller holds the locks)."""
+        path = self._names_path(user_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_json_atomic(path, json.dumps(names))
@@ -1,12 +1,13 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Union, Sequence
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from check_time_plans.analytics.training_analytics import TrainingJoinEngine, TrainingAnalytics, ExerciseSummary
+from check_time_plans.data_ingestion.chunking import MapReduceRunner, partition_by_week
+from check_time_plans.data_ingestion.views import as_view
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class ExerciseProgressionMetrics(BaseModel):
     """Metrics for measuring progression in a specific exercise."""
@@ -44,25 +45,60 @@ class TrainingLogsAnalysis(BaseModel):
     energy_level_patterns: str = Field(..., description="Patterns in reported energy levels")
     performance_trends: str = Field(..., description="Overall performance trends and patterns")
 
+class TrainingLogsNarrative(BaseModel):
+    """Narrative part of the training analysis; adherence, volume and progression are computed locally."""
+    muscle_groups_assessment: List[MuscleGroupProgress] = Field(..., description="Assessment by muscle group")
+    technique_observations: Optional[str] = Field(None, description="Observations about technique (if reported)")
+    common_limiting_factors: List[str] = Field(..., description="Frequently reported limiting factors")
+    energy_level_patterns: str = Field(..., description="Patterns in reported energy levels")
+    performance_trends: str = Field(..., description="Overall performance trends and patterns")
+
 class TrainingLogsExtractor:
     """
     Extracts and analyzes client training log data.
     
     This class processes training logs to evaluate exercise progression,
     training consistency, and performance patterns over time, providing
-    insights for program adjustment and optimization.
+    insights for program adjustment and optimization. Session adherence, volume
+    completion, intensity adherence and load progression come from joining the plan
+    against the logs in TrainingJoinEngine; the LLM only writes the narrative.
+    
+    Histories longer than ``chunk_weeks`` weeks are processed map-reduce style: entries are
+    partitioned by week (or by exercise), each chunk gets its own cached narrative call, and
+    a final call merges the partial narratives.
     """
 
-    def __init__(self, llm_client: Optional[Any] = None):
+    def __init__(
+        self,
+        llm_client: Optional[Any] = None,
+        engine: Optional[TrainingJoinEngine] = None,
+        runner: Optional[MapReduceRunner] = None,
+        chunk_weeks: int = 4,
+        partition: str = "week"
+    ):
         """
         Initialize the TrainingLogsExtractor with an optional custom LLM client.
         
         Args:
             llm_client: Custom LLM client implementation. If None, uses the default BaseLLM.
+            engine: Plan-vs-log join engine. If None, uses the default TrainingJoinEngine.
+            runner: Map-reduce runner for long histories. If None, uses the default MapReduceRunner.
+            chunk_weeks: Histories spanning more weeks than this are chunked
+            partition: "week" or "exercise"
         """
+        if partition not in ("week", "exercise"):
+            raise ValueError(f"Unknown partition: {partition}")
         self.llm_client = llm_client or BaseLLM()
+        self.engine = engine or TrainingJoinEngine()
+        self.runner = runner or MapReduceRunner()
+        self.chunk_weeks = chunk_weeks
+        self.partition = partition
     
-    def extract_training_logs(self, training_logs: List[Dict[str, Any]], workout_plan: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def extract_training_logs(
+        self,
+        training_logs: Sequence[Union[Dict[str, Any], BaseModel]],
+        workout_plan: Optional[Union[Dict[str, Any], BaseModel]] = None
+    ) -> Dict[str, Any]:
         """
         Process training logs to analyze exercise progression and performance.
         
@@ -70,18 +106,29 @@ class TrainingLogsExtractor:
         exercises, assess muscle group development, and identify performance patterns.
         
         Args:
-            training_logs: The client's exercise logs over time
+            training_logs: The client's exercise logs over time (dicts or ExerciseLog models)
             workout_plan: The client's prescribed workout plan (optional for comparison)
             
         Returns:
             A dictionary containing structured training logs analysis
         """
         try:
-            # Process using the schema-based approach
-            schema_result = self._analyze_training_logs_schema(training_logs, workout_plan)
+            # Validated models are read through views instead of .dict() copies
+            training_logs = as_view(training_logs)
+            workout_plan = as_view(workout_plan)
+            
+            # Join the plan against the logs locally
+            analytics = self.engine.compute(training_logs, workout_plan)
+            
+            # Ask the LLM for the narrative only, chunked for long histories
+            if analytics.weeks > self.chunk_weeks:
+                narrative = self._map_reduce_narrative(training_logs, workout_plan, analytics)
+            else:
+                narrative = self._analyze_training_logs_schema(training_logs, workout_plan, analytics)
             
             return {
-                "training_logs_analysis": schema_result
+                "training_logs_analysis": self._merge_analysis(analytics, narrative),
+                "computed_metrics": analytics.model_dump()
             }
             
         except Exception as e:
@@ -120,17 +167,19 @@ class TrainingLogsExtractor:
     def _analyze_training_logs_schema(
         self,
         training_logs: List[Dict[str, Any]],
-        workout_plan: Optional[Dict[str, Any]] = None
+        workout_plan: Optional[Dict[str, Any]],
+        analytics: TrainingAnalytics
     ) -> Dict[str, Any]:
         """
-        Analyze training logs using Pydantic schema validation.
+        Write the narrative part of the training analysis using Pydantic schema validation.
         
         Args:
             training_logs: The client's exercise logs over time
             workout_plan: The client's prescribed workout plan
+            analytics: Plan-vs-log metrics computed by the engine
             
         Returns:
-            Structured training logs analysis as a Pydantic model
+            Narrative fields of the training logs analysis
         """
         # Extract exercise names and organize log data
         exercise_names = []
@@ -145,16 +194,18 @@ class TrainingLogsExtractor:
             plan_name = workout_plan.get("name", "Unnamed Plan")
             plan_schedule = workout_plan.get("schedule", [])
         
-        # Construct detailed prompt with training data
+        # The computed join replaces the raw logs; only notes are sent verbatim
         prompt = (
-            "Analyze this client's training logs to evaluate exercise progression, training consistency, "
+            "Analyze this client's training to evaluate muscle group development, limiting factors, "
             "and performance patterns. Identify strengths, weaknesses, and actionable insights for program adjustment.\\n\\n"
             
             f"EXERCISE LOGS SUMMARY:\\n"
             f"- Total exercises tracked: {len(exercise_names)}\\n"
             f"- Exercise names: {', '.join(exercise_names)}\\n\\n"
             
-            f"DETAILED TRAINING LOGS:\\n{self._format_training_logs(training_logs)}\\n\\n"
+            f"COMPUTED PLAN-VS-LOG METRICS:\\n{self.engine.format_summary(analytics)}\\n\\n"
+            
+            f"TRAINING NOTES:\\n{self._format_training_notes(training_logs)}\\n\\n"
         )
         
         # Add workout plan information if available
@@ -166,72 +217,204 @@ class TrainingLogsExtractor:
             )
         
         prompt += (
-            "Your training logs analysis should include:\\n"
-            "1. Progression metrics for each tracked exercise\\n"
-            "2. Assessment by muscle group\\n"
-            "3. Identification of strongest and weakest lifts\\n"
-            "4. Training consistency and adherence analysis\\n"
-            "5. Performance trends and patterns\\n"
-            "6. Common limiting factors affecting performance\\n\\n"
+            "The computed metrics are exact; do not recalculate them. Your training logs analysis should include:\\n"
+            "1. Assessment by muscle group\\n"
+            "2. Technique observations, if reported\\n"
+            "3. Common limiting factors affecting performance\\n"
+            "4. Energy level patterns\\n"
+            "5. Performance trends and patterns\\n\\n"
             
             "Create a complete training logs analysis with actionable insights for program optimization."
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=TrainingLogsAnalysis)
+        result = self.llm_client.call_llm(prompt, system_message, schema=TrainingLogsNarrative, node=type(self).__name__)
         return result
     
-    def _format_training_logs(self, logs: List[Dict[str, Any]]) -> str:
+    def _map_reduce_narrative(
+        self,
+        training_logs: List[Dict[str, Any]],
+        workout_plan: Optional[Dict[str, Any]],
+        analytics: TrainingAnalytics
+    ) -> Dict[str, Any]:
         """
-        Format training log data as a readable string for inclusion in prompts.
+        Write the narrative for a long history from per-chunk narratives.
         
         Args:
-            logs: List of training log dictionaries
+            training_logs: The client's exercise logs over time
+            workout_plan: The client's prescribed workout plan
+            analytics: Plan-vs-log metrics computed by the engine over the whole history
+            
+        Returns:
+            Narrative fields of the training logs analysis
+        """
+        chunks = self._partition_logs(training_logs, workout_plan)
+        namespace = f"training_logs_{self.partition}"
+        
+        def map_chunk(label: str, chunk: Dict[str, Any]) -> Dict[str, Any]:
+            if self.partition == "week":
+                chunk_metrics = self.engine.format_summary(self.engine.compute(chunk["logs"], chunk["plan"]))
+            else:
+                chunk_metrics = "".join(
+                    self._format_exercise_summary(exercise)
+                    for exercise in analytics.exercises if exercise.name == label
+                )
+            prompt = (
+                f"Analyze one part ({self.partition} {label}) of this client's training history. "
+                "Another step merges your analysis with the other parts, so describe only what this part shows.\\n\\n"
+                
+                f"COMPUTED METRICS FOR THIS PART:\\n{chunk_metrics}\\n\\n"
+                
+                f"TRAINING NOTES:\\n{self._format_training_notes(chunk['logs'])}\\n\\n"
+                
+                "The computed metrics are exact; do not recalculate them. Cover muscle groups, technique, "
+                "limiting factors, energy levels and performance trends."
+            )
+            return self.llm_client.call_llm(prompt, self.get_system_message(), schema=TrainingLogsNarrative, node=type(self).__name__)
+        
+        partials = self.runner.map(namespace, chunks, map_chunk)
+        summary = self.engine.format_summary(analytics, max_sessions=10)
+        
+        def reduce_partials(partials: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+            prompt = (
+                f"Merge these partial analyses of a client's training history (one per {self.partition}) into a single "
+                "training logs analysis. Combine repeated observations, keep the most recent state of each trend, "
+                "and list each limiting factor once.\\n\\n"
+                
+                f"COMPUTED METRICS FOR THE WHOLE HISTORY:\\n{summary}\\n\\n"
+                
+                f"PARTIAL ANALYSES:\\n{self._format_dict(partials)}\\n\\n"
+                
+                "The computed metrics are exact; do not recalculate them."
+            )
+            return self.llm_client.call_llm(prompt, self.get_system_message(), schema=TrainingLogsNarrative, node=type(self).__name__)
+        
+        return self.runner.reduce(f"{namespace}_reduce", partials, summary, reduce_partials)
+    
+    def _partition_logs(
+        self,
+        training_logs: List[Dict[str, Any]],
+        workout_plan: Optional[Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Split the logs into chunks by week or by exercise.
+        
+        Args:
+            training_logs: The client's exercise logs over time
+            workout_plan: The client's prescribed workout plan
+            
+        Returns:
+            Chunk label -> {"logs": logs of the chunk, "plan": workout plan}
+        """
+        if self.partition == "exercise":
+            return {
+                log.get("name", "Unnamed Exercise"): {"logs": [log], "plan": workout_plan}
+                for log in training_logs
+            }
+        
+        entries = [(log, entry) for log in training_logs for entry in log.get("entries", []) or []]
+        chunks = {}
+        for week, week_entries in partition_by_week(entries, lambda pair: pair[1].get("date", "")).items():
+            logs: Dict[str, Dict[str, Any]] = {}
+            for log, entry in week_entries:
+                name = log.get("name", "Unnamed Exercise")
+                logs.setdefault(name, {**log, "entries": []})["entries"].append(entry)
+            chunks[week] = {"logs": list(logs.values()), "plan": workout_plan}
+        return chunks
+    
+    def _format_exercise_summary(self, exercise: ExerciseSummary) -> str:
+        """
+        Format one exercise's computed progression for inclusion in prompts.
+        
+        Args:
+            exercise: Per-exercise summary from the engine
             
         Returns:
             Formatted string representation
         """
-        if not logs:
-            return "No training logs available."
+        return (
+            f"  {exercise.name} ({exercise.muscle_group}): {exercise.starting_weight} -> {exercise.current_weight} "
+            f"(best {exercise.best_weight}, {exercise.weight_change_percentage:+.1f}%, "
+            f"{exercise.progression_per_week:+.2f}/week), {exercise.sessions} of {exercise.planned_sessions} planned sessions\\n"
+        )
+    
+    def _merge_analysis(self, analytics: TrainingAnalytics, narrative: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Combine computed metrics and the narrative into the TrainingLogsAnalysis shape.
         
-        # Group logs by exercise
-        exercise_logs = {}
-        for log in logs:
-            name = log.get("name", "Unnamed Exercise")
-            if name not in exercise_logs:
-                exercise_logs[name] = []
+        Args:
+            analytics: Plan-vs-log metrics computed by the engine
+            narrative: Narrative fields from the LLM
             
-            entries = log.get("entries", [])
-            exercise_logs[name].extend(entries)
+        Returns:
+            Dictionary matching the TrainingLogsAnalysis schema
+        """
+        exercises = analytics.exercises
+        by_strength = sorted(exercises, key=lambda e: e.best_weight, reverse=True)
+        by_improvement = sorted(exercises, key=lambda e: e.weight_change_percentage, reverse=True)
+        return {
+            "exercises_progression": [self._progression_metrics(exercise).model_dump() for exercise in exercises],
+            "muscle_groups_assessment": narrative.get("muscle_groups_assessment", []),
+            "strongest_lifts": [e.name for e in by_strength[:3]],
+            "most_improved_lifts": [e.name for e in by_improvement[:3] if e.weight_change_percentage > 0],
+            "least_improved_lifts": [e.name for e in reversed(by_improvement[-3:]) if e.weight_change_percentage <= 0],
+            "training_consistency": analytics.training_consistency,
+            "volume_completion_rate": analytics.volume_completion_rate,
+            "intensity_adherence": analytics.intensity_adherence,
+            "technique_observations": narrative.get("technique_observations"),
+            "common_limiting_factors": narrative.get("common_limiting_factors", []),
+            "energy_level_patterns": narrative.get("energy_level_patterns", ""),
+            "performance_trends": narrative.get("performance_trends", "")
+        }
+    
+    def _progression_metrics(self, exercise: ExerciseSummary) -> ExerciseProgressionMetrics:
+        """
+        Map an engine exercise summary onto ExerciseProgressionMetrics.
         
-        # Format each exercise's log
-        formatted = ""
-        for exercise, entries in exercise_logs.items():
-            # Sort entries by date
-            sorted_entries = sorted(entries, key=lambda x: x.get("date", ""), reverse=False)
+        Args:
+            exercise: Per-exercise summary from the engine
             
-            formatted += f"  {exercise}:\\n"
-            for entry in sorted_entries:
-                date = entry.get("date", "Unknown date")
-                weight = entry.get("weight", "N/A")
-                reps = entry.get("reps", "")
-                sets = entry.get("sets", "")
-                
-                entry_details = f"    - {date}: {weight} "
-                if reps:
-                    entry_details += f"for {reps} reps "
-                if sets:
-                    entry_details += f"x {sets} sets "
-                    
+        Returns:
+            Progression metrics for the exercise
+        """
+        if exercise.sessions < 2:
+            trend = "Single session"
+        elif exercise.weight_change > 0:
+            trend = "Increasing"
+        elif exercise.weight_change < 0:
+            trend = "Decreasing"
+        else:
+            trend = "Plateau"
+        consistency = min(exercise.sessions / exercise.planned_sessions, 1.0) * 10 if exercise.planned_sessions else 0.0
+        return ExerciseProgressionMetrics(
+            exercise_name=exercise.name,
+            starting_weight=exercise.starting_weight,
+            current_weight=exercise.current_weight,
+            weight_change=exercise.weight_change,
+            weight_change_percentage=exercise.weight_change_percentage,
+            progression_rate=exercise.progression_per_week,
+            consistency_score=round(consistency, 1),
+            performance_trend=trend
+        )
+    
+    def _format_training_notes(self, logs: List[Dict[str, Any]]) -> str:
+        """
+        Format entry notes for inclusion in prompts.
+        
+        Args:
+            logs: List of training log dictionaries
+            
+        Returns:
+            Formatted string representation
+        """
+        formatted = ""
+        for log in logs:
+            for entry in sorted(log.get("entries", []), key=lambda x: x.get("date", "")):
                 notes = entry.get("notes", "")
                 if notes:
-                    entry_details += f"(Notes: {notes})"
-                
-                formatted += f"{entry_details}\\n"
-            
-            formatted += "\\n"
+                    formatted += f"  {log.get('name', 'Unnamed Exercise')} ({entry.get('date', 'Unknown date')}): {notes}\\n"
         
-        return formatted
+        return formatted or "No training notes available."
     
     def _format_workout_schedule(self, schedule: List[Dict[str, Any]]) -> str:
         """
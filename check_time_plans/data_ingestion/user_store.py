@@ -0,0 +1,83 @@
+from typing import Dict, Any, Iterator, Tuple
+from collections.abc import MutableMapping
+import os
+import json
+import logging
+import threading
+from check_time_plans.data_ingestion.shared_state import state_dir, safe_id, file_version, write_json_atomic, process_lock
+
+logger = logging.getLogger(__name__)
+
+USER_STATE_DIR = state_dir("USER_STATE_DIR", "users")
+
+class UserInfoStore(MutableMapping):
+    """
+    Saved user infos, keyed by user id and persisted as one JSON file per user under USER_STATE_DIR.
+
+    Behaves like the plain dict it replaces, but every worker process sees the same users:
+    reads reuse the in-process copy only while the file on disk is unchanged.
+    """
+
+    def __init__(self, state_dir: str = USER_STATE_DIR):
+        """
+        Initialize the UserInfoStore.
+
+        Args:
+            state_dir: Directory for per-user files
+        """
+        self.state_dir = state_dir
+        self._users: Dict[str, Tuple[Any, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.state_dir, exist_ok=True)
+
+    def __getitem__(self, user_id: str) -> Dict[str, Any]:
+        path = self._path(user_id)
+        version = file_version(path)
+        if version is None:
+            raise KeyError(user_id)
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                user_info = json.load(f)
+        except FileNotFoundError:
+            raise KeyError(user_id)
+        with self._lock:
+            self._users[user_id] = (version, user_info)
+        return user_info
+
+    def __setitem__(self, user_id: str, user_info: Dict[str, Any]) -> None:
+        path = self._path(user_id)
+        with self._lock, process_lock(path):
+            write_json_atomic(path, json.dumps(user_info))
+            self._users[user_id] = (file_version(path), user_info)
+
+    def __delitem__(self, user_id: str) -> None:
+        path = self._path(user_id)
+        with self._lock, process_lock(path):
+            self._users.pop(user_id, None)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                raise KeyError(user_id)
+
+    def __iter__(self) -> Iterator[str]:
+        # File names are the sanitized ids (hashed for ids that are not safe as names);
+        # the stored info carries the original one
+        for name in sorted(os.listdir(self.state_dir)):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.state_dir, name), "r", encoding="utf-8") as f:
+                        user_info = json.load(f)
+                except FileNotFoundError:
+                    continue
+                yield user_info.get("userId", name[:-len(".json")])
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.state_dir) if name.endswith(".json"))
+
+    def _path(self, user_id: str) -> str:
+        """Path of the user's info file."""
+        return os.path.join(self.state_dir, f"{safe_id(user_id)}.json")
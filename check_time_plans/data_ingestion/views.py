@@ -0,0 +1,91 @@
+from typing import Any, Iterator
+from collections.abc import Mapping, Sequence
+from pydantic import BaseModel
+
+class ModelView(Mapping):
+    """
+    Read-only mapping over a validated model (or a dict of models).
+
+    Extractors and engines read their inputs with ``.get()`` chains; wrapping the validated
+    check-in models in views lets them read the typed objects directly instead of a
+    ``.dict()`` copy. Nested models and lists are wrapped lazily on access.
+    """
+
+    __slots__ = ("_source",)
+
+    def __init__(self, source: Any):
+        self._source = source
+
+    def __getitem__(self, key: str) -> Any:
+        if isinstance(self._source, BaseModel):
+            if key not in type(self._source).model_fields:
+                raise KeyError(key)
+            return as_view(getattr(self._source, key))
+        return as_view(self._source[key])
+
+    def __iter__(self) -> Iterator[str]:
+        if isinstance(self._source, BaseModel):
+            return iter(type(self._source).model_fields)
+        return iter(self._source)
+
+    def __len__(self) -> int:
+        if isinstance(self._source, BaseModel):
+            return len(type(self._source).model_fields)
+        return len(self._source)
+
+    def __repr__(self) -> str:
+        return f"ModelView({self._source!r})"
+
+class SequenceView(Sequence):
+    """Read-only sequence whose model elements are wrapped in views on access."""
+
+    __slots__ = ("_source",)
+
+    def __init__(self, source: Sequence[Any]):
+        self._source = source
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return SequenceView(self._source[index])
+        return as_view(self._source[index])
+
+    def __len__(self) -> int:
+        return len(self._source)
+
+    def __repr__(self) -> str:
+        return f"SequenceView({self._source!r})"
+
+def _contains_models(value: Any) -> bool:
+    """Whether a plain container holds models that need wrapping (checks the first element only)."""
+    if isinstance(value, dict):
+        value = next(iter(value.values()), None)
+    elif isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    else:
+        return False
+    return isinstance(value, BaseModel) or _contains_models(value)
+
+def as_view(value: Any) -> Any:
+    """
+    Wrap models (and containers of models) in read-only views; anything else is returned as is.
+
+    Plain dicts and lists without models pass through untouched, so callers that already
+    hold dicts pay nothing.
+    """
+    if isinstance(value, BaseModel):
+        return ModelView(value)
+    if isinstance(value, dict) and _contains_models(value):
+        return ModelView(value)
+    if isinstance(value, (list, tuple)) and _contains_models(value):
+        return SequenceView(value)
+    return value
+
+def to_plain(value: Any) -> Any:
+    """JSON fallback for views (``json.dumps(..., default=to_plain)``)."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        return list(value)
+    return str(value)
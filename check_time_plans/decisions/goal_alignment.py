@@ -40,7 +40,8 @@ class GoalAlignmentNode:
             goal_assessment = self.llm_client.call_llm(
                 prompt, 
                 system_message, 
-                schema=GoalProgressAssessment
+                schema=GoalProgressAssessment,
+                node=type(self).__name__
             )
             
             return goal_assessment
@@ -0,0 +1,302 @@
+from typing import Dict, Any, List, Optional, Sequence
+from pydantic import BaseModel, Field
+from first_time_plans.call_llm_class import BaseLLM
+from check_time_plans.data_ingestion.check_in_ingestion import StandardizedCheckInData
+from check_time_plans.data_ingestion.timeseries_store import to_epoch_day
+from check_time_plans.data_ingestion.views import as_view
+from check_time_plans.analytics.meal_analytics import MealAdherenceEngine, MealAdherenceAnalytics, session_dates
+import re
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Free-text fallback when the goals carry no structured goalDirection
+GAIN_PATTERN = re.compile(r"\b(gain\w*|bulk\w*|build\w*|increas\w* (?:body ?)?weight|mass)\b")
+LOSS_PATTERN = re.compile(r"\b(los[et]\w*|losing|loss|cut\w*|reduc\w* (?:body ?)?weight|drop\w*|lean(?:ing)? out)\b")
+# A direction word preceded by one of these (within NEGATION_WINDOW words) is not counted
+NEGATIONS = {"avoid", "avoiding", "without", "not", "no", "never", "prevent", "preventing", "minimise", "minimize", "minimal", "limit", "limiting", "stop"}
+NEGATION_WINDOW = 3
+
+def infer_goal_direction(goal_texts: Sequence[str]) -> str:
+    """
+    Gain/lose/maintain from free-text goals.
+
+    Direction words are counted unless negated ("avoid fat loss while building muscle" is a
+    gain); when gain and loss are mentioned equally (recomposition) or not at all, the
+    direction is maintain.
+    """
+    counts = {"gain": 0, "lose": 0}
+    for text in goal_texts:
+        text = (text or "").lower()
+        for direction, pattern in (("gain", GAIN_PATTERN), ("lose", LOSS_PATTERN)):
+            for match in pattern.finditer(text):
+                preceding = re.findall(r"[a-z]+", text[:match.start()])[-NEGATION_WINDOW:]
+                if not NEGATIONS.intersection(preceding):
+                    counts[direction] += 1
+    if counts["gain"] == counts["lose"]:
+        return "maintain"
+    return "gain" if counts["gain"] > counts["lose"] else "lose"
+
+class PreScreenTolerances(BaseModel):
+    """Configurable tolerances used to decide whether a week needs plan changes."""
+    gain_rate_min: float = Field(0.1, description="Minimum weekly weight gain (% bodyweight) when the goal is to gain")
+    gain_rate_max: float = Field(0.5, description="Maximum weekly weight gain (% bodyweight) when the goal is to gain")
+    loss_rate_min: float = Field(0.3, description="Minimum weekly weight loss (% bodyweight) when the goal is to lose")
+    loss_rate_max: float = Field(1.0, description="Maximum weekly weight loss (% bodyweight) when the goal is to lose")
+    maintain_rate_max: float = Field(0.3, description="Maximum absolute weekly weight change (% bodyweight) when maintaining")
+    macro_adherence_min: float = Field(90.0, description="Minimum average adherence (%) for each macro")
+    macro_adherence_max: float = Field(110.0, description="Maximum average adherence (%) for each macro")
+    session_completion_min: float = Field(85.0, description="Minimum logged-session completion (%)")
+    progression_min: float = Field(75.0, description="Minimum share (%) of exercises holding or increasing load")
+    min_daily_reports: int = Field(4, description="Minimum daily reports needed to trust the screen")
+
+class PreScreenCheck(BaseModel):
+    """Outcome of a single pre-screen rule."""
+    name: str
+    passed: bool
+    value: Optional[float] = None
+    detail: str
+
+class PreScreenResult(BaseModel):
+    """Result of the deterministic no-change pre-screen."""
+    keep_plan: bool = Field(..., description="True when every check is within tolerance")
+    goal_direction: str = Field(..., description="Inferred goal direction: gain, lose or maintain")
+    checks: List[PreScreenCheck] = Field(..., description="Individual check outcomes")
+    calorie_adherence: Optional[float] = Field(None, description="Mean % of calorie target over the reported days")
+
+    def value(self, name: str) -> Optional[float]:
+        """Measured value of the named check, if it was measured."""
+        return next((check.value for check in self.checks if check.name == name), None)
+
+class NoChangePreScreenNode:
+    """
+    Deterministic pre-screen that decides whether a weekly check-in can keep the current plan.
+
+    Checks weight-trend slope against the goal direction, macro adherence against the
+    meal plan's training-day and rest-day targets (scored by MealAdherenceEngine, the same
+    definition the meal adherence extractor reports), logged-session completion against the
+    workout schedule, and load progression across exercise logs. When every check passes,
+    the check-in pipeline can skip extraction, analysis and decision LLM calls and return a
+    templated response.
+    """
+
+    def __init__(
+        self,
+        tolerances: Optional[PreScreenTolerances] = None,
+        llm_client: Optional[Any] = None,
+        adherence_engine: Optional[MealAdherenceEngine] = None
+    ):
+        """
+        Initialize the NoChangePreScreenNode.
+
+        Args:
+            tolerances: Screening tolerances. If None, uses the defaults of PreScreenTolerances.
+            llm_client: Custom LLM client implementation. If None, uses the default BaseLLM.
+            adherence_engine: Macro adherence scoring. If None, uses the default MealAdherenceEngine.
+        """
+        self.tolerances = tolerances or PreScreenTolerances()
+        self.llm_client = llm_client or BaseLLM()
+        self.adherence_engine = adherence_engine or MealAdherenceEngine()
+
+    def evaluate(self, check_in: StandardizedCheckInData) -> PreScreenResult:
+        """
+        Run every pre-screen check over the standardized check-in data.
+
+        Args:
+            check_in: Standardized check-in data from CheckInDataIngestionModule
+
+        Returns:
+            PreScreenResult with the individual checks and the overall decision
+        """
+        goal_direction = self._infer_goal_direction(check_in)
+        adherence = self.adherence_engine.compute(
+            as_view(check_in.mealPlan),
+            as_view(check_in.dailyReports),
+            session_dates(check_in.exerciseLogs)
+        )
+        checks = [
+            self._check_report_coverage(check_in),
+            self._check_weight_trend(check_in, goal_direction),
+            self._check_macro_adherence(adherence),
+            self._check_session_completion(check_in),
+            self._check_progression(check_in),
+        ]
+        keep_plan = all(check.passed for check in checks)
+        logger.info(f"No-change pre-screen for {check_in.userId}: keep_plan={keep_plan}")
+        return PreScreenResult(
+            keep_plan=keep_plan,
+            goal_direction=goal_direction,
+            checks=checks,
+            calorie_adherence=adherence.calorie_adherence if adherence.days_reported else None
+        )
+
+    def build_no_change_response(self, check_in: StandardizedCheckInData, result: PreScreenResult) -> Dict[str, Any]:
+        """
+        Build the templated "no changes" decisions plus a brief LLM summary.
+
+        Args:
+            check_in: Standardized check-in data
+            result: A passing pre-screen result
+
+        Returns:
+            Dictionary with nutrition/training adjustments and the summary text
+        """
+        rationale = (
+            "All weekly check-in metrics are within tolerance "
+            f"({', '.join(check.detail for check in result.checks)}). Keep the current plan."
+        )
+        return {
+            "nutrition_adjustments": {
+                "macro_adjustments": [],
+                "calorie_adjustments": 0,
+                "meal_timing_changes": None,
+                "specific_food_recommendations": None,
+                "rationale": rationale,
+                "new_meal_plan": None
+            },
+            "training_adjustments": {
+                "exercise_modifications": [],
+                "volume_adjustments": [],
+                "intensity_changes": None,
+                "recovery_recommendations": None,
+                "exercise_additions": [],
+                "exercise_deletions": [],
+                "rationale": rationale,
+                "new_workout_plan": None
+            },
+            "summary": self._summarize(check_in, result)
+        }
+
+    def _summarize(self, check_in: StandardizedCheckInData, result: PreScreenResult) -> str:
+        """Ask the LLM for a short encouraging summary of a no-change week."""
+        prompt = (
+            f"Client goal this week: {check_in.goals.weeklyGoal}\n"
+            f"Goal direction: {result.goal_direction}\n"
+            "Check-in metrics (all within tolerance):\n" +
+            "\n".join(f"- {check.name}: {check.detail}" for check in result.checks) +
+            "\n\nWrite a brief (3-4 sentence) check-in summary telling the client the plan stays "
+            "the same this week and why."
+        )
+        system_message = (
+            "You are a supportive strength and nutrition coach writing short weekly check-in summaries."
+        )
+        return self.llm_client.call_llm(prompt, system_message, node=type(self).__name__)
+
+    def _infer_goal_direction(self, check_in: StandardizedCheckInData) -> str:
+        """The structured goal direction, else gain/lose/maintain inferred from the free-text goals."""
+        goals = check_in.goals
+        if goals.goalDirection is not None:
+            return goals.goalDirection
+        return infer_goal_direction([goals.weeklyGoal, goals.monthlyGoal, goals.quarterlyGoal])
+
+    def _check_report_coverage(self, check_in: StandardizedCheckInData) -> PreScreenCheck:
+        """Require enough daily reports for the other checks to be meaningful."""
+        count = len(check_in.dailyReports)
+        return PreScreenCheck(
+            name="report_coverage",
+            passed=count >= self.tolerances.min_daily_reports,
+            value=float(count),
+            detail=f"{count} daily reports"
+        )
+
+    def _check_weight_trend(self, check_in: StandardizedCheckInData, goal_direction: str) -> PreScreenCheck:
+        """
+        Compare the least-squares weekly weight slope against the goal direction.
+
+        Days are placed by their date; if any report lacks a parseable date, by their position
+        in the sorted week instead (never a mix of the two).
+        """
+        reports = sorted(check_in.dailyReports, key=lambda r: (r.date, r.day))
+        days = [to_epoch_day(report.date) for report in reports]
+        if any(math.isnan(day) for day in days):
+            days = [float(index) for index in range(len(reports))]
+        points = [(day, report.weight) for day, report in zip(days, reports) if report.weight > 0]
+        n = len(points)
+        mean_x = sum(x for x, _ in points) / n if points else 0.0
+        mean_y = sum(y for _, y in points) / n if points else 0.0
+        denominator = sum((x - mean_x) ** 2 for x, _ in points)
+        if n < 2 or denominator == 0:
+            return PreScreenCheck(name="weight_trend", passed=False, detail="not enough weigh-ins")
+
+        slope_per_day = sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator
+        weekly_rate = slope_per_day * 7 / mean_y * 100
+
+        tol = self.tolerances
+        if goal_direction == "gain":
+            passed = tol.gain_rate_min <= weekly_rate <= tol.gain_rate_max
+        elif goal_direction == "lose":
+            passed = tol.loss_rate_min <= -weekly_rate <= tol.loss_rate_max
+        else:
+            passed = abs(weekly_rate) <= tol.maintain_rate_max
+
+        return PreScreenCheck(
+            name="weight_trend",
+            passed=passed,
+            value=round(weekly_rate, 3),
+            detail=f"weight trend {weekly_rate:+.2f}% bodyweight/week (goal: {goal_direction})"
+        )
+
+    def _check_macro_adherence(self, analytics: MealAdherenceAnalytics) -> PreScreenCheck:
+        """
+        Check that mean per-macro adherence sits within the band, with every day scored against
+        its own (training or rest) targets exactly as the meal adherence extractor scores it.
+        """
+        adherence = analytics.macro_adherence
+        if not analytics.days_reported or len(adherence) < 3:
+            return PreScreenCheck(name="macro_adherence", passed=False, detail="missing macro targets or reports")
+
+        passed = all(
+            self.tolerances.macro_adherence_min <= value <= self.tolerances.macro_adherence_max
+            for value in adherence.values()
+        )
+        worst = max(adherence.values(), key=lambda value: abs(value - 100))
+        return PreScreenCheck(
+            name="macro_adherence",
+            passed=passed,
+            value=round(worst, 1),
+            detail="macro adherence " + ", ".join(f"{macro} {value:.0f}%" for macro, value in adherence.items())
+        )
+
+    def _check_session_completion(self, check_in: StandardizedCheckInData) -> PreScreenCheck:
+        """Compare distinct logged training dates against planned training days."""
+        planned = sum(1 for day in check_in.workoutPlan.schedule if day.type != "Rest Day" and day.exercises)
+        logged = len({
+            entry.date[:10]
+            for log in check_in.exerciseLogs
+            for entry in log.entries
+            if entry.date
+        })
+        if planned == 0:
+            return PreScreenCheck(name="session_completion", passed=False, detail="no planned sessions")
+
+        completion = min(logged / planned * 100, 100.0)
+        return PreScreenCheck(
+            name="session_completion",
+            passed=completion >= self.tolerances.session_completion_min,
+            value=round(completion, 1),
+            detail=f"{logged} sessions logged vs {planned} planned"
+        )
+
+    def _check_progression(self, check_in: StandardizedCheckInData) -> PreScreenCheck:
+        """Check that loads are holding or increasing across logged exercises."""
+        tracked = 0
+        progressing = 0
+        for log in check_in.exerciseLogs:
+            entries = sorted(log.entries, key=lambda entry: entry.date)
+            if len(entries) < 2:
+                continue
+            tracked += 1
+            if entries[-1].weight >= entries[0].weight:
+                progressing += 1
+
+        if tracked == 0:
+            return PreScreenCheck(name="progression", passed=True, detail="no repeated lifts to compare")
+
+        share = progressing / tracked * 100
+        return PreScreenCheck(
+            name="progression",
+            passed=share >= self.tolerances.progression_min,
+            value=round(share, 1),
+            detail=f"{progressing}/{tracked} lifts holding or progressing"
+        )
@@ -68,8 +68,7 @@ class NutritionAdjustmentNode:
         """
         self.llm_client = llm_client or BaseLLM()
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
-
+        
     def get_system_message(self) -> str:
         """
         Returns the system message to guide the LLM in nutrition adjustment decisions.
@@ -127,7 +126,8 @@ class NutritionAdjustmentNode:
             result = self.llm_client.call_llm(
                 prompt, 
                 system_message, 
-                schema=NutritionAdjustmentRecommendation
+                schema=NutritionAdjustmentRecommendation,
+                node=type(self).__name__
             )
             
             return result
@@ -160,8 +160,7 @@ class NutritionAdjustmentNode:
         """
         self.llm_client = llm_client or BaseLLM()
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
-
+        
     def get_system_message(self) -> str:
         """
         Returns the system message to guide the LLM in training adjustment decisions.
@@ -219,7 +218,8 @@ class NutritionAdjustmentNode:
             result = self.llm_client.call_llm(
                 prompt, 
                 system_message, 
-                schema=TrainingAdjustmentRecommendation
+                schema=TrainingAdjustmentRecommendation,
+                node=type(self).__name__
             )
             
             return result
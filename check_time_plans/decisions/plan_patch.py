@@ -0,0 +1,178 @@
+from typing import Dict, Any, List, Optional, Literal, Tuple, Type
+from pydantic import BaseModel, Field, ValidationError
+from check_time_plans.data_ingestion.check_in_ingestion import WorkoutPlan, MealPlan
+import copy
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PatchOperation(BaseModel):
+    """A single typed patch operation against a stored plan."""
+    op: Literal["replace", "add", "remove"] = Field(..., description="Operation type")
+    path: str = Field(
+        ...,
+        description="JSON-pointer path into the plan, e.g. '/schedule/0/exercises/1/sets' or "
+        "'/trainingDayMeals/2/items/-' to append to a list"
+    )
+    value: Optional[str] = Field(
+        None,
+        description="New value encoded as JSON (e.g. '4', '\"90 sec\"', '{\"name\": \"Dips\", \"sets\": 3}'). "
+        "Omit for 'remove'."
+    )
+    reason: Optional[str] = Field(None, description="Short reason for this change")
+
+class PlanPatch(BaseModel):
+    """Structured plan adjustment expressed as patch operations instead of full plans."""
+    workout_changes_required: bool = Field(..., description="Whether the workout plan needs any change")
+    nutrition_changes_required: bool = Field(..., description="Whether the meal plan needs any change")
+    workout_operations: List[PatchOperation] = Field(..., description="Patch operations for the workout plan")
+    meal_operations: List[PatchOperation] = Field(..., description="Patch operations for the meal plan")
+    rationale: str = Field(..., description="Why the changes are (or are not) needed")
+    four_week_goal: Optional[str] = Field(None, description="New four-week goal if it changed")
+
+class PlanPatchError(ValueError):
+    """Raised when a patch operation cannot be applied or the patched plan is invalid."""
+
+def _parse_pointer(path: str) -> List[str]:
+    """Split a JSON pointer into unescaped tokens; the plan root ("" or "/") cannot be patched."""
+    if path in ("", "/"):
+        raise PlanPatchError(f"Invalid path '{path}': cannot patch the plan root")
+    if not path.startswith("/"):
+        raise PlanPatchError(f"Invalid path '{path}': must start with '/'")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")]
+
+def _list_index(token: str, size: int) -> int:
+    """Parse a list index token, rejecting negative ("-1"), signed and out-of-range indexes."""
+    if not token.isdigit():
+        raise ValueError(token)
+    index = int(token)
+    if index >= size:
+        raise IndexError(token)
+    return index
+
+def _decode_value(value: Optional[str]) -> Any:
+    """Decode a JSON-encoded operation value, falling back to the raw string."""
+    if value is None:
+        return None
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return value
+
+def _resolve_parent(document: Any, tokens: List[str], path: str) -> Tuple[Any, str]:
+    """Walk to the container holding the final token of a path."""
+    current = document
+    for token in tokens[:-1]:
+        try:
+            current = current[_list_index(token, len(current))] if isinstance(current, list) else current[token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise PlanPatchError(f"Path '{path}' does not exist in the plan")
+    return current, tokens[-1]
+
+def _apply_operation(document: Any, operation: PatchOperation) -> Dict[str, Any]:
+    """Apply one operation in place and return its diff entry."""
+    tokens = _parse_pointer(operation.path)
+    parent, key = _resolve_parent(document, tokens, operation.path)
+    value = _decode_value(operation.value)
+
+    try:
+        if isinstance(parent, list):
+            if operation.op == "add":
+                # Insertion may also target the position just past the end
+                index = len(parent) if key == "-" else _list_index(key, len(parent) + 1)
+                parent.insert(index, value)
+                before = None
+            elif operation.op == "replace":
+                index = _list_index(key, len(parent))
+                before = parent[index]
+                parent[index] = value
+            else:
+                before = parent.pop(_list_index(key, len(parent)))
+                value = None
+        elif isinstance(parent, dict):
+            if operation.op == "remove":
+                before = parent.pop(key)
+                value = None
+            else:
+                if operation.op == "replace" and key not in parent:
+                    raise KeyError(key)
+                before = parent.get(key)
+                parent[key] = value
+        else:
+            raise TypeError(type(parent).__name__)
+    except (KeyError, IndexError, ValueError, TypeError):
+        raise PlanPatchError(f"Cannot {operation.op} at path '{operation.path}'")
+
+    return {
+        "op": operation.op,
+        "path": operation.path,
+        "before": before,
+        "after": value,
+        "reason": operation.reason
+    }
+
+def apply_plan_patch(
+    plan: BaseModel,
+    operations: List[PatchOperation],
+    model_class: Optional[Type[BaseModel]] = None
+) -> Tuple[BaseModel, List[Dict[str, Any]]]:
+    """
+    Apply patch operations to a plan and re-validate the result.
+
+    Operations are applied in order to a copy of the plan; the original is left untouched.
+
+    Args:
+        plan: Stored WorkoutPlan or MealPlan
+        operations: Patch operations returned by the LLM
+        model_class: Model used to validate the patched plan (defaults to the plan's class)
+
+    Returns:
+        Tuple of (patched plan, list of diff entries)
+
+    Raises:
+        PlanPatchError: If an operation cannot be applied or the patched plan fails validation
+    """
+    model_class = model_class or type(plan)
+    document = copy.deepcopy(plan.model_dump())
+    diff = [_apply_operation(document, operation) for operation in operations]
+
+    try:
+        patched = model_class(**document)
+    except ValidationError as e:
+        raise PlanPatchError(f"Patched {model_class.__name__} is invalid: {e}")
+
+    return patched, diff
+
+def apply_plan_adjustment(
+    patch: PlanPatch,
+    workout_plan: WorkoutPlan,
+    meal_plan: MealPlan
+) -> Dict[str, Any]:
+    """
+    Apply a full PlanPatch to the stored workout and meal plans.
+
+    Args:
+        patch: Structured adjustment from the LLM
+        workout_plan: Stored workout plan
+        meal_plan: Stored meal plan
+
+    Returns:
+        Dictionary with the patched plans, their diffs and the rationale
+    """
+    patched_workout, workout_diff = apply_plan_patch(workout_plan, patch.workout_operations, WorkoutPlan)
+    patched_meal, meal_diff = apply_plan_patch(meal_plan, patch.meal_operations, MealPlan)
+    logger.info(f"Applied {len(workout_diff)} workout and {len(meal_diff)} meal patch operations")
+
+    return {
+        "workout_changes_required": bool(workout_diff),
+        "nutrition_changes_required": bool(meal_diff),
+        "rationale": patch.rationale,
+        "four_week_goal": patch.four_week_goal,
+        "workout_plan": patched_workout.model_dump(),
+        "meal_plan": patched_meal.model_dump(),
+        "diff": {
+            "workout": workout_diff,
+            "meal": meal_diff
+        }
+    }
@@ -78,8 +78,7 @@ class TrainingAdjustmentNode:
         """
         self.llm_client = llm_client or BaseLLM()
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
-
+        
     def get_system_message(self) -> str:
         """
         Returns the system message to guide the LLM in training adjustment decisions.
@@ -137,7 +136,8 @@ class TrainingAdjustmentNode:
             result = self.llm_client.call_llm(
                 prompt, 
                 system_message, 
-                schema=TrainingAdjustmentRecommendation
+                schema=TrainingAdjustmentRecommendation,
+                node=type(self).__name__
             )
             
             return result
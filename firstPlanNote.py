@@ -1,18 +1,14 @@
 import os
 from typing import Dict, Any
 from datetime import datetime
-from dotenv import load_dotenv
-from openai import OpenAI
+from startup.clients import lazy_client
+from startup.config import get_settings
 
-# Load environment variables
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-
-OPENAI_MODEL = "gpt-4o-mini"
+# Shared client from the registry; built on first use
+client = lazy_client()
 
 # Ensure API key is set
-if not api_key:
+if not get_settings().openai_api_key:
     raise ValueError("Missing OpenAI API key")
 
 
@@ -3,10 +3,10 @@ import logging
 from typing import Dict, Any, Optional, List
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from check_time_plans.analytics.anthropometrics import AnthropometricsEngine, AnthropometricAnalysis, personal_metrics
 
 # Set up basic logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class StepReasoningForBodyAnalysis(BaseModel):
     explanation: str = Field(
@@ -109,12 +109,14 @@ class BodyCompositionModule:
     """
     Analyzes client body measurements and composition.
     
-    Uses an LLM-driven approach to analyze body proportions, estimate composition,
-    and provide training implications based on structural considerations.
+    Ratios, symmetry and the US Navy body-fat estimate are computed locally by
+    AnthropometricsEngine; the LLM interprets them to assess muscle groups, proportions
+    and training implications.
     """
-    def __init__(self, llm_client: Optional[Any] = None):
+    def __init__(self, llm_client: Optional[Any] = None, engine: Optional[AnthropometricsEngine] = None):
         # Use provided LLM client or fallback to the BaseLLM
         self.llm_client = llm_client or BaseLLM()
+        self.engine = engine or AnthropometricsEngine()
 
     def process(self, standardized_profile: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -125,8 +127,9 @@ class BodyCompositionModule:
         """
         try:
            ##  body_analysis = self._analyze_body_composition(standardized_profile)
-            body_analysis_schema = self._analyze_body_composition_schema(standardized_profile)
-            return {"body_analysis_schema": body_analysis_schema}
+            analysis = self._compute_anthropometrics(standardized_profile)
+            body_analysis_schema = self._analyze_body_composition_schema(standardized_profile, analysis)
+            return {"body_analysis_schema": body_analysis_schema, "anthropometrics": analysis.model_dump()}
         except Exception as e:
             logger.error("Error during body composition analysis: %s", e)
             raise e
@@ -252,18 +255,33 @@ class BodyCompositionModule:
         }
 
         # Call the LLM using the defined function schema
-        result = self.llm_client.call_llm(prompt, system_message, function_schema=function_schema)
+        result = self.llm_client.call_llm(prompt, system_message, function_schema=function_schema, node=type(self).__name__)
         return result
     
-    def _analyze_body_composition_schema(self, standardized_profile: Dict[str, Any]) -> Dict[str, Any]:
+    def _compute_anthropometrics(self, standardized_profile: Dict[str, Any]) -> AnthropometricAnalysis:
+        """
+        Computes ratios, symmetry, body fat and BMI from the profile's measurements.
+        
+        :param standardized_profile: The standardized client profile.
+        :return: Deterministic anthropometric analysis.
+        """
+        measurements_data = standardized_profile.get("body_composition") or standardized_profile.get("measurements", {})
+        sex, height_cm, weight = personal_metrics(standardized_profile.get("personal_info", {}))
+        return self.engine.analyze(measurements_data, sex=sex, height_cm=height_cm, weight_current=weight)
+
+    def _analyze_body_composition_schema(
+        self,
+        standardized_profile: Dict[str, Any],
+        analysis: AnthropometricAnalysis
+    ) -> Dict[str, Any]:
         """
         Uses an LLM with Pydantic schema to analyze body composition.
         
         :param standardized_profile: The standardized client profile.
+        :param analysis: Anthropometrics computed by the engine.
         :return: Structured body composition analysis as a Pydantic model.
         """
         personal_info = standardized_profile.get("personal_info", {})
-        measurements_data = standardized_profile.get("measurements", {})
 
         system_message = self.get_body_analysis_system_message()
         
@@ -271,14 +289,25 @@ class BodyCompositionModule:
             "Analyze this client's body composition using anthropometric measurements and exercise science principles. "
             "Document your reasoning process and assessment methodology for each conclusion.\n\n"
             f"CLIENT PROFILE:\n{json.dumps(personal_info)}\n\n"
-            f"CLIENT MEASUREMENTS:\n{json.dumps(measurements_data)}\n\n"
+            f"COMPUTED ANTHROPOMETRICS (measurements in cm, ratios, right-left difference %, US Navy body fat):\n"
+            f"{self.engine.format_summary(analysis)}\n\n"
             "Provide a detailed analysis that includes muscle group assessments, proportion analysis, "
             "composition estimates, and specific training implications based on structural considerations. "
-            "Use established anthropometric formulas and ratios where appropriate, and be honest about "
+            "The computed values are exact; use them instead of recalculating, and be honest about "
             "assessment limitations when measurements are incomplete.\n\n"
             "Return your analysis as a properly structured JSON conforming to the BodyComposition model schema."
         )
         
         # Call the LLM using the Pydantic model as schema
-        result = self.llm_client.call_llm(prompt, system_message, schema=BodyComposition)
-        return result
\ No newline at end of file
+        result = self.llm_client.call_llm(prompt, system_message, schema=BodyComposition, node=type(self).__name__)
+
+        # Keep the deterministic estimates when the measurements allow them
+        body_fat = analysis.current.body_fat_percentage
+        if body_fat is not None and isinstance(result, dict):
+            estimates = result.setdefault("composition_estimates", {})
+            estimates["estimated_body_fat_percentage"] = f"{body_fat}% (US Navy circumference method)"
+            if analysis.current.lean_mass is not None:
+                estimates["lean_mass_estimate"] = (
+                    f"{analysis.current.lean_mass} kg (body weight x (1 - body fat), US Navy estimate)"
+                )
+        return result
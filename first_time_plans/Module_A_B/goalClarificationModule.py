@@ -6,7 +6,6 @@ from pydantic import BaseModel, Field
 
 # Set up basic logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 
 
@@ -298,7 +297,7 @@ class GoalClarificationModule:
         }
 
         # Call the LLM using the defined function schema
-        result = self.llm_client.call_llm(prompt, system_message, function_schema=function_schema)
+        result = self.llm_client.call_llm(prompt, system_message, function_schema=function_schema, node=type(self).__name__)
         return result
     
     def _analyze_goals_schema(self, standardized_profile: Dict[str, Any]) -> Dict[str, Any]:
@@ -327,6 +326,6 @@ class GoalClarificationModule:
         )
         
         # Call the LLM using the Pydantic model as schema
-        result = self.llm_client.call_llm(prompt, system_message, schema=Goal)
+        result = self.llm_client.call_llm(prompt, system_message, schema=Goal, node=type(self).__name__)
         return result
     
\ No newline at end of file
@@ -0,0 +1,250 @@
+import re
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional, Callable
+from first_time_plans.prompt_prefix import canonical_json
+
+logger = logging.getLogger(__name__)
+
+NUMBER = r"(\d+(?:[.,]\d+)?)"
+
+HEIGHT_UNITS_CM = {
+    "cm": 1.0, "centimeter": 1.0, "centimeters": 1.0, "centimetre": 1.0, "centimetres": 1.0,
+    "mm": 0.1, "m": 100.0, "meter": 100.0, "meters": 100.0, "metre": 100.0, "metres": 100.0,
+    "in": 2.54, "inch": 2.54, "inches": 2.54, '"': 2.54, "''": 2.54,
+}
+WEIGHT_UNITS_KG = {
+    "kg": 1.0, "kgs": 1.0, "kilo": 1.0, "kilos": 1.0, "kilogram": 1.0, "kilograms": 1.0,
+    "lb": 0.45359237, "lbs": 0.45359237, "pound": 0.45359237, "pounds": 0.45359237,
+}
+DURATION_UNITS_MIN = {
+    "min": 1.0, "mins": 1.0, "minute": 1.0, "minutes": 1.0,
+    "h": 60.0, "hr": 60.0, "hrs": 60.0, "hour": 60.0, "hours": 60.0,
+}
+
+FEET_INCHES = re.compile(rf"^{NUMBER}\s*(?:ft|feet|foot|')\s*(?:{NUMBER}\s*(?:in|inch|inches|\"|'')?)?$")
+# The unit is required: a bare number is left for the caller rather than given a guessed unit
+HEIGHT = re.compile(rf"^{NUMBER}\s*({'|'.join(map(re.escape, sorted(HEIGHT_UNITS_CM, key=len, reverse=True)))})$")
+WEIGHT = re.compile(rf"^{NUMBER}\s*({'|'.join(sorted(WEIGHT_UNITS_KG, key=len, reverse=True))})$")
+DURATION = re.compile(rf"^{NUMBER}(?:\s*-\s*{NUMBER})?\s*({'|'.join(sorted(DURATION_UNITS_MIN, key=len, reverse=True))})$")
+FREQUENCY = re.compile(rf"^(\d+)(?:\s*(?:-|to)\s*(\d+))?\s*(?:x|times?|days?|sessions?)(?:\s*(?:a|per|/)\s*(?:week|wk))?$")
+AGE = re.compile(rf"^{NUMBER}\s*(?:y|yo|yrs?|years?)?(?:\s*old)?$")
+PLAIN_NUMBER = re.compile(r"^-?\d+(?:\.\d+)?$")
+
+# Synonym -> canonical value, matched against the lower-cased value with punctuation removed
+ACTIVITY_LEVELS = {
+    "sedentary": "sedentary", "inactive": "sedentary", "not active": "sedentary", "very low": "sedentary",
+    "lightly active": "lightly active", "light": "lightly active", "low": "lightly active", "slightly active": "lightly active",
+    "moderately active": "moderately active", "moderate": "moderately active", "medium": "moderately active",
+    "active": "moderately active", "very active": "very active", "high": "very active",
+    "extremely active": "extremely active", "extra active": "extremely active", "very high": "extremely active",
+}
+EXPERIENCE_LEVELS = {
+    "beginner": "beginner", "novice": "beginner", "new": "beginner", "none": "beginner", "low": "beginner",
+    "intermediate": "intermediate", "moderate": "intermediate", "medium": "intermediate", "average": "intermediate",
+    "advanced": "advanced", "expert": "advanced", "experienced": "advanced", "high": "advanced",
+}
+GOALS = {
+    "fat loss": "fat loss", "lose fat": "fat loss", "weight loss": "fat loss", "lose weight": "fat loss",
+    "cut": "fat loss", "cutting": "fat loss", "get lean": "fat loss",
+    "muscle gain": "muscle gain", "gain muscle": "muscle gain", "build muscle": "muscle gain",
+    "hypertrophy": "muscle gain", "bulk": "muscle gain", "bulking": "muscle gain", "gain weight": "muscle gain",
+    "recomposition": "recomposition", "recomp": "recomposition", "body recomposition": "recomposition",
+    "strength": "strength", "get stronger": "strength", "increase strength": "strength",
+    "maintenance": "maintenance", "maintain": "maintenance", "maintain weight": "maintenance",
+    "endurance": "endurance", "improve endurance": "endurance",
+    "general fitness": "general fitness", "health": "general fitness", "stay healthy": "general fitness",
+}
+GENDERS = {"m": "male", "male": "male", "man": "male", "f": "female", "female": "female", "woman": "female"}
+
+# Field names are matched case- and separator-insensitively (main_goals == mainGoals == maingoals)
+HEIGHT_FIELDS = {"height"}
+WEIGHT_FIELDS = {"weight", "currentweight", "targetweight", "goalweight", "bodyweight"}
+AGE_FIELDS = {"age"}
+DURATION_FIELDS = {"weeklyexercisetime", "workhours", "sessionduration", "sessionlength", "workoutduration", "sleep", "sleephours", "sleepduration"}
+FREQUENCY_FIELDS = {"trainingfrequency", "exercisefrequency", "weeklyfrequency", "daysperweek", "exerciseroutine"}
+ENUM_FIELDS = {
+    "activitylevel": ACTIVITY_LEVELS,
+    "experience": EXPERIENCE_LEVELS, "experiencelevel": EXPERIENCE_LEVELS, "traininglevel": EXPERIENCE_LEVELS,
+    "fitnessknowledge": EXPERIENCE_LEVELS, "rateyourfitnesslevel": EXPERIENCE_LEVELS,
+    "goal": GOALS, "goals": GOALS, "maingoal": GOALS, "maingoals": GOALS, "primarygoal": GOALS, "primarygoals": GOALS,
+    "gender": GENDERS, "sex": GENDERS,
+}
+# Free-text fields holding comma-separated items, whose order carries no meaning
+LIST_FIELDS = {
+    "supplements", "fitnessequipment", "equipment", "bodyparts", "musclefocus", "sports", "injuries",
+    "exercisetypedoyoudo", "exerciseleastliked", "exercisemostliked", "dietpreference", "allergies",
+}
+# Identity and timestamp fields: copied as is and left out of the profile hash
+IDENTITY_FIELDS = ("user_id", "measurement_date")
+
+
+def _field(key: str) -> str:
+    """Normalize a field name for lookups (lower case, no separators)."""
+    return re.sub(r"[^a-z0-9]", "", str(key).lower())
+
+
+def _number(text: str) -> float:
+    """Parse a number that may use a decimal comma."""
+    return float(text.replace(",", "."))
+
+
+def _fmt(value: float) -> str:
+    """Format a quantity with at most one decimal and no trailing zero."""
+    value = round(value, 1)
+    return str(int(value)) if value == int(value) else str(value)
+
+
+def parse_height(value: str) -> Optional[str]:
+    """'6ft 2in', "6'2\"", '1.83 m' or '72 inches' -> '188 cm' style; None if not a height with a unit."""
+    match = FEET_INCHES.match(value)
+    if match:
+        feet, inches = match.groups()
+        return f"{_fmt(_number(feet) * 30.48 + _number(inches or '0') * 2.54)} cm"
+    match = HEIGHT.match(value)
+    if not match:
+        return None
+    return f"{_fmt(_number(match.group(1)) * HEIGHT_UNITS_CM[match.group(2)])} cm"
+
+
+def parse_weight(value: str) -> Optional[str]:
+    """'180 lbs' or '82kg' -> '81.6 kg' style; None if not a weight with a unit."""
+    match = WEIGHT.match(value)
+    if not match:
+        return None
+    return f"{_fmt(_number(match.group(1)) * WEIGHT_UNITS_KG[match.group(2)])} kg"
+
+
+def parse_duration(value: str) -> Optional[str]:
+    """'1.5 hours', '45 mins' or '7-8 hours' -> minutes ('90 min', '420-480 min'); None if not a duration."""
+    match = DURATION.match(value)
+    if not match:
+        return None
+    low, high, unit = match.groups()
+    factor = DURATION_UNITS_MIN[unit]
+    minutes = _fmt(_number(low) * factor)
+    return f"{minutes}-{_fmt(_number(high) * factor)} min" if high else f"{minutes} min"
+
+
+def parse_frequency(value: str) -> Optional[str]:
+    """'3-4 days', '4x a week' or '3 to 4 sessions' -> '3-4 days/week' style; None if not a frequency."""
+    match = FREQUENCY.match(value)
+    if not match:
+        return None
+    low, high = match.groups()
+    return f"{low}-{high} days/week" if high and high != low else f"{low} days/week"
+
+
+def parse_age(value: str) -> Optional[int]:
+    """'25', '25 years' or '25 yo' -> 25; None if not an age."""
+    match = AGE.match(value)
+    return int(_number(match.group(1))) if match else None
+
+
+def parse_enum(value: str, synonyms: Dict[str, str]) -> str:
+    """
+    Map each comma-separated item of a value onto its canonical enumeration value.
+
+    Unknown items are kept as written (lower-cased); several items are de-duplicated and sorted.
+    """
+    items = []
+    for item in re.split(r"\s*[,;/]\s*|\s+and\s+", value):
+        key = re.sub(r"[^a-z0-9 ]", "", item.lower()).strip()
+        if key:
+            items.append(synonyms.get(key, key))
+    return ", ".join(sorted(set(items)))
+
+
+def parse_list(value: str) -> str:
+    """De-duplicate and sort the comma-separated items of a free-text list."""
+    items = {}
+    for item in re.split(r"\s*[,;]\s*", value):
+        if item:
+            items.setdefault(item.lower(), item)
+    return ", ".join(items[key] for key in sorted(items))
+
+
+FIELD_PARSERS: Dict[str, Callable[[str], Any]] = {
+    **{name: parse_height for name in HEIGHT_FIELDS},
+    **{name: parse_weight for name in WEIGHT_FIELDS},
+    **{name: parse_age for name in AGE_FIELDS},
+    **{name: parse_duration for name in DURATION_FIELDS},
+    **{name: parse_frequency for name in FREQUENCY_FIELDS},
+    **{name: (lambda value, synonyms=synonyms: parse_enum(value, synonyms)) for name, synonyms in ENUM_FIELDS.items()},
+    **{name: parse_list for name in LIST_FIELDS},
+}
+
+
+class ProfileCanonicalizer:
+    """
+    ProfileCanonicalizer turns the standardized profile produced by DataIngestionModule into
+    its canonical form, so that semantically identical profiles serialize identically.
+
+    - Heights become 'N cm', weights 'N kg', durations 'N min' and training frequencies
+      'N days/week' when a unit is given; ages and plain numeric strings become numbers.
+    - Activity level, experience, goals and gender are mapped onto fixed vocabularies.
+    - Comma-separated free-text lists and lists of plain values are de-duplicated and sorted.
+    - Whitespace is collapsed, empty values are dropped and keys are sorted.
+
+    Values a parser does not recognize are kept (whitespace-normalized) rather than guessed at.
+    """
+
+    def canonicalize(self, profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the canonical form of a standardized profile.
+
+        :param profile: Output of DataIngestionModule.process_data.
+        :return: Canonical profile with the same sections and field names.
+        """
+        canonical = self._canonical({key: value for key, value in profile.items() if key not in IDENTITY_FIELDS}) or {}
+        canonical.update({key: profile[key] for key in IDENTITY_FIELDS if key in profile})
+        return canonical
+
+    def profile_hash(self, profile: Dict[str, Any]) -> str:
+        """
+        Stable hash of a canonical profile, ignoring the user id and measurement date.
+
+        :param profile: Canonical profile.
+        :return: Hex SHA-256 of its canonical JSON.
+        """
+        content = {key: value for key, value in profile.items() if key not in IDENTITY_FIELDS}
+        return hashlib.sha256(canonical_json(content).encode("utf-8")).hexdigest()
+
+    def _canonical(self, value: Any, field: str = "") -> Any:
+        """Canonicalize a value found under a field; returns None for empty values."""
+        if isinstance(value, dict):
+            items = ((key, self._canonical(item, _field(key))) for key, item in value.items())
+            canonical = {key: item for key, item in sorted(items, key=lambda pair: str(pair[0])) if item is not None}
+            return canonical or None
+        if isinstance(value, (list, tuple)):
+            return self._canonical_list(value, field)
+        if isinstance(value, str):
+            return self._canonical_string(value, field)
+        return value
+
+    def _canonical_list(self, values: List[Any], field: str) -> Optional[List[Any]]:
+        """Canonicalize list items; lists of plain values are de-duplicated and sorted."""
+        items = [item for item in (self._canonical(value, field) for value in values) if item is not None]
+        if not items:
+            return None
+        if all(isinstance(item, (str, int, float, bool)) for item in items):
+            unique = {canonical_json(item): item for item in items}
+            return [unique[key] for key in sorted(unique)]
+        # Lists of records (exercises, meals, ...) keep their order
+        return items
+
+    def _canonical_string(self, value: str, field: str) -> Any:
+        """Parse a string by its field, falling back to the whitespace-normalized text."""
+        text = " ".join(value.split())
+        if not text:
+            return None
+        parser = FIELD_PARSERS.get(field)
+        if parser is not None:
+            # Free-text lists keep their casing; every other parser works on lower-cased text
+            parsed = parser(text if parser is parse_list else text.lower())
+            if parsed not in (None, ""):
+                return parsed
+        if PLAIN_NUMBER.match(text):
+            number = float(text)
+            return int(number) if number.is_integer() else number
+        return text
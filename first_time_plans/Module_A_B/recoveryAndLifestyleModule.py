@@ -6,7 +6,6 @@ from first_time_plans.call_llm_class import BaseLLM
 
 # Set up basic logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class StepReasoningForLifestyleAnalysis(BaseModel):
     explanation: str = Field(
@@ -276,7 +275,7 @@ class RecoveryAndLifestyleModule:
         }
 
         # Call the LLM using the defined function schema
-        result = self.llm_client.call_llm(prompt, system_message, function_schema=function_schema)
+        result = self.llm_client.call_llm(prompt, system_message, function_schema=function_schema, node=type(self).__name__)
         return result
     
     def _analyze_recovery_lifestyle_schema(self, standardized_profile: Dict[str, Any]) -> Dict[str, Any]:
@@ -307,5 +306,5 @@ class RecoveryAndLifestyleModule:
         )
         
         # Call the LLM using the Pydantic model as schema
-        result = self.llm_client.call_llm(prompt, system_message, schema=RecoveryAndLifestyle)
+        result = self.llm_client.call_llm(prompt, system_message, schema=RecoveryAndLifestyle, node=type(self).__name__)
         return result
\ No newline at end of file
@@ -6,7 +6,6 @@ from first_time_plans.call_llm_class import BaseLLM
 
 # Set up basic logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class StepReasoningForHistoryAnalysis(BaseModel):
     explanation: str = Field(
@@ -211,5 +210,5 @@ class TrainingHistoryModule:
         )
         
         # Call the LLM using the Pydantic model as schema
-        result = self.llm_client.call_llm(prompt, system_message, schema=TrainingHistory)
+        result = self.llm_client.call_llm(prompt, system_message, schema=TrainingHistory, node=type(self).__name__)
         return result
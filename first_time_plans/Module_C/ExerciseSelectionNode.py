@@ -1,12 +1,12 @@
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.circuit_breaker import CircuitOpen
+from first_time_plans.deterministic_plans import catalog_exercise_selection, profile_facts, template_split
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class ExerciseDetails(BaseModel):
     """Detailed information about a selected exercise."""
@@ -59,6 +59,10 @@ class ExerciseSelectionDecisionNode:
     with the client's goals, biomechanical needs, training history, and the
     established training split and volume guidelines.
     """
+
+    # Upstream fields the prompt uses: the node can start as soon as these are final
+    SPLIT_FIELDS = ("split_type", "training_frequency")
+    VOLUME_FIELDS = ("muscle_group_recommendations",)
     
     def __init__(self, llm_client: Optional[Any] = None):
         """
@@ -90,8 +94,8 @@ class ExerciseSelectionDecisionNode:
         Args:
             standardized_profile: Standardized client profile data
             history_analysis: Training history and experience analysis
-            split_recommendation: Recommended training split
-            volume_guidelines: Volume and intensity guidelines
+            split_recommendation: Recommended training split (at least SPLIT_FIELDS)
+            volume_guidelines: Volume and intensity guidelines (at least VOLUME_FIELDS)
             
         Returns:
             A dictionary containing the structured exercise selection plan
@@ -106,10 +110,44 @@ class ExerciseSelectionDecisionNode:
                 "exercise_selection_plan": schema_result
             }
             
+        except CircuitOpen as e:
+            logger.warning(f"{str(e)}; selecting exercises from the catalog")
+            return self.fallback(standardized_profile, history_analysis, split_recommendation, volume_guidelines)
         except Exception as e:
             logger.error(f"Error determining exercise selection: {str(e)}")
             raise e
     
+    def fallback(
+        self,
+        standardized_profile: Dict[str, Any],
+        history_analysis: Dict[str, Any],
+        split_recommendation: Dict[str, Any],
+        volume_guidelines: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Exercise selection without the LLM: for every day of the split, catalog exercises for
+        its muscle groups that the client's equipment and experience allow. Served, marked
+        degraded, while the LLM circuit is open.
+        
+        Args:
+            standardized_profile: Standardized client profile data
+            history_analysis: Training history and experience analysis (unused)
+            split_recommendation: Recommended training split; the template split if it has no days
+            volume_guidelines: Volume and intensity guidelines (unused)
+            
+        Returns:
+            The same structure as process(), with degraded set
+        """
+        facts = profile_facts(standardized_profile)
+        split = (split_recommendation or {}).get("training_split_recommendation") or {}
+        if not split.get("split_days"):
+            split = template_split(facts)
+        plan = ExerciseSelectionPlan(**catalog_exercise_selection(split, facts))
+        return {
+            "exercise_selection_plan": plan.model_dump(),
+            "degraded": True
+        }
+    
     def get_system_message(self) -> str:
         """
         Returns the system message to guide the LLM in exercise selection decision-making.
@@ -178,13 +216,13 @@ class ExerciseSelectionDecisionNode:
         disliked_exercises = standardized_profile.get("fitness", {}).get("data", {}).get("exercise_leastLiked", "Unknown")
         
         # Extract training split information
-        split_schema = split_recommendation.get("split_recommendation_schema", {})
-        split_name = split_schema.get("split_name", "Unknown Split")
-        weekly_schedule = split_schema.get("weekly_schedule", {})
+        split = split_recommendation.get("training_split_recommendation") or {}
+        split_name = split.get("split_type", "Unknown Split")
+        training_frequency = split.get("training_frequency", "Unknown")
         
         # Extract volume guidelines
-        volume_intensity_rec = volume_guidelines.get("volume_intensity_recommendation", {})
-        muscle_guidelines = volume_intensity_rec.get("muscle_group_guidelines", [])
+        volume_intensity_rec = volume_guidelines.get("volume_intensity_recommendation") or {}
+        muscle_guidelines = volume_intensity_rec.get("muscle_group_recommendations", [])
         
         # Construct detailed prompt with comprehensive client data
         prompt = (
@@ -201,7 +239,7 @@ class ExerciseSelectionDecisionNode:
             f"- Disliked/Problematic Exercises: {disliked_exercises}\n\n"
             
             f"TRAINING SPLIT: {split_name}\n"
-            f"Weekly Schedule:\n{self._format_dict(weekly_schedule)}\n\n"
+            f"Training Frequency: {training_frequency} days per week\n\n"
             
             f"VOLUME GUIDELINES BY MUSCLE GROUP:\n{self._format_dict(muscle_guidelines)}\n\n"
             
@@ -221,7 +259,7 @@ class ExerciseSelectionDecisionNode:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=ExerciseSelectionPlan)
+        result = self.llm_client.call_llm(prompt, system_message, schema=ExerciseSelectionPlan, node=type(self).__name__)
         return result
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
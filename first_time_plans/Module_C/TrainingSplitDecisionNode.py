@@ -1,12 +1,13 @@
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.circuit_breaker import CircuitOpen
+from first_time_plans.partial_output import FieldEvents
+from first_time_plans.deterministic_plans import profile_facts, template_split
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class SplitDayDetails(BaseModel):
     """Details for a specific training day in the split."""
@@ -63,7 +64,8 @@ class TrainingSplitDecisionNode:
         goal_analysis: Dict[str, Any],
         body_analysis: Dict[str, Any],
         history_analysis: Dict[str, Any],
-        recovery_analysis: Dict[str, Any] = None
+        recovery_analysis: Dict[str, Any] = None,
+        fields: Optional[FieldEvents] = None
     ) -> Dict[str, Any]:
         """
         Process client data to determine the optimal training split.
@@ -82,6 +84,7 @@ class TrainingSplitDecisionNode:
             body_analysis: Body composition and measurement analysis
             history_analysis: Training history and experience analysis
             recovery_analysis: Recovery capacity and lifestyle analysis (optional)
+            fields: Receives the recommendation's fields as they become final (optional)
             
         Returns:
             A dictionary containing the structured training split recommendation
@@ -89,17 +92,47 @@ class TrainingSplitDecisionNode:
         try:
             # Process using the schema-based approach
             schema_result = self._determine_training_split_schema(
-                client_profile, goal_analysis, body_analysis, history_analysis, recovery_analysis
+                client_profile, goal_analysis, body_analysis, history_analysis, recovery_analysis, fields
             )
             
             return {
                 "training_split_recommendation": schema_result
             }
             
+        except CircuitOpen as e:
+            logger.warning(f"{str(e)}; using the template split")
+            return self.fallback(client_profile, goal_analysis, body_analysis, history_analysis, recovery_analysis)
         except Exception as e:
             logger.error(f"Error determining training split: {str(e)}")
             raise e
     
+    def fallback(
+        self,
+        client_profile: Dict[str, Any],
+        goal_analysis: Dict[str, Any],
+        body_analysis: Dict[str, Any],
+        history_analysis: Dict[str, Any],
+        recovery_analysis: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Training split without the LLM: the template for the client's weekly training days
+        (full body, upper/lower or push/pull/legs). Served, marked degraded, while the LLM
+        circuit is open.
+        
+        Args:
+            client_profile: Standardized client profile data
+            goal_analysis: Client goals and objectives analysis
+            body_analysis, history_analysis, recovery_analysis: Unused
+            
+        Returns:
+            The same structure as process(), with degraded set
+        """
+        split = TrainingSplitRecommendation(**template_split(profile_facts(client_profile, goal_analysis)))
+        return {
+            "training_split_recommendation": split.model_dump(),
+            "degraded": True
+        }
+    
     def get_system_message(self) -> str:
         """
         Returns the system message to guide the LLM in training split decision-making.
@@ -144,7 +177,8 @@ class TrainingSplitDecisionNode:
         goal_analysis: Dict[str, Any],
         body_analysis: Dict[str, Any],
         history_analysis: Dict[str, Any],
-        recovery_analysis: Dict[str, Any] = None
+        recovery_analysis: Dict[str, Any] = None,
+        fields: Optional[FieldEvents] = None
     ) -> Dict[str, Any]:
         """
         Determine the optimal training split using Pydantic schema validation.
@@ -155,6 +189,7 @@ class TrainingSplitDecisionNode:
             body_analysis: Body composition and measurement analysis
             history_analysis: Training history and experience analysis
             recovery_analysis: Recovery capacity and lifestyle analysis (optional)
+            fields: Receives the recommendation's fields as they become final (optional)
             
         Returns:
             Structured training split recommendation as a Pydantic model
@@ -215,7 +250,7 @@ class TrainingSplitDecisionNode:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=TrainingSplitRecommendation)
+        result = self.llm_client.call_llm(prompt, system_message, schema=TrainingSplitRecommendation, node=type(self).__name__, fields=fields)
         return result
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
@@ -2,11 +2,10 @@ import logging
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.partial_output import FieldEvents
 import json
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class VolumePerMuscleGroup(BaseModel):
     """Represents volume recommendations for a specific muscle group."""
@@ -67,7 +66,8 @@ class VolumeAndIntensityDecisionNode:
         client_data: Dict[str, Any],
         history_analysis: Dict[str, Any], 
         body_analysis: Dict[str, Any], 
-        goal_analysis: Dict[str, Any]
+        goal_analysis: Dict[str, Any],
+        fields: Optional[FieldEvents] = None
     ) -> Dict[str, Any]:
         """
         Process client data to determine optimal volume and intensity parameters.
@@ -84,6 +84,7 @@ class VolumeAndIntensityDecisionNode:
             history_analysis: Training history and experience analysis
             body_analysis: Body composition and measurement analysis
             goal_analysis: Client goals and objectives analysis
+            fields: Receives the recommendation's fields as they become final (optional)
             
         Returns:
             A dictionary containing structured volume and intensity recommendations
@@ -91,7 +92,7 @@ class VolumeAndIntensityDecisionNode:
         try:
             # Process using the schema-based approach
             schema_result = self._determine_volume_intensity_schema(
-                client_data, history_analysis, body_analysis, goal_analysis
+                client_data, history_analysis, body_analysis, goal_analysis, fields
             )
             
             return {
@@ -139,7 +140,8 @@ class VolumeAndIntensityDecisionNode:
         client_data: Dict[str, Any],
         history_analysis: Dict[str, Any], 
         body_analysis: Dict[str, Any], 
-        goal_analysis: Dict[str, Any]
+        goal_analysis: Dict[str, Any],
+        fields: Optional[FieldEvents] = None
     ) -> Dict[str, Any]:
         """
         Determine volume and intensity parameters using Pydantic schema validation.
@@ -149,6 +151,7 @@ class VolumeAndIntensityDecisionNode:
             history_analysis: Training history and experience analysis
             body_analysis: Body composition and measurement analysis
             goal_analysis: Client goals and objectives analysis
+            fields: Receives the recommendation's fields as they become final (optional)
             
         Returns:
             Structured volume and intensity recommendation as a Pydantic model
@@ -188,7 +191,7 @@ class VolumeAndIntensityDecisionNode:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=VolumeAndIntensityRecommendation)
+        result = self.llm_client.call_llm(prompt, system_message, schema=VolumeAndIntensityRecommendation, node=type(self).__name__, fields=fields)
         return result
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
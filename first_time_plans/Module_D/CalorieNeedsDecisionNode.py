@@ -1,12 +1,12 @@
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.circuit_breaker import CircuitOpen
+from first_time_plans.deterministic_plans import calculate_caloric_targets, profile_facts
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class BMRComponent(BaseModel):
     """Basal Metabolic Rate calculation results."""
@@ -108,10 +108,37 @@ class CaloricNeedsDecisionNode:
                 "caloric_targets": schema_result
             }
             
+        except CircuitOpen as e:
+            logger.warning(f"{str(e)}; using calculated caloric targets")
+            return self.fallback(client_data, body_analysis, goal_analysis)
         except Exception as e:
             logger.error(f"Error determining caloric needs: {str(e)}")
             raise e
     
+    def fallback(
+        self,
+        client_data: Dict[str, Any],
+        body_analysis: Dict[str, Any],
+        goal_analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Caloric targets without the LLM: Mifflin-St Jeor BMR, standard activity factors and a
+        goal percentage. Served, marked degraded, while the LLM circuit is open.
+        
+        Args:
+            client_data: Raw client profile data
+            body_analysis: Body composition and measurement analysis (unused)
+            goal_analysis: Client goals and objectives analysis
+            
+        Returns:
+            The same structure as process(), with degraded set
+        """
+        targets = CaloricTargets(**calculate_caloric_targets(profile_facts(client_data, goal_analysis)))
+        return {
+            "caloric_targets": targets.model_dump(),
+            "degraded": True
+        }
+    
     def get_system_message(self) -> str:
         """
         Returns the system message to guide the LLM in caloric needs determination.
@@ -206,7 +233,7 @@ class CaloricNeedsDecisionNode:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=CaloricTargets)
+        result = self.llm_client.call_llm(prompt, system_message, schema=CaloricTargets, node=type(self).__name__)
         return result
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
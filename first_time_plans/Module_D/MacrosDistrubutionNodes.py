@@ -1,12 +1,12 @@
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.circuit_breaker import CircuitOpen
+from first_time_plans.deterministic_plans import calculate_macro_plan, profile_facts
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class MacroNutrientTargets(BaseModel):
     """Detailed macronutrient targets."""
@@ -103,10 +103,43 @@ class MacroDistributionDecisionNode:
                 "macro_plan": schema_result
             }
             
+        except CircuitOpen as e:
+            logger.warning(f"{str(e)}; using calculated macro distribution")
+            return self.fallback(caloric_targets, client_data, body_analysis, goal_analysis, history_analysis)
         except Exception as e:
             logger.error(f"Error determining macronutrient distribution: {str(e)}")
             raise e
     
+    def fallback(
+        self,
+        caloric_targets: Dict[str, Any],
+        client_data: Dict[str, Any],
+        body_analysis: Dict[str, Any],
+        goal_analysis: Dict[str, Any],
+        history_analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Macro distribution without the LLM: protein in g/kg for the goal, a fixed fat share
+        with a g/kg floor and carbohydrates for the rest, applied to the given caloric targets.
+        Served, marked degraded, while the LLM circuit is open.
+        
+        Args:
+            caloric_targets: Caloric needs assessment (LLM or calculated)
+            client_data: Raw client profile data
+            body_analysis: Body composition and measurement analysis (unused)
+            goal_analysis: Client goals and objectives analysis
+            history_analysis: Training history and experience analysis (unused)
+            
+        Returns:
+            The same structure as process(), with degraded set
+        """
+        facts = profile_facts(client_data, goal_analysis)
+        plan = MacroDistributionPlan(**calculate_macro_plan((caloric_targets or {}).get("caloric_targets"), facts))
+        return {
+            "macro_plan": plan.model_dump(),
+            "degraded": True
+        }
+    
     def get_system_message(self) -> str:
         """
         Returns the system message to guide the LLM in macronutrient distribution determination.
@@ -213,7 +246,7 @@ class MacroDistributionDecisionNode:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=MacroDistributionPlan)
+        result = self.llm_client.call_llm(prompt, system_message, schema=MacroDistributionPlan, node=type(self).__name__)
         return result
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
@@ -4,9 +4,7 @@ from first_time_plans.call_llm_class import BaseLLM
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class MealDetail(BaseModel):
     """Details for a specific meal in the plan."""
@@ -213,7 +211,7 @@ class MealTimingDecisionNode:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=MealTimingPlan)
+        result = self.llm_client.call_llm(prompt, system_message, schema=MealTimingPlan, node=type(self).__name__)
         return result
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
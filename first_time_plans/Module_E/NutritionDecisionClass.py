@@ -1,12 +1,11 @@
 from typing import Dict, Any, List, Optional, Union
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.validation import to_model, validate_python
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class FoodItem(BaseModel):
     """Specific food item in a meal."""
@@ -222,18 +221,14 @@ class NutritionDecisionClass:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=MealPlan)
+        result = self.llm_client.call_llm(prompt, system_message, schema=MealPlan, as_model=True, node=type(self).__name__)
 
-        # Ensure result is a MealPlan instance
-        if isinstance(result, dict):
-            try:
-                return MealPlan(**result)
-            except Exception as e:
-                logger.error(f"Failed to convert dict to MealPlan: {str(e)}")
-                raise e
-    
-
-        return result
+        # Custom clients may still hand back a dict or raw JSON
+        try:
+            return to_model(MealPlan, result)
+        except Exception as e:
+            logger.error(f"Failed to validate MealPlan: {str(e)}")
+            raise e
     
     def _format_meal_plan(self, meal_plan: Union[MealPlan, Dict[str, Any]]) -> str:
         """
@@ -249,7 +244,7 @@ class NutritionDecisionClass:
         if isinstance(meal_plan, dict):
             logger.info("Converting dictionary to MealPlan object")
             try:
-                meal_plan = MealPlan(**meal_plan)
+                meal_plan = validate_python(MealPlan, meal_plan)
             except Exception as e:
                 logger.error(f"Error converting dict to MealPlan: {str(e)}")
                 # Create basic fallback output if conversion fails
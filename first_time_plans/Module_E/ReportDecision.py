@@ -3,9 +3,7 @@ from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class DecisionExplanation(BaseModel):
     """Detailed explanation of a specific program decision."""
@@ -156,7 +154,7 @@ class ReportDecision:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=ReportStructure)
+        result = self.llm_client.call_llm(prompt, system_message, schema=ReportStructure, node=type(self).__name__)
         return result
     
     def _format_dict(self, data: Dict[str, Any]) -> str:
@@ -4,9 +4,7 @@ from datetime import datetime
 import logging
 from first_time_plans.call_llm_class import BaseLLM
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class ClientProfile(BaseModel):
     """Summary of client's basic information and background."""
@@ -256,7 +254,7 @@ Macro Distribution:
             f"capacity and practical constraints."
         )
         
-        return self.llm_client.call_llm(prompt,self.system_message)
+        return self.llm_client.call_llm(prompt,self.system_message, node=type(self).__name__)
 
     def _explain_volume_selection(
         self,
@@ -272,7 +270,7 @@ Macro Distribution:
             f"and MRV concepts where appropriate."
         )
         
-        return self.llm_client.call_llm(prompt, self.system_message)
+        return self.llm_client.call_llm(prompt, self.system_message, node=type(self).__name__)
 
     def _explain_exercise_selection(
         self,
@@ -288,7 +286,7 @@ Macro Distribution:
             f"managing fatigue and injury risk."
         )
         
-        return self.llm_client.call_llm(prompt, self.system_message)
+        return self.llm_client.call_llm(prompt, self.system_message, node=type(self).__name__)
 
     def _explain_nutrition_plan(
         self,
@@ -304,7 +302,7 @@ Macro Distribution:
             f"of nutrient timing and energy balance."
         )
         
-        return self.llm_client.call_llm(prompt, self.system_message)
+        return self.llm_client.call_llm(prompt, self.system_message, node=type(self).__name__)
 
     def _explain_progression_strategy(
         self,
@@ -320,4 +318,4 @@ Macro Distribution:
             f"needs."
         )
         
-        return self.llm_client.call_llm(prompt, self.system_message)
\ No newline at end of file
+        return self.llm_client.call_llm(prompt, self.system_message, node=type(self).__name__)
\ No newline at end of file
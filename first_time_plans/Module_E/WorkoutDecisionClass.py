@@ -1,12 +1,11 @@
 from typing import Dict, Any, List, Optional, Union
 from pydantic import BaseModel, Field
 from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.validation import to_model, validate_python
 import json
 import logging
 
-# Configure logging
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 class ExerciseDetail(BaseModel):
     """Details for a specific exercise in the workout plan."""
@@ -201,17 +200,14 @@ class WorkoutDecisionClass:
         )
         
         system_message = self.get_system_message()
-        result = self.llm_client.call_llm(prompt, system_message, schema=CompletePlan)
+        result = self.llm_client.call_llm(prompt, system_message, schema=CompletePlan, as_model=True, node=type(self).__name__)
         
-        # Ensure result is a CompletePlan instance
-        if isinstance(result, dict):
-            try:
-                return CompletePlan(**result)
-            except Exception as e:
-                logger.error(f"Failed to convert dict to CompletePlan: {str(e)}")
-                raise e
-        
-        return result
+        # Custom clients may still hand back a dict or raw JSON
+        try:
+            return to_model(CompletePlan, result)
+        except Exception as e:
+            logger.error(f"Failed to validate CompletePlan: {str(e)}")
+            raise e
 
     def _format_workout_plan(self, workout_plan: Union[CompletePlan, Dict[str, Any]]) -> str:
         """
@@ -227,7 +223,7 @@ class WorkoutDecisionClass:
         if isinstance(workout_plan, dict):
             logger.info("Converting dictionary to CompletePlan object")
             try:
-                workout_plan = CompletePlan(**workout_plan)
+                workout_plan = validate_python(CompletePlan, workout_plan)
             except Exception as e:
                 logger.error(f"Error converting dict to CompletePlan: {str(e)}")
                 # Create basic fallback output if conversion fails
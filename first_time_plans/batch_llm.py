@@ -0,0 +1,326 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from startup.config import get_settings
+from startup.clients import lazy_client
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+# Statuses after which a batch's output (possibly partial) is final
+FINISHED = {"completed", "expired", "cancelled"}
+
+class BatchFailed(Exception):
+    """A batched request got no completion: its batch failed, or the request itself was rejected."""
+
+class BatchBackend:
+    """
+    Where batches run. Requests and results use the line format of the OpenAI Batch API:
+    {"custom_id", "method", "url", "body"} in, {"custom_id", "response": {"status_code", "body"}, "error"} out.
+    """
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        """Submit request lines as one batch and return its id."""
+        raise NotImplementedError
+
+    def poll(self, batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Returns:
+            Result lines by custom_id once the batch is finished, None while it runs
+
+        Raises:
+            BatchFailed: The batch failed as a whole
+        """
+        raise NotImplementedError
+
+class OpenAIBatchBackend(BatchBackend):
+    """Runs batches on the OpenAI Batch API: uploaded as a JSONL file, completed within 24h."""
+
+    def __init__(self, llm_client: Optional[Any] = None):
+        self.llm_client = llm_client or lazy_client()
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        data = "\n".join(json.dumps(line) for line in requests).encode("utf-8")
+        input_file = self.llm_client.files.create(file=("batch.jsonl", data), purpose="batch")
+        batch = self.llm_client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h"
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        batch = self.llm_client.batches.retrieve(batch_id)
+        if batch.status == "failed":
+            errors = getattr(batch.errors, "data", None) or []
+            raise BatchFailed(f"Batch {batch_id} failed: {'; '.join(e.message or e.code for e in errors) or 'no details'}")
+        if batch.status not in FINISHED:
+            return None
+        results: Dict[str, Dict[str, Any]] = {}
+        # Requests the API rejected are listed in the error file, in the same line format
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                results.update(_read_lines(self.llm_client.files.content(file_id).text))
+        return results
+
+class LocalBatchBackend(BatchBackend):
+    """
+    File-based stand-in for the Batch API, for tests and local runs.
+
+    A batch is written to `<directory>/<batch id>.input.jsonl`. On the first poll its requests
+    are sent one by one through an ordinary client (the shared one unless given) and the
+    results written to `<batch id>.output.jsonl`, which a test may also provide itself.
+    """
+
+    def __init__(self, directory: str, llm_client: Optional[Any] = None):
+        self.directory = directory
+        self.llm_client = llm_client or lazy_client()
+        os.makedirs(directory, exist_ok=True)
+
+    def submit(self, requests: List[Dict[str, Any]]) -> str:
+        batch_id = f"local_batch_{uuid.uuid4().hex}"
+        with open(self._path(batch_id, "input"), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(line) + "\n" for line in requests)
+        return batch_id
+
+    def poll(self, batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        output_path = self._path(batch_id, "output")
+        if not os.path.exists(output_path):
+            with open(self._path(batch_id, "input"), "r", encoding="utf-8") as f:
+                requests = list(_read_lines(f.read()).values())
+            lines = [self._run(line) for line in requests]
+            # Written under a temporary name, so that the output file is only ever seen complete
+            with open(output_path + ".tmp", "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(line) + "\n" for line in lines)
+            os.replace(output_path + ".tmp", output_path)
+        with open(output_path, "r", encoding="utf-8") as f:
+            return _read_lines(f.read())
+
+    def _run(self, line: Dict[str, Any]) -> Dict[str, Any]:
+        """Result line of one request line."""
+        result: Dict[str, Any] = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": line["custom_id"], "response": None, "error": None}
+        try:
+            completion = self.llm_client.chat.completions.create(**line["body"])
+            result["response"] = {"status_code": 200, "body": completion.model_dump()}
+        except Exception as e:
+            result["error"] = {"code": type(e).__name__, "message": str(e)}
+        return result
+
+    def _path(self, batch_id: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
+
+def _read_lines(text: str) -> Dict[str, Dict[str, Any]]:
+    """JSONL batch lines by custom_id."""
+    lines = (json.loads(line) for line in text.splitlines() if line.strip())
+    return {line["custom_id"]: line for line in lines}
+
+class BatchCollector:
+    """
+    Accumulates the LLM requests of many pipeline runs into batches and fans the results
+    back out to the waiting nodes.
+
+    Each run executes in its own thread inside batch_mode(); its nodes block in complete()
+    until their result arrives. A batch is submitted as soon as every active run is waiting
+    on a request (one pipeline stage of all runs), once `max_requests` are pending, or
+    `max_wait` seconds after the oldest pending request, whichever comes first. Submitted
+    batches are polled every `poll_interval` seconds.
+    """
+
+    def __init__(self, backend: BatchBackend, max_requests: int, max_wait: float, poll_interval: float):
+        self.backend = backend
+        self.max_requests = max_requests
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self._pending: List[Tuple[Dict[str, Any], "Future[Dict[str, Any]]"]] = []
+        self._oldest = 0.0
+        self._runs = 0
+        self._submitted: Dict[str, int] = {}
+        self._totals = {"batches": 0, "requests": 0, "failed_requests": 0}
+        self._cond = threading.Condition()
+        self._flusher: Optional[threading.Thread] = None
+
+    def complete(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue one chat completion request and wait for its batch to finish.
+
+        Args:
+            body: The chat.completions request body
+
+        Returns:
+            The completion, as returned by the API
+
+        Raises:
+            BatchFailed: The batch or the request failed
+        """
+        future: "Future[Dict[str, Any]]" = Future()
+        line = {"custom_id": uuid.uuid4().hex, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+        with self._cond:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((line, future))
+            self._start_flusher()
+            self._cond.notify_all()
+        return future.result()
+
+    @contextmanager
+    def run(self) -> Iterator[None]:
+        """Count the enclosed pipeline run as active until it ends."""
+        with self._cond:
+            self._runs += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._runs -= 1
+                # The remaining runs may all be waiting now
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "active_runs": self._runs,
+                "pending_requests": len(self._pending),
+                "running_batches": dict(self._submitted),
+                **self._totals
+            }
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_loop, name="batch-flusher", daemon=True)
+            self._flusher.start()
+
+    def _ready(self) -> bool:
+        return bool(self._pending) and (
+            len(self._pending) >= self.max_requests
+            or (self._runs > 0 and len(self._pending) >= self._runs)
+            or time.monotonic() - self._oldest >= self.max_wait
+        )
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._ready():
+                    if not self._pending:
+                        self._flusher = None
+                        return
+                    self._cond.wait(max(self._oldest + self.max_wait - time.monotonic(), 0.01))
+                batch, self._pending = self._pending[:self.max_requests], self._pending[self.max_requests:]
+                self._oldest = time.monotonic()
+            threading.Thread(target=self._run_batch, args=(batch,), name="batch-poller", daemon=True).start()
+
+    def _run_batch(self, batch: List[Tuple[Dict[str, Any], "Future[Dict[str, Any]]"]]) -> None:
+        """Submit one batch, poll it to the end and resolve its requests' futures."""
+        try:
+            batch_id = self.backend.submit([line for line, _ in batch])
+            logger.info(f"Submitted batch {batch_id} with {len(batch)} request(s)")
+            with self._cond:
+                self._submitted[batch_id] = len(batch)
+                self._totals["batches"] += 1
+                self._totals["requests"] += len(batch)
+            try:
+                results = self._poll(batch_id)
+                while results is None:
+                    time.sleep(self.poll_interval)
+                    results = self._poll(batch_id)
+            finally:
+                with self._cond:
+                    self._submitted.pop(batch_id, None)
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} request(s) failed: {str(e)}")
+            error = e if isinstance(e, BatchFailed) else BatchFailed(str(e))
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        failed = 0
+        for line, future in batch:
+            result = results.get(line["custom_id"]) or {}
+            response = result.get("response") or {}
+            if response.get("status_code") == 200:
+                future.set_result(response["body"])
+                continue
+            failed += 1
+            error = result.get("error") or (response.get("body") or {}).get("error") or {}
+            future.set_exception(BatchFailed(f"Batched request failed: {error.get('message') or 'no result'}"))
+        with self._cond:
+            self._totals["failed_requests"] += failed
+        logger.info(f"Batch {batch_id} finished: {len(batch) - failed}/{len(batch)} request(s) completed")
+
+    def _poll(self, batch_id: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Poll a batch; an error reaching the backend only skips this poll, the batch keeps running."""
+        try:
+            return self.backend.poll(batch_id)
+        except BatchFailed:
+            raise
+        except Exception as e:
+            logger.warning(f"Polling batch {batch_id} failed: {str(e)}")
+            return None
+
+class _Completions:
+    def __init__(self, collector: BatchCollector):
+        self.collector = collector
+
+    def create(self, **kwargs: Any) -> Any:
+        from openai.types.chat import ChatCompletion
+        # Batched requests wait as long as the batch takes
+        kwargs.pop("timeout", None)
+        return ChatCompletion.model_validate(self.collector.complete(kwargs))
+
+class _Chat:
+    def __init__(self, collector: BatchCollector):
+        self.completions = _Completions(collector)
+
+class BatchClient:
+    """Stand-in for the OpenAI client whose chat.completions.create() goes through a BatchCollector."""
+
+    def __init__(self, collector: BatchCollector):
+        self.chat = _Chat(collector)
+
+_current: ContextVar[Optional[BatchCollector]] = ContextVar("llm_batch", default=None)
+
+def current_batch() -> Optional[BatchCollector]:
+    """The collector of the pipeline run being executed in batch mode, or None."""
+    return _current.get()
+
+@contextmanager
+def batch_mode(collector: BatchCollector) -> Iterator[BatchCollector]:
+    """
+    Run the enclosed pipeline run in batch mode: every BaseLLM call made in it (and in threads
+    started from its context) is queued on the collector instead of called directly.
+    """
+    token = _current.set(collector)
+    try:
+        with collector.run():
+            yield collector
+    finally:
+        _current.reset(token)
+
+_collector: Optional[BatchCollector] = None
+_collector_lock = threading.Lock()
+
+def get_collector() -> BatchCollector:
+    """The process-wide collector, with the backend and limits from the BATCH_* settings."""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            settings = get_settings()
+            if settings.batch_backend == "local":
+                backend: BatchBackend = LocalBatchBackend(os.path.join(settings.state_dir, "batches"))
+            else:
+                backend = OpenAIBatchBackend()
+            _collector = BatchCollector(
+                backend,
+                max_requests=settings.batch_max_requests,
+                max_wait=settings.batch_max_wait,
+                poll_interval=settings.batch_poll_interval
+            )
+        return _collector
+
+def batch_stats() -> Dict[str, Any]:
+    return get_collector().stats()
@@ -1,17 +1,88 @@
 import os
 import json
-from typing import Any, Dict, Optional, Type
-from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Type
 from pydantic import BaseModel
-import openai
-from openai import OpenAI
 import time
+import logging
+import threading
+from first_time_plans.validation import validate_json
+from first_time_plans.deadline import Deadline, DeadlineExceeded, MIN_LLM_TIMEOUT, current_deadline, llm_timeout
+from first_time_plans.circuit_breaker import get_breaker
+from first_time_plans.model_routing import Route, get_router, routed
+from first_time_plans.partial_output import FieldEvents
+from first_time_plans.output_repair import describe_errors, repair_json, repair_output
+from first_time_plans.batch_llm import BatchClient, current_batch
+from startup.clients import lazy_client
 
-# Load environment variables and set up the API client
-load_dotenv()
-API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=API_KEY)
-OPENAI_MODEL = "gpt-4o-mini"
+# Shared client from the registry; the OpenAI SDK is only imported on the first call
+client = lazy_client()
+
+logger = logging.getLogger(__name__)
+
+# Follow-up requests for output that could not be repaired locally; they carry only the
+# broken output (and its errors), not the original prompt
+CONTINUE_MESSAGE = (
+    "The JSON document below was cut off. Output only its continuation, starting exactly "
+    "where it stops, so that appending your answer completes the document."
+)
+FIX_MESSAGE = "Fix the JSON document below so that it passes validation. Return the complete corrected document."
+ARGUMENTS_MESSAGE = "Call the function with the arguments given in the text below, fixing any invalid JSON."
+
+@lru_cache(maxsize=None)
+def response_format(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    The strict json_schema response format of a schema, built once per schema.
+
+    The strict schema comes from the SDK's public pydantic_function_tool(), the same
+    conversion it applies to a response_format given as a model.
+
+    :param schema: A Pydantic model class.
+    :return: The response_format request parameter.
+    """
+    from openai import pydantic_function_tool
+    function = pydantic_function_tool(schema)["function"]
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": function["name"], "schema": function["parameters"], "strict": True}
+    }
+
+
+def is_provider_error(error: BaseException) -> bool:
+    """
+    Whether an exception says the provider is failing: a timeout, a connection error, a
+    rate limit (429) or a server error (5xx). Other 4xx errors and local errors do not.
+    """
+    import openai
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class OutputRefused(ValueError):
+    """Raised when the model refuses to produce a structured output; the message is its refusal."""
+
+
+class CallTiming:
+    """
+    Provider latency of one call, as the circuit breaker sees it: the time to the first
+    streamed chunk, or to the whole response when it is not streamed, so that the length
+    of a streamed output and any repair follow-ups do not count as slowness.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.answered: Optional[float] = None
+
+    def mark(self) -> None:
+        """Record that the provider started answering (only the first mark counts)."""
+        if self.answered is None:
+            self.answered = time.monotonic()
+
+    def latency(self) -> float:
+        return (self.answered if self.answered is not None else time.monotonic()) - self.started
 
 
 class BaseLLM:
@@ -22,18 +93,43 @@ class BaseLLM:
       - Function calling for action-driven responses.
       - Structured outputs to enforce a JSON schema.
       - Standard text responses.
+
+    With a shared_prefix (see first_time_plans.prompt_prefix) every call starts with the same
+    system message, followed by the caller's system message and prompt, so calls made through
+    one instance share a cacheable prompt prefix. Token usage, including cached prompt tokens,
+    is accumulated per instance. Every call goes through the model's circuit breaker, so
+    while the provider is failing or slow calls are refused at once with CircuitOpen.
+
+    The model, max_tokens and temperature of a call come from the routing table entry of the
+    calling node (see first_time_plans.model_routing), unless the instance pins a model.
+    A structured call given FieldEvents streams and publishes each field as soon as it is final.
+
+    Structured output that fails to parse or validate is repaired locally first (truncated
+    JSON, trailing commas, numbers sent as text; see first_time_plans.output_repair). Only if
+    that fails is one short follow-up made: a continuation of output cut off at max_tokens, or
+    a fix of the output given just its validation errors. Missing function-call arguments get
+    the same treatment.
+
+    Inside batch_mode() (bulk runs, see first_time_plans.batch_llm) calls are queued on the
+    batch collector instead, and neither the circuit breaker nor the routing SLOs see them.
     """
-    def __init__(self, llm_client: Optional[Any] = None, model: str = OPENAI_MODEL):
+    def __init__(self, llm_client: Optional[Any] = None, model: Optional[str] = None, shared_prefix: Optional[str] = None):
         self.llm_client = llm_client or client
         self.model = model
         self.system_message = "You are a helpful assistant."
+        self.shared_prefix = shared_prefix
+        self.usage = {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+        self._usage_lock = threading.Lock()
     
     def call_llm(
         self,
         prompt: str,
         system_message:  str,
         schema: Optional[Type[BaseModel]] = None,
-        function_schema: Optional[Dict] = None
+        function_schema: Optional[Dict] = None,
+        as_model: bool = False,
+        node: Optional[str] = None,
+        fields: Optional[FieldEvents] = None
     ) -> Any:
         """
         Call the LLM with the provided prompt.
@@ -41,42 +137,369 @@ class BaseLLM:
         :param prompt: The user's message.
         :param schema: A Pydantic model class defining the JSON schema for structured outputs.
         :param function_schema: A dictionary defining a function's schema for function calling.
+        :param as_model: With a schema, return the validated model instance instead of a dict.
+        :param node: Class name of the calling node, the key of its routing table entry.
+        :param fields: With a schema, receives the output's fields as they become final.
         :return: The response from the LLM, parsed as JSON or plain text.
+        :raises OutputRefused: With a schema, the model refused to answer.
         """
 
-        messages = [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": prompt}
-        ]
-        
+        messages = self._build_messages(prompt, system_message)
+        try:
+            if current_batch() is not None:
+                # Batch turnaround says nothing about the provider's health or the node's latency
+                route = self._pin(get_router().route(node))
+                result = self._call(route, messages, schema, function_schema, as_model, fields)
+            else:
+                with routed(node) as route:
+                    result = self._call_with_breaker(self._pin(route), messages, schema, function_schema, as_model, fields)
+        except BaseException as e:
+            if fields is not None:
+                fields.fail(e)
+            raise
+        if fields is not None:
+            fields.complete(result)
+        return result
+
+    def _pin(self, route: Route) -> Route:
+        """The route with the instance's pinned model, if any."""
+        return route.model_copy(update={"model": self.model}) if self.model else route
+
+    def _call_with_breaker(
+        self,
+        route: Route,
+        messages: List[Dict[str, str]],
+        schema: Optional[Type[BaseModel]],
+        function_schema: Optional[Dict],
+        as_model: bool,
+        fields: Optional[FieldEvents]
+    ) -> Any:
+        """
+        Run the call through the circuit breaker of the route's model.
+
+        Only provider errors (see is_provider_error) and slow answers count against the model;
+        a call ended by the request's deadline or failing locally (e.g. an output that cannot
+        be repaired) gives its slot back without a verdict.
+        """
+        # Refused at once while the model's circuit is open (raises CircuitOpen)
+        breaker = get_breaker(route.model)
+        breaker.before_call()
+        timing = CallTiming()
+        try:
+            result = self._call(route, messages, schema, function_schema, as_model, fields, timing)
+        except DeadlineExceeded:
+            # Ended by the request, not by the provider
+            breaker.release()
+            raise
+        except Exception as e:
+            # A timeout caused by the request budget running out is reported as such
+            deadline = current_deadline()
+            if deadline is not None and deadline.remaining() < MIN_LLM_TIMEOUT:
+                breaker.release()
+                raise DeadlineExceeded(f"Request budget of {deadline.budget:.0f}s exhausted") from e
+            if is_provider_error(e):
+                breaker.record(False, timing.latency())
+            else:
+                breaker.release()
+            raise
+        breaker.record(True, timing.latency())
+        return result
+
+    def _call(
+        self,
+        route: Route,
+        messages: List[Dict[str, str]],
+        schema: Optional[Type[BaseModel]],
+        function_schema: Optional[Dict],
+        as_model: bool,
+        fields: Optional[FieldEvents] = None,
+        timing: Optional[CallTiming] = None
+    ) -> Any:
+        """
+        Run one completion; within a request deadline it gets the remaining budget as its timeout.
+        `timing` is marked when the provider starts answering the first request.
+        """
+        timing = timing or CallTiming()
+        timeout = llm_timeout()
+        deadline = current_deadline()
+        batch = current_batch()
+        llm_client = self.llm_client if batch is None else BatchClient(batch)
+        if deadline is not None and hasattr(llm_client, "with_options"):
+            # A retry would start after the budget is spent
+            llm_client = llm_client.with_options(max_retries=0)
+
         # Case 1: Use function calling if a function schema is provided
         if function_schema:
             tools = [{
                 "type": "function",
                 "function": function_schema
             }]
-            completion = self.llm_client.chat.completions.create(
-                model=self.model, 
+            completion = llm_client.chat.completions.create(
+                model=route.model,
                 messages=messages,
-                tools=tools
+                tools=tools,
+                timeout=timeout,
+                **route.options()
             )
-            # Expect at least one function call in the response
-            tool_call = completion.choices[0].message.tool_calls[0]
-            return json.loads(tool_call.function.arguments)
+            timing.mark()
+            self._record_usage(completion)
+            return self._function_arguments(llm_client, route, messages, tools, completion.choices[0].message)
+
+        # Within a request the answer is streamed, so that a cancelled request closes the
+        # connection (and stops the generation) at the next chunk instead of waiting for it;
+        # so is a structured answer whose fields are consumed before it is complete
+        if batch is None and (deadline is not None or (fields is not None and schema)):
+            completion = self._stream(llm_client, deadline, route, messages, schema, timeout, fields, timing)
         
         # Case 2: Use structured JSON outputs if a Pydantic schema is provided
+        # (validated here rather than by the SDK, so that a broken output can be repaired)
         elif schema:
-            completion = self.llm_client.beta.chat.completions.parse(
-                model=self.model,
+            completion = llm_client.chat.completions.create(
+                model=route.model,
                 messages=messages,
-                response_format=schema
+                response_format=response_format(schema),
+                timeout=timeout,
+                **route.options()
             )
-            return json.loads(completion.choices[0].message.content)
         
         # Case 3: Otherwise, return the plain text response
         else:
-            completion = self.llm_client.chat.completions.create(
-                model=self.model,
-                messages=messages
+            completion = llm_client.chat.completions.create(
+                model=route.model,
+                messages=messages,
+                timeout=timeout,
+                **route.options()
             )
-            return completion.choices[0].message.content
+
+        timing.mark()
+        self._record_usage(completion)
+        choice = completion.choices[0]
+        if not schema:
+            return choice.message.content
+        refusal = getattr(choice.message, "refusal", None)
+        if refusal:
+            # Not a broken output: a fix request would only be refused again
+            raise OutputRefused(refusal)
+        content = choice.message.content or ""
+        try:
+            model = validate_json(schema, content)
+        except ValueError as e:
+            model = self._repair(llm_client, route, schema, content, choice.finish_reason, e)
+        return model if as_model else model.model_dump()
+
+    def _repair(
+        self,
+        llm_client: Any,
+        route: Route,
+        schema: Type[BaseModel],
+        content: str,
+        finish_reason: Optional[str],
+        error: ValueError
+    ) -> BaseModel:
+        """
+        Recover a structured output that failed to parse: locally if possible, otherwise with
+        one follow-up call that continues a truncated output or fixes the validation errors.
+
+        :return: The validated instance.
+        :raises ValueError: The output could not be recovered (a ValidationError if it does not match the schema).
+        """
+        try:
+            return repair_output(schema, content)
+        except ValueError as e:
+            error = e
+        if finish_reason == "length":
+            logger.warning(f"{schema.__name__} output cut off at {len(content)} characters; requesting the rest")
+            # Free-form, so the model can continue mid-document instead of starting a new object
+            content += self._follow_up(llm_client, route, CONTINUE_MESSAGE, content) or ""
+            return repair_output(schema, content)
+        logger.warning(f"{schema.__name__} output invalid after local repair; requesting a fix")
+        fixed = self._follow_up(
+            llm_client,
+            route,
+            FIX_MESSAGE,
+            f"Validation errors:\n{describe_errors(error)}\n\nDocument:\n{content}",
+            response_format=response_format(schema)
+        )
+        return repair_output(schema, fixed or "")
+
+    def _function_arguments(
+        self,
+        llm_client: Any,
+        route: Route,
+        messages: List[Dict[str, str]],
+        tools: List[Dict[str, Any]],
+        message: Any
+    ) -> Dict[str, Any]:
+        """
+        Arguments of the function call in a response.
+
+        Arguments that are not valid JSON are repaired locally; when there are none (the model
+        answered in text, or the JSON cannot be repaired) the function call is requested again
+        with tool_choice forced: from the text alone if there is any, else with the original messages.
+
+        :return: The decoded arguments.
+        :raises ValueError: No arguments could be recovered.
+        """
+        tool_choice = {"type": "function", "function": {"name": tools[0]["function"]["name"]}}
+        text = _call_arguments(message)
+        if text is None:
+            text = message.content or ""
+        arguments = _decode_arguments(text)
+        if arguments is not None:
+            return arguments
+
+        logger.warning(f"No usable arguments for {tool_choice['function']['name']}; requesting the function call")
+        if text.strip():
+            messages = [{"role": "system", "content": ARGUMENTS_MESSAGE}, {"role": "user", "content": text}]
+        completion = llm_client.chat.completions.create(
+            model=route.model,
+            messages=messages,
+            tools=tools,
+            tool_choice=tool_choice,
+            timeout=llm_timeout(),
+            **route.options()
+        )
+        self._record_usage(completion)
+        arguments = _decode_arguments(_call_arguments(completion.choices[0].message) or "")
+        if arguments is None:
+            raise ValueError(f"No valid arguments for {tool_choice['function']['name']} in the response")
+        return arguments
+
+    def _follow_up(
+        self,
+        llm_client: Any,
+        route: Route,
+        instruction: str,
+        content: str,
+        response_format: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """
+        A short repair request on the route's model: the instruction and the broken output only.
+
+        :return: The response text.
+        """
+        options = route.options()
+        if response_format is not None:
+            options["response_format"] = response_format
+        completion = llm_client.chat.completions.create(
+            model=route.model,
+            messages=[{"role": "system", "content": instruction}, {"role": "user", "content": content}],
+            timeout=llm_timeout(),
+            **options
+        )
+        self._record_usage(completion)
+        return completion.choices[0].message.content
+
+    def _stream(
+        self,
+        llm_client: Any,
+        deadline: Optional[Deadline],
+        route: Route,
+        messages: List[Dict[str, str]],
+        schema: Optional[Type[BaseModel]],
+        timeout: float,
+        fields: Optional[FieldEvents] = None,
+        timing: Optional[CallTiming] = None
+    ) -> Any:
+        """
+        Stream a completion, checking the request between chunks; `timing` is marked at the first chunk.
+
+        With `fields`, the content received so far is parsed after every chunk and the fields
+        it shows to be final are published.
+
+        An answer cut off at max_tokens or by the content filter is returned as received (the
+        SDK only refuses to parse it), so that the caller handles it like an unstreamed one:
+        text comes back truncated and structured output goes through _repair.
+
+        :return: The final completion, with usage.
+        :raises RequestCancelled: The client disconnected; leaving the stream closes the connection.
+        :raises DeadlineExceeded: The request budget ran out while streaming.
+        """
+        from openai import ContentFilterFinishReasonError, LengthFinishReasonError
+        options = route.options()
+        if schema:
+            options["response_format"] = response_format(schema)
+        with llm_client.beta.chat.completions.stream(
+            model=route.model,
+            messages=messages,
+            stream_options={"include_usage": True},
+            timeout=timeout,
+            **options
+        ) as stream:
+            for event in stream:
+                if timing is not None:
+                    timing.mark()
+                if deadline is not None:
+                    deadline.check()
+                if fields is not None and event.type == "content.delta":
+                    fields.update(event.snapshot)
+            try:
+                return stream.get_final_completion()
+            except (LengthFinishReasonError, ContentFilterFinishReasonError):
+                return stream.current_completion_snapshot
+
+    def _build_messages(self, prompt: str, system_message: str) -> List[Dict[str, str]]:
+        """
+        Assemble the messages: shared prefix first, node-specific instructions and prompt last.
+
+        :param prompt: The user's message.
+        :param system_message: The caller's system message.
+        :return: Chat messages.
+        """
+        messages = []
+        if self.shared_prefix:
+            messages.append({"role": "system", "content": self.shared_prefix})
+        messages.append({"role": "system", "content": system_message})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _record_usage(self, completion: Any) -> None:
+        """
+        Accumulate token usage from a completion, including prompt tokens served from the provider's cache.
+
+        :param completion: The API response.
+        """
+        usage = getattr(completion, "usage", None)
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["cached_tokens"] += cached_tokens
+            self.usage["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+        logger.info(f"LLM call: {prompt_tokens} prompt tokens ({cached_tokens} cached)")
+
+    def usage_summary(self) -> Dict[str, Any]:
+        """
+        Token usage accumulated by this instance.
+
+        :return: Call and token counts plus the share of prompt tokens served from cache.
+        """
+        with self._usage_lock:
+            summary = dict(self.usage)
+        summary["cached_ratio"] = (
+            round(summary["cached_tokens"] / summary["prompt_tokens"], 3) if summary["prompt_tokens"] else 0.0
+        )
+        return summary
+
+
+def _call_arguments(message: Any) -> Optional[str]:
+    """Arguments text of the first function call in a message, or None without one."""
+    tool_calls = getattr(message, "tool_calls", None) or []
+    return tool_calls[0].function.arguments if tool_calls else None
+
+
+def _decode_arguments(text: str) -> Optional[Dict[str, Any]]:
+    """Function-call arguments as a dict, repairing invalid JSON; None if there are none."""
+    try:
+        arguments = json.loads(text)
+    except ValueError:
+        try:
+            # An empty object is all partial parsing makes of text without JSON
+            arguments = repair_json(text) or None
+        except ValueError:
+            return None
+    return arguments if isinstance(arguments, dict) else None
@@ -0,0 +1,136 @@
+from typing import Any, Deque, Dict
+from collections import deque
+import math
+import time
+import logging
+import threading
+from startup.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpen(Exception):
+    """The model's circuit is open: the call is refused at once instead of waiting on a failing provider."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"LLM circuit for {model} is open")
+        self.model = model
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class CircuitBreaker:
+    """
+    Error-rate and latency breaker for one model.
+
+    The last `window` calls are kept as failed (a provider error, or slower than
+    `slow_call_seconds` to answer; a streamed answer counts to its first chunk) or not. Once at least `min_calls` are recorded and the failed share reaches `failure_rate`,
+    the circuit opens and every call is refused for `cooldown` seconds. After that a single
+    probe call is let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        window: int,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_seconds: float,
+        cooldown: float
+    ):
+        self.model = model
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._probe_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            CircuitOpen: The circuit is open, or half open with its probe already running
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probe_running:
+                self._probe_running = True
+                return
+            raise CircuitOpen(self.model, max(remaining, 1))
+
+    def record(self, succeeded: bool, latency: float) -> None:
+        """Record the outcome of a call that before_call() let through."""
+        failed = not succeeded or latency > self.slow_call_seconds
+        with self._lock:
+            self._latencies.append(latency)
+            if self.state == HALF_OPEN:
+                self._probe_running = False
+                if failed:
+                    self._open("probe failed")
+                else:
+                    logger.info(f"LLM circuit for {self.model} closed")
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if (
+                self.state == CLOSED
+                and len(self._outcomes) >= self.min_calls
+                and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open(f"{sum(self._outcomes)}/{len(self._outcomes)} recent calls failed or were slow")
+
+    def release(self) -> None:
+        """Give back a probe slot whose call ended without a verdict (e.g. the request was cancelled)."""
+        with self._lock:
+            self._probe_running = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(self._outcomes),
+                "latency_p50": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                "latency_p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 3) if latencies else None,
+            }
+
+    def _open(self, reason: str) -> None:
+        logger.warning(f"LLM circuit for {self.model} opened: {reason}")
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._outcomes.clear()
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(model: str) -> CircuitBreaker:
+    """The process-wide breaker of a model, created with the CIRCUIT_* settings on first use."""
+    with _breakers_lock:
+        if model not in _breakers:
+            settings = get_settings()
+            _breakers[model] = CircuitBreaker(
+                model,
+                window=settings.circuit_window,
+                min_calls=settings.circuit_min_calls,
+                failure_rate=settings.circuit_failure_rate,
+                slow_call_seconds=settings.circuit_slow_call_seconds,
+                cooldown=settings.circuit_cooldown
+            )
+        return _breakers[model]
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """State and recent latency of every model's breaker in this process."""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {model: breaker.stats() for model, breaker in breakers.items()}
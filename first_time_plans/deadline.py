@@ -0,0 +1,168 @@
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+import logging
+import threading
+from startup.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Header carrying the client's budget for the whole request, in seconds
+DEADLINE_HEADER = "X-Request-Timeout"
+# Below this, an LLM call cannot produce a useful answer and is not started at all
+MIN_LLM_TIMEOUT = 1.0
+
+T = TypeVar("T")
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out; the endpoint answers 504 instead of working on."""
+
+class RequestCancelled(DeadlineExceeded):
+    """The client disconnected; like an exhausted budget, the request stops where it is."""
+
+class Deadline:
+    """
+    Time budget and cancellation state of one request.
+
+    Set for the duration of a request with request_deadline(); BaseLLM reads it to give every
+    LLM call the remaining budget as its timeout and to abort a streamed call once the request
+    is cancelled, and optional nodes check it before running.
+    """
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.skipped: List[str] = []
+        self.cancelled = False
+        self._cancel_callbacks: List[Callable[[], Any]] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """Seconds left (negative once expired)."""
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """Whether at least `seconds` of budget are left."""
+        return self.remaining() >= seconds
+
+    def cancel(self) -> None:
+        """Cancel the request: no further LLM call starts and registered callbacks run once."""
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._cancel_callbacks = self._cancel_callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancel callback failed: {str(e)}")
+
+    def on_cancel(self, callback: Callable[[], Any]) -> None:
+        """Run callback when the request is cancelled (immediately if it already is)."""
+        with self._lock:
+            if not self.cancelled:
+                self._cancel_callbacks.append(callback)
+                return
+        callback()
+
+    def check(self) -> None:
+        """
+        Raises:
+            RequestCancelled: The request was cancelled
+            DeadlineExceeded: The budget is spent
+        """
+        if self.cancelled:
+            raise RequestCancelled("Client disconnected")
+        if self.expired():
+            raise DeadlineExceeded(f"Request budget of {self.budget:.0f}s exhausted")
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """The deadline of the request being served, or None outside a request."""
+    return _current.get()
+
+def budget_from_header(value: Optional[str], default: float) -> float:
+    """
+    Request budget from the deadline header, falling back to the endpoint default.
+
+    Args:
+        value: Header value in seconds (missing, malformed or non-positive values are ignored)
+        default: The endpoint's default budget
+
+    Returns:
+        Budget in seconds, capped at the configured maximum
+    """
+    try:
+        budget = float(value) if value is not None else default
+    except ValueError:
+        budget = default
+    if budget <= 0:
+        budget = default
+    return min(budget, get_settings().max_request_timeout)
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[Deadline]:
+    """Make a deadline current for the enclosed block (and threads started from its context)."""
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+def detached(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wrap work scheduled to run after the response (background tasks) so that it runs
+    without the request's deadline, which it would otherwise inherit.
+    """
+    def run(*args: Any, **kwargs: Any) -> T:
+        token = _current.set(None)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+def llm_timeout() -> float:
+    """
+    Timeout for the next LLM call: the remaining request budget, or the configured default
+    outside a request.
+
+    Raises:
+        RequestCancelled: The request was cancelled
+        DeadlineExceeded: Less than MIN_LLM_TIMEOUT seconds are left
+    """
+    deadline = current_deadline()
+    if deadline is None:
+        return get_settings().llm_timeout
+    deadline.check()
+    remaining = deadline.remaining()
+    if remaining < MIN_LLM_TIMEOUT:
+        raise DeadlineExceeded(f"Request budget of {deadline.budget:.0f}s exhausted")
+    return remaining
+
+def optional_step(name: str, min_remaining: float, step: Callable[[], T], default: T) -> T:
+    """
+    Run an optional node only if enough budget is left for it and the required nodes after it.
+
+    Args:
+        name: Node name, recorded in the deadline's skipped list when skipped
+        min_remaining: Budget (seconds) the node needs to be worth starting
+        step: Runs the node
+        default: Result used when the node is skipped
+
+    Returns:
+        The node's result, or default
+    """
+    deadline = current_deadline()
+    if deadline is not None and not deadline.allows(min_remaining):
+        logger.warning(f"Skipping {name}: {deadline.remaining():.1f}s left, needs {min_remaining:.0f}s")
+        deadline.skipped.append(name)
+        return default
+    return step()
@@ -0,0 +1,532 @@
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel
+import re
+import logging
+from first_time_plans.Module_A_B.profileCanonicalization import (
+    ACTIVITY_LEVELS, EXPERIENCE_LEVELS, GOALS, GENDERS, _field, parse_height, parse_weight
+)
+
+logger = logging.getLogger(__name__)
+
+# Rule-based counterparts of the calorie, macro, split and exercise-selection nodes. They are
+# served, marked degraded, while the LLM circuit is open; every value is derived from the
+# profile with the standard formulas and tables below.
+
+ACTIVITY_MULTIPLIERS = {
+    "sedentary": 1.2,
+    "lightly active": 1.375,
+    "moderately active": 1.55,
+    "very active": 1.725,
+    "extremely active": 1.9,
+}
+# Share of maintenance added (surplus) or removed (deficit) per goal
+GOAL_ADJUSTMENTS = {
+    "fat loss": -0.20,
+    "recomposition": -0.05,
+    "muscle gain": 0.10,
+    "strength": 0.05,
+    "maintenance": 0.0,
+    "endurance": 0.0,
+    "general fitness": 0.0,
+}
+GOAL_RATES = {
+    "fat loss": "about 0.5-1% of bodyweight lost per week",
+    "recomposition": "stable bodyweight with slow waist reduction",
+    "muscle gain": "about 0.25-0.5% of bodyweight gained per week",
+    "strength": "stable to slightly increasing bodyweight",
+}
+PROTEIN_PER_KG = {"fat loss": 2.2, "recomposition": 2.2, "muscle gain": 2.0, "strength": 2.0}
+DEFAULT_PROTEIN_PER_KG = 1.8
+MIN_FAT_PER_KG = 0.6
+FAT_SHARE = 0.25
+# Calories moved from rest days to training days
+TRAINING_DAY_SHIFT = 150
+REP_RANGES = {"strength": "3-6", "muscle gain": "6-12", "fat loss": "8-15", "recomposition": "8-12", "endurance": "12-20"}
+DEFAULT_REP_RANGE = "8-12"
+EXERCISES_PER_DAY = {"beginner": "4-5 exercises", "intermediate": "5-6 exercises", "advanced": "6-7 exercises"}
+SETS_PER_DAY = {"beginner": "10-14 sets total", "intermediate": "14-18 sets total", "advanced": "16-22 sets total"}
+
+# Profile defaults used when a value is missing (confidence is then reported as low)
+DEFAULT_FACTS = {"age": 30, "sex": "male", "height_cm": 170.0, "weight_kg": 70.0}
+
+# Training day templates: (day name, primary muscle groups, secondary muscle groups)
+FULL_BODY = ["quads", "chest", "back", "hamstrings", "shoulders"]
+UPPER = ["chest", "back", "shoulders", "biceps", "triceps"]
+LOWER = ["quads", "hamstrings", "glutes", "calves"]
+PUSH = ["chest", "shoulders", "triceps"]
+PULL = ["back", "biceps"]
+LEGS = ["quads", "hamstrings", "glutes", "calves"]
+SPLIT_TEMPLATES: Dict[int, Tuple[str, List[Tuple[str, List[str], List[str]]]]] = {
+    2: ("Full Body", [("Full Body A", FULL_BODY, ["core"]), ("Full Body B", FULL_BODY, ["glutes"])]),
+    3: ("Full Body", [
+        ("Full Body A", FULL_BODY, ["core"]),
+        ("Full Body B", FULL_BODY, ["glutes", "biceps"]),
+        ("Full Body C", FULL_BODY, ["triceps", "calves"]),
+    ]),
+    4: ("Upper/Lower", [
+        ("Upper A", UPPER, []), ("Lower A", LOWER, ["core"]),
+        ("Upper B", UPPER, []), ("Lower B", LOWER, ["core"]),
+    ]),
+    5: ("Upper/Lower + Push/Pull/Legs", [
+        ("Upper", UPPER, []), ("Lower", LOWER, ["core"]),
+        ("Push", PUSH, []), ("Pull", PULL, ["shoulders"]), ("Legs", LEGS, ["core"]),
+    ]),
+    6: ("Push/Pull/Legs", [
+        ("Push A", PUSH, []), ("Pull A", PULL, ["shoulders"]), ("Legs A", LEGS, ["core"]),
+        ("Push B", PUSH, []), ("Pull B", PULL, ["shoulders"]), ("Legs B", LEGS, ["core"]),
+    ]),
+}
+WEEKLY_STRUCTURES = {
+    2: "Mon / Thu",
+    3: "Mon / Wed / Fri",
+    4: "Mon / Tue / Thu / Fri",
+    5: "Mon / Tue / Wed / Fri / Sat",
+    6: "Mon-Sat, rest Sunday",
+}
+
+class CatalogExercise(BaseModel):
+    """One exercise of the fallback catalog."""
+    name: str
+    category: str
+    equipment: str
+    primary_muscles: List[str]
+    secondary_muscles: List[str]
+    joint_action: str
+    technical_difficulty: str
+    risk_profile: str
+    progression: str
+    regression: str
+
+def _exercise(name, category, equipment, primary, secondary, joint_action, difficulty, risk, progression, regression):
+    return CatalogExercise(
+        name=name, category=category, equipment=equipment, primary_muscles=primary, secondary_muscles=secondary,
+        joint_action=joint_action, technical_difficulty=difficulty, risk_profile=risk,
+        progression=progression, regression=regression
+    )
+
+# Muscle group -> exercises, compound movements first
+EXERCISE_CATALOG: Dict[str, List[CatalogExercise]] = {
+    "chest": [
+        _exercise("Barbell Bench Press", "Compound", "Barbell", ["Chest"], ["Triceps", "Front Delts"], "Horizontal Push", "Medium", "Medium", "Add load", "Dumbbell Bench Press"),
+        _exercise("Dumbbell Bench Press", "Compound", "Dumbbell", ["Chest"], ["Triceps", "Front Delts"], "Horizontal Push", "Low", "Low", "Add load", "Machine Chest Press"),
+        _exercise("Machine Chest Press", "Compound", "Machine", ["Chest"], ["Triceps"], "Horizontal Push", "Low", "Low", "Add load", "Push-Up"),
+        _exercise("Push-Up", "Compound", "Bodyweight", ["Chest"], ["Triceps", "Core"], "Horizontal Push", "Low", "Low", "Feet elevated", "Incline Push-Up"),
+        _exercise("Cable Fly", "Isolation", "Cable", ["Chest"], ["Front Delts"], "Shoulder Horizontal Adduction", "Low", "Low", "Add load", "Dumbbell Fly"),
+        _exercise("Dumbbell Fly", "Isolation", "Dumbbell", ["Chest"], ["Front Delts"], "Shoulder Horizontal Adduction", "Low", "Medium", "Add load", "Machine Chest Press"),
+    ],
+    "back": [
+        _exercise("Barbell Row", "Compound", "Barbell", ["Lats", "Upper Back"], ["Biceps", "Rear Delts"], "Horizontal Pull", "Medium", "Medium", "Add load", "Chest-Supported Dumbbell Row"),
+        _exercise("Lat Pulldown", "Compound", "Cable", ["Lats"], ["Biceps"], "Vertical Pull", "Low", "Low", "Add load", "Assisted Pull-Up"),
+        _exercise("Pull-Up", "Compound", "Bodyweight", ["Lats"], ["Biceps", "Upper Back"], "Vertical Pull", "Medium", "Low", "Add weight", "Inverted Row"),
+        _exercise("Chest-Supported Dumbbell Row", "Compound", "Dumbbell", ["Upper Back", "Lats"], ["Biceps", "Rear Delts"], "Horizontal Pull", "Low", "Low", "Add load", "Inverted Row"),
+        _exercise("Inverted Row", "Compound", "Bodyweight", ["Upper Back"], ["Biceps"], "Horizontal Pull", "Low", "Low", "Feet elevated", "Higher bar angle"),
+        _exercise("Seated Cable Row", "Compound", "Cable", ["Upper Back", "Lats"], ["Biceps"], "Horizontal Pull", "Low", "Low", "Add load", "Chest-Supported Dumbbell Row"),
+    ],
+    "shoulders": [
+        _exercise("Overhead Press", "Compound", "Barbell", ["Front Delts"], ["Triceps", "Side Delts"], "Vertical Push", "Medium", "Medium", "Add load", "Seated Dumbbell Press"),
+        _exercise("Seated Dumbbell Press", "Compound", "Dumbbell", ["Front Delts"], ["Triceps", "Side Delts"], "Vertical Push", "Low", "Low", "Add load", "Pike Push-Up"),
+        _exercise("Pike Push-Up", "Compound", "Bodyweight", ["Front Delts"], ["Triceps"], "Vertical Push", "Medium", "Low", "Feet elevated", "Push-Up"),
+        _exercise("Dumbbell Lateral Raise", "Isolation", "Dumbbell", ["Side Delts"], [], "Shoulder Abduction", "Low", "Low", "Add load", "Cable Lateral Raise"),
+        _exercise("Cable Lateral Raise", "Isolation", "Cable", ["Side Delts"], [], "Shoulder Abduction", "Low", "Low", "Add load", "Dumbbell Lateral Raise"),
+    ],
+    "quads": [
+        _exercise("Back Squat", "Compound", "Barbell", ["Quads", "Glutes"], ["Adductors", "Core"], "Knee Extension", "High", "Medium", "Add load", "Goblet Squat"),
+        _exercise("Leg Press", "Compound", "Machine", ["Quads", "Glutes"], ["Adductors"], "Knee Extension", "Low", "Low", "Add load", "Goblet Squat"),
+        _exercise("Goblet Squat", "Compound", "Dumbbell", ["Quads", "Glutes"], ["Core"], "Knee Extension", "Low", "Low", "Add load", "Bodyweight Squat"),
+        _exercise("Bodyweight Squat", "Compound", "Bodyweight", ["Quads", "Glutes"], [], "Knee Extension", "Low", "Low", "Tempo or pause", "Box Squat"),
+        _exercise("Leg Extension", "Isolation", "Machine", ["Quads"], [], "Knee Extension", "Low", "Low", "Add load", "Split Squat"),
+        _exercise("Bulgarian Split Squat", "Compound", "Dumbbell", ["Quads", "Glutes"], ["Adductors"], "Knee Extension", "Medium", "Low", "Add load", "Split Squat"),
+    ],
+    "hamstrings": [
+        _exercise("Romanian Deadlift", "Compound", "Barbell", ["Hamstrings", "Glutes"], ["Lower Back"], "Hip Hinge", "Medium", "Medium", "Add load", "Dumbbell Romanian Deadlift"),
+        _exercise("Dumbbell Romanian Deadlift", "Compound", "Dumbbell", ["Hamstrings", "Glutes"], ["Lower Back"], "Hip Hinge", "Low", "Low", "Add load", "Glute Bridge"),
+        _exercise("Lying Leg Curl", "Isolation", "Machine", ["Hamstrings"], [], "Knee Flexion", "Low", "Low", "Add load", "Stability Ball Leg Curl"),
+        _exercise("Single-Leg Hip Hinge", "Compound", "Bodyweight", ["Hamstrings", "Glutes"], ["Core"], "Hip Hinge", "Medium", "Low", "Hold a weight", "Glute Bridge"),
+    ],
+    "glutes": [
+        _exercise("Hip Thrust", "Compound", "Barbell", ["Glutes"], ["Hamstrings"], "Hip Extension", "Low", "Low", "Add load", "Glute Bridge"),
+        _exercise("Dumbbell Hip Thrust", "Compound", "Dumbbell", ["Glutes"], ["Hamstrings"], "Hip Extension", "Low", "Low", "Add load", "Glute Bridge"),
+        _exercise("Glute Bridge", "Isolation", "Bodyweight", ["Glutes"], ["Hamstrings"], "Hip Extension", "Low", "Low", "Single leg", "Partial range"),
+    ],
+    "biceps": [
+        _exercise("Dumbbell Curl", "Isolation", "Dumbbell", ["Biceps"], ["Forearms"], "Elbow Flexion", "Low", "Low", "Add load", "Cable Curl"),
+        _exercise("Cable Curl", "Isolation", "Cable", ["Biceps"], ["Forearms"], "Elbow Flexion", "Low", "Low", "Add load", "Dumbbell Curl"),
+        _exercise("Barbell Curl", "Isolation", "Barbell", ["Biceps"], ["Forearms"], "Elbow Flexion", "Low", "Low", "Add load", "Dumbbell Curl"),
+        _exercise("Chin-Up", "Compound", "Bodyweight", ["Biceps", "Lats"], [], "Vertical Pull", "Medium", "Low", "Add weight", "Inverted Row"),
+    ],
+    "triceps": [
+        _exercise("Cable Triceps Pushdown", "Isolation", "Cable", ["Triceps"], [], "Elbow Extension", "Low", "Low", "Add load", "Bench Dip"),
+        _exercise("Overhead Dumbbell Triceps Extension", "Isolation", "Dumbbell", ["Triceps"], [], "Elbow Extension", "Low", "Low", "Add load", "Cable Triceps Pushdown"),
+        _exercise("Close-Grip Bench Press", "Compound", "Barbell", ["Triceps"], ["Chest"], "Horizontal Push", "Medium", "Low", "Add load", "Dumbbell Floor Press"),
+        _exercise("Bench Dip", "Compound", "Bodyweight", ["Triceps"], ["Chest"], "Elbow Extension", "Low", "Medium", "Feet elevated", "Bent-knee Bench Dip"),
+    ],
+    "calves": [
+        _exercise("Standing Calf Raise", "Isolation", "Machine", ["Calves"], [], "Ankle Plantar Flexion", "Low", "Low", "Add load", "Bodyweight Calf Raise"),
+        _exercise("Dumbbell Calf Raise", "Isolation", "Dumbbell", ["Calves"], [], "Ankle Plantar Flexion", "Low", "Low", "Add load", "Bodyweight Calf Raise"),
+        _exercise("Bodyweight Calf Raise", "Isolation", "Bodyweight", ["Calves"], [], "Ankle Plantar Flexion", "Low", "Low", "Single leg", "Partial range"),
+    ],
+    "core": [
+        _exercise("Cable Crunch", "Isolation", "Cable", ["Abs"], [], "Spinal Flexion", "Low", "Low", "Add load", "Crunch"),
+        _exercise("Plank", "Isolation", "Bodyweight", ["Abs", "Obliques"], [], "Anti-Extension", "Low", "Low", "Longer hold", "Knee Plank"),
+        _exercise("Hanging Knee Raise", "Isolation", "Bodyweight", ["Abs"], ["Hip Flexors"], "Hip Flexion", "Medium", "Low", "Straight legs", "Lying Leg Raise"),
+    ],
+}
+# Muscle names an LLM split may use -> catalog group
+MUSCLE_ALIASES = {
+    "chest": "chest", "pecs": "chest", "pectorals": "chest",
+    "back": "back", "lats": "back", "upper back": "back", "latissimus dorsi": "back", "traps": "back",
+    "shoulders": "shoulders", "delts": "shoulders", "deltoids": "shoulders", "side delts": "shoulders", "rear delts": "shoulders",
+    "quads": "quads", "quadriceps": "quads", "legs": "quads",
+    "hamstrings": "hamstrings", "glutes": "glutes", "gluteus": "glutes",
+    "biceps": "biceps", "arms": "biceps", "triceps": "triceps",
+    "calves": "calves", "core": "core", "abs": "core", "abdominals": "core", "obliques": "core",
+}
+EQUIPMENT_KEYWORDS = {
+    "Barbell": ("barbell", "gym", "rack"),
+    "Dumbbell": ("dumbbell", "gym", "kettlebell"),
+    "Machine": ("machine", "gym"),
+    "Cable": ("cable", "gym"),
+}
+
+class ProfileFacts(BaseModel):
+    """The profile values the rule-based plans need, with defaults filled in."""
+    name: str = "Client"
+    age: int
+    sex: str
+    height_cm: float
+    weight_kg: float
+    activity_level: str = "moderately active"
+    training_days: int = 3
+    experience: str = "intermediate"
+    goal: str = "general fitness"
+    equipment: List[str]
+    defaults_used: List[str]
+
+def _profile_fields(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """All section fields of a standardized profile, keyed by normalized field name."""
+    fields = {}
+    for section in profile.values():
+        if not isinstance(section, dict):
+            continue
+        data = section.get("data", section)
+        if isinstance(data, dict):
+            for key, value in data.items():
+                if value not in (None, ""):
+                    fields.setdefault(_field(key), value)
+    return fields
+
+def _lookup(table: Dict[str, str], value: Any) -> Optional[str]:
+    """Canonical enum value of free text (first matching synonym), as in profile canonicalization."""
+    text = re.sub(r"[^a-z ]", " ", str(value).lower())
+    text = " ".join(text.split())
+    if text in table:
+        return table[text]
+    for synonym in sorted(table, key=len, reverse=True):
+        if re.search(rf"\b{re.escape(synonym)}\b", text):
+            return table[synonym]
+    return None
+
+def _first_number(value: Any) -> Optional[float]:
+    match = re.search(r"\d+(?:\.\d+)?", str(value))
+    return float(match.group()) if match else None
+
+def profile_facts(profile: Dict[str, Any], goal_analysis: Optional[Dict[str, Any]] = None) -> ProfileFacts:
+    """
+    Read age, sex, height, weight, activity, training days, experience, goal and equipment
+    from a standardized profile (canonicalized or not).
+
+    Args:
+        profile: Standardized client profile
+        goal_analysis: Goal clarification output; its first primary goal wins over the profile's
+
+    Returns:
+        Profile facts; missing values are defaulted and listed in defaults_used
+    """
+    fields = _profile_fields(profile)
+    defaults_used = []
+
+    def number(names, parse=None) -> Optional[float]:
+        for name in names:
+            if name in fields:
+                value = fields[name]
+                if parse is not None and isinstance(value, str):
+                    value = parse(value.strip().lower()) or value
+                number_value = _first_number(value)
+                if number_value:
+                    return number_value
+        return None
+
+    age = number(["age"])
+    height = number(["height"], parse_height)
+    if height is not None and height < 3:
+        # The canonical profile keeps a unitless height as given; the formulas need centimetres
+        height *= 100
+    weight = number(["weight", "currentweight", "bodyweight"], parse_weight)
+    sex = next((_lookup(GENDERS, fields[n]) for n in ("gender", "sex") if n in fields), None)
+    if age is None:
+        defaults_used.append("age")
+    if height is None:
+        defaults_used.append("height")
+    if weight is None:
+        defaults_used.append("weight")
+    if sex is None:
+        defaults_used.append("sex")
+
+    goal = None
+    primary_goals = (goal_analysis or {}).get("goal_analysis_schema", {}).get("primary_goals") or []
+    for text in list(primary_goals) + [fields.get(n) for n in ("maingoals", "maingoal", "primarygoal", "goals", "goal")]:
+        if text:
+            goal = _lookup(GOALS, text)
+            if goal:
+                break
+
+    activity = next((_lookup(ACTIVITY_LEVELS, fields[n]) for n in ("activitylevel",) if n in fields), None)
+    experience = next(
+        (_lookup(EXPERIENCE_LEVELS, fields[n]) for n in ("experience", "experiencelevel", "traininglevel", "fitnessknowledge", "rateyourfitnesslevel") if n in fields),
+        None
+    )
+    days = number(["trainingfrequency", "exercisefrequency", "weeklyfrequency", "daysperweek", "exerciseroutine"])
+    equipment_text = " ".join(str(fields.get(n, "")) for n in ("fitnessequipment", "equipment")).lower()
+
+    return ProfileFacts(
+        name=str(fields.get("name", "Client")),
+        age=int(age) if age else DEFAULT_FACTS["age"],
+        sex=sex or DEFAULT_FACTS["sex"],
+        height_cm=height or DEFAULT_FACTS["height_cm"],
+        weight_kg=weight or DEFAULT_FACTS["weight_kg"],
+        activity_level=activity or "moderately active",
+        training_days=min(6, max(2, int(days))) if days else 3,
+        experience=experience or "intermediate",
+        goal=goal or "general fitness",
+        equipment=available_equipment(equipment_text),
+        defaults_used=defaults_used
+    )
+
+def available_equipment(text: str) -> List[str]:
+    """Equipment types usable by the client; a blank or unrecognized answer assumes a full gym."""
+    found = ["Bodyweight"] + [kind for kind, words in EQUIPMENT_KEYWORDS.items() if any(word in text for word in words)]
+    if len(found) == 1 and not re.search(r"\b(none|no equipment|bodyweight|home)\b", text):
+        return ["Bodyweight"] + list(EQUIPMENT_KEYWORDS)
+    return found
+
+def mifflin_st_jeor(facts: ProfileFacts) -> int:
+    """Basal metabolic rate (kcal/day)."""
+    bmr = 10 * facts.weight_kg + 6.25 * facts.height_cm - 5 * facts.age
+    return round(bmr + (5 if facts.sex == "male" else -161))
+
+def calculate_caloric_targets(facts: ProfileFacts) -> Dict[str, Any]:
+    """Calorie targets in the CaloricTargets shape, from Mifflin-St Jeor and standard activity factors."""
+    bmr = mifflin_st_jeor(facts)
+    multiplier = ACTIVITY_MULTIPLIERS[facts.activity_level]
+    maintenance = round(bmr * multiplier)
+    adjustment_share = GOAL_ADJUSTMENTS.get(facts.goal, 0.0)
+    adjustment = round(maintenance * adjustment_share)
+    goal_calories = maintenance + adjustment
+    # Training days get a little more, rest days a little less; the weekly average stays on target
+    rest_days = 7 - facts.training_days
+    training_day = goal_calories + TRAINING_DAY_SHIFT
+    rest_day = goal_calories - round(TRAINING_DAY_SHIFT * facts.training_days / rest_days) if rest_days else goal_calories
+    exercise_adjustment = round(bmr * (multiplier - 1.2))
+    confidence = "Low (defaults used for: " + ", ".join(facts.defaults_used) + ")" if facts.defaults_used else "Moderate"
+    return {
+        "bmr_analysis": {
+            "formula_used": "Mifflin-St Jeor",
+            "calculated_bmr": bmr,
+            "variables_used": [
+                f"weight: {facts.weight_kg:g}kg",
+                f"height: {facts.height_cm:g}cm",
+                f"age: {facts.age}",
+                f"gender: {facts.sex}",
+                f"activity level: {facts.activity_level}",
+            ],
+            "confidence_level": confidence,
+        },
+        "tee_analysis": {
+            "activity_multiplier": multiplier,
+            "activity_classification": facts.activity_level,
+            "calculated_tee": maintenance,
+            "exercise_adjustment": exercise_adjustment,
+            "neat_estimate": round(bmr * 0.2),
+        },
+        "goal_adjustment": {
+            "primary_goal": facts.goal,
+            "caloric_adjustment": adjustment,
+            "adjustment_percentage": round(adjustment_share * 100, 1),
+            "scientific_rationale": "Standard percentage of maintenance for the goal (rule-based estimate).",
+            "rate_of_change_estimate": GOAL_RATES.get(facts.goal, "stable bodyweight"),
+        },
+        "maintenance_calories": maintenance,
+        "goal_calories": goal_calories,
+        "training_day_calories": training_day,
+        "rest_day_calories": rest_day,
+        "confidence_assessment": confidence,
+        "individual_factors": [f"{facts.training_days} training days per week", f"{facts.experience} lifter"],
+        "adaptive_recommendations": [
+            "Track morning bodyweight daily and compare weekly averages",
+            "Adjust intake by 100-200 kcal if the weekly trend misses the target rate for two weeks",
+        ],
+    }
+
+def calculate_macros(calories: int, facts: ProfileFacts) -> Dict[str, Any]:
+    """MacroNutrientTargets for one day: protein by g/kg, fat by share with a floor, carbs the rest."""
+    protein_per_kg = PROTEIN_PER_KG.get(facts.goal, DEFAULT_PROTEIN_PER_KG)
+    protein = round(protein_per_kg * facts.weight_kg)
+    fat = round(max(MIN_FAT_PER_KG * facts.weight_kg, calories * FAT_SHARE / 9))
+    carbs = max(0, round((calories - protein * 4 - fat * 9) / 4))
+    total = protein * 4 + carbs * 4 + fat * 9 or 1
+    return {
+        "protein_grams": protein,
+        "protein_per_kg": round(protein / facts.weight_kg, 2),
+        "protein_percentage": round(protein * 400 / total),
+        "carb_grams": carbs,
+        "carb_per_kg": round(carbs / facts.weight_kg, 2),
+        "carb_percentage": round(carbs * 400 / total),
+        "fat_grams": fat,
+        "fat_per_kg": round(fat / facts.weight_kg, 2),
+        "fat_percentage": round(fat * 900 / total),
+    }
+
+def calculate_macro_plan(caloric_targets: Dict[str, Any], facts: ProfileFacts) -> Dict[str, Any]:
+    """Macro plan in the MacroDistributionPlan shape for the given (LLM or calculated) calorie targets."""
+    targets = caloric_targets or calculate_caloric_targets(facts)
+    training_calories = targets.get("training_day_calories") or targets["goal_calories"]
+    rest_calories = targets.get("rest_day_calories") or targets["goal_calories"]
+    protein_per_kg = PROTEIN_PER_KG.get(facts.goal, DEFAULT_PROTEIN_PER_KG)
+    return {
+        "client_name": facts.name,
+        "primary_goal": facts.goal,
+        "maintenance_calories": targets["maintenance_calories"],
+        "adjusted_daily_calories": targets["goal_calories"],
+        "training_day_plan": {
+            "total_calories": training_calories,
+            "macros": calculate_macros(training_calories, facts),
+            "scientific_rationale": "Extra carbohydrate on training days to fuel sessions (rule-based split).",
+        },
+        "rest_day_plan": {
+            "total_calories": rest_calories,
+            "macros": calculate_macros(rest_calories, facts),
+            "scientific_rationale": "Same protein and fat as training days, fewer carbohydrates (rule-based split).",
+        },
+        "protein_justification": f"{protein_per_kg} g/kg bodyweight for a {facts.goal} goal.",
+        "carb_justification": "Remaining calories after protein and fat.",
+        "fat_justification": f"{int(FAT_SHARE * 100)}% of calories, at least {MIN_FAT_PER_KG} g/kg for hormonal health.",
+        "individual_considerations": [f"Bodyweight {facts.weight_kg:g} kg"],
+        "nutrient_timing_guidelines": [
+            "Spread protein over 3-5 meals of 0.3-0.5 g/kg",
+            "Place most carbohydrates around training",
+        ],
+        "adaptive_strategies": ["Change carbohydrates first when calories are adjusted"],
+    }
+
+def _sample_exercises(group: str, facts: ProfileFacts, count: int) -> List[CatalogExercise]:
+    """First catalog exercises of a group that the client's equipment and experience allow."""
+    chosen = []
+    for exercise in EXERCISE_CATALOG.get(group, []):
+        if exercise.equipment not in facts.equipment:
+            continue
+        if facts.experience == "beginner" and exercise.technical_difficulty == "High":
+            continue
+        chosen.append(exercise)
+        if len(chosen) == count:
+            break
+    return chosen
+
+def template_split(facts: ProfileFacts) -> Dict[str, Any]:
+    """Training split in the TrainingSplitRecommendation shape, from the template for the client's training days."""
+    split_type, days = SPLIT_TEMPLATES[facts.training_days]
+    frequency = "2x per week" if facts.training_days >= 4 or split_type == "Full Body" else "1-2x per week"
+    return {
+        "split_type": split_type,
+        "training_frequency": facts.training_days,
+        "muscle_group_frequency": frequency,
+        "split_days": [
+            {
+                "day_name": day_name,
+                "primary_muscle_groups": [group.title() for group in primary],
+                "secondary_muscle_groups": [group.title() for group in secondary],
+                "volume_allocation": SETS_PER_DAY[facts.experience],
+                "exercise_count_recommendation": EXERCISES_PER_DAY[facts.experience],
+                "key_exercise_types": ["Compound", "Isolation"],
+                "sample_exercises": [
+                    exercise.name for group in primary for exercise in _sample_exercises(group, facts, 1)
+                ],
+                "intensity_guideline": f"{REP_RANGES.get(facts.goal, DEFAULT_REP_RANGE)} reps, 1-3 reps in reserve",
+            }
+            for day_name, primary, secondary in days
+        ],
+        "scheduling_guidelines": {
+            "weekly_structure": WEEKLY_STRUCTURES[facts.training_days],
+            "rest_day_recommendations": "Avoid training the same muscle groups on consecutive days",
+            "deload_strategy": "Halve the sets every 5th to 8th week",
+            "recovery_considerations": ["Sleep 7-9 hours", "Keep daily steps consistent"],
+            "flexibility_options": ["Merge two sessions into full-body days in a busy week"],
+        },
+        "key_benefits": [f"Every major muscle group trained {frequency}"],
+        "scientific_rationale": "Template split chosen from the available training days (rule-based).",
+        "individual_considerations": [f"{facts.experience} lifter", f"{facts.training_days} training days per week"],
+        "progression_strategy": "Add reps within the range, then load (double progression)",
+    }
+
+def _details(exercise: CatalogExercise, facts: ProfileFacts) -> Dict[str, Any]:
+    return {
+        "name": exercise.name,
+        "category": exercise.category,
+        "equipment": exercise.equipment,
+        "primary_muscles": exercise.primary_muscles,
+        "secondary_muscles": exercise.secondary_muscles,
+        "joint_action": exercise.joint_action,
+        "rep_range": REP_RANGES.get(facts.goal, DEFAULT_REP_RANGE) if exercise.category == "Compound" else "10-15",
+        "technical_difficulty": exercise.technical_difficulty,
+        "risk_profile": exercise.risk_profile,
+        "progression_options": [exercise.progression],
+        "regression_options": [exercise.regression],
+    }
+
+def catalog_exercise_selection(split: Dict[str, Any], facts: ProfileFacts) -> Dict[str, Any]:
+    """
+    Exercise selection in the ExerciseSelectionPlan shape: for every day of the split, catalog
+    exercises for its muscle groups that fit the client's equipment and experience.
+
+    Args:
+        split: Training split (TrainingSplitRecommendation shape); its days and muscle groups are used
+        facts: Profile facts
+    """
+    days = []
+    for day in split.get("split_days", []):
+        groups = []
+        for muscle in day.get("primary_muscle_groups", []):
+            group = MUSCLE_ALIASES.get(str(muscle).lower())
+            if group and group not in groups:
+                groups.append(group)
+        focus_groups = []
+        for position, group in enumerate(groups):
+            exercises = _sample_exercises(group, facts, 2)
+            compounds = [e for e in exercises if e.category == "Compound"][:1] or exercises[:1]
+            isolations = [e for e in exercises if e not in compounds][:1]
+            focus_groups.append({
+                "muscle_group": group.title(),
+                "training_priority": "High" if position < 2 else "Medium",
+                "primary_exercises": [_details(e, facts) for e in compounds],
+                "secondary_exercises": [_details(e, facts) for e in isolations],
+                "scientific_rationale": "Catalog selection: compound movement first, isolation to add volume.",
+            })
+        order = [e["name"] for group in focus_groups for e in group["primary_exercises"]]
+        order += [e["name"] for group in focus_groups for e in group["secondary_exercises"]]
+        days.append({
+            "day_focus": day.get("day_name", "Training Day"),
+            "muscle_groups_targeted": [group.title() for group in groups],
+            "recommended_exercise_order": order,
+            "muscle_focus_groups": focus_groups,
+            "total_volume_guideline": SETS_PER_DAY[facts.experience],
+            "workout_duration_estimate": "45-75 minutes",
+        })
+    return {
+        "client_name": facts.name,
+        "primary_goal": facts.goal,
+        "training_split": split.get("split_type", "Custom"),
+        "weekly_training_days": days,
+        "exercise_selection_principles": ["Compound movements first", "Only exercises the available equipment allows"],
+        "client_specific_adaptations": [f"Equipment: {', '.join(facts.equipment)}"],
+        "progression_strategy": "Add reps within the range, then load (double progression)",
+        "variety_recommendations": "Swap accessory exercises every 6-8 weeks; keep the main lifts",
+    }
@@ -3,30 +3,31 @@ from enum import Enum
 import re
 from dataclasses import dataclass
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from startup.clients import lazy_client
+from first_time_plans.deadline import llm_timeout
+from first_time_plans.model_routing import routed
 from first_time_plans.PastClassesWanted.bodyAnalysis import BodyAnalysis
 from first_time_plans.PastClassesWanted.trainingHistoryTwo import TrainingHistoryAnalysis
 
 
-# Load environment variables and set up the API client
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-OPENAI_MODEL = "gpt-4o-mini"
+# Shared client from the registry; built on first use
+client = lazy_client()
 
 
-async def call_llm(system_message: str, prompt: str) -> str:
+async def call_llm(system_message: str, prompt: str, node: str) -> str:
     """
-    Helper function to call the LLM with a system message and a prompt.
+    Helper function to call the LLM with a system message and a prompt, routed as `node`.
     """
-    response = client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": prompt}
-        ],
-    )
+    with routed(node) as route:
+        response = client.chat.completions.create(
+            model=route.model,
+            timeout=llm_timeout(),
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": prompt}
+            ],
+            **route.options()
+        )
     return response.choices[0].message.content.strip()
 
 
@@ -230,7 +231,7 @@ class ClientAnalysisSystem:
         Prioritize findings based on impact on program success.
         """
         
-        return await call_llm(self.system_message, prompt)
+        return await call_llm(self.system_message, prompt, node=type(self).__name__)
 
 
 
@@ -382,7 +383,7 @@ class ClientReportGenerator:
         Conclude with a prioritized list of recommendations and critical success factors.
         """
         
-        return await call_llm(self.system_message, prompt)
+        return await call_llm(self.system_message, prompt, node=type(self).__name__)
 
 
 
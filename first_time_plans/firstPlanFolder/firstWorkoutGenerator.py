@@ -1,26 +1,27 @@
 from typing import Dict, Any
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from startup.clients import lazy_client
+from first_time_plans.deadline import llm_timeout
+from first_time_plans.model_routing import routed
 
-# Load environment variables and set up the API client
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
-OPENAI_MODEL = "gpt-4o-mini"
+# Shared client from the registry; built on first use
+client = lazy_client()
 
 
-async def call_llm(system_message: str, prompt: str) -> str:
+async def call_llm(system_message: str, prompt: str, node: str = "WorkoutPlanGenerator") -> str:
     """
-    Helper function to call the LLM with a system message and prompt.
+    Helper function to call the LLM with a system message and prompt, routed as `node`.
     """
-    response = client.chat.completions.create(
-        model=OPENAI_MODEL,
-        messages=[
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": prompt}
-        ], 
-    )
+    with routed(node) as route:
+        response = client.chat.completions.create(
+            model=route.model,
+            timeout=llm_timeout(),
+            messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": prompt}
+            ],
+            **route.options()
+        )
     return response.choices[0].message.content.strip()
 
 
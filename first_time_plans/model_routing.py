@@ -0,0 +1,216 @@
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from collections import deque
+from contextlib import contextmanager
+from pydantic import BaseModel
+import time
+import logging
+import threading
+from startup.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+class Route(BaseModel):
+    """
+    How one node calls the LLM.
+
+    `tier` indexes MODEL_TIERS (0 is the most capable model, higher tiers are faster);
+    `model` pins a model by name instead. max_tokens and temperature are passed to the API
+    when set. When the node's recent calls miss `slo_seconds`, it is routed one tier down.
+    """
+    tier: int = 0
+    model: Optional[str] = None
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    slo_seconds: Optional[float] = None
+
+    def options(self) -> Dict[str, Any]:
+        """Request options of the route, for chat.completions calls."""
+        options: Dict[str, Any] = {}
+        if self.max_tokens is not None:
+            options["max_tokens"] = self.max_tokens
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        return options
+
+# Defaults per node class (or legacy function); MODEL_ROUTES overrides any field
+DEFAULT_ROUTES: Dict[str, Route] = {
+    # Module A/B: profile analysis
+    "GoalClarificationModule": Route(slo_seconds=20),
+    "BodyCompositionModule": Route(slo_seconds=20),
+    "TrainingHistoryModule": Route(slo_seconds=20),
+    "RecoveryAndLifestyleModule": Route(slo_seconds=20),
+    # Module C/D: training and nutrition decisions
+    "TrainingSplitDecisionNode": Route(slo_seconds=20),
+    "VolumeAndIntensityDecisionNode": Route(slo_seconds=20),
+    "ExerciseSelectionDecisionNode": Route(slo_seconds=30),
+    "CaloricNeedsDecisionNode": Route(slo_seconds=20),
+    "MacroDistributionDecisionNode": Route(slo_seconds=20),
+    "MealTimingDecisionNode": Route(slo_seconds=20),
+    # Module E: full plans are long structured outputs
+    "NutritionDecisionClass": Route(slo_seconds=60),
+    "WorkoutDecisionClass": Route(slo_seconds=60),
+    "ReportDecision": Route(slo_seconds=40),
+    # Check-in pipeline
+    "MealAdherenceExtractor": Route(slo_seconds=20),
+    "TrainingLogsExtractor": Route(slo_seconds=20),
+    "BodyMetricsExtractor": Route(slo_seconds=20),
+    "ReportMetricExtractor": Route(slo_seconds=20),
+    "NutritionAdherenceModule": Route(slo_seconds=20),
+    "TrainingPerformanceModule": Route(slo_seconds=20),
+    "BodyMetricsModule": Route(slo_seconds=20),
+    "NoChangePreScreenNode": Route(max_tokens=300, slo_seconds=10),
+    "GoalAlignmentNode": Route(slo_seconds=20),
+    "NutritionAdjustmentNode": Route(slo_seconds=30),
+    "TrainingAdjustmentNode": Route(slo_seconds=30),
+    # Legacy endpoints
+    "optimize_gpt": Route(slo_seconds=60),
+    "workout_gpt": Route(slo_seconds=60),
+    "nutrition_gpt": Route(slo_seconds=60),
+    "checkIn_gpt": Route(slo_seconds=40),
+    "adjust_plan_gpt": Route(slo_seconds=60),
+    "adjust_plan_patch_gpt": Route(slo_seconds=40),
+    # Pulls a single number or label out of a report: the fastest tier is enough
+    "NutritionParameterExtraction": Route(tier=1, max_tokens=50, temperature=0, slo_seconds=5),
+    "MealPlanGenerator": Route(slo_seconds=60),
+    "WorkoutPlanGenerator": Route(slo_seconds=60),
+    "ClientAnalysisSystem": Route(slo_seconds=60),
+    "ClientReportGenerator": Route(slo_seconds=60),
+}
+
+class ModelRouter:
+    """
+    Picks the model and options of each LLM call from the routing table.
+
+    Latency of successful calls is kept per node and model over the last `window` calls.
+    Once at least `min_calls` are recorded and their p95 exceeds the node's SLO, the node is
+    routed to the next faster tier for `cooldown` seconds (stepping down again if that tier
+    misses the SLO as well); afterwards it returns to its configured tier.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, Route],
+        tiers: List[str],
+        window: int,
+        min_calls: int,
+        cooldown: float
+    ):
+        self.routes = routes
+        self.tiers = tiers
+        self.window = window
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+        # node -> (model it is routed to instead of its own, monotonic time the reroute ends)
+        self._rerouted: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def route(self, node: Optional[str]) -> Route:
+        """The route of a node's next call, with the model resolved (nodes without an entry use tier 0)."""
+        configured = self._configured(node)
+        with self._lock:
+            rerouted = self._rerouted.get(node)
+            if rerouted is not None and rerouted[1] <= time.monotonic():
+                logger.info(f"Routing {node} back to {configured.model}")
+                del self._rerouted[node]
+                self._latencies.pop((node, configured.model), None)
+                rerouted = None
+        if rerouted is None:
+            return configured
+        return configured.model_copy(update={"model": rerouted[0]})
+
+    def record(self, node: Optional[str], model: str, latency: float) -> None:
+        """Record the latency of a successful call and reroute the node if it misses its SLO."""
+        if node is None:
+            return
+        slo = self._configured(node).slo_seconds
+        with self._lock:
+            samples = self._latencies.setdefault((node, model), deque(maxlen=self.window))
+            samples.append(latency)
+            if slo is None or len(samples) < self.min_calls:
+                return
+            p95 = _p95(samples)
+            faster = self._faster(model)
+            if p95 <= slo or faster is None:
+                return
+            logger.warning(f"{node} missing its {slo:g}s SLO on {model} (p95 {p95:.1f}s); routing to {faster}")
+            self._rerouted[node] = (faster, time.monotonic() + self.cooldown)
+            self._latencies.pop((node, faster), None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-node active model, SLO and observed latency, plus per-model latency over all nodes."""
+        with self._lock:
+            latencies = {key: list(samples) for key, samples in self._latencies.items()}
+            rerouted = dict(self._rerouted)
+        nodes: Dict[str, Any] = {}
+        models: Dict[str, List[float]] = {}
+        for (node, model), samples in latencies.items():
+            models.setdefault(model, []).extend(samples)
+            entry = nodes.setdefault(node, {
+                "model": rerouted[node][0] if node in rerouted else self._configured(node).model,
+                "slo_seconds": self._configured(node).slo_seconds,
+                "rerouted": node in rerouted,
+                "latency_p95": {}
+            })
+            entry["latency_p95"][model] = round(_p95(samples), 3)
+        return {
+            "tiers": self.tiers,
+            "models": {model: {"calls": len(samples), "latency_p95": round(_p95(samples), 3)} for model, samples in models.items()},
+            "nodes": nodes
+        }
+
+    def _configured(self, node: Optional[str]) -> Route:
+        """The node's route from the table, with `model` filled in from its tier."""
+        route = self.routes.get(node) or Route()
+        if route.model is None:
+            route = route.model_copy(update={"model": self.tiers[min(route.tier, len(self.tiers) - 1)]})
+        return route
+
+    def _faster(self, model: str) -> Optional[str]:
+        """The next tier after model, or None for the fastest tier and models outside the tiers."""
+        if model not in self.tiers:
+            return None
+        index = self.tiers.index(model)
+        return self.tiers[index + 1] if index + 1 < len(self.tiers) else None
+
+def _p95(samples: Any) -> float:
+    """Nearest-rank p95 of a non-empty sample."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+def get_router() -> ModelRouter:
+    """The process-wide router, built from DEFAULT_ROUTES, MODEL_ROUTES and the ROUTE_* settings on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            settings = get_settings()
+            routes = dict(DEFAULT_ROUTES)
+            for node, override in settings.model_routes.items():
+                base = routes.get(node) or Route()
+                routes[node] = Route.model_validate({**base.model_dump(exclude_unset=True), **override})
+            _router = ModelRouter(
+                routes,
+                tiers=settings.model_tiers,
+                window=settings.route_window,
+                min_calls=settings.route_min_calls,
+                cooldown=settings.route_cooldown
+            )
+        return _router
+
+@contextmanager
+def routed(node: Optional[str]) -> Iterator[Route]:
+    """
+    Route one LLM call of a node: yields the route to call with and, if the block completes,
+    records its duration against the node's SLO.
+    """
+    router = get_router()
+    route = router.route(node)
+    started = time.monotonic()
+    yield route
+    router.record(node, route.model, time.monotonic() - started)
+
+def routing_stats() -> Dict[str, Any]:
+    return get_router().stats()
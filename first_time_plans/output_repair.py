@@ -0,0 +1,129 @@
+from typing import Any, List, Type, TypeVar
+import re
+import logging
+from jiter import from_json
+from pydantic import BaseModel, ValidationError
+from first_time_plans.validation import validate_python
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T", bound=BaseModel)
+
+# Validation errors of numeric fields that a number embedded in the value can fix
+NUMERIC_ERRORS = {"float_parsing", "float_type", "int_parsing", "int_type", "int_from_float"}
+# Rounds of coercion before giving up (each fixes every numeric error it is shown)
+MAX_COERCION_ROUNDS = 3
+# Validation errors quoted to the model in a fix request
+MAX_REPORTED_ERRORS = 20
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+_NUMBER = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+def repair_json(text: str) -> Any:
+    """
+    Decode JSON an LLM got slightly wrong.
+
+    Markdown fences and text before the first bracket are dropped, trailing commas removed,
+    and a truncated document is completed by parsing it with jiter in partial mode (open
+    strings, lists and objects are closed; a key without a value is dropped).
+
+    Raises:
+        ValueError: No JSON could be recovered
+    """
+    text = _FENCE.sub("", text)
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        raise ValueError("No JSON object in output")
+    return from_json(_drop_trailing_commas(text[start:]).encode("utf-8"), partial_mode="trailing-strings")
+
+def _drop_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing bracket, leaving string contents alone."""
+    out: List[str] = []
+    in_string = escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+        out.append(char)
+    return "".join(out)
+
+def coerce_to_schema(schema: Type[T], data: Any) -> T:
+    """
+    Validate data into the schema, coercing values of numeric fields that arrived as text
+    ("72.5 kg", "1,200", "80%") or as a float where an int is expected.
+
+    Raises:
+        ValidationError: The data still does not match the schema
+    """
+    for _ in range(MAX_COERCION_ROUNDS):
+        try:
+            return validate_python(schema, data)
+        except ValidationError as e:
+            if not _coerce_errors(data, e):
+                raise
+    return validate_python(schema, data)
+
+def _coerce_errors(data: Any, error: ValidationError) -> bool:
+    """Rewrite the values behind numeric validation errors in place; whether any changed."""
+    changed = False
+    for item in error.errors():
+        if item["type"] not in NUMERIC_ERRORS or not item["loc"]:
+            continue
+        *parents, last = item["loc"]
+        try:
+            container = data
+            for key in parents:
+                container = container[key]
+            value = container[last]
+        except (KeyError, IndexError, TypeError):
+            continue
+        number = _to_number(value, integer=item["type"].startswith("int"))
+        if number is not None and number != value:
+            container[last] = number
+            changed = True
+    return changed
+
+def _to_number(value: Any, integer: bool) -> Any:
+    """The number in a value (the first one in a string), rounded for int fields; None if there is none."""
+    if isinstance(value, str):
+        match = _NUMBER.search(value)
+        if match is None:
+            return None
+        value = float(match.group().replace(",", ""))
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return None
+    return int(round(value)) if integer else value
+
+def repair_output(schema: Type[T], content: str) -> T:
+    """
+    Recover a structured output locally: repair_json() followed by coerce_to_schema().
+
+    Raises:
+        ValueError: The output cannot be recovered without the model (ValidationError included)
+    """
+    model = coerce_to_schema(schema, repair_json(content))
+    logger.info(f"Repaired {schema.__name__} output locally")
+    return model
+
+def describe_errors(error: Exception) -> str:
+    """Validation errors as short lines for a fix request (the first MAX_REPORTED_ERRORS)."""
+    if not isinstance(error, ValidationError):
+        return f"- {str(error)}"
+    lines = [
+        f"- {'.'.join(str(part) for part in item['loc']) or '(root)'}: {item['msg']}"
+        for item in error.errors()[:MAX_REPORTED_ERRORS]
+    ]
+    if error.error_count() > MAX_REPORTED_ERRORS:
+        lines.append(f"- ... and {error.error_count() - MAX_REPORTED_ERRORS} more")
+    return "\n".join(lines)
@@ -0,0 +1,156 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import Future
+import threading
+import logging
+from jiter import from_json
+from first_time_plans.deadline import DeadlineExceeded, current_deadline
+
+logger = logging.getLogger(__name__)
+
+def final_fields(partial: Any, prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    """
+    Fields of a partially streamed JSON object whose values can no longer change.
+
+    The snapshot is the partial parse of the output so far. Fields are generated in order, so
+    every key of an object except the last is final; the last one is still being written and
+    is only descended into, giving dotted paths for nested fields.
+    """
+    if not isinstance(partial, dict) or not partial:
+        return
+    keys = list(partial)
+    for key in keys[:-1]:
+        yield from all_fields({key: partial[key]}, prefix)
+    yield from final_fields(partial[keys[-1]], f"{prefix}{keys[-1]}.")
+
+def all_fields(value: Any, prefix: str = "") -> Iterator[Tuple[str, Any]]:
+    """Every field of a complete JSON object, nested ones under dotted paths."""
+    if not isinstance(value, dict):
+        return
+    for key, item in value.items():
+        yield f"{prefix}{key}", item
+        yield from all_fields(item, f"{prefix}{key}.")
+
+class FieldEvents:
+    """
+    Field-completion events of one structured LLM call.
+
+    Pass an instance to BaseLLM.call_llm (or a node's process()) and the call streams its
+    output, publishing each field as soon as it is final; a downstream node can wait() for the
+    few fields it depends on and start while the rest of the object is still being generated.
+    """
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None):
+        """
+        Initialize the FieldEvents.
+
+        Args:
+            on_field: Called with (path, value) for every field once it is final
+        """
+        self.on_field = on_field
+        self._fields: Dict[str, Any] = {}
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+
+    def update(self, snapshot: str) -> None:
+        """
+        Publish the fields that are final in the JSON text received so far.
+
+        The text is parsed with jiter in partial mode keeping trailing strings: a field is final
+        as soon as the next one starts, even while that one is a long string still streaming
+        (the SDK's own partial parse drops it, holding back the field before it).
+        """
+        try:
+            partial = from_json(snapshot.encode("utf-8"), partial_mode="trailing-strings")
+        except ValueError:
+            return
+        self._publish(list(final_fields(partial)))
+
+    def complete(self, result: Any) -> None:
+        """Publish every field of the finished output."""
+        if hasattr(result, "model_dump"):
+            result = result.model_dump()
+        self._publish(list(all_fields(result)))
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def fail(self, error: BaseException) -> None:
+        """End the events with the call's error; waiting consumers get it raised."""
+        with self._cond:
+            if not self._done:
+                self._error = error
+                self._done = True
+                self._cond.notify_all()
+
+    def close(self) -> None:
+        """End the events without an error, e.g. when the call returned without publishing its fields."""
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def wait(self, *paths: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Block until the given fields are final.
+
+        Args:
+            paths: Dotted field paths (e.g. "split_type", "intensity_guidelines.rpe_recommendation")
+            timeout: Seconds to wait (default: the remaining request budget, or no limit outside a request)
+
+        Returns:
+            The fields' values by path
+
+        Raises:
+            KeyError: The output finished without one of the fields
+            DeadlineExceeded: The fields were not final in time
+            Exception: The call failed before the fields were final (its own error)
+        """
+        if timeout is None:
+            deadline = current_deadline()
+            timeout = max(deadline.remaining(), 0) if deadline is not None else None
+        with self._cond:
+            ready = self._cond.wait_for(lambda: self._done or all(p in self._fields for p in paths), timeout)
+            if not ready:
+                raise DeadlineExceeded(f"Fields {', '.join(paths)} not final in time")
+            missing = [p for p in paths if p not in self._fields]
+            if missing:
+                if self._error is not None:
+                    raise self._error
+                raise KeyError(f"Output has no field {', '.join(missing)}")
+            return {p: self._fields[p] for p in paths}
+
+    def _publish(self, fields: List[Tuple[str, Any]]) -> None:
+        with self._cond:
+            new = [(path, value) for path, value in fields if path not in self._fields]
+            if not new:
+                return
+            self._fields.update(new)
+            self._cond.notify_all()
+        if self.on_field is not None:
+            for path, value in new:
+                self.on_field(path, value)
+
+def early_input(fields: FieldEvents, future: "Future[Dict[str, Any]]", key: str, *paths: str) -> Dict[str, Any]:
+    """
+    Input for a node started before its upstream node finished: the upstream output under `key`,
+    reduced to the fields the node depends on, as soon as those are final.
+
+    If the upstream node finishes without publishing them (its call failed and it fell back to
+    a rule-based result, or its LLM client does not stream), the node gets the upstream node's
+    finished result instead.
+
+    Args:
+        fields: Events of the upstream node's call
+        future: The upstream node's process() running in another thread
+        key: Key of the structured output in the upstream node's result
+        paths: Top-level fields the node depends on
+    """
+    future.add_done_callback(lambda _: fields.close())
+    try:
+        values = fields.wait(*paths)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.info(f"Early fields {', '.join(paths)} unavailable ({str(e)}); waiting for the full result")
+        return future.result()
+    return {key: values}
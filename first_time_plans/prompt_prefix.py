@@ -0,0 +1,32 @@
+import json
+from typing import Any, Dict
+
+# Identical for every node of a run, so that together with the profile it forms a byte-identical
+# prompt prefix the provider can cache; node-specific roles and instructions always come after it
+SHARED_PERSONA = (
+    "You are one step of an evidence-based coaching system that follows Dr. Mike Israetel's "
+    "(Renaissance Periodization) principles for hypertrophy, strength, nutrition and recovery. "
+    "Every step of this client's plan receives the same client profile below; your step-specific "
+    "role, instructions and inputs follow after it. Base every conclusion on the profile and "
+    "the inputs you are given."
+)
+
+
+def canonical_json(data: Any) -> str:
+    """
+    Serialize data deterministically: sorted keys, no insignificant whitespace.
+
+    :param data: JSON-serializable data (non-serializable values fall back to str).
+    :return: The same string for equal data, whatever the key order.
+    """
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def build_shared_prefix(profile: Dict[str, Any]) -> str:
+    """
+    Build the stable prompt prefix (persona + canonical client profile) for a run.
+
+    :param profile: The standardized client profile.
+    :return: Prefix text to pass to BaseLLM(shared_prefix=...).
+    """
+    return f"{SHARED_PERSONA}\n\nCLIENT PROFILE:\n{canonical_json(profile)}"
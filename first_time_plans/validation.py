@@ -0,0 +1,54 @@
+from functools import lru_cache
+from typing import Any, Type, TypeVar, Union
+from pydantic import TypeAdapter
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=None)
+def get_adapter(schema: Type[T]) -> TypeAdapter:
+    """
+    Return the TypeAdapter for a schema, building its validator only once per process.
+
+    :param schema: A Pydantic model class or any type TypeAdapter accepts (e.g. List[Model]).
+    :return: The cached TypeAdapter.
+    """
+    return TypeAdapter(schema)
+
+
+def validate_json(schema: Type[T], data: Union[str, bytes]) -> T:
+    """
+    Validate raw JSON text or bytes straight into the schema, without an intermediate dict.
+
+    :param schema: The target type.
+    :param data: Raw JSON, e.g. the content of an LLM completion or a request body.
+    :return: The validated instance.
+    """
+    return get_adapter(schema).validate_json(data)
+
+
+def validate_python(schema: Type[T], data: Any) -> T:
+    """
+    Validate already-decoded data (dicts, lists) into the schema.
+
+    :param schema: The target type.
+    :param data: Decoded data.
+    :return: The validated instance.
+    """
+    return get_adapter(schema).validate_python(data)
+
+
+def to_model(schema: Type[T], result: Any) -> T:
+    """
+    Coerce an LLM result into the schema: instances pass through untouched, raw JSON is
+    validated from text and dicts are validated as Python data.
+
+    :param schema: The target type.
+    :param result: Model instance, JSON text/bytes or decoded data.
+    :return: The validated instance.
+    """
+    if isinstance(schema, type) and isinstance(result, schema):
+        return result
+    if isinstance(result, (str, bytes, bytearray)):
+        return validate_json(schema, result)
+    return validate_python(schema, result)
@@ -1,17 +1,15 @@
 import os
 import io
 import sys
-from dotenv import load_dotenv
-from  openai import OpenAI
+from startup.clients import lazy_client
+from first_time_plans.deadline import llm_timeout
+from first_time_plans.model_routing import routed
 
 
 
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Shared client from the registry; built on first use
+client = lazy_client()
 
-OPENAI_MODEL = "gpt-4o-mini"
-#OPENAI_MODEL = "gpt-3.5-turbo"
 
 # some regardign to sysme message the one use preovuisl 
 
@@ -226,7 +224,8 @@ def messages_for(profile):
     ]
 
 def optimize_gpt(profile):
-    reply =  client.chat.completions.create(model= OPENAI_MODEL, messages = messages_for(profile))
+    with routed("optimize_gpt") as route:
+        reply =  client.chat.completions.create(model= route.model, messages = messages_for(profile), timeout=llm_timeout(), **route.options())
     reply_text = reply.choices[0].message.content
     return reply_text
 
@@ -330,7 +329,8 @@ def message_workout_plan(report):
     ]
     
 async def workout_gpt(user_id: str, report: str):
-    reply =  client.chat.completions.create(model= OPENAI_MODEL, messages = message_workout_plan(report))
+    with routed("workout_gpt") as route:
+        reply =  client.chat.completions.create(model= route.model, messages = message_workout_plan(report), timeout=llm_timeout(), **route.options())
     reply_text = reply.choices[0].message.content
     print(workout_gpt)
     return reply_text
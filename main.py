@@ -1,9 +1,88 @@
 import os
+import gc
+import signal
+import logging
 import uvicorn
+from startup.config import get_settings, configure_logging
+
+logger = logging.getLogger("launcher")
+
+
+def serve_workers(host: str, port: int, workers: int, graceful_timeout: int) -> None:
+    """
+    Production launcher: import the app once, then fork `workers` uvicorn servers sharing one socket.
+
+    The app and every lazily imported pipeline module are loaded in the parent before forking,
+    so the workers share them copy-on-write instead of importing everything N times. State lives
+    under the (absolute) STATE_DIR of the shared settings. On SIGTERM/SIGINT every worker stops
+    accepting connections and drains its in-flight pipelines for up to `graceful_timeout`
+    seconds; workers that die unexpectedly are replaced.
+    """
+    config = uvicorn.Config("api:app", host=host, port=port, timeout_graceful_shutdown=graceful_timeout)
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.Server(config).run()
+        return
+
+    # Pre-fork import, then keep the loaded objects out of the collector so that
+    # garbage collection in the workers does not copy the shared pages
+    config.load()
+    from startup.lazy import preload
+    logger.info(f"Preloaded {preload()} pipeline object(s)")
+    sock = config.bind_socket()
+    gc.freeze()
+
+    children = set()
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            # Own process group: a terminal Ctrl+C reaches the parent only, which forwards one SIGTERM
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info(f"Draining {len(children)} worker(s)")
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    logger.info(f"Started {workers} worker(s) on {host}:{port}")
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            logger.warning(f"Worker {pid} exited with status {status}, restarting")
+            spawn()
+    sock.close()
+
 
 if __name__ == "__main__":
-    port = int(os.getenv("PORT", 8000))  # Get port from environment variable or default to 8000
-    host = "0.0.0.0"  # This is the standard for making the app externally accessible
-    reload = os.getenv("ENV") != "production"  # Only reload in development
+    configure_logging()
+    settings = get_settings()
 
-    uvicorn.run("api:app", host=host, port=port, reload=reload)
+    if settings.production:
+        # WEB_CONCURRENCY workers (default: one per core); GRACEFUL_TIMEOUT seconds to drain on shutdown
+        serve_workers(settings.host, settings.port, settings.web_concurrency, settings.graceful_timeout)
+    else:
+        uvicorn.run("api:app", host=settings.host, port=settings.port, reload=True)  # Only reload in development
@@ -1,16 +1,15 @@
 import os
 import io
 import sys
-from dotenv import load_dotenv
-from  openai import OpenAI
+from startup.clients import lazy_client
+from first_time_plans.deadline import llm_timeout
+from first_time_plans.model_routing import routed
 
 
 
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=api_key)
+# Shared client from the registry; built on first use
+client = lazy_client()
 
-OPENAI_MODEL = "gpt-4o-mini"
 
 
 
@@ -146,7 +145,8 @@ def message_nutri_plan(report):
     ]
     
 async def nutrition_gpt(user_id: str, report: str):
-    reply =  client.chat.completions.create(model= OPENAI_MODEL, messages = message_nutri_plan(report))
+    with routed("nutrition_gpt") as route:
+        reply =  client.chat.completions.create(model= route.model, messages = message_nutri_plan(report), timeout=llm_timeout(), **route.options())
     reply_text = reply.choices[0].message.content
     return reply_text
     
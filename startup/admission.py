@@ -0,0 +1,194 @@
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import heapq
+import itertools
+import math
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+FIRST_PLAN = "first_plan"
+CHECK_IN = "check_in"
+BATCH = "batch"
+PRIORITIES = {FIRST_PLAN: 0, CHECK_IN: 1, BATCH: 2}
+
+# Header a caller (e.g. a backfill script) sets to run its requests in a lower class
+PRIORITY_HEADER = "X-Request-Priority"
+
+# Weight of the newest run in the service-time averages
+SERVICE_TIME_ALPHA = 0.2
+# Recent queue waits kept per class for the percentiles
+WAIT_SAMPLES = 1000
+
+class AdmissionRejected(Exception):
+    """The request cannot start within its deadline; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class ClassStats:
+    """Counters and recent queue waits of one priority class."""
+
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = 0
+        self.running = 0
+        self.service_time: Optional[float] = None
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+
+    def record_service(self, seconds: float) -> None:
+        if self.service_time is None:
+            self.service_time = seconds
+        else:
+            self.service_time += SERVICE_TIME_ALPHA * (seconds - self.service_time)
+
+    def snapshot(self, queued: int) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+        return {
+            "queued": queued,
+            "running": self.running,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_p50": round(_percentile(waits, 0.50), 3),
+            "wait_p95": round(_percentile(waits, 0.95), 3),
+            "service_time": round(self.service_time, 3) if self.service_time is not None else None
+        }
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list (0 when empty)."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class AdmissionController:
+    """
+    Bounds the number of pipelines a worker runs at once and queues the rest by priority.
+
+    Pipelines are admitted while fewer than `max_concurrent` are running; beyond that they wait
+    in a priority queue (first plans before check-ins before batch jobs, FIFO within a class).
+    A request whose budget would run out before it could start and finish a typical run is
+    rejected at once, or as soon as its wait reaches that point, instead of joining a queue
+    that makes every admitted request slow. Lives on one worker's event loop; no locking needed.
+    """
+
+    def __init__(self, max_concurrent: int):
+        """
+        Initialize the AdmissionController.
+
+        Args:
+            max_concurrent: Pipelines run at once by this worker
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self._running = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._classes = {name: ClassStats() for name in PRIORITIES}
+
+    @asynccontextmanager
+    async def slot(self, priority_class: str, budget: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold one pipeline slot for the enclosed block.
+
+        Args:
+            priority_class: FIRST_PLAN, CHECK_IN or BATCH
+            budget: Seconds left in the request's deadline, or None to wait as long as it takes
+
+        Raises:
+            AdmissionRejected: The request cannot start in time
+        """
+        stats = self._classes[priority_class]
+        queued_at = time.monotonic()
+        await self._acquire(priority_class, budget)
+        started_at = time.monotonic()
+        stats.admitted += 1
+        stats.running += 1
+        stats.waits.append(started_at - queued_at)
+        try:
+            yield
+        finally:
+            stats.running -= 1
+            stats.record_service(time.monotonic() - started_at)
+            self._release()
+
+    def estimated_wait(self, priority_class: str) -> float:
+        """
+        Seconds until a request of the class joining now would start: the queued requests ahead
+        of it, run max_concurrent at a time, at the average service time.
+        """
+        if self._running < self.max_concurrent and not self._live_waiters():
+            return 0.0
+        priority = PRIORITIES[priority_class]
+        ahead = sum(1 for p, _, future in self._waiters if p <= priority and not future.done())
+        return (ahead + 1) / self.max_concurrent * self._service_time()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running pipelines, queue wait percentiles and service time per class."""
+        queued = {name: 0 for name in PRIORITIES}
+        names = {p: name for name, p in PRIORITIES.items()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                queued[names[priority]] += 1
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self._running,
+            "queued": sum(queued.values()),
+            "classes": {name: stats.snapshot(queued[name]) for name, stats in self._classes.items()}
+        }
+
+    async def _acquire(self, priority_class: str, budget: Optional[float]) -> None:
+        """Take a slot, waiting in the queue if none is free."""
+        if self._running < self.max_concurrent and not self._live_waiters():
+            self._running += 1
+            return
+
+        stats = self._classes[priority_class]
+        # Starting later than this leaves less than a typical run of the class
+        start_by = None
+        if budget is not None:
+            start_by = max(0.0, budget - (stats.service_time or 0.0))
+            estimate = self.estimated_wait(priority_class)
+            if estimate > start_by:
+                stats.rejected += 1
+                raise AdmissionRejected(
+                    f"Server busy: expected queue wait {estimate:.0f}s exceeds the request budget", estimate
+                )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[priority_class], next(self._seq), future))
+        try:
+            await asyncio.wait_for(future, timeout=start_by)
+        except asyncio.TimeoutError:
+            stats.rejected += 1
+            retry_after = self.estimated_wait(priority_class)
+            raise AdmissionRejected(f"Server busy: not started within {start_by:.0f}s", retry_after)
+        except BaseException:
+            # Cancelled (client gone) just as the slot was granted: hand it on
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        """Free a slot and grant it to the first live waiter."""
+        self._running -= 1
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self._running += 1
+                future.set_result(None)
+                return
+
+    def _live_waiters(self) -> bool:
+        """Whether any request is still queued (timed-out entries are dropped lazily)."""
+        while self._waiters and self._waiters[0][2].done():
+            heapq.heappop(self._waiters)
+        return bool(self._waiters)
+
+    def _service_time(self) -> float:
+        """Average pipeline duration over all classes (0 until one has finished)."""
+        times = [stats.service_time for stats in self._classes.values() if stats.service_time is not None]
+        return sum(times) / len(times) if times else 0.0
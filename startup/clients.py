@@ -0,0 +1,60 @@
+from typing import Any, Callable, Dict
+import logging
+import threading
+from startup.config import get_settings
+from startup.lazy import LazyObject
+
+logger = logging.getLogger(__name__)
+
+def _openai_client() -> Any:
+    """Default factory: the OpenAI SDK is only imported when the first client is built."""
+    from openai import OpenAI
+    settings = get_settings()
+    return OpenAI(api_key=settings.openai_api_key, timeout=settings.llm_timeout)
+
+class ClientRegistry:
+    """
+    One shared instance per named API client, created on first use.
+
+    Every module used to build its own OpenAI client at import time; they now share the
+    registry's client, and therefore its HTTP connection pool.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {"openai": _openai_client}
+        self._clients: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Register (or replace) the factory of a named client."""
+        with self._lock:
+            self._factories[name] = factory
+            self._clients.pop(name, None)
+
+    def get(self, name: str = "openai") -> Any:
+        """Return the named client, building it on first use."""
+        with self._lock:
+            if name not in self._clients:
+                self._clients[name] = self._factories[name]()
+            return self._clients[name]
+
+    def lazy(self, name: str = "openai") -> LazyObject:
+        """A module-level stand-in for the named client that does not build it at import time."""
+        return LazyObject(lambda: self.get(name), label=f"client:{name}")
+
+    def warm_up(self) -> None:
+        """
+        Open a pooled connection on every registered client, so that a freshly started worker's
+        first requests do not pay for DNS and TLS setup. Failures are logged, never raised.
+        """
+        for name in list(self._factories):
+            try:
+                self.get(name).with_options(max_retries=0, timeout=10).models.list()
+            except Exception as e:
+                logger.warning(f"Warm-up of client '{name}' failed: {str(e)}")
+
+registry = ClientRegistry()
+
+def lazy_client(name: str = "openai") -> LazyObject:
+    """Shorthand for ``registry.lazy(name)``."""
+    return registry.lazy(name)
@@ -0,0 +1,129 @@
+from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from pydantic import BaseModel
+import os
+import json
+import logging
+
+class Settings(BaseModel):
+    """
+    Process-wide configuration, read once from the environment (and .env) at startup.
+
+    Modules read their settings from here instead of calling load_dotenv() and os.getenv()
+    at import time.
+    """
+    env: str = "development"
+    host: str = "0.0.0.0"
+    port: int = 8000
+    web_concurrency: int = 1
+    graceful_timeout: int = 120
+    warmup: bool = False
+    import_profile: bool = False
+    log_level: str = "INFO"
+    openai_api_key: Optional[str] = None
+    openai_model: str = "gpt-4o-mini"
+    # Seconds; LLM calls outside a request deadline, and the cap on client-requested budgets
+    llm_timeout: float = 120.0
+    max_request_timeout: float = 600.0
+    # Keep running a pipeline whose client disconnected (its results still warm the caches)
+    complete_on_disconnect: bool = False
+    # Seconds a response stored under an Idempotency-Key is replayed to retries
+    idempotency_ttl: float = 86400.0
+    # Chunk results (see check_time_plans.data_ingestion.chunking): entries kept in memory per
+    # process, and seconds an unused result stays on disk
+    chunk_cache_max_entries: int = 1024
+    chunk_cache_ttl: float = 30 * 86400.0
+    # Pipelines one worker runs at once; further requests queue by priority
+    max_concurrent_pipelines: int = 4
+    # Per-model LLM circuit breaker: opens when failure_rate of the last `window` calls
+    # (at least min_calls) hit a provider error or took longer than slow_call_seconds to
+    # answer (to the first chunk when streamed); retries after cooldown
+    circuit_window: int = 20
+    circuit_min_calls: int = 5
+    circuit_failure_rate: float = 0.5
+    circuit_slow_call_seconds: float = 60.0
+    circuit_cooldown: float = 30.0
+    # Model tiers, most capable first; nodes route one tier down while they miss their latency SLO
+    model_tiers: List[str] = ["gpt-4o-mini", "gpt-4.1-nano"]
+    # Per-node overrides of the routing table (see first_time_plans.model_routing)
+    model_routes: Dict[str, Dict[str, Any]] = {}
+    route_window: int = 20
+    route_min_calls: int = 5
+    route_cooldown: float = 300.0
+    # Bulk runs: "openai" (Batch API) or "local" (file-based stand-in under state_dir/batches).
+    # A batch is submitted once every run waits on a request, at batch_max_requests, or
+    # batch_max_wait seconds after its first request; batch_max_runs runs execute at once
+    batch_backend: str = "openai"
+    batch_max_requests: int = 1000
+    batch_max_wait: float = 10.0
+    batch_poll_interval: float = 30.0
+    batch_max_runs: int = 50
+    state_dir: str = ".state"
+
+    @property
+    def production(self) -> bool:
+        return self.env == "production"
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build the settings from environment variables, after loading .env if present."""
+        from dotenv import load_dotenv
+        load_dotenv()
+        env = os.getenv("ENV", "development")
+        openai_model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        tiers = os.getenv("MODEL_TIERS", f"{openai_model},gpt-4.1-nano")
+        return cls(
+            env=env,
+            host=os.getenv("HOST", "0.0.0.0"),
+            port=int(os.getenv("PORT", 8000)),
+            web_concurrency=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+            graceful_timeout=int(os.getenv("GRACEFUL_TIMEOUT", 120)),
+            warmup=os.getenv("WARMUP", "1" if env == "production" else "0") == "1",
+            import_profile=os.getenv("IMPORT_PROFILE") == "1",
+            log_level=os.getenv("LOG_LEVEL", "INFO").upper(),
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            openai_model=openai_model,
+            llm_timeout=float(os.getenv("LLM_TIMEOUT", 120)),
+            max_request_timeout=float(os.getenv("MAX_REQUEST_TIMEOUT", 600)),
+            complete_on_disconnect=os.getenv("COMPLETE_ON_DISCONNECT") == "1",
+            idempotency_ttl=float(os.getenv("IDEMPOTENCY_TTL", 86400)),
+            chunk_cache_max_entries=int(os.getenv("CHUNK_CACHE_MAX_ENTRIES", 1024)),
+            chunk_cache_ttl=float(os.getenv("CHUNK_CACHE_TTL", 30 * 86400)),
+            max_concurrent_pipelines=int(os.getenv("MAX_CONCURRENT_PIPELINES", 4)),
+            circuit_window=int(os.getenv("CIRCUIT_WINDOW", 20)),
+            circuit_min_calls=int(os.getenv("CIRCUIT_MIN_CALLS", 5)),
+            circuit_failure_rate=float(os.getenv("CIRCUIT_FAILURE_RATE", 0.5)),
+            circuit_slow_call_seconds=float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", 60)),
+            circuit_cooldown=float(os.getenv("CIRCUIT_COOLDOWN", 30)),
+            model_tiers=list(dict.fromkeys(m.strip() for m in tiers.split(",") if m.strip())),
+            model_routes=_json_setting(os.getenv("MODEL_ROUTES")),
+            route_window=int(os.getenv("ROUTE_WINDOW", 20)),
+            route_min_calls=int(os.getenv("ROUTE_MIN_CALLS", 5)),
+            route_cooldown=float(os.getenv("ROUTE_COOLDOWN", 300)),
+            batch_backend=os.getenv("BATCH_BACKEND", "openai").lower(),
+            batch_max_requests=int(os.getenv("BATCH_MAX_REQUESTS", 1000)),
+            batch_max_wait=float(os.getenv("BATCH_MAX_WAIT", 10)),
+            batch_poll_interval=float(os.getenv("BATCH_POLL_INTERVAL", 30)),
+            batch_max_runs=int(os.getenv("BATCH_MAX_RUNS", 50)),
+            # Absolute, so that every worker process resolves the same directory
+            state_dir=os.path.abspath(os.getenv("STATE_DIR", ".state"))
+        )
+
+def _json_setting(value: Optional[str]) -> Dict[str, Any]:
+    """A JSON object given inline or as the path of a JSON file (empty when unset)."""
+    if not value:
+        return {}
+    if not value.lstrip().startswith("{"):
+        with open(value, "r", encoding="utf-8") as f:
+            value = f.read()
+    return json.loads(value)
+
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The settings of this process, loaded on first use."""
+    return Settings.from_env()
+
+@lru_cache(maxsize=None)
+def configure_logging() -> None:
+    """Configure the root logger once per process (replaces the per-module basicConfig calls)."""
+    logging.basicConfig(level=get_settings().log_level)
@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Tuple
+from importlib.abc import MetaPathFinder, Loader
+import sys
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class _TimedLoader(Loader):
+    """Wraps a module's loader and times its execution."""
+
+    def __init__(self, loader: Loader, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec: Any) -> Any:
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        self._profiler._enter()
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__, time.perf_counter() - start)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+class ImportProfiler(MetaPathFinder):
+    """
+    Records how long every module takes to import, for a startup report.
+
+    Installed as the first meta path finder; it resolves specs through the remaining finders
+    and wraps their loaders, recording cumulative time (including nested imports) and self
+    time per module.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self._local = threading.local()
+        self._started = time.perf_counter()
+
+    def start(self) -> "ImportProfiler":
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def stop(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname: str, path: Any, target: Any = None) -> Any:
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                        spec.loader = _TimedLoader(spec.loader, self)
+                    return spec
+            return None
+        finally:
+            self._local.finding = False
+
+    def _enter(self) -> None:
+        stack = getattr(self._local, "children", None)
+        if stack is None:
+            stack = self._local.children = []
+        stack.append(0.0)
+
+    def _exit(self, name: str, elapsed: float) -> None:
+        stack = self._local.children
+        nested = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        self.timings[name] = (elapsed, elapsed - nested)
+
+    def report(self, top: int = 15, stop: bool = True) -> List[Dict[str, Any]]:
+        """
+        Log and return the slowest imports.
+
+        Args:
+            top: Number of modules to report
+            stop: Uninstall the profiler afterwards
+
+        Returns:
+            Rows of module, cumulative_ms and self_ms, slowest cumulative first
+        """
+        if stop:
+            self.stop()
+        rows = [
+            {"module": name, "cumulative_ms": round(total * 1000, 1), "self_ms": round(own * 1000, 1)}
+            for name, (total, own) in sorted(self.timings.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        ]
+        elapsed = (time.perf_counter() - self._started) * 1000
+        logger.info(f"Imported {len(self.timings)} modules in {elapsed:.0f} ms; slowest:")
+        for row in rows:
+            logger.info(f"  {row['cumulative_ms']:>8.1f} ms cumulative {row['self_ms']:>8.1f} ms self  {row['module']}")
+        return rows
+
+def start_import_profiler(enabled: bool) -> Optional[ImportProfiler]:
+    """Install an ImportProfiler when enabled (IMPORT_PROFILE=1), else return None."""
+    return ImportProfiler().start() if enabled else None
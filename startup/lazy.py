@@ -0,0 +1,58 @@
+from typing import Any, Callable, List
+from importlib import import_module
+import threading
+
+_UNSET = object()
+
+class LazyObject:
+    """
+    Stand-in for an object that is only built on first use.
+
+    Calls and attribute access are forwarded to the real object, so a lazily imported class,
+    function or store can be used exactly like the eager one. isinstance checks, ``except``
+    clauses and type annotations still need the real object and must import it eagerly.
+    """
+
+    __slots__ = ("_factory", "_target", "_lock", "_label")
+
+    def __init__(self, factory: Callable[[], Any], label: str = ""):
+        self._factory = factory
+        self._target = _UNSET
+        self._lock = threading.Lock()
+        self._label = label
+        _registry.append(self)
+
+    def resolve(self) -> Any:
+        """Build (once) and return the real object."""
+        if self._target is _UNSET:
+            with self._lock:
+                if self._target is _UNSET:
+                    self._target = self._factory()
+        return self._target
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.resolve()(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.resolve(), name)
+
+    def __repr__(self) -> str:
+        state = "unresolved" if self._target is _UNSET else "resolved"
+        return f"LazyObject({self._label or self._factory!r}, {state})"
+
+_registry: List[LazyObject] = []
+
+def lazy_import(module: str, name: str) -> LazyObject:
+    """``from module import name``, deferred until the name is first called or accessed."""
+    return LazyObject(lambda: getattr(import_module(module), name), label=f"{module}.{name}")
+
+def preload() -> int:
+    """
+    Resolve every lazy object created so far, e.g. in the launcher before forking workers.
+
+    Returns:
+        Number of objects resolved
+    """
+    for lazy in list(_registry):
+        lazy.resolve()
+    return len(_registry)
@@ -0,0 +1,143 @@
+import os
+import sys
+import copy
+import tempfile
+from types import SimpleNamespace
+
+# On-disk stores resolve their directories at import time; keep them out of the working tree
+os.environ.setdefault("STATE_DIR", tempfile.mkdtemp(prefix="checkin-tests-"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from openai import NOT_GIVEN
+from openai.lib.streaming.chat import ChatCompletionStreamState
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+MEAL_PLAN = {
+    "name": "Plan",
+    "description": "",
+    "totalDailyNutrition": {"protein": 180, "carbohydrates": 300, "fat": 70, "calories": 2550},
+    "trainingDayMeals": [
+        {"name": "Breakfast", "nutrition": {"protein": 60, "carbohydrates": 100, "fat": 25, "calories": 865}},
+        {"name": "Lunch", "nutrition": {"protein": 60, "carbohydrates": 100, "fat": 25, "calories": 865}},
+        {"name": "Dinner", "nutrition": {"protein": 60, "carbohydrates": 100, "fat": 20, "calories": 820}},
+    ],
+    "nonTrainingDayMeals": [
+        {"name": "Breakfast", "nutrition": {"protein": 60, "carbohydrates": 70, "fat": 25, "calories": 745}},
+        {"name": "Lunch", "nutrition": {"protein": 60, "carbohydrates": 70, "fat": 25, "calories": 745}},
+        {"name": "Dinner", "nutrition": {"protein": 60, "carbohydrates": 60, "fat": 20, "calories": 660}},
+    ],
+}
+
+WORKOUT_PLAN = {
+    "name": "Upper/Lower",
+    "schedule": [
+        {"day": 1, "type": "Upper", "exercises": [{"name": "Bench Press", "sets": 4, "reps": 8}]},
+        {"day": 2, "type": "Lower", "exercises": [{"name": "Squat", "sets": 4, "reps": 6}]},
+        {"day": 3, "type": "Rest Day"},
+        {"day": 4, "type": "Upper", "exercises": [{"name": "Barbell Row", "sets": 4, "reps": 8}]},
+    ],
+}
+
+TRAINING_DATES = ("2025-03-01", "2025-03-03", "2025-03-05")
+
+def make_check_in(weight_slope: float = 0.03, goals: dict = None) -> dict:
+    """A week of check-in data that eats exactly to plan: training-day targets on logged days, rest-day targets otherwise."""
+    reports = []
+    for i in range(7):
+        date = f"2025-03-0{i + 1}"
+        macros = (
+            {"proteins": 180, "carbs": 300, "fats": 70} if date in TRAINING_DATES
+            else {"proteins": 180, "carbs": 200, "fats": 70}
+        )
+        reports.append({"day": i + 1, "date": date, "weight": 80 + weight_slope * i, "macros": macros})
+    logs = [
+        {"name": "Bench Press", "entries": [{"date": "2025-03-01", "weight": 80}, {"date": "2025-03-05", "weight": 82.5}]},
+        {"name": "Squat", "entries": [{"date": "2025-03-03", "weight": 100}]},
+    ]
+    return {
+        "analysisReport": goals or {"weeklyGoal": "gain 0.2kg lean mass", "monthlyGoal": "bulk", "quarterlyGoal": "gain 3kg"},
+        "bodyMeasurements": {
+            "dates": {"current": "2025-03-07", "previous": "2025-02-28"},
+            "measurements": {"bellyWaistGirth": {"current": 84, "previous": 85, "unit": "cm", "change": -1}},
+        },
+        "dailyReports": reports,
+        "exercisesLog": logs,
+        "mealPlan": copy.deepcopy(MEAL_PLAN),
+        "userWorkoutDetails": copy.deepcopy(WORKOUT_PLAN),
+        "weekReport": {"date": "2025-03-07", "userId": "u1", "averageWeight": 80.1},
+    }
+
+class FakeLLM:
+    """Records calls and answers with a fixed text (or an empty object for structured calls)."""
+
+    def __init__(self, reply: str = "summary text"):
+        self.reply = reply
+        self.calls = []
+
+    def call_llm(self, prompt, system_message, schema=None, function_schema=None, **kwargs):
+        self.calls.append((prompt, system_message, schema))
+        return self.reply if schema is None and function_schema is None else {}
+
+class SDKStream:
+    """A chat completion stream of one scripted answer, run through the SDK's stream state."""
+
+    def __init__(self, model, content, finish_reason, response_format=NOT_GIVEN):
+        self.model = model
+        self.content = content
+        self.finish_reason = finish_reason
+        self._state = ChatCompletionStreamState(response_format=response_format)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        for delta, reason in ((self.content, None), ("", self.finish_reason)):
+            chunk = ChatCompletionChunk.model_validate({
+                "id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": self.model,
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": delta}, "finish_reason": reason}],
+            })
+            yield from self._state.handle_chunk(chunk)
+
+    def get_final_completion(self):
+        return self._state.get_final_completion()
+
+    @property
+    def current_completion_snapshot(self):
+        return self._state.current_completion_snapshot
+
+class StreamingSDKClient:
+    """
+    Answers with scripted contents, streamed through the SDK's own stream state so that finish
+    reasons are handled as the real client handles them; the first answer ends with `finish_reason`.
+    """
+
+    def __init__(self, *contents, finish_reason="stop"):
+        self.contents = list(contents)
+        self.finish_reason = finish_reason
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(stream=self.stream)))
+
+    def create(self, model, messages, **kwargs):
+        self.requests.append(messages)
+        return ChatCompletion.model_validate({
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": self.contents.pop(0)}}],
+        })
+
+    def stream(self, model, messages, response_format=NOT_GIVEN, **kwargs):
+        self.requests.append(messages)
+        finish_reason = self.finish_reason if len(self.requests) == 1 else "stop"
+        return SDKStream(model, self.contents.pop(0), finish_reason, response_format)
+
+@pytest.fixture
+def check_in_payload():
+    return make_check_in()
+
+@pytest.fixture
+def fake_llm():
+    return FakeLLM()
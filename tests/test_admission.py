@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from startup.admission import BATCH, CHECK_IN, FIRST_PLAN, AdmissionController, AdmissionRejected
+
+def test_queued_requests_start_by_priority_then_arrival():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1)
+        started = []
+        release = asyncio.Event()
+
+        async def run(name, priority_class):
+            async with controller.slot(priority_class):
+                started.append(name)
+                if name == "holder":
+                    await release.wait()
+
+        holder = asyncio.ensure_future(run("holder", CHECK_IN))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.ensure_future(run(name, priority_class))
+            for name, priority_class in (("batch", BATCH), ("check_in", CHECK_IN), ("first_1", FIRST_PLAN), ("first_2", FIRST_PLAN))
+        ]
+        await asyncio.sleep(0)
+        assert controller.stats()["queued"] == 4
+        release.set()
+        await asyncio.gather(holder, *waiters)
+        return started, controller.stats()
+
+    started, stats = asyncio.run(scenario())
+    assert started == ["holder", "first_1", "first_2", "check_in", "batch"]
+    assert stats["running"] == 0
+    assert stats["classes"][FIRST_PLAN]["admitted"] == 2
+
+def test_request_that_cannot_start_in_time_is_rejected_at_once():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1)
+        controller._classes[CHECK_IN].record_service(30.0)
+        async with controller.slot(CHECK_IN):
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with controller.slot(CHECK_IN, budget=40.0):
+                    pass
+        return controller, rejected.value
+
+    controller, rejected = asyncio.run(scenario())
+    assert rejected.retry_after == 30
+    assert controller.stats()["classes"][CHECK_IN]["rejected"] == 1
+
+def test_queued_request_gives_up_when_its_budget_runs_out():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1)
+        async with controller.slot(CHECK_IN):
+            with pytest.raises(AdmissionRejected):
+                async with controller.slot(BATCH, budget=0.05):
+                    pass
+        # The abandoned waiter does not keep the slot
+        async with controller.slot(BATCH, budget=0.05):
+            return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["running"] == 1
+    assert stats["queued"] == 0
@@ -0,0 +1,51 @@
+import pytest
+from check_time_plans.analytics.anthropometrics import AnthropometricsEngine, parse_number, personal_metrics
+
+@pytest.fixture
+def engine():
+    return AnthropometricsEngine()
+
+def test_parse_number_and_personal_metrics():
+    assert parse_number("180 cm") == 180.0
+    assert parse_number("82kg") == 82.0
+    assert parse_number("tall") is None
+    assert personal_metrics({"title": "Personal", "data": {"gender": "male", "height": "1.8", "weight": 82}}) == ("male", 180.0, 82.0)
+
+def test_units_are_converted_to_cm(engine):
+    analysis = engine.analyze({"hipGirth": {"value": 40, "unit": "in"}, "bellyWaistGirth": 85})
+    assert analysis.measurements["hipGirth"] == 101.6
+    assert analysis.current.ratios["waist_to_hip"] == round(85 / 101.6, 3)
+
+def test_navy_body_fat_lean_mass_and_bmi(engine):
+    measurements = {"bellyWaistGirth": 85, "neckGirth": 38}
+    analysis = engine.analyze(measurements, sex="male", height_cm=180, weight_current=81)
+    assert analysis.current.body_fat_percentage == 16.1
+    assert analysis.current.lean_mass == round(81 * (1 - 0.161066), 1)
+    assert analysis.current.bmi == 25.0
+    # The equation needs to know which sex it applies to
+    assert engine.analyze(measurements, height_cm=180).current.body_fat_percentage is None
+
+def test_symmetry_pairs_right_against_left(engine):
+    analysis = engine.analyze({"upperArmGirthR": 36, "upperArmGirthL": 34})
+    assert analysis.current.symmetry == {"upperArmGirth": round(2 / 35 * 100, 1)}
+
+def test_changes_and_classification(engine):
+    measurements = {
+        "bellyWaistGirth": {"current": 84, "previous": 88, "unit": "cm"},
+        "hipGirth": {"current": 100, "previous": 100.5, "unit": "cm"},
+    }
+    analysis = engine.analyze(measurements, weight_current=80, weight_previous=82)
+    assert analysis.changes == {"bellyWaistGirth": -4.0, "hipGirth": -0.5}
+    classified = engine.classify_changes(analysis)
+    assert classified["trending_measurements"] == ["bellyWaistGirth"]
+    assert classified["stable_measurements"] == ["hipGirth"]
+    assert classified["primary_change_areas"] == ["bellyWaistGirth"]
+
+    metrics = engine.composition_metrics(analysis)
+    assert metrics["weight_change"] == -2.0
+    assert metrics["waist_measurement_change"] == -4.0
+
+def test_no_measurements(engine):
+    analysis = engine.analyze({})
+    assert analysis.previous is None
+    assert engine.format_summary(analysis) == "No measurements available."
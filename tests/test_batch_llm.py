@@ -0,0 +1,110 @@
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from check_time_plans.data_ingestion.batch_job_store import BatchJobStore
+from first_time_plans.batch_llm import BatchCollector, BatchFailed, LocalBatchBackend, batch_mode, current_batch
+from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.circuit_breaker import get_breaker
+
+class EchoClient:
+    """Completes every request with the last message's content, upper-cased; fails on "fail"."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, **kwargs):
+        content = messages[-1]["content"]
+        if content == "fail":
+            raise RuntimeError("rejected")
+        body = {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content.upper()}}],
+        }
+        return SimpleNamespace(model_dump=lambda: body)
+
+class CountingBackend(LocalBatchBackend):
+    def __init__(self, directory):
+        super().__init__(directory, llm_client=EchoClient())
+        self.batch_sizes = []
+
+    def submit(self, requests):
+        self.batch_sizes.append(len(requests))
+        return super().submit(requests)
+
+@pytest.fixture
+def backend(tmp_path):
+    return CountingBackend(str(tmp_path))
+
+def run_all(collector, prompts):
+    """One pipeline run per prompt, each in its own thread and batch mode."""
+    llm = BaseLLM(llm_client=EchoClient(), model="batch-test-model")
+    # Every run is active before any of them calls, as in a bulk job's first stage
+    started = threading.Barrier(len(prompts))
+
+    def run(prompt):
+        with batch_mode(collector):
+            started.wait()
+            try:
+                return llm.call_llm(prompt, "system")
+            except BatchFailed as e:
+                return e
+
+    with ThreadPoolExecutor(max_workers=len(prompts)) as pool:
+        return list(pool.map(lambda prompt: contextvars.copy_context().run(run, prompt), prompts))
+
+def test_one_stage_of_all_runs_goes_out_as_one_batch(backend):
+    collector = BatchCollector(backend, max_requests=100, max_wait=30, poll_interval=0.01)
+    assert run_all(collector, ["a", "b", "c"]) == ["A", "B", "C"]
+    assert backend.batch_sizes == [3]
+    assert collector.stats()["requests"] == 3
+    # Batch turnaround is not provider latency
+    assert get_breaker("batch-test-model").stats()["recent_calls"] == 0
+    assert current_batch() is None
+
+def test_batches_are_capped_at_max_requests(backend):
+    collector = BatchCollector(backend, max_requests=2, max_wait=30, poll_interval=0.01)
+    assert run_all(collector, ["a", "b", "c", "d"]) == ["A", "B", "C", "D"]
+    assert sorted(backend.batch_sizes) == [2, 2]
+
+def test_failed_requests_fail_only_their_run(backend):
+    collector = BatchCollector(backend, max_requests=100, max_wait=30, poll_interval=0.01)
+    results = run_all(collector, ["ok", "fail"])
+    assert results[0] == "OK"
+    assert isinstance(results[1], BatchFailed)
+    assert collector.stats()["failed_requests"] == 1
+
+def test_batch_job_store_tracks_runs(tmp_path):
+    store = BatchJobStore(state_dir=str(tmp_path))
+    job = store.create("checkIn_optimization", 2)
+    store.record(job.job_id, 0, result={"report": "ok"})
+    assert store.get(job.job_id).summary()["pending"] == 1
+
+    store.record(job.job_id, 1, error="BatchFailed: rejected")
+    finished = store.get(job.job_id)
+    assert finished.status == "done"
+    assert finished.summary()["success"] == 1 and finished.summary()["error"] == 1
+    assert store.get("missing") is None
+
+def test_empty_job_is_done_at_once(tmp_path):
+    job = BatchJobStore(state_dir=str(tmp_path)).create("checkIn_optimization", 0)
+    assert job.status == "done"
+
+def test_jobs_of_a_stopped_worker_are_interrupted(tmp_path):
+    store = BatchJobStore(state_dir=str(tmp_path))
+    live = store.create("checkIn_optimization", 1)
+    lost = store.create("checkIn_optimization", 2)
+    store.record(lost.job_id, 0, result={"report": "ok"})
+    with store.running(live.job_id):
+        assert store.interrupt_abandoned() == 1
+    assert store.get(live.job_id).status == "running"
+    interrupted = store.get(lost.job_id)
+    assert interrupted.status == "interrupted"
+    assert interrupted.summary()["success"] == 1 and interrupted.summary()["error"] == 1
+    assert [path.name for path in tmp_path.iterdir() if path.name.endswith(".owner")] == []
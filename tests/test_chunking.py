@@ -0,0 +1,84 @@
+import os
+import time
+import pytest
+from check_time_plans.data_ingestion.chunking import ChunkCache, MapReduceRunner, chunk_key, partition_by_week, week_start
+from first_time_plans.deadline import DeadlineExceeded, current_deadline, request_deadline
+
+@pytest.fixture
+def runner(tmp_path):
+    return MapReduceRunner(cache=ChunkCache(root_dir=str(tmp_path)), max_workers=2)
+
+def test_partition_by_week_groups_by_monday_in_order():
+    items = [{"date": "2025-03-12"}, {"date": "2025-03-03T07:00:00"}, {"date": "bad"}, {"date": "2025-03-09"}]
+    weeks = partition_by_week(items, lambda item: item["date"])
+    assert list(weeks) == ["2025-03-03", "2025-03-10"]
+    assert len(weeks["2025-03-03"]) == 2
+    assert week_start("") is None
+
+def test_chunk_key_ignores_key_order_and_separates_namespaces():
+    assert chunk_key("a", {"x": 1, "y": 2}) == chunk_key("a", {"y": 2, "x": 1})
+    assert chunk_key("a", {"x": 1}) != chunk_key("b", {"x": 1})
+
+def test_map_reuses_cached_chunks(runner):
+    calls = []
+    def summarize(label, chunk):
+        calls.append(label)
+        return {"total": sum(chunk)}
+
+    assert runner.map("ns", {"w1": [1, 2], "w2": [3]}, summarize) == {"w1": {"total": 3}, "w2": {"total": 3}}
+    # Only the changed chunk is mapped again
+    assert runner.map("ns", {"w1": [1, 2], "w2": [4]}, summarize) == {"w1": {"total": 3}, "w2": {"total": 4}}
+    assert sorted(calls) == ["w1", "w2", "w2"]
+
+def test_failed_chunks_are_left_out_and_not_cached(runner):
+    def flaky(label, chunk):
+        if label == "bad":
+            raise RuntimeError("provider error")
+        return {"ok": True}
+
+    assert runner.map("ns", {"good": 1, "bad": 2}, flaky) == {"good": {"ok": True}}
+    assert runner.map("ns", {"bad": 2}, lambda label, chunk: {"ok": True}) == {"bad": {"ok": True}}
+
+def test_map_runs_chunks_under_the_callers_deadline(runner):
+    seen = []
+    def check(label, chunk):
+        seen.append(current_deadline())
+        return {"ok": True}
+
+    with request_deadline(30) as deadline:
+        runner.map("ns", {"a": 1, "b": 2}, check)
+    assert seen == [deadline, deadline]
+
+def test_deadline_exceeded_aborts_the_map(runner):
+    def out_of_time(label, chunk):
+        raise DeadlineExceeded("budget exhausted")
+
+    with pytest.raises(DeadlineExceeded):
+        runner.map("ns", {"a": 1}, out_of_time)
+
+def test_reduce_is_cached_on_partials_and_context(runner):
+    calls = []
+    def merge(partials):
+        calls.append(partials)
+        return {"merged": len(partials)}
+
+    partials = {"w1": {"total": 3}}
+    assert runner.reduce("merge", partials, "goal", merge) == {"merged": 1}
+    assert runner.reduce("merge", partials, "goal", merge) == {"merged": 1}
+    runner.reduce("merge", partials, "new goal", merge)
+    assert len(calls) == 2
+
+def test_cache_keeps_recent_results_in_memory_and_expires_unused_ones(tmp_path):
+    cache = ChunkCache(root_dir=str(tmp_path), max_entries=2, ttl=60)
+    for key in ("a", "b", "c"):
+        cache.put("ns", key, {"key": key})
+    assert list(cache._memory) == ["b", "c"]
+    # Evicted from memory, still on disk
+    assert cache.get("ns", "a") == {"key": "a"}
+    assert list(cache._memory) == ["c", "a"]
+
+    old = time.time() - 120
+    os.utime(tmp_path / "ns" / "b.json", (old, old))
+    assert cache.get("ns", "b") is None
+    assert cache.purge() == 1
+    assert sorted(path.name for path in (tmp_path / "ns").iterdir()) == ["a.json", "c.json"]
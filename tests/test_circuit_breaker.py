@@ -0,0 +1,188 @@
+import time
+import itertools
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+from pydantic import BaseModel
+
+from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, get_breaker
+from first_time_plans.deadline import MIN_LLM_TIMEOUT, DeadlineExceeded, request_deadline
+
+REQUEST = httpx.Request("POST", "https://api.test/v1/chat/completions")
+_models = itertools.count()
+
+class Answer(BaseModel):
+    text: str
+
+def completion(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+        usage=None
+    )
+
+def status_error(cls, status):
+    return cls("provider error", response=httpx.Response(status, request=REQUEST), body=None)
+
+class RaisingClient:
+    """Fails every create() and stream() with the given exception, after `delay` seconds."""
+
+    def __init__(self, error, delay=0.0):
+        self.error = error
+        self.delay = delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(stream=self.create)))
+
+    def create(self, **kwargs):
+        time.sleep(self.delay)
+        raise self.error
+
+class TextClient:
+    """Answers every create() with the given text."""
+
+    def __init__(self, content):
+        self.content = content
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        return completion(self.content)
+
+class SlowStream:
+    """A stream whose first chunk arrives at once and whose last arrives after `duration` seconds."""
+
+    def __init__(self, content, duration):
+        self.content = content
+        self.duration = duration
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        yield SimpleNamespace(type="chunk")
+        time.sleep(self.duration)
+        yield SimpleNamespace(type="content.done")
+
+    def get_final_completion(self):
+        return completion(self.content)
+
+class StreamingClient:
+    def __init__(self, content, duration):
+        stream = lambda **kwargs: SlowStream(content, duration)
+        self.beta = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(stream=stream)))
+
+def make_breaker(**overrides):
+    options = dict(model="m", window=4, min_calls=2, failure_rate=0.5, slow_call_seconds=1.0, cooldown=60)
+    options.update(overrides)
+    return CircuitBreaker(**options)
+
+def fresh_model():
+    """A model name no other test has used, so that it gets its own breaker."""
+    return f"test-model-{next(_models)}"
+
+def test_breaker_opens_at_failure_rate_and_refuses_calls():
+    breaker = make_breaker()
+    breaker.before_call()
+    breaker.record(True, 0.1)
+    breaker.before_call()
+    breaker.record(False, 0.1)
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+def test_breaker_counts_slow_calls_as_failed():
+    breaker = make_breaker()
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record(True, 5.0)
+
+    assert breaker.state == OPEN
+
+def test_half_open_probe_closes_on_success():
+    breaker = make_breaker(cooldown=0)
+    breaker._open("test")
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+
+def test_release_frees_the_probe_without_a_verdict():
+    breaker = make_breaker(cooldown=0)
+    breaker._open("test")
+    breaker.before_call()
+
+    breaker.release()
+
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+
+@pytest.mark.parametrize("error", [
+    status_error(openai.InternalServerError, 503),
+    status_error(openai.RateLimitError, 429),
+    openai.APITimeoutError(request=REQUEST),
+])
+def test_provider_errors_count_against_the_model(error):
+    model = fresh_model()
+    llm = BaseLLM(llm_client=RaisingClient(error), model=model)
+
+    with pytest.raises(type(error)):
+        llm.call_llm("prompt", "system")
+
+    assert get_breaker(model).stats()["recent_failures"] == 1
+
+@pytest.mark.parametrize("error", [
+    status_error(openai.BadRequestError, 400),
+    ValueError("unrecoverable output"),
+])
+def test_local_and_request_errors_are_not_counted(error):
+    model = fresh_model()
+    llm = BaseLLM(llm_client=RaisingClient(error), model=model)
+
+    with pytest.raises(type(error)):
+        llm.call_llm("prompt", "system")
+
+    assert get_breaker(model).stats()["recent_calls"] == 0
+
+def test_timeout_from_an_exhausted_deadline_is_not_counted():
+    model = fresh_model()
+    # The call starts with budget left and times out once less than MIN_LLM_TIMEOUT remains
+    error = openai.APITimeoutError(request=REQUEST)
+    llm = BaseLLM(llm_client=RaisingClient(error, delay=0.1), model=model)
+
+    with request_deadline(MIN_LLM_TIMEOUT + 0.05):
+        with pytest.raises(DeadlineExceeded):
+            llm.call_llm("prompt", "system")
+
+    assert get_breaker(model).stats()["recent_calls"] == 0
+
+def test_successful_call_is_recorded():
+    model = fresh_model()
+    llm = BaseLLM(llm_client=TextClient("hello"), model=model)
+
+    assert llm.call_llm("prompt", "system") == "hello"
+
+    stats = get_breaker(model).stats()
+    assert stats["recent_calls"] == 1
+    assert stats["recent_failures"] == 0
+
+def test_long_streamed_output_is_timed_to_its_first_chunk():
+    model = fresh_model()
+    get_breaker(model).slow_call_seconds = 0.05
+    llm = BaseLLM(llm_client=StreamingClient('{"text": "done"}', duration=0.2), model=model)
+
+    with request_deadline(30):
+        result = llm.call_llm("prompt", "system", schema=Answer, as_model=True)
+
+    assert result.text == "done"
+    stats = get_breaker(model).stats()
+    assert stats["recent_failures"] == 0
+    assert stats["latency_p50"] < 0.05
@@ -0,0 +1,117 @@
+import pytest
+from pydantic import ValidationError
+from check_time_plans.data_ingestion.check_in_ingestion import CheckInDataIngestionModule, DailyReport, ExerciseLog
+from check_time_plans.data_ingestion.daily_ingestion import DailyCheckInStore
+from check_time_plans.data_ingestion.shared_state import safe_id
+
+def report(date, weight=80.0):
+    return DailyReport(date=date, weight=weight, macros={"proteins": 180, "carbs": 300, "fats": 70})
+
+def log(name, *weights, date="2025-03-01"):
+    return ExerciseLog(name=name, entries=[{"date": date, "weight": weight, "reps": 8} for weight in weights])
+
+@pytest.fixture
+def store(tmp_path):
+    return DailyCheckInStore(state_dir=str(tmp_path))
+
+def test_appends_update_aggregates(store):
+    store.append_daily_report("u1", report("2025-03-01", 80))
+    store.append_daily_report("u1", report("2025-03-02", 81))
+    aggregates = store.append_exercise_log("u1", log("Squat", 100, 105))
+    assert aggregates.days_reported == 2
+    assert aggregates.macro_totals.proteins == 360
+    assert aggregates.session_dates == ["2025-03-01"]
+    assert aggregates.e1rm_bests["Squat"].entries == 2
+
+def test_resent_day_replaces_report(store):
+    store.append_daily_report("u1", report("2025-03-01", 80))
+    aggregates = store.append_daily_report("u1", report("2025-03-01", 79))
+    assert aggregates.days_reported == 1
+    assert aggregates.weight_last == 79
+
+def test_resent_exercise_log_replaces_its_entries(store):
+    store.append_exercise_log("u1", log("Squat", 100, 100))
+    store.append_exercise_log("u1", log("Squat", 110, date="2025-03-03"))
+    # A retried POST of the first log
+    aggregates = store.append_exercise_log("u1", log("Squat", 100, 100))
+    assert aggregates.e1rm_bests["Squat"].entries == 3
+    assert aggregates.session_dates == ["2025-03-01", "2025-03-03"]
+    state = store.get_state("u1")
+    assert [entry.weight for entry in state.exerciseLogs[0].entries] == [100, 100, 110]
+    assert aggregates.e1rm_bests["Squat"].last_weight == 110
+
+def test_close_week_keeps_data_appended_after_snapshot(store):
+    store.append_daily_report("u1", report("2025-03-01"))
+    store.append_exercise_log("u1", log("Squat", 100, 100))
+    snapshot = store.get_state("u1").model_copy(deep=True)
+
+    # Arrives while the weekly check-in runs
+    store.append_daily_report("u1", report("2025-03-08", 79))
+    store.append_exercise_log("u1", log("Squat", 100, date="2025-03-08"))
+
+    remaining = store.close_week("u1", snapshot)
+    assert [r.date for r in remaining.dailyReports] == ["2025-03-08"]
+    assert [(l.name, [e.date for e in l.entries]) for l in remaining.exerciseLogs] == [("Squat", ["2025-03-08"])]
+    assert remaining.aggregates.days_reported == 1
+    assert remaining.aggregates.weight_first == 79
+    assert store.get_state("u1").aggregates.session_dates == ["2025-03-08"]
+
+def test_close_week_keeps_replacement_of_snapshotted_report(store):
+    store.append_daily_report("u1", report("2025-03-01", 80))
+    snapshot = store.get_state("u1").model_copy(deep=True)
+    store.append_daily_report("u1", report("2025-03-01", 79.5))
+    remaining = store.close_week("u1", snapshot)
+    assert [r.weight for r in remaining.dailyReports] == [79.5]
+
+def test_close_week_persists_across_instances(store, tmp_path):
+    store.append_daily_report("u1", report("2025-03-01"))
+    store.close_week("u1", store.get_state("u1").model_copy(deep=True))
+    assert DailyCheckInStore(state_dir=str(tmp_path)).get_state("u1").dailyReports == []
+
+def test_safe_id_is_unambiguous():
+    assert safe_id("user_1-a") == "user_1-a"
+    assert safe_id("a.b") != safe_id("ab")
+    assert safe_id("a/b") != safe_id("a_b")
+    assert safe_id("") != safe_id("~")
+    for user_id in ("a.b", "../etc", "", "ü"):
+        name = safe_id(user_id)
+        assert name.startswith("~") and name[1:].isalnum()
+
+@pytest.mark.parametrize("model, data", [
+    (DailyReport, {}),
+    (DailyReport, {"weight": 80}),
+    (DailyReport, {"date": "", "weight": 80}),
+    (ExerciseLog, {}),
+    (ExerciseLog, {"name": "Squat", "entries": []}),
+    (ExerciseLog, {"name": "Squat", "entries": [{"weight": 100}]}),
+])
+def test_posted_daily_data_keeps_required_fields(model, data):
+    with pytest.raises(ValidationError):
+        model.model_validate(data)
+
+def test_weekly_payload_stays_lenient():
+    data = CheckInDataIngestionModule().process_check_in_data({
+        "dailyReports": [{}], "exercisesLog": [{"entries": [{}]}]
+    })
+    assert data.dailyReports[0].date == "" and data.dailyReports[0].weight == 0
+    assert data.exerciseLogs[0].name == "Undefined"
+
+def test_stored_week_feeds_weekly_payload(store):
+    store.append_daily_report("u1", report("2025-03-01"))
+    store.append_exercise_log("u1", log("Squat", 100))
+    state = store.get_state("u1")
+    data = CheckInDataIngestionModule().process_check_in_data({
+        "dailyReports": state.dailyReports, "exercisesLog": state.exerciseLogs
+    })
+    assert data.dailyReports[0] is state.dailyReports[0]
+    assert data.exerciseLogs[0].entries[0].weight == 100
+
+def test_close_week_after_another_worker_saved(store, tmp_path):
+    store.append_daily_report("u1", report("2025-03-01"))
+    store.append_exercise_log("u1", log("Squat", 100))
+    snapshot = store.get_state("u1").model_copy(deep=True)
+    # Another worker appends: this store reloads the state from disk as the lenient models
+    DailyCheckInStore(state_dir=str(tmp_path)).append_daily_report("u1", report("2025-03-02"))
+    remaining = store.close_week("u1", snapshot)
+    assert [r.date for r in remaining.dailyReports] == ["2025-03-02"]
+    assert remaining.exerciseLogs == []
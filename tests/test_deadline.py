@@ -0,0 +1,111 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import contextvars
+
+import pytest
+
+from conftest import StreamingSDKClient
+from startup.config import get_settings
+from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.circuit_breaker import get_breaker
+from first_time_plans.deadline import (
+    MIN_LLM_TIMEOUT, DeadlineExceeded, RequestCancelled, budget_from_header, current_deadline, detached,
+    llm_timeout, optional_step, request_deadline
+)
+
+def test_budget_from_header():
+    cap = get_settings().max_request_timeout
+    assert budget_from_header("30", 120) == 30
+    assert budget_from_header(None, 120) == min(120, cap)
+    assert budget_from_header("soon", 120) == min(120, cap)
+    assert budget_from_header("-5", 120) == min(120, cap)
+    assert budget_from_header(str(cap * 10), 120) == cap
+
+def test_llm_timeout_is_the_remaining_budget():
+    assert llm_timeout() == get_settings().llm_timeout
+    with request_deadline(30):
+        assert 29 < llm_timeout() <= 30
+    with request_deadline(MIN_LLM_TIMEOUT / 2):
+        with pytest.raises(DeadlineExceeded):
+            llm_timeout()
+
+def test_deadline_reaches_copied_contexts_but_not_detached_work():
+    with request_deadline(30) as deadline:
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            assert pool.submit(contextvars.copy_context().run, current_deadline).result() is deadline
+        assert detached(current_deadline)() is None
+        assert current_deadline() is deadline
+    assert current_deadline() is None
+
+def test_optional_step_is_skipped_when_time_is_short():
+    assert optional_step("narrative", 60, lambda: "ran", "skipped") == "ran"
+    with request_deadline(10) as deadline:
+        assert optional_step("narrative", 60, lambda: "ran", "skipped") == "skipped"
+        assert optional_step("metrics", 5, lambda: "ran", "skipped") == "ran"
+    assert deadline.skipped == ["narrative"]
+
+def test_check_raises_once_expired():
+    with request_deadline(0.01) as deadline:
+        deadline.check()
+        time.sleep(0.02)
+        assert deadline.expired()
+        with pytest.raises(DeadlineExceeded):
+            deadline.check()
+
+class CancellingStream:
+    """Cancels the request after its first chunk and records whether it was closed."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.chunks = 0
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+        return False
+
+    def __iter__(self):
+        for _ in range(100):
+            self.chunks += 1
+            if self.chunks == 1:
+                self.deadline.cancel()
+            yield SimpleNamespace(type="chunk")
+
+def test_cancel_runs_callbacks_once_and_fails_checks():
+    calls = []
+    with request_deadline(30) as deadline:
+        deadline.on_cancel(lambda: calls.append("first"))
+        deadline.cancel()
+        deadline.cancel()
+        deadline.on_cancel(lambda: calls.append("late"))
+        with pytest.raises(RequestCancelled):
+            deadline.check()
+        with pytest.raises(RequestCancelled):
+            llm_timeout()
+    assert calls == ["first", "late"]
+
+def test_cancelled_request_closes_the_stream_at_the_next_chunk():
+    with request_deadline(30) as deadline:
+        stream = CancellingStream(deadline)
+        client = SimpleNamespace(beta=SimpleNamespace(chat=SimpleNamespace(
+            completions=SimpleNamespace(stream=lambda **kwargs: stream)
+        )))
+        llm = BaseLLM(llm_client=client, model="cancel-test-model")
+        with pytest.raises(RequestCancelled):
+            llm.call_llm("prompt", "system")
+
+    assert stream.chunks == 1
+    assert stream.closed
+    # A cancelled call says nothing about the provider
+    assert get_breaker("cancel-test-model").stats()["recent_calls"] == 0
+
+@pytest.mark.parametrize("finish_reason", ["length", "content_filter"])
+def test_streamed_text_cut_off_comes_back_as_received(finish_reason):
+    client = StreamingSDKClient("A long summary that stops mid-sen", finish_reason=finish_reason)
+    llm = BaseLLM(llm_client=client, model="cut-off-test-model")
+    with request_deadline(30):
+        assert llm.call_llm("summarize", "system") == "A long summary that stops mid-sen"
@@ -0,0 +1,64 @@
+import time
+import pytest
+from check_time_plans.data_ingestion.idempotency_store import IdempotencyKeyReused, IdempotencyStore, request_hash
+
+PATH = "/checkIn_optimization/"
+
+@pytest.fixture
+def store(tmp_path):
+    return IdempotencyStore(state_dir=str(tmp_path), ttl=60)
+
+def test_request_hash_ignores_json_formatting_but_not_the_path():
+    assert request_hash(PATH, b'{"a": 1, "b": [1, 2]}') == request_hash(PATH, b'{"b":[1,2],"a":1}')
+    assert request_hash(PATH, b'{"a": 1}') != request_hash("/first_time/", b'{"a": 1}')
+    assert request_hash(PATH, b"not json") == request_hash(PATH, b"not json")
+
+def test_completed_response_is_replayed(store):
+    fingerprint = request_hash(PATH, b"{}")
+    claimed, _ = store.begin(PATH, "key-1", fingerprint)
+    assert claimed
+
+    claimed, record = store.begin(PATH, "key-1", fingerprint)
+    assert not claimed and not record.done
+
+    store.complete(PATH, "key-1", {"plan": "ok"})
+    claimed, record = store.begin(PATH, "key-1", fingerprint)
+    assert not claimed and record.done
+    assert record.response == {"plan": "ok"}
+
+def test_keys_are_scoped_per_endpoint_and_bound_to_the_body(store):
+    store.begin(PATH, "key-1", request_hash(PATH, b'{"a": 1}'))
+    with pytest.raises(IdempotencyKeyReused):
+        store.begin(PATH, "key-1", request_hash(PATH, b'{"a": 2}'))
+    claimed, _ = store.begin("/first_time/", "key-1", request_hash("/first_time/", b'{"a": 2}'))
+    assert claimed
+
+def test_released_key_runs_again(store, tmp_path):
+    fingerprint = request_hash(PATH, b"{}")
+    store.begin(PATH, "key-1", fingerprint)
+    store.release(PATH, "key-1")
+    assert store.get(PATH, "key-1") is None
+    # Its lock file goes with the record
+    assert list(tmp_path.iterdir()) == []
+    assert store.begin(PATH, "key-1", fingerprint)[0]
+
+def test_expired_records_are_purged_and_stale_runs_taken_over(tmp_path):
+    store = IdempotencyStore(state_dir=str(tmp_path), ttl=0.01)
+    fingerprint = request_hash(PATH, b"{}")
+    store.begin(PATH, "done", fingerprint)
+    store.complete(PATH, "done", {"ok": True})
+    store.stale_after = 0.01
+    store.begin(PATH, "running", fingerprint)
+    time.sleep(0.02)
+
+    assert store.get(PATH, "done") is None
+    assert store.begin(PATH, "running", fingerprint)[0]
+    assert store.purge() == 1
+    # Only the record taken over is left, with its lock file
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".json", ".lock"]
+
+def test_purge_removes_lock_files_without_a_record(tmp_path):
+    store = IdempotencyStore(state_dir=str(tmp_path), ttl=60)
+    (tmp_path / "orphan.json.lock").write_text("")
+    assert store.purge() == 0
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,54 @@
+import copy
+import pytest
+from check_time_plans.analytics.meal_analytics import MealAdherenceEngine
+from conftest import MEAL_PLAN, TRAINING_DATES
+
+def day(date, proteins, carbs, fats):
+    return {"date": date, "macros": {"proteins": proteins, "carbs": carbs, "fats": fats}}
+
+@pytest.fixture
+def engine():
+    return MealAdherenceEngine()
+
+def test_rest_target_is_the_plans_rest_day_total(engine):
+    targets = engine.day_targets(MEAL_PLAN)
+    assert targets["training"].tolist() == [180, 300, 70, 2550]
+    assert targets["rest"].tolist() == [180, 200, 70, 2150]
+
+def test_partial_rest_meals_fall_back_to_training_target(engine):
+    plan = copy.deepcopy(MEAL_PLAN)
+    plan["nonTrainingDayMeals"] = plan["nonTrainingDayMeals"][:1]
+    targets = engine.day_targets(plan)
+    assert targets["rest"].tolist() == targets["training"].tolist()
+
+def test_meal_totals_without_daily_total(engine):
+    plan = copy.deepcopy(MEAL_PLAN)
+    plan["totalDailyNutrition"] = {}
+    targets = engine.day_targets(plan)
+    assert targets["training"].tolist() == [180, 300, 70, 2550]
+    assert targets["rest"].tolist() == [180, 200, 70, 2150]
+
+def test_eating_to_plan_scores_100_on_both_day_types(engine):
+    reports = [
+        day(f"2025-03-0{i}", 180, 300, 70) if f"2025-03-0{i}" in TRAINING_DATES else day(f"2025-03-0{i}", 180, 200, 70)
+        for i in range(1, 8)
+    ]
+    analytics = engine.compute(MEAL_PLAN, reports, TRAINING_DATES)
+    assert analytics.macro_adherence == {"protein": 100.0, "carbs": 100.0, "fat": 100.0}
+    assert analytics.consistent_days == 7
+    assert analytics.training_days.days == 3 and analytics.rest_days.days == 4
+    assert analytics.rest_days.target_calories == 2150
+
+def test_without_session_dates_every_day_is_a_training_day(engine):
+    analytics = engine.compute(MEAL_PLAN, [day("2025-03-02", 180, 200, 70)])
+    assert analytics.macro_adherence["carbs"] == pytest.approx(66.7)
+    assert analytics.training_days is None
+
+def test_trend_uses_positions_when_dates_are_missing(engine):
+    reports = [{"day": 7, **day("", 180, 300, 70)}, day("", 90, 150, 35)]
+    analytics = engine.compute(MEAL_PLAN, reports)
+    assert analytics.adherence_trend_per_week is not None
+    assert analytics.days_reported == 2
+
+def test_no_reports(engine):
+    assert engine.compute(MEAL_PLAN, []).days_reported == 0
@@ -0,0 +1,75 @@
+import pytest
+from check_time_plans.data_ingestion.check_in_ingestion import CheckInDataIngestionModule
+from check_time_plans.data_ingestion.memory_store import (
+    CheckInMemoryStore, CheckInMetricsRow, build_metrics_row, parse_goals, pre_screen_metrics_row
+)
+from check_time_plans.decisions.no_change_screen import NoChangePreScreenNode
+from conftest import FakeLLM
+
+REPORT = """Good week overall.
+--------
+GoalOne: Hit 180g protein daily
+GoalFour: Gain 0.8kg
+GoalTwelve: Gain 3kg
+--------"""
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckInMemoryStore(state_dir=str(tmp_path), llm_client=FakeLLM("condensed"), max_rows=2)
+
+def test_parse_goals():
+    goals = parse_goals(REPORT)
+    assert (goals.short_term, goals.mid_term, goals.long_term) == ("Hit 180g protein daily", "Gain 0.8kg", "Gain 3kg")
+
+def test_digest_condenses_baseline_once(store):
+    store.digest("u1", "a long initial report")
+    store.digest("u1", "a long initial report")
+    assert len(store.llm_client.calls) == 1
+    assert "Starting point: condensed" in store.digest("u1")
+
+def test_rows_merge_by_date_and_are_capped(store):
+    store.record_metrics("u1", CheckInMetricsRow(date="2025-03-07", average_weight=80, calorie_adherence=95))
+    store.record_metrics("u1", CheckInMetricsRow(date="2025-03-07", calorie_adherence=101))
+    store.record_metrics("u1", CheckInMetricsRow(date="2025-03-14"))
+    memory = store.record_metrics("u1", CheckInMetricsRow(date="2025-03-21"))
+    assert [row.date for row in memory.metrics] == ["2025-03-14", "2025-03-21"]
+    store.record_metrics("u1", CheckInMetricsRow(date="2025-03-21", average_weight=81, calorie_adherence=99))
+    first = store.get_memory("u1").metrics[-1]
+    assert (first.average_weight, first.calorie_adherence) == (81, 99)
+
+def test_update_folds_report(store):
+    memory = store.update("u1", REPORT, CheckInMetricsRow(date="2025-03-07", average_weight=80))
+    assert memory.check_ins == 1
+    assert memory.goals.mid_term == "Gain 0.8kg"
+    assert memory.narrative == "condensed"
+    assert "2025-03-07 | 80" in store.digest("u1")
+
+def test_pre_screen_row_matches_extractor_fields(check_in_payload):
+    data = CheckInDataIngestionModule().process_check_in_data(check_in_payload)
+    pre_screen = NoChangePreScreenNode(llm_client=FakeLLM()).evaluate(data)
+    row = pre_screen_metrics_row(data.weekReport.date, data.weekReport.averageWeight, pre_screen)
+    assert row.date == "2025-03-07"
+    assert row.average_weight == 80.1
+    assert row.weekly_rate_percent == pre_screen.value("weight_trend")
+    assert row.calorie_adherence == 100.0
+    assert row.training_consistency == 100.0
+    assert row.volume_completion is None
+
+def test_build_metrics_row_skips_empty_meal_metrics():
+    row = build_metrics_row("2025-03-07T10:00:00", meal_metrics={"days_reported": 0, "calorie_adherence": 0.0})
+    assert row.date == "2025-03-07"
+    assert row.calorie_adherence is None
+
+def test_prompts_fall_back_without_digest():
+    from checkIn_optimization import client_history
+    assert client_history({"analysisReportStart": "initial"}) == "initial"
+    assert client_history({"analysisReportStart": "initial", "memoryDigest": "digest"}) == "digest"
+    assert client_history({}) == ""
+
+def test_report_prompt_without_digest():
+    from checkIn_optimization import user_prompt_for_checkIn_plan
+    info = {key: "x" for key in (
+        "mealPlanLastWeek", "bodyMeasurementsLastWeek", "dailyReportsLastWeek",
+        "exercisesLogLastWeek", "userWorkoutDetailsLastWeek"
+    )}
+    assert "the initial report" in user_prompt_for_checkIn_plan({**info, "analysisReportStart": "the initial report"})
@@ -0,0 +1,56 @@
+import time
+from first_time_plans.model_routing import ModelRouter, Route
+
+TIERS = ["big", "small", "tiny"]
+
+def make_router(**overrides):
+    routes = {
+        "Slow": Route(slo_seconds=10),
+        "Extractor": Route(tier=1, max_tokens=50, temperature=0),
+        "Pinned": Route(model="special", slo_seconds=1),
+    }
+    options = dict(routes=routes, tiers=TIERS, window=5, min_calls=3, cooldown=60)
+    options.update(overrides)
+    return ModelRouter(**options)
+
+def test_routes_resolve_tiers_and_options():
+    router = make_router()
+    assert router.route("Extractor").model == "small"
+    assert router.route("Extractor").options() == {"max_tokens": 50, "temperature": 0}
+    assert router.route("Unknown").model == "big"
+    assert router.route(None).options() == {}
+    assert router.route("Pinned").model == "special"
+
+def test_node_missing_its_slo_steps_down_one_tier():
+    router = make_router()
+    for _ in range(2):
+        router.record("Slow", "big", 30)
+    assert router.route("Slow").model == "big"
+
+    router.record("Slow", "big", 30)
+    assert router.route("Slow").model == "small"
+    assert router.stats()["nodes"]["Slow"]["rerouted"]
+
+    # Still too slow on the faster tier: one more step down, and no further
+    for _ in range(3):
+        router.record("Slow", "small", 30)
+    assert router.route("Slow").model == "tiny"
+    for _ in range(3):
+        router.record("Slow", "tiny", 30)
+    assert router.route("Slow").model == "tiny"
+
+def test_fast_nodes_and_pinned_models_stay_put():
+    router = make_router()
+    for _ in range(5):
+        router.record("Slow", "big", 2)
+        router.record("Pinned", "special", 5)
+    assert router.route("Slow").model == "big"
+    assert router.route("Pinned").model == "special"
+
+def test_rerouted_node_returns_after_the_cooldown():
+    router = make_router(cooldown=0.01)
+    for _ in range(3):
+        router.record("Slow", "big", 30)
+    assert router.route("Slow").model == "small"
+    time.sleep(0.02)
+    assert router.route("Slow").model == "big"
@@ -0,0 +1,73 @@
+import pytest
+from check_time_plans.data_ingestion.check_in_ingestion import CheckInDataIngestionModule
+from check_time_plans.decisions.no_change_screen import NoChangePreScreenNode, infer_goal_direction
+from check_time_plans.data_ingestion.meal_adherence import MealAdherenceExtractor
+from check_time_plans.analytics.meal_analytics import session_dates
+from conftest import make_check_in
+
+def evaluate(payload, llm):
+    data = CheckInDataIngestionModule().process_check_in_data(payload)
+    return data, NoChangePreScreenNode(llm_client=llm).evaluate(data)
+
+def checks_by_name(result):
+    return {check.name: check for check in result.checks}
+
+def test_week_on_plan_keeps_plan(check_in_payload, fake_llm):
+    _, result = evaluate(check_in_payload, fake_llm)
+    assert result.goal_direction == "gain"
+    assert result.keep_plan, [check.detail for check in result.checks if not check.passed]
+
+@pytest.mark.parametrize("text, direction", [
+    ("avoid fat loss while building muscle", "gain"),
+    ("lose 0.5kg of fat", "lose"),
+    ("cut to 12% body fat", "lose"),
+    ("gain strength without gaining fat", "gain"),
+    ("lose fat and build muscle", "maintain"),
+    ("stay consistent", "maintain"),
+])
+def test_infer_goal_direction(text, direction):
+    assert infer_goal_direction([text]) == direction
+
+def test_structured_goal_direction_wins_over_text(fake_llm):
+    payload = make_check_in(goals={"weeklyGoal": "drop the extra snacks", "goalDirection": "Bulk"})
+    data, result = evaluate(payload, fake_llm)
+    assert data.goals.goalDirection == "gain"
+    assert result.goal_direction == "gain"
+
+def test_unknown_structured_direction_falls_back_to_text(fake_llm):
+    payload = make_check_in(goals={"weeklyGoal": "cut", "goalDirection": "something else"})
+    _, result = evaluate(payload, fake_llm)
+    assert result.goal_direction == "lose"
+
+def test_weight_trend_uses_dates_not_day_numbers(fake_llm):
+    payload = make_check_in(weight_slope=0.03)
+    # Day numbers missing on some reports must not mix list positions with day numbers
+    for report in payload["dailyReports"][3:]:
+        report.pop("day")
+    _, result = evaluate(payload, fake_llm)
+    trend = checks_by_name(result)["weight_trend"]
+    assert trend.value == pytest.approx(0.03 * 7 / 80.09 * 100, abs=0.01)
+
+def test_weight_trend_without_dates_uses_positions(fake_llm):
+    payload = make_check_in(weight_slope=0.03)
+    for report in payload["dailyReports"]:
+        report["date"] = ""
+    _, result = evaluate(payload, fake_llm)
+    assert checks_by_name(result)["weight_trend"].value == pytest.approx(0.262, abs=0.01)
+
+def test_losing_weight_on_gain_goal_fails(fake_llm):
+    _, result = evaluate(make_check_in(weight_slope=-0.1), fake_llm)
+    assert not checks_by_name(result)["weight_trend"].passed
+    assert not result.keep_plan
+
+def test_macro_adherence_matches_extractor(check_in_payload, fake_llm):
+    data, result = evaluate(check_in_payload, fake_llm)
+    extracted = MealAdherenceExtractor(llm_client=fake_llm).engine.compute(
+        data.mealPlan.model_dump(),
+        [report.model_dump() for report in data.dailyReports],
+        session_dates(data.exerciseLogs)
+    )
+    macro_check = checks_by_name(result)["macro_adherence"]
+    assert macro_check.passed
+    worst = max(extracted.macro_adherence.values(), key=lambda value: abs(value - 100))
+    assert macro_check.value == pytest.approx(worst)
@@ -0,0 +1,107 @@
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from conftest import StreamingSDKClient
+from first_time_plans.call_llm_class import FIX_MESSAGE, BaseLLM, response_format
+from first_time_plans.deadline import request_deadline
+from first_time_plans.output_repair import coerce_to_schema, describe_errors, repair_json, repair_output
+
+class Meal(BaseModel):
+    name: str
+    calories: int
+    protein: float
+
+class MealPlan(BaseModel):
+    meals: List[Meal]
+
+class ScriptedClient:
+    """Answers create() calls with the given contents in turn and keeps the messages it was sent."""
+
+    def __init__(self, *contents, finish_reason="stop"):
+        self.contents = list(contents)
+        self.finish_reason = finish_reason
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        self.requests.append(messages)
+        finish_reason = self.finish_reason if len(self.requests) == 1 else "stop"
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=self.contents.pop(0)), finish_reason=finish_reason)],
+            usage=None
+        )
+
+def test_repair_json_strips_fences_prose_and_trailing_commas():
+    text = 'Here is the plan:\n```json\n{"meals": [{"name": "Oats, milk", "calories": 350,},],}\n```'
+    assert repair_json(text) == {"meals": [{"name": "Oats, milk", "calories": 350}]}
+    with pytest.raises(ValueError):
+        repair_json("no json here")
+
+def test_repair_json_completes_truncated_output():
+    assert repair_json('{"meals": [{"name": "Oats", "calories": 350}, {"name": "Ri') == {
+        "meals": [{"name": "Oats", "calories": 350}, {"name": "Ri"}]
+    }
+
+def test_numeric_fields_are_coerced():
+    data = {"meals": [{"name": "Oats", "calories": "1,200 kcal", "protein": "30.5g"}, {"name": "Rice", "calories": 399.6, "protein": 8}]}
+    plan = coerce_to_schema(MealPlan, data)
+    assert [meal.calories for meal in plan.meals] == [1200, 400]
+    assert plan.meals[0].protein == 30.5
+    with pytest.raises(ValidationError):
+        coerce_to_schema(Meal, {"name": "Oats", "calories": "lots", "protein": 1})
+
+def test_describe_errors_lists_paths():
+    with pytest.raises(ValidationError) as error:
+        repair_output(MealPlan, '{"meals": [{"name": "Oats"}]}')
+    assert "- meals.0.calories: Field required" in describe_errors(error.value)
+
+def test_locally_repairable_output_needs_no_follow_up():
+    client = ScriptedClient('```json\n{"name": "Oats", "calories": "350", "protein": 12,}\n```')
+    llm = BaseLLM(llm_client=client, model="repair-test-model")
+    assert llm.call_llm("plan", "system", schema=Meal, as_model=True) == Meal(name="Oats", calories=350, protein=12)
+    assert len(client.requests) == 1
+
+def test_response_format_is_the_strict_schema():
+    fmt = response_format(MealPlan)
+    assert fmt["type"] == "json_schema"
+    assert fmt["json_schema"]["name"] == "MealPlan" and fmt["json_schema"]["strict"]
+    assert fmt["json_schema"]["schema"]["$defs"]["Meal"]["additionalProperties"] is False
+
+def test_dict_callers_get_the_validated_output():
+    client = ScriptedClient('{"name": "Oats", "calories": 350, "protein": 12}')
+    llm = BaseLLM(llm_client=client, model="repair-test-model")
+    result = llm.call_llm("plan", "system", schema=Meal)
+    assert result == {"name": "Oats", "calories": 350, "protein": 12.0}
+    assert isinstance(result["protein"], float)
+
+def test_invalid_output_gets_one_fix_request_with_its_errors():
+    client = ScriptedClient(
+        '{"name": "Oats", "calories": "lots", "protein": 12}',
+        '{"name": "Oats", "calories": 350, "protein": 12}'
+    )
+    llm = BaseLLM(llm_client=client, model="repair-test-model")
+    assert llm.call_llm("Plan my breakfast", "system", schema=Meal) == {"name": "Oats", "calories": 350, "protein": 12.0}
+    fix_request = client.requests[1]
+    assert fix_request[0]["content"] == FIX_MESSAGE
+    assert "calories" in fix_request[1]["content"]
+    # Only the broken output and its errors are sent back, not the original prompt
+    assert "breakfast" not in fix_request[1]["content"]
+
+def test_cut_off_output_is_continued():
+    client = ScriptedClient('{"meals": [{"name": "Oats", "calories": 350, "pro', 'tein": 12}]}', finish_reason="length")
+    llm = BaseLLM(llm_client=client, model="repair-test-model")
+    plan = llm.call_llm("plan", "system", schema=MealPlan, as_model=True)
+    assert plan.meals[0].protein == 12
+    assert len(client.requests) == 2
+
+def test_streamed_cut_off_output_is_continued():
+    # Under a request deadline the call streams, and the SDK refuses to parse a cut-off answer
+    client = StreamingSDKClient('{"meals": [{"name": "Oats", "calories": 350, "pro', 'tein": 12}]}', finish_reason="length")
+    llm = BaseLLM(llm_client=client, model="repair-test-model")
+    with request_deadline(30):
+        plan = llm.call_llm("plan", "system", schema=MealPlan, as_model=True)
+    assert plan.meals[0].protein == 12
+    assert len(client.requests) == 2
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from first_time_plans.deadline import DeadlineExceeded
+from first_time_plans.partial_output import FieldEvents, early_input, final_fields
+
+def test_only_fields_followed_by_another_are_final():
+    partial = {"split_type": "upper/lower", "days": 4, "notes": {"volume": "moderate", "rpe": "7"}}
+    assert list(final_fields(partial)) == [("split_type", "upper/lower"), ("days", 4), ("notes.volume", "moderate")]
+
+def test_fields_are_published_as_the_stream_advances():
+    published = []
+    events = FieldEvents(on_field=lambda path, value: published.append(path))
+    events.update('{"split_type": "upper/lo')
+    assert published == []
+    events.update('{"split_type": "upper/lower", "rationale": "Because the client trai')
+    assert published == ["split_type"]
+    assert events.wait("split_type", timeout=0) == {"split_type": "upper/lower"}
+
+    events.complete({"split_type": "upper/lower", "rationale": "done"})
+    assert published == ["split_type", "rationale"]
+
+def test_wait_blocks_until_the_field_is_final():
+    events = FieldEvents()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        waiting = pool.submit(events.wait, "volume", timeout=5)
+        events.update('{"volume": 12, "sets": 3')
+        assert waiting.result() == {"volume": 12}
+
+def test_wait_reports_missing_fields_errors_and_timeouts():
+    events = FieldEvents()
+    with pytest.raises(DeadlineExceeded):
+        events.wait("volume", timeout=0.01)
+    events.complete({"other": 1})
+    with pytest.raises(KeyError):
+        events.wait("volume")
+
+    failed = FieldEvents()
+    failed.fail(RuntimeError("provider error"))
+    with pytest.raises(RuntimeError):
+        failed.wait("volume")
+
+def test_early_input_falls_back_to_the_finished_result():
+    events = FieldEvents()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # The upstream node returns (e.g. a rule-based fallback) without publishing any field
+        future = pool.submit(lambda: {"split": {"split_type": "full body"}})
+        assert early_input(events, future, "split", "split_type") == {"split": {"split_type": "full body"}}
+
+    streamed = FieldEvents()
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        future = pool.submit(release.wait)
+        try:
+            streamed.update('{"split_type": "ppl", "days": 4')
+            assert early_input(streamed, future, "split", "split_type") == {"split": {"split_type": "ppl"}}
+        finally:
+            release.set()
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+import checkIn_fixPlans
+from check_time_plans.data_ingestion.check_in_ingestion import CheckInDataIngestionModule
+from check_time_plans.decisions.plan_patch import PatchOperation, PlanPatch, PlanPatchError, apply_plan_patch, apply_plan_adjustment
+from first_time_plans.call_llm_class import BaseLLM
+from conftest import WORKOUT_PLAN, MEAL_PLAN
+
+@pytest.fixture
+def workout_plan():
+    return CheckInDataIngestionModule().process_check_in_data({"userWorkoutDetails": WORKOUT_PLAN}).workoutPlan
+
+@pytest.fixture
+def meal_plan():
+    return CheckInDataIngestionModule().process_check_in_data({"mealPlan": MEAL_PLAN}).mealPlan
+
+def op(op, path, value=None):
+    return PatchOperation(op=op, path=path, value=value)
+
+def test_replace_add_remove(workout_plan):
+    patched, diff = apply_plan_patch(workout_plan, [
+        op("replace", "/schedule/0/exercises/0/sets", "5"),
+        op("add", "/schedule/0/exercises/-", '{"name": "Dips", "sets": 3, "reps": 10}'),
+        op("remove", "/schedule/3"),
+    ])
+    assert patched.schedule[0].exercises[0].sets == 5
+    assert patched.schedule[0].exercises[-1].name == "Dips"
+    assert len(patched.schedule) == 3
+    assert [entry["before"] for entry in diff] == [4, None, diff[2]["before"]]
+    assert diff[2]["before"]["type"] == "Upper"
+    # The stored plan is left untouched
+    assert workout_plan.schedule[0].exercises[0].sets == 4
+    assert len(workout_plan.schedule) == 4
+
+def test_add_at_end_index(workout_plan):
+    patched, _ = apply_plan_patch(workout_plan, [op("add", "/schedule/4", '{"day": 5, "type": "Rest Day"}')])
+    assert patched.schedule[4].day == 5
+
+@pytest.mark.parametrize("path", [
+    "/schedule/-1/type",
+    "/schedule/-1",
+    "/schedule/+1",
+    "/schedule/-1/exercises/0/sets",
+    "/schedule/9",
+])
+def test_rejects_negative_and_out_of_range_indexes(workout_plan, path):
+    for kind in ("replace", "remove"):
+        with pytest.raises(PlanPatchError):
+            apply_plan_patch(workout_plan, [op(kind, path, '"Upper"')])
+
+def test_rejects_negative_insert_index(workout_plan):
+    with pytest.raises(PlanPatchError):
+        apply_plan_patch(workout_plan, [op("add", "/schedule/-1", '{"day": 5}')])
+
+@pytest.mark.parametrize("path", ["", "/"])
+@pytest.mark.parametrize("kind", ["replace", "remove", "add"])
+def test_rejects_root_path(workout_plan, path, kind):
+    with pytest.raises(PlanPatchError):
+        apply_plan_patch(workout_plan, [op(kind, path, "{}")])
+
+def test_rejects_missing_key_and_bad_pointer(meal_plan):
+    with pytest.raises(PlanPatchError):
+        apply_plan_patch(meal_plan, [op("replace", "/totalDailyNutrition/fiber", "30")])
+    with pytest.raises(PlanPatchError):
+        apply_plan_patch(meal_plan, [op("replace", "totalDailyNutrition/calories", "2400")])
+
+def test_invalid_result_is_rejected(meal_plan):
+    with pytest.raises(PlanPatchError):
+        apply_plan_patch(meal_plan, [op("replace", "/totalDailyNutrition/calories", '"lots"')])
+
+def test_apply_plan_adjustment_reports_changes(workout_plan, meal_plan):
+    patch = PlanPatch(
+        workout_changes_required=False,
+        nutrition_changes_required=True,
+        workout_operations=[],
+        meal_operations=[op("replace", "/totalDailyNutrition/calories", "2400")],
+        rationale="cut calories",
+    )
+    result = apply_plan_adjustment(patch, workout_plan, meal_plan)
+    assert not result["workout_changes_required"]
+    assert result["nutrition_changes_required"]
+    assert result["meal_plan"]["totalDailyNutrition"]["calories"] == 2400
+    assert result["diff"]["meal"][0]["before"] == 2550
+
+def test_refused_plan_patch_is_a_plan_patch_error(workout_plan, meal_plan, monkeypatch):
+    requests = []
+
+    def create(messages, **kwargs):
+        requests.append(messages)
+        message = SimpleNamespace(content=None, refusal="I can't help with that.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=None)
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(checkIn_fixPlans, "llm", BaseLLM(llm_client=client, model="plan-patch-test-model"))
+    with pytest.raises(PlanPatchError, match="can't help"):
+        checkIn_fixPlans.adjust_plan_patch_gpt({}, "report", workout_plan, meal_plan)
+    # A refusal is not repaired with a follow-up
+    assert len(requests) == 1
@@ -0,0 +1,58 @@
+import pytest
+from first_time_plans.Module_A_B.profileCanonicalization import (
+    ProfileCanonicalizer, parse_duration, parse_frequency, parse_height, parse_weight
+)
+
+@pytest.fixture
+def canonicalizer():
+    return ProfileCanonicalizer()
+
+@pytest.mark.parametrize("value, expected", [
+    ("6ft 2in", "188 cm"),
+    ("6'2\"", "188 cm"),
+    ("1.83 m", "183 cm"),
+    ("72 inches", "182.9 cm"),
+    ("183", None),
+    ("tall", None),
+])
+def test_parse_height(value, expected):
+    assert parse_height(value) == expected
+
+def test_parse_weight_duration_and_frequency():
+    assert parse_weight("180 lbs") == "81.6 kg"
+    assert parse_weight("82,5 kg") == "82.5 kg"
+    assert parse_weight("82") is None
+    assert parse_duration("1.5 hours") == "90 min"
+    assert parse_duration("7-8 hours") == "420-480 min"
+    assert parse_frequency("4x a week") == "4 days/week"
+    assert parse_frequency("3 to 4 sessions") == "3-4 days/week"
+
+def test_equivalent_profiles_hash_the_same(canonicalizer):
+    first = {
+        "user_id": "u1",
+        "personal": {"height": "6ft 2in", "weight": "180 lbs", "age": "30 years", "gender": "M"},
+        "goals": {"mainGoals": "Build muscle, lose fat", "supplements": "Creatine, whey"},
+        "lifestyle": {"activityLevel": "Moderate", "sleep": "8 hours", "notes": "  "},
+    }
+    second = {
+        "user_id": "u2",
+        "lifestyle": {"sleep": "480 minutes", "activityLevel": "moderately active"},
+        "goals": {"supplements": "whey,  Creatine", "mainGoals": "fat loss and muscle gain"},
+        "personal": {"gender": "male", "age": "30", "weight": "81.6kg", "height": "188 cm"},
+    }
+    canonical = canonicalizer.canonicalize(first)
+    assert canonical["personal"] == {"age": 30, "gender": "male", "height": "188 cm", "weight": "81.6 kg"}
+    assert canonical["goals"]["mainGoals"] == "fat loss, muscle gain"
+    assert "notes" not in canonical["lifestyle"]
+    assert canonical["user_id"] == "u1"
+    assert canonicalizer.profile_hash(canonical) == canonicalizer.profile_hash(canonicalizer.canonicalize(second))
+
+def test_unrecognized_values_are_kept(canonicalizer):
+    canonical = canonicalizer.canonicalize({"personal": {"height": "about average", "weight": "12.5"}})
+    # A bare number is not given a unit
+    assert canonical["personal"] == {"height": "about average", "weight": 12.5}
+
+def test_record_lists_keep_their_order(canonicalizer):
+    exercises = [{"name": "Squat"}, {"name": "Bench"}]
+    assert canonicalizer.canonicalize({"history": {"exercises": exercises}})["history"]["exercises"] == exercises
+    assert canonicalizer.canonicalize({"tags": ["b", "a", "b"]})["tags"] == ["a", "b"]
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from first_time_plans.call_llm_class import BaseLLM
+from first_time_plans.prompt_prefix import SHARED_PERSONA, build_shared_prefix, canonical_json
+
+class RecordingClient:
+    """Answers every create() with fixed usage and keeps the messages it was sent."""
+
+    def __init__(self):
+        self.messages = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        self.messages.append(messages)
+        usage = SimpleNamespace(
+            prompt_tokens=1000,
+            completion_tokens=50,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=800)
+        )
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="ok"), finish_reason="stop")],
+            usage=usage
+        )
+
+def test_prefix_is_identical_whatever_the_key_order():
+    first = build_shared_prefix({"name": "A", "goals": {"primary": "bulk", "weekly": 0.2}})
+    second = build_shared_prefix({"goals": {"weekly": 0.2, "primary": "bulk"}, "name": "A"})
+    assert first == second
+    assert first.startswith(SHARED_PERSONA)
+    assert canonical_json({"b": 1, "a": "é"}) == '{"a":"é","b":1}'
+
+def test_calls_share_the_prefix_and_record_cached_tokens():
+    client = RecordingClient()
+    prefix = build_shared_prefix({"name": "A"})
+    llm = BaseLLM(llm_client=client, model="prefix-test-model", shared_prefix=prefix)
+
+    llm.call_llm("split?", "You pick the training split.")
+    llm.call_llm("volume?", "You set weekly volume.")
+
+    assert [messages[0]["content"] for messages in client.messages] == [prefix, prefix]
+    assert client.messages[1][1:] == [
+        {"role": "system", "content": "You set weekly volume."},
+        {"role": "user", "content": "volume?"},
+    ]
+    usage = llm.usage_summary()
+    assert (usage["calls"], usage["prompt_tokens"], usage["cached_tokens"]) == (2, 2000, 1600)
+    assert usage["cached_ratio"] == 0.8
+
+def test_without_a_prefix_the_caller_system_message_comes_first():
+    client = RecordingClient()
+    BaseLLM(llm_client=client, model="prefix-test-model").call_llm("hi", "system")
+    assert client.messages[0][0] == {"role": "system", "content": "system"}
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from check_time_plans.analytics.report_analytics import ReportAnalyticsEngine, ewma
+
+def report(day, weight, **fields):
+    return {"day": day, "date": f"2025-03-{day:02d}", "weight": weight, **fields}
+
+@pytest.fixture
+def engine():
+    return ReportAnalyticsEngine()
+
+def test_ewma_matches_the_recursive_definition_and_fills_gaps():
+    values = np.array([np.nan, 80.0, 81.0, np.nan, 79.0])
+    expected, current = [], None
+    for value in [80.0, 80.0, 81.0, 81.0, 79.0]:
+        current = value if current is None else current + 0.3 * (value - current)
+        expected.append(current)
+    assert np.allclose(ewma(values, 0.3), expected)
+    assert np.isnan(ewma(np.array([np.nan, np.nan]), 0.3)).all()
+
+def test_weight_trend_uses_calendar_days_and_skips_missing_weigh_ins(engine):
+    # 0.1 kg/day over dates with a gap, plus a day without a weigh-in
+    reports = [report(1, 80.0), report(2, 0), report(3, 80.2), report(8, 80.7)]
+    weight = engine.compute(reports).weight
+    assert weight.weigh_ins == 3
+    assert weight.weekly_rate_kg == pytest.approx(0.7)
+    assert weight.regression_change == pytest.approx(0.7)
+    assert (weight.start_weight, weight.latest_weight) == (80.0, 80.7)
+
+def test_unsorted_reports_are_ordered_by_date(engine):
+    reports = [report(3, 79.8), report(1, 80.0), report(2, 79.9)]
+    assert engine.compute(reports).weight.weekly_rate_kg == pytest.approx(-0.7)
+
+def test_readiness_drops_with_resting_heart_rate_above_baseline(engine):
+    reports = [report(day, 80, rhr=rhr) for day, rhr in enumerate([60, 60, 62, 63, 64], start=1)]
+    readiness = engine.compute(reports, rhr_baseline=60).readiness
+    assert readiness.rhr_deviation == 3.0
+    assert readiness.readiness_score == 70.0
+
+def test_sleep_activity_and_consistency(engine):
+    reports = [
+        report(1, 80, sleep={"length": 7, "efficiency": 90}, steps=8000, cardio=20, performance="Great session"),
+        report(2, 80, sleep={"length": 8, "efficiency": 92}, steps=10000, stressors="work deadline"),
+    ]
+    analytics = engine.compute(reports)
+    assert analytics.sleep.nights == 2
+    assert analytics.sleep.mean_length == 7.5
+    assert analytics.sleep.length_trend_per_week == pytest.approx(7.0)
+    assert analytics.activity.steps_total == 18000
+    assert analytics.activity.cardio_days == 1
+    assert analytics.performance_consistency == 50.0
+    assert analytics.stress_days == 1
+
+def test_progress_metrics_describe_the_trend(engine):
+    reports = [report(day, 80 + 0.1 * day) for day in range(1, 8)]
+    metrics = engine.to_progress_metrics(engine.compute(reports))
+    assert metrics["weight_trend"].startswith("gaining 0.70 kg/week")
+    assert metrics["recovery_quality"].startswith("unknown")
+
+    flat = engine.to_progress_metrics(engine.compute([report(day, 80) for day in range(1, 8)]))
+    assert flat["weight_trend"].startswith("stable")
+
+def test_empty_period(engine):
+    analytics = engine.compute([])
+    assert analytics.weight.weigh_ins == 0
+    assert analytics.performance_consistency == 0.0
+    assert engine.to_progress_metrics(analytics)["weight_trend"] == "insufficient weigh-ins"
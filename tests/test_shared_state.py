@@ -0,0 +1,71 @@
+import os
+import json
+import threading
+from check_time_plans.data_ingestion.shared_state import file_version, process_lock, write_json_atomic
+from check_time_plans.data_ingestion.user_store import UserInfoStore
+
+def test_atomic_writes_change_the_file_version(tmp_path):
+    path = str(tmp_path / "state.json")
+    assert file_version(path) is None
+    write_json_atomic(path, json.dumps({"n": 1}))
+    first = file_version(path)
+    write_json_atomic(path, json.dumps({"n": 2}))
+    assert file_version(path) != first
+    assert json.load(open(path)) == {"n": 2}
+    assert os.listdir(tmp_path) == ["state.json"]
+
+def test_process_lock_serializes_read_modify_write(tmp_path):
+    path = str(tmp_path / "counter.json")
+    write_json_atomic(path, "0")
+
+    def increment():
+        for _ in range(20):
+            with process_lock(path):
+                value = json.load(open(path))
+                write_json_atomic(path, json.dumps(value + 1))
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert json.load(open(path)) == 80
+
+def test_process_lock_survives_its_file_being_removed(tmp_path):
+    path = str(tmp_path / "counter.json")
+    write_json_atomic(path, "0")
+
+    def increment():
+        for _ in range(20):
+            with process_lock(path):
+                value = json.load(open(path))
+                write_json_atomic(path, json.dumps(value + 1))
+                # As when a record is removed: waiters must not share the deleted lock file
+                os.remove(f"{path}.lock")
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert json.load(open(path)) == 80
+
+def test_user_store_is_shared_between_workers(tmp_path):
+    first, second = UserInfoStore(str(tmp_path)), UserInfoStore(str(tmp_path))
+    first["u1"] = {"userId": "u1", "weight": 80}
+    assert second["u1"] == {"userId": "u1", "weight": 80}
+
+    # A newer save by one worker replaces the other worker's cached copy
+    second["u1"] = {"userId": "u1", "weight": 81}
+    assert first["u1"]["weight"] == 81
+
+    del first["u1"]
+    assert "u1" not in second
+
+def test_user_store_iterates_original_ids(tmp_path):
+    store = UserInfoStore(str(tmp_path))
+    for user_id in ("plain", "mail@example.com"):
+        store[user_id] = {"userId": user_id}
+    assert sorted(store) == ["mail@example.com", "plain"]
+    assert len(store) == 2
+    assert dict(store)["mail@example.com"] == {"userId": "mail@example.com"}
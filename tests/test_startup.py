@@ -0,0 +1,53 @@
+import sys
+import threading
+
+from startup.clients import ClientRegistry
+from startup.config import Settings, _json_setting
+from startup.lazy import LazyObject, lazy_import
+
+def test_lazy_object_builds_once_on_first_use():
+    built = []
+    def factory():
+        built.append(1)
+        return lambda x: x * 2
+
+    lazy = LazyObject(factory, label="double")
+    assert built == []
+    assert "unresolved" in repr(lazy)
+
+    threads = [threading.Thread(target=lazy, args=(1,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert lazy(3) == 6
+    assert built == [1]
+
+def test_lazy_import_defers_the_module_import():
+    sys.modules.pop("colorsys", None)
+    rgb_to_hsv = lazy_import("colorsys", "rgb_to_hsv")
+    assert "colorsys" not in sys.modules
+    assert rgb_to_hsv(1, 0, 0) == (0.0, 1.0, 1)
+    assert "colorsys" in sys.modules
+
+def test_client_registry_shares_one_client_per_name():
+    registry = ClientRegistry()
+    registry.register("fake", object)
+    client = registry.lazy("fake")
+    assert registry.get("fake") is registry.get("fake")
+    assert client.resolve() is registry.get("fake")
+
+def test_settings_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("MODEL_TIERS", "a, b,a")
+    monkeypatch.setenv("STATE_DIR", "relative-state")
+    monkeypatch.setenv("MAX_CONCURRENT_PIPELINES", "2")
+    settings = Settings.from_env()
+    assert settings.model_tiers == ["a", "b"]
+    assert settings.max_concurrent_pipelines == 2
+    assert settings.state_dir.endswith("relative-state") and settings.state_dir.startswith("/")
+
+    routes = tmp_path / "routes.json"
+    routes.write_text('{"VolumeDecisionNode": {"tier": 1}}')
+    assert _json_setting(str(routes)) == {"VolumeDecisionNode": {"tier": 1}}
+    assert _json_setting('{"a": {}}') == {"a": {}}
+    assert _json_setting(None) == {}
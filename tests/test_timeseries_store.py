@@ -0,0 +1,58 @@
+import math
+import numpy as np
+import pytest
+from check_time_plans.data_ingestion.check_in_ingestion import LenientDailyReport
+from check_time_plans.data_ingestion.timeseries_store import TimeSeriesStore, to_epoch_day, from_epoch_day, rolling_stat
+
+def report(date, weight, steps=None):
+    return LenientDailyReport(date=date, weight=weight, steps=steps, macros={"proteins": 150, "carbs": 200, "fats": 60})
+
+@pytest.fixture
+def store(tmp_path):
+    return TimeSeriesStore(root_dir=str(tmp_path))
+
+def test_epoch_day_round_trip():
+    assert from_epoch_day(to_epoch_day("2025-03-01T08:00:00Z")) == "2025-03-01"
+    for bad in ("", "not a date", None):
+        assert math.isnan(to_epoch_day(bad))
+
+def test_latest_write_wins_and_dateless_rows_are_dropped(store):
+    store.append_daily_reports("u1", [report("2025-03-01", 80), report("2025-03-02", 81), report("", 99)])
+    store.append_daily_reports("u1", [report("2025-03-02", 80.5)])
+    data = store.daily_range("u1", fields=["weight"])
+    assert [from_epoch_day(day) for day in data["date"]] == ["2025-03-01", "2025-03-02"]
+    assert data["weight"].tolist() == [80, 80.5]
+
+def test_daily_grid_and_rolling(store):
+    store.append_daily_reports("u1", [report("2025-03-01", 80, 1000), report("2025-03-03", 81, 3000)])
+    grid = store.daily_grid("u1", "steps")
+    assert np.isnan(grid["values"][1])
+    rolling = store.rolling("u1", "steps", window=2, stat="sum")
+    assert rolling["values"].tolist() == [1000, 1000, 3000]
+
+def test_rolling_stat_counts_only_present_values():
+    values = np.array([1.0, np.nan, 3.0, np.nan])
+    assert rolling_stat(values, 2, "count").tolist() == [1, 1, 1, 1]
+    assert rolling_stat(values, 3, "mean").tolist() == [1, 1, 2, 3]
+
+def test_measurement_history_skips_undated_sets(store):
+    store.append_measurements("u1", "2025-03-01", {"waist": 85})
+    store.append_measurements("u1", "", {"waist": 70})
+    store.append_measurements("u1", "", {"waist": 60})
+    store.append_measurements("u1", "2025-03-29", {"waist": 83, "hips": 100})
+    history = store.measurement_history("u1", "waist")
+    assert history["value"].tolist() == [85, 83]
+    summary = store.summarize_measurement_trends("u1", ["waist", "hips"])
+    assert summary == {"waist": {
+        "since": "2025-03-01", "first": 85.0, "latest": 83.0, "check_ins": 2, "change_per_4_weeks": -2.0
+    }}
+
+def test_append_after_a_partial_write_keeps_columns_aligned(store, tmp_path):
+    store.append_daily_reports("u1", [report("2025-03-01", 80)])
+    # An append that died after the weight column but before the date column
+    with open(tmp_path / "u1" / "daily" / "weight.f8", "ab") as f:
+        f.write(np.array([99.0], dtype=np.float64).tobytes() + b"\x00\x00")
+    store.append_daily_reports("u1", [report("2025-03-02", 81)])
+    data = store.daily_range("u1", fields=["weight"])
+    assert [from_epoch_day(day) for day in data["date"]] == ["2025-03-01", "2025-03-02"]
+    assert data["weight"].tolist() == [80, 81]
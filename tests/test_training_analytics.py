@@ -0,0 +1,47 @@
+import pytest
+from check_time_plans.analytics.training_analytics import TrainingJoinEngine, muscle_group_for, normalize_exercise_name, resolve_exercise
+from conftest import WORKOUT_PLAN
+
+@pytest.mark.parametrize("name, group", [
+    ("Lateral Raises", "shoulders"),
+    ("Upright Row", "shoulders"),
+    ("Lat Pulldown", "back"),
+    ("Chest Supported Row", "back"),
+    ("Incline Dumbbell Press", "chest"),
+    ("Chest Press Machine", "chest"),
+    ("Incline DB Curl", "biceps"),
+    ("Leg Curl", "hamstrings"),
+    ("Leg Extension", "quads"),
+    ("Overhead Triceps Extension", "triceps"),
+    ("Triceps Dips", "triceps"),
+    ("Hanging Leg Raise", "core"),
+    ("Standing Calves Raise", "calves"),
+    ("RDL", "hamstrings"),
+    ("OHP", "shoulders"),
+    ("Pull-ups", "back"),
+    ("Plate Loaded Hip Abduction", "other"),
+])
+def test_muscle_group_for(name, group):
+    assert muscle_group_for(normalize_exercise_name(name)) == group
+
+def test_resolve_exercise_to_plan_names():
+    candidates = ("back squat", "barbell row", "bench press")
+    assert resolve_exercise("Squats", candidates) == "back squat"
+    assert resolve_exercise("BB Row", candidates) == "barbell row"
+    assert resolve_exercise("Bench-Press", candidates) == "bench press"
+    assert resolve_exercise("Cable Fly", candidates) == "cable fly"
+
+def test_compute_joins_logs_against_plan():
+    logs = [
+        {"name": "Bench Press", "entries": [
+            {"date": "2025-03-01", "weight": 80, "sets": 4, "reps": 8},
+            {"date": "2025-03-05", "weight": 82.5, "sets": 4, "reps": 8},
+        ]},
+        {"name": "Squats", "entries": [{"date": "2025-03-03", "weight": 100, "sets": 4, "reps": 6}]},
+    ]
+    analytics = TrainingJoinEngine().compute(logs, WORKOUT_PLAN)
+    summaries = {summary.canonical_id: summary for summary in analytics.exercises}
+    assert summaries["bench press"].muscle_group == "chest"
+    assert summaries["bench press"].current_weight == 82.5
+    assert "squat" in summaries
+    assert summaries["squat"].muscle_group == "quads"
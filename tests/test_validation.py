@@ -0,0 +1,27 @@
+from typing import List
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from first_time_plans.validation import get_adapter, to_model, validate_json, validate_python
+
+class Meal(BaseModel):
+    name: str
+    calories: int
+
+def test_adapters_are_built_once_per_schema():
+    assert get_adapter(Meal) is get_adapter(Meal)
+    assert get_adapter(List[Meal]) is get_adapter(List[Meal])
+
+def test_validate_json_and_python():
+    assert validate_json(Meal, '{"name": "Oats", "calories": 350}') == Meal(name="Oats", calories=350)
+    assert validate_json(List[Meal], b'[{"name": "Oats", "calories": 350}]')[0].calories == 350
+    assert validate_python(Meal, {"name": "Eggs", "calories": "200"}).calories == 200
+    with pytest.raises(ValidationError):
+        validate_json(Meal, '{"name": "Oats"}')
+
+def test_to_model_accepts_instances_text_and_dicts():
+    meal = Meal(name="Rice", calories=400)
+    assert to_model(Meal, meal) is meal
+    assert to_model(Meal, '{"name": "Rice", "calories": 400}') == meal
+    assert to_model(Meal, {"name": "Rice", "calories": 400}) == meal